@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark: Gracenote 'ALBUM_FETCH' requests for an ambiguous TOC.
+
+A local stub of the Gracenote Web API answers 'ALBUM_TOC' with several
+candidate albums and answers each 'ALBUM_FETCH' after a simulated
+round-trip latency. The collector is timed with one connection (the
+previous, sequential behavior) and with
+:data:`flacmanager.GRACENOTE_FETCH_CONNECTIONS` connections.
+
+Run from the repository root::
+
+   $ python benchmarks/gracenote_album_fetch.py
+
+A temporary working directory is used so that the default
+*flacmanager.ini* is not written to the repository.
+
+"""
+
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import sys
+from tempfile import TemporaryDirectory
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import flacmanager
+
+
+ALBUMS = 8
+TRACKS = 12
+LATENCY = 0.05
+REPEAT = 5
+
+
+class StubGracenoteHandler(BaseHTTPRequestHandler):
+    """Answers 'ALBUM_TOC' and 'ALBUM_FETCH' queries."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        gn_query = ET.fromstring(body).find("QUERY")
+
+        time.sleep(LATENCY)
+
+        if gn_query.get("CMD") == "ALBUM_TOC":
+            albums = "".join(
+                '<ALBUM ORD="%d"><GN_ID>album-%d</GN_ID></ALBUM>' % (n, n)
+                for n in range(1, ALBUMS + 1))
+        else:
+            gn_id = gn_query.find("GN_ID").text
+            albums = (
+                "<ALBUM><GN_ID>%s</GN_ID><TITLE>Title %s</TITLE>"
+                    "<ARTIST>Artist</ARTIST><DATE>1999</DATE>"
+                    "<GENRE>Rock</GENRE><TRACK_COUNT>%d</TRACK_COUNT>%s"
+                "</ALBUM>") % (
+                    gn_id, gn_id, TRACKS,
+                    "".join(
+                        "<TRACK><TRACK_NUM>%d</TRACK_NUM>"
+                            "<TITLE>Track %d</TITLE></TRACK>" % (t, t)
+                        for t in range(1, TRACKS + 1)))
+        data = (
+            '<RESPONSES><RESPONSE STATUS="OK">%s</RESPONSE></RESPONSES>'
+                % albums).encode("UTF-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def collect(address, toc):
+    collector = flacmanager.GracenoteCDDBMetadataCollector(toc)
+    collector.api_host = "%s:%d" % address
+    collector.use_ssl = False
+
+    started = time.perf_counter()
+    collector.collect()
+    elapsed = time.perf_counter() - started
+
+    assert len(collector.metadata["album_title"]) == ALBUMS
+    return elapsed
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGracenoteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    offsets = tuple(150 + 20000 * t for t in range(TRACKS))
+    toc = flacmanager.TOC(1, TRACKS, offsets, offsets[-1] + 20000)
+
+    with TemporaryDirectory() as tempdir:
+        os.chdir(tempdir)
+        config = flacmanager.get_config()
+        config["Gracenote"]["client_id"] = "1234-ABCD"
+        config["Gracenote"]["user_id"] = "user"
+        # every run must reach the (stub) service
+        config["HTTP"]["cache_dir"] = ""
+
+        connections = flacmanager.GRACENOTE_FETCH_CONNECTIONS
+        results = OrderedDict()
+        for (label, n) in [("sequential", 1), ("concurrent", connections)]:
+            flacmanager.GRACENOTE_FETCH_CONNECTIONS = n
+            best = min(
+                collect(server.server_address, toc) for _ in range(REPEAT))
+            results[label] = best
+            print("%-10s %8.1f ms for %d candidate albums (%d connection%s)"
+                % (label, best * 1000, ALBUMS, n, "" if n == 1 else "s"))
+
+        print("speedup    %8.2fx" % (
+            results["sequential"] / results["concurrent"]))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
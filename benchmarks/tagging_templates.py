@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+"""Micro-benchmark: per-track tagging map evaluation on a 99-track disc.
+
+Compares the previous approach (interpolating the ``[Vorbis]`` and
+``[ID3v2]`` sections and calling :meth:`str.format` for every tag of
+every track) with the compiled, per-album
+:class:`flacmanager.TaggingTemplate`.
+
+Run from the repository root::
+
+   $ python benchmarks/tagging_templates.py
+
+A temporary working directory is used so that the default
+*flacmanager.ini* is not written to the repository.
+
+"""
+
+from collections import OrderedDict
+import os
+import sys
+from tempfile import TemporaryDirectory
+import timeit
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import flacmanager
+
+
+TRACKS = 99
+REPEAT = 5
+
+
+def make_album(ntracks=TRACKS):
+    """Build flattened per-track metadata for a synthetic disc."""
+    album = OrderedDict([
+        ("album_title", "The Long Album"),
+        ("album_artist", "Various Artists"),
+        ("album_label", "Label"),
+        ("album_genre", "Rock"),
+        ("album_year", "1999"),
+        ("album_discnumber", 1),
+        ("album_disctotal", 1),
+        ("album_compilation", True),
+        ("album_tracktotal", ntracks),
+        ("album_cover", None),
+        ("album_discid", "zvKYzMcDcdrk6j1C.wPqrwVX4iA-"),
+    ])
+    custom = OrderedDict([
+        (("MUSICBRAINZ_DISCID", "TXXX"),
+            ["MusicBrainz Disc Id={album_discid}"]),
+        (("TRACKLABEL", "COMM"), ["{track_number:02d} of {album_tracktotal}"]),
+    ])
+
+    per_track_metadata = []
+    for number in range(1, ntracks + 1):
+        track = OrderedDict([
+            ("track_include", True),
+            ("track_number", number),
+            ("track_title", "Track %d" % number),
+            ("track_artist", "Artist %d" % number),
+            ("track_genre", "Rock"),
+            ("track_year", "1999"),
+            ("__custom", custom),
+        ])
+        track.update(album)
+        per_track_metadata.append(track)
+
+    return per_track_metadata
+
+
+def uncompiled_tagging_map(type_, metadata):
+    """The tagging map evaluation used before templates were compiled."""
+    config = flacmanager.get_config()
+
+    tags = OrderedDict()
+    for (tag, spec) in config[type_].items():
+        value = (
+            spec.format(**metadata) if spec[0] == '{'
+            else metadata[spec])
+        if value:
+            tags[tag] = value if type(value) is list else [value]
+
+    custom_tags = OrderedDict()
+    for ((vorbis_comment, id3v2_tag), values) in metadata["__custom"].items():
+        tag = vorbis_comment if type_ == "Vorbis" else id3v2_tag
+        values = [
+            value for value in (spec.format(**metadata) for spec in values)
+            if value]
+        if values:
+            custom_tags.setdefault(tag, []).extend(values)
+    tags.update(custom_tags)
+
+    return tags
+
+
+def compiled_tagging_map(type_, metadata):
+    return flacmanager.get_tagging_template(type_, metadata).evaluate(
+        metadata)
+
+
+def run(make_tagging_map, per_track_metadata):
+    flacmanager._TAGGING_TEMPLATES.clear()
+    for metadata in per_track_metadata:
+        for type_ in ["Vorbis", "ID3v2"]:
+            make_tagging_map(type_, metadata)
+
+
+def main():
+    with TemporaryDirectory() as tempdir:
+        os.chdir(tempdir)
+        flacmanager.get_config()
+
+        per_track_metadata = make_album()
+
+        # sanity check: both approaches produce the same tags
+        for metadata in per_track_metadata:
+            for type_ in ["Vorbis", "ID3v2"]:
+                assert (
+                    uncompiled_tagging_map(type_, metadata)
+                    == compiled_tagging_map(type_, metadata))
+
+        results = OrderedDict()
+        for (label, make_tagging_map) in [
+                ("uncompiled", uncompiled_tagging_map),
+                ("compiled", compiled_tagging_map)]:
+            timer = timeit.Timer(
+                lambda: run(make_tagging_map, per_track_metadata))
+            (number, _) = timer.autorange()
+            best = min(timer.repeat(repeat=REPEAT, number=number)) / number
+            results[label] = best
+            print("%-10s %8.3f ms per %d-track disc (Vorbis + ID3v2)" % (
+                label, best * 1000, TRACKS))
+
+        print("speedup    %8.2fx" % (
+            results["uncompiled"] / results["compiled"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -67,16 +67,23 @@ WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
 FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 OTHER DEALINGS IN THE SOFTWARE."""
 
+import argparse
 from ast import literal_eval
+from bisect import bisect_left
 import atexit
-import cgi
+import base64
 from collections import namedtuple, OrderedDict
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait)
 from configparser import ConfigParser, ExtendedInterpolation
 from copy import deepcopy
 import ctypes as C
 import datetime
+import hashlib
 from functools import lru_cache, partial, total_ordering
-from http.client import HTTPConnection, HTTPMessage, HTTPSConnection
+from http.client import (
+    HTTPConnection, HTTPException, HTTPMessage, HTTPSConnection)
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import imghdr
 from io import BytesIO, StringIO
 import json
@@ -85,20 +92,39 @@ import os
 import plistlib
 import queue
 import re
+import select
+import shutil
+import socket
+import sqlite3
 import ssl
+import string
+import struct
 import subprocess
 import sys
+import tarfile
 from tempfile import mkstemp, TemporaryDirectory
 import threading
 import time
-from tkinter import *
-from tkinter.ttk import *
-import tkinter.filedialog as filedialog
-import tkinter.messagebox as messagebox
-import tkinter.scrolledtext as scrolledtext
-import tkinter.simpledialog as simpledialog
-from urllib.parse import urlparse
-from urllib.request import Request, urlopen
+try:
+    from tkinter import *
+    from tkinter.ttk import *
+    import tkinter.filedialog as filedialog
+    import tkinter.messagebox as messagebox
+    import tkinter.scrolledtext as scrolledtext
+    import tkinter.simpledialog as simpledialog
+except ImportError:
+    # only the UI requires Tk; these stand-ins allow the UI classes to be
+    # defined (but not used) so that the batch and watch commands can run
+    from types import SimpleNamespace
+    Tk = Menu = Frame = LabelFrame = object
+    StringVar = None
+    filedialog = messagebox = scrolledtext = None
+    simpledialog = SimpleNamespace(Dialog=object)
+    _TK_AVAILABLE = False
+else:
+    _TK_AVAILABLE = True
+from urllib.parse import parse_qs, urljoin, urlparse
+from urllib.request import urlopen
 import xml.etree.ElementTree as ET
 
 __all__ = [
@@ -196,7 +222,7 @@ def identify_cdda_device():
     :rtype: :obj:`str`
 
     """
-    # do not trace; called repeatedly by a the DiscCheck thread
+    # do not trace; called repeatedly by DiskutilDiscMonitor
     output = subprocess.check_output(
         ["diskutil", "list"], stderr=subprocess.STDOUT)
     output = output.decode(sys.getfilesystemencoding())
@@ -229,7 +255,7 @@ def identify_cdda_mount_point(device):
     :rtype: :obj:`str`
 
     """
-    # do not trace; called repeatedly by a the DiscCheck thread
+    # do not trace; called repeatedly by DiskutilDiscMonitor
     output = subprocess.check_output(
         ["diskutil", "info", device], stderr=subprocess.STDOUT)
     output = output.decode(sys.getfilesystemencoding())
@@ -248,6 +274,391 @@ _CDDA_DEVICE_IDENT_WAIT = 0.5
 #: inserted CD-DA device's mount point.
 _CDDA_MOUNT_POINT_IDENT_WAIT = 1.5
 
+#: The number of seconds to wait between scans of sysfs for media
+#: changes when kernel uevents are not available (Linux).
+_MEDIA_POLL_INTERVAL = 2.0
+
+#: The number of seconds to wait for newly inserted media to be mounted
+#: before its insertion is reported without a mount point (Linux).
+_MEDIA_MOUNT_WAIT = 5.0
+
+#: The ``NETLINK_KOBJECT_UEVENT`` netlink protocol (see
+#: :file:`linux/netlink.h`).
+_NETLINK_KOBJECT_UEVENT = 15
+
+#: Describes a change in the media of an optical drive. *action* is
+#: "insert" or "eject", *device* is the device file name ("/dev/<device>"),
+#: and *mount_point* is the media's mount point (or ``None``).
+DiscEvent = namedtuple("DiscEvent", ["action", "device", "mount_point"])
+
+
+@logged
+class DiscMonitor:
+    """The interface for watching optical drives for media changes.
+
+    :meth:`events` produces exactly one :obj:`DiscEvent` for each insert
+    and each eject.
+
+    """
+
+    def events(self):
+        """Generate a :obj:`DiscEvent` for each media change.
+
+        This generator blocks until the next media change occurs, and
+        never ends on its own.
+
+        """
+        self.__log.call()
+
+        while True:
+            for event in self.poll():
+                self.__log.info("%r", event)
+                yield event
+            self.wait()
+
+    def poll(self):
+        """Check for media changes since the last call.
+
+        :return: a list of :obj:`DiscEvent`
+        :rtype: :obj:`list`
+
+        """
+        raise NotImplementedError()
+
+    def wait(self):
+        """Block until media may have changed."""
+        raise NotImplementedError()
+
+    def close(self):
+        """Release any resources held by this monitor."""
+        pass
+
+    def eject(self, device):
+        """Eject the media in *device*.
+
+        :arg str device: the device file name ("/dev/<device>")
+        :return: ``True`` if the media was ejected
+        :rtype: :obj:`bool`
+
+        """
+        raise NotImplementedError()
+
+
+@logged
+class DiskutilDiscMonitor(DiscMonitor):
+    """Watches for CD-DA discs by polling ``diskutil`` (Mac OS X)."""
+
+    def __init__(self):
+        self.__log.call()
+        super().__init__()
+
+        self._device = None
+        self._mount_point = None
+        self._candidate = None
+
+    def poll(self):
+        """Report a CD-DA disc once it is mounted, and report its
+        ejection once it is gone.
+
+        """
+        # do not trace; called repeatedly
+        device = identify_cdda_device()
+
+        events = []
+        if self._device is not None and device != self._device:
+            events.append(DiscEvent("eject", self._device, self._mount_point))
+            self._device = self._mount_point = None
+
+        if device is None or device == self._device:
+            self._candidate = None
+        elif device != self._candidate:
+            # give the device time to mount before asking for its mount
+            # point (see wait)
+            self.__log.info("identified CD-DA device %s", device)
+            self._candidate = device
+        else:
+            mount_point = identify_cdda_mount_point(device)
+            if mount_point is not None:
+                self.__log.info("identified CD-DA mount point %s", mount_point)
+                (self._device, self._mount_point) = (device, mount_point)
+                self._candidate = None
+                events.append(DiscEvent("insert", device, mount_point))
+
+        return events
+
+    def wait(self):
+        """Sleep between ``diskutil`` queries."""
+        # do not trace; called repeatedly
+        time.sleep(
+            _CDDA_MOUNT_POINT_IDENT_WAIT if self._candidate is not None
+            else _CDDA_DEVICE_IDENT_WAIT)
+
+    def eject(self, device):
+        """Eject the media in *device* using ``diskutil``."""
+        self.__log.call(device)
+
+        status = subprocess.call(
+            ["diskutil", "eject", device],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        self.__log.return_(status == 0)
+        return status == 0
+
+
+@logged
+class LinuxDiscMonitor(DiscMonitor):
+    """Watches optical drives for media changes on Linux.
+
+    Media presence is read from sysfs (a drive's *size* is non-zero
+    while it holds media), and mount points from the mount table. Both
+    are re-read only when something may have changed: when the kernel
+    sends a block device uevent (over a netlink socket) or when the
+    mount table changes. If uevents are not available, sysfs is scanned
+    every :data:`_MEDIA_POLL_INTERVAL` seconds instead.
+
+    """
+
+    def __init__(
+            self, sysfs_root="/sys", mounts_filename="/proc/self/mounts",
+            dev_root="/dev", use_uevents=True):
+        """
+        :keyword str sysfs_root: where sysfs is mounted
+        :keyword str mounts_filename: the mount table
+        :keyword str dev_root: the folder that holds device files
+        :keyword bool use_uevents:
+           ``False`` to always scan sysfs periodically instead of
+           listening for kernel uevents
+
+        """
+        self.__log.call(
+            sysfs_root=sysfs_root, mounts_filename=mounts_filename,
+            dev_root=dev_root, use_uevents=use_uevents)
+        super().__init__()
+
+        self.sysfs_root = sysfs_root
+        self.mounts_filename = mounts_filename
+        self.dev_root = dev_root
+
+        #: device -> mount point (or ``None``) for reported inserts
+        self._inserted = {}
+        #: device -> time first seen, for media not yet reported
+        self._pending = {}
+
+        self.use_uevents = use_uevents
+
+        self._uevent_socket = None
+        self._mounts_file = None
+        self._poller = None
+
+    def poll(self):
+        """Compare the current media and mount points to those that have
+        been reported.
+
+        Newly inserted media is reported once it is mounted, or after
+        :data:`_MEDIA_MOUNT_WAIT` seconds (without a mount point) if it
+        is not mounted; e.g. a CD-DA disc is not mounted unless a CD-DA
+        file system (or a desktop automounter) is used.
+
+        """
+        # do not trace; called repeatedly
+        present = self._scan_media()
+        now = time.monotonic()
+
+        events = []
+        for device in sorted(set(self._inserted) - set(present)):
+            events.append(
+                DiscEvent("eject", device, self._inserted.pop(device)))
+        for device in set(self._pending) - set(present):
+            del self._pending[device]
+
+        for (device, mount_point) in sorted(present.items()):
+            if device in self._inserted:
+                continue
+            first_seen = self._pending.setdefault(device, now)
+            if mount_point is not None or now - first_seen >= _MEDIA_MOUNT_WAIT:
+                del self._pending[device]
+                self._inserted[device] = mount_point
+                events.append(DiscEvent("insert", device, mount_point))
+
+        return events
+
+    def wait(self):
+        """Block until a block device uevent arrives, the mount table
+        changes, or a pending insert's mount wait expires.
+
+        """
+        # do not trace; called repeatedly
+        if self._poller is None:
+            self._poller = select.poll()
+            if self.use_uevents:
+                self._uevent_socket = self._open_uevent_socket()
+            if self._uevent_socket is not None:
+                self._poller.register(self._uevent_socket, select.POLLIN)
+            try:
+                self._mounts_file = open(self.mounts_filename, "rb")
+            except OSError as e:
+                self.__log.warning(
+                    "unable to watch %s: %s", self.mounts_filename, e)
+            else:
+                self._poller.register(
+                    self._mounts_file, select.POLLPRI | select.POLLERR)
+
+        timeouts = []
+        if self._uevent_socket is None:
+            timeouts.append(_MEDIA_POLL_INTERVAL)
+        if self._pending:
+            timeouts.append(max(0, min(
+                first_seen + _MEDIA_MOUNT_WAIT - time.monotonic()
+                for first_seen in self._pending.values())))
+        timeout = min(timeouts) * 1000 if timeouts else None
+
+        for (fd, _) in self._poller.poll(timeout):
+            if (self._uevent_socket is not None
+                    and fd == self._uevent_socket.fileno()):
+                self._drain_uevents()
+
+    def close(self):
+        """Close the uevent socket and the mount table."""
+        self.__log.call()
+
+        for f in [self._uevent_socket, self._mounts_file]:
+            if f is not None:
+                f.close()
+        self._uevent_socket = self._mounts_file = self._poller = None
+
+    def eject(self, device):
+        """Eject the media in *device* using ``eject``."""
+        self.__log.call(device)
+
+        status = subprocess.call(
+            ["eject", device],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        self.__log.return_(status == 0)
+        return status == 0
+
+    def _scan_media(self):
+        """Return the optical drives that hold media.
+
+        :return: device -> mount point (or ``None``)
+        :rtype: :obj:`dict`
+
+        """
+        block_dirname = os.path.join(self.sysfs_root, "block")
+        try:
+            names = os.listdir(block_dirname)
+        except OSError as e:
+            self.__log.warning("unable to list %s: %s", block_dirname, e)
+            return {}
+
+        mounts = None
+        present = {}
+        for name in names:
+            # SCSI/ATAPI optical drives are always named sr<N>
+            if not re.match(r"sr\d+$", name):
+                continue
+            try:
+                with open(os.path.join(block_dirname, name, "size")) as f:
+                    size = int(f.read().strip() or 0)
+            except (OSError, ValueError):
+                continue
+            if size > 0:
+                if mounts is None:
+                    mounts = self._read_mounts()
+                device = os.path.join(self.dev_root, name)
+                present[device] = mounts.get(device)
+
+        return present
+
+    def _read_mounts(self):
+        """Return device -> mount point from the mount table."""
+        mounts = {}
+        try:
+            with open(self.mounts_filename, "rb") as f:
+                for line in f:
+                    fields = line.split()
+                    if len(fields) < 2:
+                        continue
+                    (device, mount_point) = (
+                        _unescape_mount_field(field) for field in fields[:2])
+                    mounts.setdefault(device, mount_point)
+        except OSError as e:
+            self.__log.warning(
+                "unable to read %s: %s", self.mounts_filename, e)
+
+        return mounts
+
+    def _open_uevent_socket(self):
+        """Open a netlink socket that receives kernel uevents.
+
+        :return: the socket, or ``None`` if uevents are not available
+
+        """
+        self.__log.call()
+
+        try:
+            sock = socket.socket(
+                socket.AF_NETLINK, socket.SOCK_RAW, _NETLINK_KOBJECT_UEVENT)
+            # group 1 is the kernel's own uevent broadcast
+            sock.bind((0, 1))
+            sock.setblocking(False)
+        except (AttributeError, OSError) as e:
+            self.__log.warning(
+                "kernel uevents are not available (%s); scanning sysfs "
+                    "every %.1f seconds",
+                e, _MEDIA_POLL_INTERVAL)
+            return None
+
+        self.__log.return_(sock)
+        return sock
+
+    def _drain_uevents(self):
+        """Read (and discard) all queued uevents.
+
+        Every queued uevent is consumed so that a burst of uevents
+        causes only one rescan.
+
+        """
+        while True:
+            try:
+                self._uevent_socket.recv(8192)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                # e.g. ENOBUFS if uevents were dropped; rescanning anyway
+                # recovers the current state
+                self.__log.warning("uevent socket: %s", e)
+                break
+
+
+def _unescape_mount_field(field):
+    r"""Decode a mount table field, in which spaces, tabs, newlines and
+    backslashes are octal-escaped (e.g. ``\040``).
+
+    """
+    return re.sub(
+        rb"\\([0-7]{3})", lambda m: bytes([int(m.group(1), 8)]), field
+    ).decode(sys.getfilesystemencoding(), "surrogateescape")
+
+
+def get_disc_monitor():
+    """Return the :class:`DiscMonitor` for the current platform.
+
+    :rtype: :class:`LinuxDiscMonitor` on Linux, otherwise
+            :class:`DiskutilDiscMonitor`
+
+    """
+    _log.call()
+
+    if sys.platform.startswith("linux"):
+        monitor = LinuxDiscMonitor()
+    else:
+        monitor = DiskutilDiscMonitor()
+
+    _log.return_(monitor)
+    return monitor
+
+
 #: Used to pass data between a :class:`DiscCheck` thread and the main
 #: thread.
 _DISC_QUEUE = queue.Queue(1)
@@ -266,33 +677,34 @@ class DiscCheck(threading.Thread):
         super().__init__(daemon=True)
 
     def run(self):
-        """Poll for a mounted CD-DA disk device until one is found or an
-        exception occurs.
+        """Wait for a mounted CD-DA disc to be inserted, or for an
+        exception to occur.
 
         """
         self.__log.call()
 
-        device = None
-        mount_point = None
+        monitor = None
         try:
-            while device is None:
-                device = identify_cdda_device()
-                time.sleep(_CDDA_DEVICE_IDENT_WAIT)
-            self.__log.info("identified CD-DA device %s", device)
-
-            while mount_point is None:
-                # sleep first here to give the device time to mount
-                time.sleep(_CDDA_MOUNT_POINT_IDENT_WAIT)
-                mount_point = identify_cdda_mount_point(device)
-            self.__log.info("identified CD-DA mount point %s", mount_point)
-
-            disc_info = (device, mount_point)
+            monitor = get_disc_monitor()
+            for event in monitor.events():
+                if event.action != "insert":
+                    continue
+                elif event.mount_point is None:
+                    # the disc's tracks must be readable as files
+                    self.__log.warning(
+                        "ignoring unmounted disc in %s", event.device)
+                    continue
+                disc_info = (event.device, event.mount_point)
+                break
         except Exception as e:
             self.__log.error("enqueueing %r", e)
             _DISC_QUEUE.put(e)
         else:
             self.__log.info("enqueueing %r", disc_info)
             _DISC_QUEUE.put(disc_info)
+        finally:
+            if monitor is not None:
+                monitor.close()
 
 
 #: Represents a disc table-of-contents (TOC), as read from a
@@ -313,8 +725,24 @@ def read_disc_toc(mountpoint):
     """
     _log.call(mountpoint)
 
-    toc_plist_filename = os.path.join(mountpoint, ".TOC.plist")
-    toc_plist = plistlib.readPlist(toc_plist_filename)
+    toc = read_toc_plist(os.path.join(mountpoint, ".TOC.plist"))
+
+    _log.return_(toc)
+    return toc
+
+
+def read_toc_plist(toc_plist_filename):
+    """Return the :obj:`TOC` from a *.TOC.plist* file.
+
+    :arg str toc_plist_filename: absolute *.TOC.plist* file name
+    :return: a populated TOC for the first CD-DA session
+    :rtype: :obj:`TOC`
+
+    """
+    _log.call(toc_plist_filename)
+
+    with open(toc_plist_filename, "rb") as f:
+        toc_plist = plistlib.load(f)
 
     first_track_number = None
     last_track_number = None
@@ -339,5145 +767,11027 @@ def read_disc_toc(mountpoint):
     return toc
 
 
-#: The global :class:`configparser.ConfigParser` object.
-_config = None
+#: The number of CD-DA frames (sectors) per second of audio; each frame
+#: holds 588 samples (per channel) at 44.1 kHz.
+CDDA_FRAMES_PER_SECOND = 75
 
-#: Used to synchronize access to the global configuration object.
-_CONFIG_LOCK = threading.RLock()
+#: The frame offset of track 1 on a standard CD-DA (the 2-second pregap).
+CDDA_FIRST_TRACK_OFFSET = 150
 
 
-def get_config():
-    """Return the configuration settings.
+@lru_cache(maxsize=4096)
+def calculate_musicbrainz_disc_id(toc):
+    """Return the MusicBrainz Disc ID for the disc *toc*.
 
-    :return: settings read from *flacmanager.ini*
-    :rtype: :class:`configparser.ConfigParser`
+    :arg flacmanager.TOC toc: a disc's table of contents
+    :return: a MusicBrainz Disc ID for *toc*
+    :rtype: :obj:`str`
 
-    The configuration is initialized with default/empty values and saved
-    to disk if it does not exist.
+    The Disc ID is the SHA-1 digest of the first and last track numbers,
+    the lead-out offset and 99 track offsets (zero for absent tracks),
+    formatted as upper-case hexadecimal, and encoded in MusicBrainz's
+    base64 variant (see
+    https://musicbrainz.org/doc/Disc_ID_Calculation).
 
     """
-    _log.call()
+    _log.call(toc)
 
-    global _config
-    with _CONFIG_LOCK:
-        if _config is None:
-            _log.info("initializing configuration")
-            _config = ConfigParser(interpolation=ExtendedInterpolation())
-            _config.optionxform = lambda option: option # preserve casing
+    offsets = [0] * 100
+    offsets[0] = toc.leadout_track_offset
+    for (i, offset) in enumerate(toc.track_offsets):
+        offsets[toc.first_track_number + i] = offset
 
-            if (_config.read("flacmanager.ini") != ["flacmanager.ini"]
-                    or "FLACManager" not in _config
-                    or _config["FLACManager"].get("__version__") !=
-                        __version__):
-                _log.warning(
-                    "flacmanager.ini is missing or outdated; "
-                        "updating to version %s",
-                    __version__)
+    sha1 = hashlib.sha1()
+    sha1.update(
+        ("%02X%02X" % (toc.first_track_number, toc.last_track_number)
+            + "".join("%08X" % offset for offset in offsets)
+        ).encode("us-ascii"))
+    disc_id = base64.b64encode(sha1.digest(), altchars=b"._").replace(
+        b'=', b'-').decode("us-ascii")
 
-                fm = {}
-                if "FLACManager" in _config:
-                    fm.update(_config["FLACManager"])
+    _log.return_(disc_id)
+    return disc_id
 
-                # always make sure this is accurate
-                _config["FLACManager"] = OrderedDict(__version__=__version__)
 
-                for (key, default_value) in [
-                        ("title", "FLACManager ${__version__}"),
-                        ]:
-                    _config["FLACManager"].setdefault(key, default_value)
+@lru_cache(maxsize=4096)
+def calculate_freedb_disc_id(toc):
+    """Return the FreeDB (CDDB1) Disc ID for the disc *toc*.
 
-                if "UI" not in _config:
-                    _config["UI"] = OrderedDict()
-                _config["UI"].setdefault("minwidth", fm.pop("minwidth", "1024"))
-                _config["UI"].setdefault("minheight", fm.pop("minheight", "768"))
-                for (key, default_value) in [
-                        #("minwidth", "1024"),
-                        #("minheight", "768"),
-                        ("padx", "7"),
-                        ("pady", "5"),
-                        ("disable_editing_excluded_tracks", "no"),
-                        ("encoding_max_visible_tracks", "29"),
-                        ]:
-                    _config["UI"].setdefault(key, default_value)
+    :arg flacmanager.TOC toc: a disc's table of contents
+    :return: an eight-digit hexadecimal FreeDB Disc ID for *toc*
+    :rtype: :obj:`str`
 
-                if "Logging" not in _config:
-                    _config["Logging"] = OrderedDict()
-                for (key, default_value) in [
-                        ("level", "WARNING"),
-                        ("filename", "flacmanager.log"),
-                        ("filemode", 'w'),
-                        ("format", 
-                            "%(asctime)s %(levelname)s [%(threadName)s "
-                            "%(name)s.%(funcName)s] %(message)s"),
-                        ]:
-                    _config["Logging"].setdefault(key, default_value)
-                        
+    """
+    _log.call(toc)
 
-                if "HTTP" not in _config:
-                    _config["HTTP"] = OrderedDict()
-                for (key, default_value) in [
-                        ("debuglevel", '0'),
-                        ("timeout", "5.0"),
-                        ]:
-                    _config["HTTP"].setdefault(key, default_value)
+    checksum = sum(
+        sum(int(digit) for digit in str(offset // CDDA_FRAMES_PER_SECOND))
+        for offset in toc.track_offsets)
+    seconds = (
+        toc.leadout_track_offset // CDDA_FRAMES_PER_SECOND
+        - toc.track_offsets[0] // CDDA_FRAMES_PER_SECOND)
+    disc_id = "%08x" % (
+        ((checksum % 0xff) << 24) | (seconds << 8) | len(toc.track_offsets))
 
-                if "Gracenote" not in _config:
-                    _config["Gracenote"] = OrderedDict()
-                for (key, default_value) in [
-                        ("client_id", ""),
-                        ("user_id", ""),
-                        ]:
-                    _config["Gracenote"].setdefault(key, default_value)
+    _log.return_(disc_id)
+    return disc_id
 
-                if "MusicBrainz" not in _config:
-                    _config["MusicBrainz"] = OrderedDict()
-                for (key, default_value) in [
-                        ("contact_url_or_email", ""),
-                        ("libdiscid_location", ""),
-                        ]:
-                    _config["MusicBrainz"].setdefault(key, default_value)
 
-                # TODO: add Discogs for metadata aggregation
-                '''
-                if "Discogs" not in _config:
-                    _config["Discogs"] = OrderedDict()
-                for (key, default_value) in [
-                        ]:
-                    _config["Discogs"].setdefault(key, default_value)
-                '''
+#: Audio file extensions that are recognized in album folders that are
+#: ingested from a watch folder (see :func:`ingest_album`).
+INGEST_AUDIO_EXTENSIONS = [".aiff", ".aif", ".aifc", ".wav", ".flac"]
 
-                if "Organize" not in _config:
-                    _config["Organize"] = OrderedDict()
-                for (key, default_value) in [
-                        ("library_root", ""),
-                        ("library_subroot_trie_key", "album_artist"),
-                        ("library_subroot_compilation_trie_key",
-                            "album_title"),
-                        ("library_subroot_trie_level", '1'),
-                        ("trie_ignore_leading_article", "a an the"),
-                        ("album_folder", "{album_artist}/{album_title}"),
-                        ("ndisc_album_folder", "${album_folder}"),
-                        ("compilation_album_folder", "{album_title}"),
-                        ("ndisc_compilation_album_folder",
-                            "${compilation_album_folder}"),
-                        ("track_filename", "{track_number:02d} {track_title}"),
-                        ("ndisc_track_filename",
-                            "{album_discnumber:02d}-${track_filename}"),
-                        ("compilation_track_filename",
-                            "${track_filename} ({track_artist})"),
-                        ("ndisc_compilation_track_filename",
-                            "{album_discnumber:02d}-${compilation_track_filename}"),
-                        ("use_xplatform_safe_names", "yes"),
-                        ("save_cover_image", "yes"),
-                        ]:
-                    _config["Organize"].setdefault(key, default_value)
 
-                if "FLAC" not in _config:
-                    _config["FLAC"] = OrderedDict()
-                for (key, default_value) in [
-                        ("library_root", "${Organize:library_root}/FLAC"),
-                        ("library_subroot_trie_key",
-                            "${Organize:library_subroot_trie_key}"),
-                        ("library_subroot_compilation_trie_key",
-                            "${Organize:library_subroot_compilation_trie_key}"),
-                        ("library_subroot_trie_level",
-                            "${Organize:library_subroot_trie_level}"),
-                        ("trie_ignore_leading_article",
-                            "${Organize:trie_ignore_leading_article}"),
-                        ("album_folder", "${Organize:album_folder}"),
-                        ("ndisc_album_folder",
-                            "${Organize:ndisc_album_folder}"),
-                        ("compilation_album_folder",
-                            "${Organize:compilation_album_folder}"),
-                        ("ndisc_compilation_album_folder",
-                            "${Organize:ndisc_compilation_album_folder}"),
-                        ("track_filename", "${Organize:track_filename}"),
-                        ("ndisc_track_filename",
-                            "${Organize:ndisc_track_filename}"),
-                        ("compilation_track_filename",
-                            "${Organize:compilation_track_filename}"),
-                        ("ndisc_compilation_track_filename",
-                            "${Organize:ndisc_compilation_track_filename}"),
-                        ("track_fileext", ".flac"),
-                        ("use_xplatform_safe_names",
-                            "${Organize:use_xplatform_safe_names}"),
-                        ("save_cover_image", "${Organize:save_cover_image}"),
-                        ("flac_encode_options",
-                            "--force --keep-foreign-metadata --verify"),
-                        ("flac_decode_options", "--force"),
-                        ]:
-                    _config["FLAC"].setdefault(key, default_value)
+def read_audio_sample_count(filename):
+    """Read the length of a WAV, AIFF/AIFF-C or FLAC audio file.
 
-                if "Vorbis" not in _config:
-                    _config["Vorbis"] = OrderedDict()
-                for (key, default_value) in [
-                        ("ALBUM", "album_title"),
-                        ("ALBUMARTIST", "album_artist"),
-                        ("ORGANIZATION", "album_label"),
-                        ("LABEL", "${ORGANIZATION}"),
-                        ("DISCNUMBER", "{album_discnumber:d}"),
-                        ("DISCTOTAL", "{album_disctotal:d}"),
-                        ("TRACKNUMBER", "{track_number:d}"),
-                        ("TRACKTOTAL", "{album_tracktotal:d}"),
-                        ("TITLE", "track_title"),
-                        ("ARTIST", "track_artist"),
-                        ("GENRE", "track_genre"),
-                        ("DATE", "track_year"),
-                        ("COMPILATION", "{album_compilation:d}"),
-                        ]:
-                    _config["Vorbis"].setdefault(key, default_value)
+    :arg str filename: absolute audio file name
+    :return:
+       a 2-tuple (number of samples per channel, sample rate)
+    :raises FLACManagerError:
+       if *filename* is not a recognized (or is an incomplete) audio
+       file
 
-                if "MP3" not in _config:
-                    _config["MP3"] = OrderedDict()
-                for (key, default_value) in [
-                        ("library_root", "${Organize:library_root}/MP3"),
-                        ("library_subroot_trie_key",
-                            "${Organize:library_subroot_trie_key}"),
-                        ("library_subroot_compilation_trie_key",
-                            "${Organize:library_subroot_compilation_trie_key}"),
-                        ("library_subroot_trie_level",
-                            "${Organize:library_subroot_trie_level}"),
-                        ("trie_ignore_leading_article",
-                            "${Organize:trie_ignore_leading_article}"),
-                        ("album_folder", "${Organize:album_folder}"),
-                        ("ndisc_album_folder",
-                            "${Organize:ndisc_album_folder}"),
-                        ("compilation_album_folder",
-                            "${Organize:compilation_album_folder}"),
-                        ("ndisc_compilation_album_folder",
-                            "${Organize:ndisc_compilation_album_folder}"),
-                        ("track_filename", "${Organize:track_filename}"),
-                        ("ndisc_track_filename",
-                            "${Organize:ndisc_track_filename}"),
-                        ("compilation_track_filename",
-                            "${Organize:compilation_track_filename}"),
-                        ("ndisc_compilation_track_filename",
-                            "${Organize:ndisc_compilation_track_filename}"),
-                        ("track_fileext", ".mp3"),
-                        ("use_xplatform_safe_names",
-                            "${Organize:use_xplatform_safe_names}"),
-                        ("save_cover_image", "${Organize:save_cover_image}"),
-                        ("lame_encode_options",
-                            "--clipdetect -q 2 -V2 -b 224"),
-                        ]:
-                    _config["MP3"].setdefault(key, default_value)
+    Only the file headers are read.
 
-                if "ID3v2" not in _config:
-                    _config["ID3v2"] = OrderedDict()
-                for (key, default_value) in [
-                        ("TALB", "album_title"),
-                        ("TPE2", "album_artist"),
-                        ("TPUB", "album_label"),
-                        ("TPOS", "{album_discnumber:d}/{album_disctotal:d}"),
-                        ("TRCK", "{track_number:d}/{album_tracktotal:d}"),
-                        ("TIT2", "track_title"),
-                        ("TIT1", "${TPE1}"),
-                        ("TPE1", "track_artist"),
-                        ("TCON", "track_genre"),
-                        ("TYER", "track_year"),
-                        ("TDRC", "${TYER}"),
-                        ("TCMP", "{album_compilation:d}"),
-                        ]:
-                    _config["ID3v2"].setdefault(key, default_value)
+    """
+    _log.call(filename)
+
+    with open(filename, "rb") as f:
+        magic = f.read(12)
+        if magic[:4] == b"RIFF" and magic[8:] == b"WAVE":
+            rv = _read_wav_sample_count(f)
+        elif magic[:4] == b"FORM" and magic[8:] in [b"AIFF", b"AIFC"]:
+            rv = _read_aiff_sample_count(f)
+        elif magic[:4] == b"fLaC":
+            f.seek(0)
+            (blocks, _) = _read_flac_metadata_blocks(f)
+            streaminfo = int.from_bytes(blocks[0][1][10:18], "big")
+            rv = (streaminfo & ((1 << 36) - 1), streaminfo >> 44)
+        else:
+            rv = None
 
-                with open("flacmanager.ini", 'w') as f:
-                    _config.write(f)
+    if rv is None or not rv[1]:
+        raise FLACManagerError(
+            "%s is not a recognized (or complete) audio file" % filename,
+            context_hint="Ingest")
 
-        _log.return_(_config)
-        return _config
+    _log.return_(rv)
+    return rv
 
 
-def save_config():
-    """Write the configuration settings to an INI-style file."""
-    _log.call()
+def _read_wav_sample_count(f):
+    """Return (samples, sample rate) from the chunks of a WAV file.
 
-    with _CONFIG_LOCK:
-        config = get_config()
+    :arg f: a WAV file positioned after the ``RIFF`` header
 
-        with open("flacmanager.ini", 'w') as f:
-            config.write(f)
+    """
+    (block_align, sample_rate, data_size) = (None, None, None)
+    while data_size is None:
+        header = f.read(8)
+        if len(header) != 8:
+            return None
+        (chunk_id, size) = (header[:4], struct.unpack("<I", header[4:])[0])
+        if chunk_id == b"fmt ":
+            fmt = f.read(size + (size & 1))
+            (sample_rate,) = struct.unpack_from("<I", fmt, 4)
+            (block_align,) = struct.unpack_from("<H", fmt, 12)
+        elif chunk_id == b"data":
+            data_size = size
+        else:
+            f.seek(size + (size & 1), os.SEEK_CUR) # chunks are word-aligned
 
+    if not block_align:
+        return None
 
-def make_tempfile(suffix=".tmp", prefix="fm"):
-    """Create a temporary file.
+    return (data_size // block_align, sample_rate)
 
-    :keyword str suffix: the default file extenstion
-    :keyword str prefix: prepended to the beginning of the filename
-    :return: the temporary file name
-    :rtype: :obj:`str`
 
-    The temporary file will be deleted automatically when the program
-    exits.
+def _read_aiff_sample_count(f):
+    """Return (samples, sample rate) from the ``COMM`` chunk of an AIFF
+    or AIFF-C file.
+
+    :arg f: an AIFF file positioned after the ``FORM`` header
 
     """
-    (fd, filename) = mkstemp(suffix=suffix, prefix=prefix)
-    # close the file descriptor; it isn't inherited by child processes
-    os.close(fd)
-    # clean up the temp file when FLACManager exits
-    atexit.register(os.unlink, filename)
-    _log.debug("created temp file %s", filename)
-    return filename
+    while True:
+        header = f.read(8)
+        if len(header) != 8:
+            return None
+        (chunk_id, size) = (header[:4], struct.unpack(">I", header[4:])[0])
+        if chunk_id == b"COMM":
+            comm = f.read(18)
+            (sample_frames,) = struct.unpack_from(">I", comm, 2)
+            # the sample rate is an 80-bit IEEE 754 extended precision float
+            (exponent, mantissa) = struct.unpack_from(">HQ", comm, 8)
+            sample_rate = mantissa * 2 ** ((exponent & 0x7fff) - 16383 - 63)
+            return (sample_frames, int(round(sample_rate)))
+        f.seek(size + (size & 1), os.SEEK_CUR) # chunks are word-aligned
+
+
+def make_synthetic_toc(sample_counts):
+    """Build a CD-DA :obj:`TOC` for audio tracks that were not read
+    from a mounted disc.
+
+    :arg list sample_counts:
+       a (number of samples per channel, sample rate) pair for each
+       track, as returned by :func:`read_audio_sample_count`
+    :return: a TOC whose track offsets are derived from the track lengths
+    :rtype: :obj:`TOC`
 
+    Tracks are laid out contiguously from frame
+    :data:`CDDA_FIRST_TRACK_OFFSET`, as on a standard CD-DA. For audio
+    that was ripped gaplessly from a CD, the TOC (and so the disc IDs)
+    will usually match those of the original disc. Partial frames (from
+    audio that was *not* ripped from a CD) are rounded up.
 
-class FLACManagerError(Exception):
-    """The type of exception raised when FLACManager operations fail."""
+    """
+    _log.call(sample_counts)
 
-    def __init__(self, message, context_hint=None, cause=None):
-        """
-        :arg str message: error message for logging or display
-        :keyword context_hint: describes the error context
-        :keyword Exception cause: the exception that caused this error
+    track_offsets = []
+    offset = CDDA_FIRST_TRACK_OFFSET
+    for (samples, sample_rate) in sample_counts:
+        track_offsets.append(offset)
+        # i.e. ceil(seconds * 75)
+        offset += -(-samples * CDDA_FRAMES_PER_SECOND // sample_rate)
 
-        The optional *context_hint* is not part of the message, and may
-        take any type or form. Exception handlers that catch
-        ``FLACManagerError`` may choose to do something with the context
-        hint, or may ignore it.
+    toc = TOC(1, len(track_offsets), tuple(track_offsets), offset)
 
-        The optional *cause* is the (caught) exception that caused this
-        ``FLACManagerError``.
+    _log.return_(toc)
+    return toc
 
-        """
-        super().__init__(message)
-        self.context_hint = context_hint
-        self.cause = cause
 
+#: The number of samples (per channel) in one CD-DA frame.
+CDDA_SAMPLES_PER_FRAME = 588
 
-#: The standard amount of X-axis padding for the FLACManager UI.
-_PADX = 7
+#: The number of bytes of (16-bit stereo) audio in one CD-DA frame.
+CDDA_BYTES_PER_FRAME = 2352
 
-#: The standard amount of Y-axis padding for the FLACManager UI.
-_PADY = 5
+#: Identifies the audio for one track when it is only part of a larger
+#: file (e.g. a disc image). The ``flac`` encoder reads *filename* from
+#: sample *skip* up to (but not including) sample *until* (``None``
+#: means the end of the file). *raw_endian* is ``None`` for WAV, AIFF
+#: and FLAC files; for raw 16-bit stereo 44.1 kHz PCM it is the byte
+#: order (``"little"`` or ``"big"``).
+TrackSource = namedtuple(
+    "TrackSource", ["filename", "skip", "until", "raw_endian"])
 
 
 @logged
-class FLACManager(Tk):
-    """The FLACManager GUI application."""
+class TOCProvider:
+    """Base class for the sources of a disc :obj:`TOC` and of the audio
+    for each of its tracks.
 
-    #: Any HTTP(S) request issued by FLACManager uses this value for the
-    #: HTTP User-Agent header value.
-    USER_AGENT = "FLACManager/{v} Python/{vi[0]:d}.{vi[1]:d}.{vi[2]:d}".format(
-        v=__version__, vi=sys.version_info)
+    Subclasses are registered in :data:`TOC_PROVIDERS`.
 
-    def __init__(self):
-        self.__log.call()
-        super().__init__()
+    """
 
-        config = get_config()
+    @classmethod
+    def accepts(cls, path):
+        """Return ``True`` if this provider can read *path*.
 
-        self.title(config["FLACManager"]["title"])
-        self.minsize(
-            config["UI"].getint("minwidth"), config["UI"].getint("minheight"))
+        :arg str path: a file or folder name
 
-        self.config(menu=_FMMenu(self, name="menubar"))
+        """
+        return False
 
-        self._disc_frame = _FMDiscFrame(self, name="disc_frame", text="Disc")
-        self._status_frame = _FMStatusFrame(self, name="status_frame")
-        self._editor_frame = _FMEditorFrame(self, name="editor_frame")
-        self._encoding_status_frame = _FMEncodingStatusFrame(
-            self, name="encoding_status_frame", text="Encoding status")
+    def __init__(self, path):
+        """
+        :arg str path: the file or folder that holds the disc (image)
 
-        self.reset()
+        """
+        self.__log.call(path)
+        self.path = path
 
-    @property
-    def disk(self):
-        """The disk device node for the inserted CD-DA disc."""
-        return self.__disk
+    def read_toc(self):
+        """Return the :obj:`TOC` for the disc.
 
-    @property
-    def mountpoint(self):
-        """The file system mount point for the inserted CD-DA disc."""
-        return self.__mountpoint
+        :rtype: :obj:`TOC`
 
-    @property
-    def toc(self):
-        """The CD-DA disc's :obj:`TOC` (table-of-contents)."""
-        return self.__toc
+        """
+        raise NotImplementedError()
 
-    def reset(self):
-        """(Re)Initialize the FLACManager GUI."""
-        self._remove()
+    def track_sources(self):
+        """Return the audio source for each track, in track order.
 
-        self.__disk = None
-        self.__mountpoint = None
-        self.__toc = None
+        :return:
+           a list of file names and/or :obj:`TrackSource` items, each of
+           which may be passed to :func:`encode_flac`
+        :rtype: :obj:`list`
 
-        # not repacked until user initiates rip+tag
-        self._encoding_status_frame.reset()
+        """
+        raise NotImplementedError()
 
-        # not repacked until metadata for an inserted disc has been aggregated
-        self._editor_frame.reset()
 
-        self._disc_frame.reset()
-        self._disc_frame.pack(anchor=N, fill=X, padx=_PADX, pady=_PADY)
+@logged
+class TOCPlistProvider(TOCProvider):
+    """Reads the TOC from the *.TOC.plist* file of a mounted disc (or of
+    a copy of a mounted disc's folder).
 
-        self._status_frame.reset()
-        self._status_frame.pack(anchor=N, fill=X, padx=_PADX, pady=_PADY)
+    """
 
-        if self.has_required_config:
-            self.check_for_disc()
-        else:
-            self._status_frame.required_configuration_missing()
+    @classmethod
+    def accepts(cls, path):
+        """Return ``True`` if *path* is a folder with a *.TOC.plist*."""
+        return os.path.isfile(os.path.join(path, ".TOC.plist"))
 
-        self.update()
+    def read_toc(self):
+        """Return the :obj:`TOC` from *.TOC.plist*."""
+        self.__log.call()
+        return read_disc_toc(self.path)
 
-    def _remove(self):
-        self._encoding_status_frame.pack_forget()
-        self._editor_frame.pack_forget()
-        self._status_frame.pack_forget()
-        self._disc_frame.pack_forget()
+    def track_sources(self):
+        """Return the CD-DA (AIFF) file names, in track order."""
+        self.__log.call()
 
-        self._persistence = None
+        track_sources = [
+            os.path.join(self.path, name)
+            for name in sorted(os.listdir(self.path), key=_natural_sort_key)
+            if not name.startswith('.')
+                and os.path.splitext(name)[1].lower() in [
+                    ".aiff", ".aif", ".aifc", ".cdda", ".cda"]]
 
-    @property
-    def has_required_config(self):
-        """Whether or not required configuration settings have been
-        specified.
+        self.__log.return_(track_sources)
+        return track_sources
 
-        """
-        config = get_config()
 
-        # the following options MUST be set by the user before FLACManager can
-        # be used
-        return (
-            config["Organize"].get("library_root")
-            and config["Gracenote"].get("client_id")
-            and config["MusicBrainz"].get("contact_url_or_email")
-            and config["MusicBrainz"].get("libdiscid_location")
-        )
+@logged
+class CueSheetProvider(TOCProvider):
+    """Reads the TOC from a CUE sheet.
 
-    def edit_required_config(self):
-        """Open a *flacmanager.ini* editor to allow the user to provide
-        required configuration settings.
+    The audio may be a single image file or one file per track, and
+    may be raw PCM (``BINARY`` or ``MOTOROLA``) or a ``WAVE``, ``AIFF``
+    or ``FLAC`` file. Only audio discs are supported; a pregap
+    (``INDEX 00``) is encoded as part of the preceding track.
+
+    """
+
+    @classmethod
+    def accepts(cls, path):
+        """Return ``True`` if *path* is a *.cue* file, or a folder that
+        contains exactly one *.cue* file.
 
         """
-        EditRequiredConfigurationDialog(
-            self, title="Edit flacmanager.ini (required settings)")
+        return (
+            (os.path.isfile(path) and path.lower().endswith(".cue"))
+            or _find_single_file(path, [".cue"]) is not None)
 
-        if self.has_required_config:
-            self.reset()
-            self.check_for_disc()
+    def __init__(self, path):
+        """
+        :arg str path: a *.cue* file, or a folder that contains one
 
-    def check_for_disc(self):
-        """Spawn the :class:`DiscCheck` thread."""
+        """
+        self.__log.call(path)
+        super().__init__(path)
+
+        self.cue_filename = (
+            path if os.path.isfile(path) else _find_single_file(path, [".cue"]))
+
+        track_offsets = []
+        self._track_sources = []
+        file_offset = CDDA_FIRST_TRACK_OFFSET
+        for (filename, file_type, indexes) in _parse_cue_sheet(
+                self.cue_filename):
+            if file_type in ["BINARY", "MOTOROLA"]:
+                raw_endian = "little" if file_type == "BINARY" else "big"
+                sample_rate = 44100
+                frames = -(-os.path.getsize(filename) // CDDA_BYTES_PER_FRAME)
+            else:
+                raw_endian = None
+                (samples, sample_rate) = read_audio_sample_count(filename)
+                frames = -(-samples * CDDA_FRAMES_PER_SECOND // sample_rate)
+
+            # INDEX positions are CD-DA frames; flac skips by samples
+            samples_per_frame = sample_rate // CDDA_FRAMES_PER_SECOND
+            for (i, index) in enumerate(indexes):
+                track_offsets.append(file_offset + index)
+                self._track_sources.append(TrackSource(
+                    filename, index * samples_per_frame,
+                    (indexes[i + 1] * samples_per_frame
+                        if i + 1 < len(indexes) else None),
+                    raw_endian))
+
+            file_offset += frames
+
+        if not track_offsets:
+            raise FLACManagerError(
+                "%s does not contain any tracks" % self.cue_filename,
+                context_hint="Ingest")
+
+        self._toc = TOC(
+            1, len(track_offsets), tuple(track_offsets), file_offset)
+
+    def read_toc(self):
+        """Return the :obj:`TOC` described by the CUE sheet."""
         self.__log.call()
+        return self._toc
 
-        self._disc_frame.reset()
-        DiscCheck().start()
-        self._update_disc_info()
+    def track_sources(self):
+        """Return a :obj:`TrackSource` for each track."""
+        self.__log.call()
+        return list(self._track_sources)
 
-    def _update_disc_info(self):
-        """Update the UI if a CD-DA disc is present.
 
-        If a disc is **not** present, set a UI timer to check again.
+@logged
+class RawImageProvider(TOCProvider):
+    """Reads the audio for each track from a raw (2352 bytes per frame,
+    16-bit little-endian stereo) image of a disc's audio session.
 
-        """
-        # do not trace; called indefinitely until a disc is found
-        try:
-            disc_info = _DISC_QUEUE.get_nowait()
-        except queue.Empty:
-            self.after(QUEUE_GET_NOWAIT_AFTER, self._update_disc_info)
-        else:
-            _DISC_QUEUE.task_done()
+    Because a raw image does not record where tracks begin, the TOC is
+    read from a *.TOC.plist* file that has the same base name as the
+    image (e.g. *disc.bin* and *disc.TOC.plist*). The image is assumed
+    to begin at the first track.
 
-            if isinstance(disc_info, Exception):
-                self.__log.error("dequeued %r", disc_info)
-                show_exception_dialog(disc_info)
-                self._disc_frame.disc_check_failed()
-                return
+    """
 
-            self.__log.debug("dequeued %r", disc_info)
-            (self.__disk, self.__mountpoint) = disc_info
-            self._disc_frame.disc_mounted(self.mountpoint)
+    #: Recognized raw image file extensions.
+    extensions = [".bin", ".img", ".raw", ".cdr"]
 
-            self.__toc = read_disc_toc(self.mountpoint)
+    @classmethod
+    def accepts(cls, path):
+        """Return ``True`` if *path* is a raw image (or a folder that
+        contains exactly one raw image) with a *.TOC.plist* file.
 
-            self.aggregate_metadata()
+        """
+        image_filename = (
+            path if os.path.isfile(path)
+            else _find_single_file(path, cls.extensions))
+        return (
+            image_filename is not None
+            and os.path.splitext(image_filename)[1].lower() in cls.extensions
+            and os.path.isfile(cls._toc_plist_filename(image_filename)))
 
-    def aggregate_metadata(self):
-        """Spawn the :class:`MetadataAggregator` thread."""
-        self.__log.call()
+    @staticmethod
+    def _toc_plist_filename(image_filename):
+        """Return the *.TOC.plist* file name for *image_filename*."""
+        return os.path.splitext(image_filename)[0] + ".TOC.plist"
 
-        self._status_frame.aggregating_metadata()
-        self._status_frame.pack(anchor=N, fill=X, padx=_PADX, pady=_PADY)
+    def __init__(self, path):
+        """
+        :arg str path: a raw image file, or a folder that contains one
 
-        try:
-            MetadataAggregator(self.toc).start()
-        except Exception as e:
-            self.__log.exception("failed to start metadata aggregator")
-            show_exception_dialog(e)
+        """
+        self.__log.call(path)
+        super().__init__(path)
 
-            self._status_frame.aggregation_failed()
-        else:
-            self._update_aggregated_metadata()
+        self.image_filename = (
+            path if os.path.isfile(path)
+            else _find_single_file(path, self.extensions))
 
-    def _update_aggregated_metadata(self):
-        """Update the UI if aggregated metadata is ready.
+    def read_toc(self):
+        """Return the :obj:`TOC` from the image's *.TOC.plist* file.
 
-        If aggregated metadata is **not** ready, set a UI timer to check
-        again.
+        :raises FLACManagerError:
+           if the image is shorter than the TOC
 
         """
-        # don't log entry into this method - it calls itself recursively until
-        # the aggregated metadata is ready
-        try:
-            aggregator = _AGGREGATOR_QUEUE.get_nowait()
-        except queue.Empty:
-            self.after(
-                QUEUE_GET_NOWAIT_AFTER, self._update_aggregated_metadata)
-        else:
-            self.__log.debug("dequeued %r", aggregator)
-            _AGGREGATOR_QUEUE.task_done()
-
-            self._persistence = aggregator.persistence
-            # metadata may be "partial" if an error occurred while collecting
-            # or aggregating, but initialize the editor frame regardless
-            self._editor_frame.metadata_ready_for_editing(aggregator.metadata)
+        self.__log.call()
 
-            if not aggregator.exceptions:
-                self._edit_metadata()
-            else:
-                show_exception_dialog(aggregator.exceptions[0])
-                self._status_frame.aggregation_failed()
+        toc = read_toc_plist(self._toc_plist_filename(self.image_filename))
 
-    def _edit_metadata(self):
-        """Display the metadata editor."""
-        self.__log.call()
+        image_frames = -(
+            -os.path.getsize(self.image_filename) // CDDA_BYTES_PER_FRAME)
+        if image_frames < toc.leadout_track_offset - toc.track_offsets[0]:
+            raise FLACManagerError(
+                "%s is shorter (%d frames) than its TOC (%d frames)" % (
+                    self.image_filename, image_frames,
+                    toc.leadout_track_offset - toc.track_offsets[0]),
+                context_hint="Ingest")
 
-        self._status_frame.pack_forget()
-        self._editor_frame.pack(anchor=N, fill=BOTH, padx=_PADX, pady=_PADY)
-        self._disc_frame.rip_and_tag_ready()
+        self.__log.return_(toc)
+        return toc
 
-    def rip_and_tag(self):
-        """Create tagged FLAC and MP3 files of all included tracks."""
+    def track_sources(self):
+        """Return a :obj:`TrackSource` for each track."""
         self.__log.call()
 
-        self._disc_frame.ripping_and_tagging()
-
-        # issues/1
-        self.persist_metadata_snapshot(showinfo=False)
+        track_offsets = self.read_toc().track_offsets
+        skips = [
+            (offset - track_offsets[0]) * CDDA_SAMPLES_PER_FRAME
+            for offset in track_offsets]
+        track_sources = [
+            TrackSource(self.image_filename, skip, until, "little")
+            for (skip, until) in zip(skips, skips[1:] + [None])]
 
-        per_track_metadata = self._editor_frame.flattened_metadata
-        try:
-            encoder = self._prepare_encoder(per_track_metadata)
-        except Exception as e:
-            self.__log.exception("failed to initialize the encoder")
-            show_exception_dialog(e)
-            self._disc_frame.rip_and_tag_failed()
-        else:
-            self._encoding_status_frame.ready_to_encode(per_track_metadata)
+        self.__log.return_(track_sources)
+        return track_sources
 
-            # at this point, the encoder is ready and the status frame has been
-            # initialized for display
-            self._editor_frame.reset()
-            self._encoding_status_frame.pack(
-                anchor=N, fill=X, expand=YES, padx=_PADX, pady=_PADY)
 
-            # rock and roll
-            encoder.start()
+@logged
+class AudioFolderProvider(TOCProvider):
+    """Builds a synthetic TOC (see :func:`make_synthetic_toc`) for a
+    folder that contains one WAV, AIFF or FLAC file per track.
 
-            self.__log.info("encoding has started; monitoring progress...")
-            self._encoding_status_frame.encoding_in_progress()
+    Tracks are ordered by file name (numbers in file names are compared
+    numerically).
 
-    def persist_metadata_snapshot(self, showinfo=True):
-        """Serialize the current metadata field values to JSON.
+    """
 
-        :keyword bool showinfo:
-           whether or not to display a messagebox with the persisted
-           metadata file path
+    @classmethod
+    def accepts(cls, path):
+        """Return ``True`` if *path* is a folder that contains audio
+        files.
 
         """
-        self.__log.call()
-        self._persistence.store(self._editor_frame.metadata_snapshot)
+        return os.path.isdir(path) and bool(cls._list_audio_files(path))
+
+    @staticmethod
+    def _list_audio_files(dirname):
+        """Return the audio file names in *dirname*, in track order."""
+        return [
+            os.path.join(dirname, name)
+            for name in sorted(os.listdir(dirname), key=_natural_sort_key)
+            if not name.startswith('.')
+                and os.path.splitext(name)[1].lower()
+                    in INGEST_AUDIO_EXTENSIONS]
 
-        if showinfo:
-            messagebox.showinfo(
-                "Metadata snapshot saved", self._persistence.metadata_filename)
+    def read_toc(self):
+        """Return a synthetic :obj:`TOC` for the audio files."""
+        self.__log.call()
+        return make_synthetic_toc([
+            read_audio_sample_count(filename)
+            for filename in self.track_sources()])
 
-    def _prepare_encoder(self, per_track_metadata):
-        """Initialize a :class:`FLACEncoder` with instructions to encode
-        each **included** track from *per_track_metadata*.
+    def track_sources(self):
+        """Return the audio file names, in track order."""
+        self.__log.call()
+        return self._list_audio_files(self.path)
 
-        :arg list per_track_metadata: metadata mappings for each track
-        :return:
-           an initialized :class:`FLACEncoder`, ready to execute the
-           encoding instructions in a separate thread
 
-        """
-        self.__log.call(per_track_metadata)
+#: The :class:`TOCProvider` classes that are tried (in order) by
+#: :func:`get_toc_provider`. Append a subclass to support another kind
+#: of disc image.
+TOC_PROVIDERS = [
+    TOCPlistProvider,
+    CueSheetProvider,
+    RawImageProvider,
+    AudioFolderProvider,
+]
 
-        disc_filenames = [
-            name for name in os.listdir(self.mountpoint)
-            if not name.startswith('.')
-                and os.path.splitext(name)[1] in [
-                    ".aiff",
-                    ".aif",
-                    ".aifc",
-                    ".cdda",
-                    ".cda"]]
 
-        # sanity checks
-        if len(disc_filenames) != len(self.toc.track_offsets):
-            raise FLACManagerError(
-                ("Disc TOC contains %d tracks, but %d CD-DA files were found "
-                        "under %s") % (
-                    len(self.toc.track_offsets), len(disc_filenames),
-                    self.mountpoint),
-                context_hint="FLAC+MP3 encoding")
-        elif len(disc_filenames) != len(per_track_metadata):
-            raise FLACManagerError(
-                ("Found %d CD-DA files to encode, but there are %d metadata "
-                    "mappings") % (len(disc_filenames), len(per_track_metadata)),
-                context_hint="FLAC+MP3 encoding")
+def get_toc_provider(path):
+    """Return a TOC provider for a mounted disc, disc image or folder.
 
-        config = get_config()
+    :arg str path: a file or folder name
+    :return: the first provider from :data:`TOC_PROVIDERS` that accepts
+       *path*
+    :rtype: :class:`TOCProvider`
+    :raises FLACManagerError: if no provider accepts *path*
 
-        flac_library_root = config["FLAC"]["library_root"]
-        try:
-            flac_library_root = resolve_path(flac_library_root)
-        except Exception as e:
-            raise FLACManagerError(
-                "Cannot use FLAC library root %r: %s" % (flac_library_root, e),
-                context_hint="FLAC encoding", cause=e)
+    """
+    _log.call(path)
 
-        mp3_library_root = config["MP3"]["library_root"]
-        try:
-            mp3_library_root = resolve_path(mp3_library_root)
-        except Exception as e:
-            raise FLACManagerError(
-                "Cannot use MP3 library root %r: %s" % (mp3_library_root, e),
-                context_hint="MP3 encoding", cause=e)
+    for provider_class in TOC_PROVIDERS:
+        if provider_class.accepts(path):
+            provider = provider_class(path)
+            break
+    else:
+        raise FLACManagerError(
+            "%s is not a recognized disc, disc image or audio folder" % path,
+            context_hint="Ingest")
 
-        encoder = FLACEncoder()
-        flac_cover_image_saved = False
-        mp3_cover_image_saved = False
-        for (i, track_metadata) in enumerate(per_track_metadata):
-            if not track_metadata["track_include"]:
-                continue
+    _log.return_(provider)
+    return provider
 
-            cdda_filename = os.path.join(self.mountpoint, disc_filenames[i])
 
-            flac_dirname = generate_flac_dirname(
-                flac_library_root, track_metadata)
-            if (self._editor_frame.is_save_cover_image
-                    and get_config().getboolean("FLAC", "save_cover_image")
-                    and (not flac_cover_image_saved)):
-                flac_cover_image_saved = _save_cover_image(
-                    flac_dirname, track_metadata["album_cover"])
-            flac_basename = generate_flac_basename(track_metadata)
-            flac_filename = os.path.join(flac_dirname, flac_basename)
+def _find_single_file(dirname, extensions):
+    """Return the only file in *dirname* with one of *extensions*.
 
-            mp3_dirname = generate_mp3_dirname(
-                mp3_library_root, track_metadata)
-            if (self._editor_frame.is_save_cover_image
-                    and get_config().getboolean("MP3", "save_cover_image")
-                    and (not mp3_cover_image_saved)):
-                mp3_cover_image_saved = _save_cover_image(
-                    mp3_dirname, track_metadata["album_cover"])
-            mp3_basename = generate_mp3_basename(track_metadata)
-            mp3_filename = os.path.join(mp3_dirname, mp3_basename)
+    :return:
+       the file name, or ``None`` if *dirname* is not a folder or does
+       not contain exactly one such file
 
-            encoder.add_instruction(
-                i, cdda_filename, flac_filename, mp3_filename, track_metadata)
+    """
+    if not os.path.isdir(dirname):
+        return None
 
-            self.__log.info(
-                "prepared encoding instruction:\n%s\n-> %s\n-> %s",
-                cdda_filename, flac_filename, mp3_filename)
+    filenames = [
+        os.path.join(dirname, name) for name in os.listdir(dirname)
+        if not name.startswith('.')
+            and os.path.splitext(name)[1].lower() in extensions]
 
-        self.__log.return_(encoder)
-        return encoder
+    return filenames[0] if len(filenames) == 1 else None
 
-    def eject_disc(self):
-        """Eject the current CD-DA disc and update the UI."""
-        self.__log.call()
 
-        status = subprocess.call(
-            ["diskutil", "eject", self.disk],
-            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+def _natural_sort_key(name):
+    """Return a sort key for *name* that orders embedded numbers
+    numerically (so that "2 Audio Track" precedes "10 Audio Track").
 
-        if status == 0:
-            self.__log.info(
-                "ejected %s mounted at %s", self.disk, self.mountpoint)
-            # resetting will automatically spawn a new DiscCheck thread
-            self.reset()
-        else:
-            self.__log.error(
-                "unable to eject %s mounted at %s", self.disk, self.mountpoint)
-            messagebox.showerror(
-                title="Disk eject failure",
-                message="Unable to eject %s" % self.mountpoint)
+    """
+    return [
+        (int(part), "") if part.isdigit() else (0, part.casefold())
+        for part in re.split(r"(\d+)", name)]
 
-    def edit_aggregation_config(self):
-        """Open the configuration editor dialog."""
-        self.__log.call()
-        EditAggregationConfigurationDialog(
-            self, title="Edit flacmanager.ini (metadata aggregation)")
 
-    def edit_organization_config(self):
-        """Open the configuration editor dialog."""
-        self.__log.call()
-        EditOrganizationConfigurationDialog(
-            self, title="Edit flacmanager.ini (default folder and file names)")
+#: Matches the ``FILE``, ``TRACK`` and ``INDEX`` commands of a CUE sheet.
+_CUE_COMMAND = re.compile(
+    r'^\s*(?:'
+        r'FILE\s+(?:"(?P<file>[^"]*)"|(?P<bare_file>\S+))\s+(?P<type>\S+)'
+        r'|TRACK\s+(?P<track>\d+)\s+(?P<mode>\S+)'
+        r'|INDEX\s+(?P<index>\d+)\s+(?P<mm>\d+):(?P<ss>\d+):(?P<ff>\d+)'
+    r')\s*$',
+    re.IGNORECASE)
 
-    def edit_flac_encoding_config(self):
-        """Open the configuration editor dialog."""
-        self.__log.call()
-        EditFLACEncodingConfigurationDialog(
-            self, title="Edit flacmanager.ini (FLAC encoding)")
 
-    def edit_vorbis_comments_config(self):
-        """Open the configuration editor dialog."""
-        self.__log.call()
-        EditVorbisCommentsConfigurationDialog(
-            self, title="Edit flacmanager.ini (default FLAC Vorbis comments)")
+def _parse_cue_sheet(cue_filename):
+    """Return the audio files, and their track start positions, from a
+    CUE sheet.
 
-    def edit_flac_organization_config(self):
-        """Open the configuration editor dialog."""
-        self.__log.call()
-        EditFLACOrganizationConfigurationDialog(
-            self, title="Edit flacmanager.ini (FLAC folder and file names)")
+    :arg str cue_filename: absolute *.cue* file name
+    :return:
+       a list of (absolute file name, file type, track ``INDEX 01``
+       positions in CD-DA frames) for each ``FILE``
+    :raises FLACManagerError:
+       if the CUE sheet describes a data track, an unsupported file
+       type, or a track without an ``INDEX 01``
 
-    def edit_mp3_encoding_config(self):
-        """Open the configuration editor dialog."""
-        self.__log.call()
-        EditMP3EncodingConfigurationDialog(
-            self, title="Edit flacmanager.ini (MP3 encoding)")
+    """
+    _log.call(cue_filename)
+
+    cue_dirname = os.path.dirname(cue_filename)
+    files = []
+    track = None
+    # some rippers write Latin-1 (rather than UTF-8) CUE sheets
+    with open(cue_filename, "rb") as f:
+        data = f.read()
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        text = data.decode("latin-1")
 
-    def edit_id3v2_tags_config(self):
-        """Open the configuration editor dialog."""
-        self.__log.call()
-        EditID3v2TagsConfigurationDialog(
-            self, title="Edit flacmanager.ini (default MP3 ID3v2 tags)")
+    for line in text.splitlines():
+        match = _CUE_COMMAND.match(line)
+        if match is None:
+            continue
+        elif match.group("type"):
+            file_type = match.group("type").upper()
+            if file_type not in [
+                    "BINARY", "MOTOROLA", "WAVE", "AIFF", "FLAC"]:
+                raise FLACManagerError(
+                    "%s: unsupported FILE type %s" % (cue_filename, file_type),
+                    context_hint="Ingest")
+            filename = match.group("file") or match.group("bare_file")
+            files.append(
+                (os.path.join(cue_dirname, filename), file_type, []))
+        elif match.group("track"):
+            if match.group("mode").upper() != "AUDIO":
+                raise FLACManagerError(
+                    "%s: track %s is a %s (data) track; only audio discs "
+                        "are supported" % (
+                        cue_filename, match.group("track"),
+                        match.group("mode")),
+                    context_hint="Ingest")
+            if track is not None:
+                raise FLACManagerError(
+                    "%s: track %s has no INDEX 01" % (cue_filename, track),
+                    context_hint="Ingest")
+            track = match.group("track")
+        elif match.group("index") and int(match.group("index")) == 1:
+            if track is None or not files:
+                raise FLACManagerError(
+                    "%s: INDEX 01 outside of a FILE/TRACK" % cue_filename,
+                    context_hint="Ingest")
+            files[-1][2].append(
+                (int(match.group("mm")) * 60 + int(match.group("ss")))
+                    * CDDA_FRAMES_PER_SECOND
+                + int(match.group("ff")))
+            track = None
+
+    if track is not None:
+        raise FLACManagerError(
+            "%s: track %s has no INDEX 01" % (cue_filename, track),
+            context_hint="Ingest")
+
+    _log.return_(files)
+    return files
 
-    def edit_mp3_organization_config(self):
-        """Open the configuration editor dialog."""
-        self.__log.call()
-        EditMP3OrganizationConfigurationDialog(
-            self, title="Edit flacmanager.ini (MP3 folder and file names)")
 
-    def edit_ui_config(self):
-        """Open the configuration editor dialog."""
-        self.__log.call()
-        EditUserInterfaceConfigurationDialog(
-            self, title="Edit flacmanager.ini (UI)")
+#: The global :class:`configparser.ConfigParser` object.
+_config = None
 
-    def edit_logging_config(self):
-        """Open the configuration editor dialog."""
-        self.__log.call()
-        EditLoggingConfigurationDialog(
-            self, title="Edit flacmanager.ini (logging/debug)")
+#: Used to synchronize access to the global configuration object.
+_CONFIG_LOCK = threading.RLock()
 
-    def show_about(self):
-        """Open the application description dialog."""
-        self.__log.call()
-        _TextDialog(self, __doc__, title="About %s" % self.title())
 
-    def show_prerequisites(self):
-        """Open the prerequisites information dialog."""
-        self.__log.call()
-        _TextDialog(
-            self, _PREREQUISITES_TEXT, title="%s prerequisites" % self.title())
+def get_config():
+    """Return the configuration settings.
 
-    def show_license(self):
-        """Open the copyright/license dialog."""
-        self.__log.call()
-        _TextDialog(
-            self, __license__, title="%s copyright and license" % self.title())
+    :return: settings read from *flacmanager.ini*
+    :rtype: :class:`configparser.ConfigParser`
 
-    def exit(self):
-        """Quit the FLACManager application."""
-        self.withdraw()
-        self.destroy()
-        self.quit()
+    The configuration is initialized with default/empty values and saved
+    to disk if it does not exist.
+
+    """
+    _log.call()
+
+    global _config
+    with _CONFIG_LOCK:
+        if _config is None:
+            _log.info("initializing configuration")
+            _config = ConfigParser(interpolation=ExtendedInterpolation())
+            _config.optionxform = lambda option: option # preserve casing
+
+            if (_config.read("flacmanager.ini") != ["flacmanager.ini"]
+                    or "FLACManager" not in _config
+                    or _config["FLACManager"].get("__version__") !=
+                        __version__):
+                _log.warning(
+                    "flacmanager.ini is missing or outdated; "
+                        "updating to version %s",
+                    __version__)
+
+                fm = {}
+                if "FLACManager" in _config:
+                    fm.update(_config["FLACManager"])
+
+                # always make sure this is accurate
+                _config["FLACManager"] = OrderedDict(__version__=__version__)
+
+                for (key, default_value) in [
+                        ("title", "FLACManager ${__version__}"),
+                        ]:
+                    _config["FLACManager"].setdefault(key, default_value)
+
+                if "UI" not in _config:
+                    _config["UI"] = OrderedDict()
+                _config["UI"].setdefault("minwidth", fm.pop("minwidth", "1024"))
+                _config["UI"].setdefault("minheight", fm.pop("minheight", "768"))
+                for (key, default_value) in [
+                        #("minwidth", "1024"),
+                        #("minheight", "768"),
+                        ("padx", "7"),
+                        ("pady", "5"),
+                        ("disable_editing_excluded_tracks", "no"),
+                        ("encoding_max_visible_tracks", "29"),
+                        ]:
+                    _config["UI"].setdefault(key, default_value)
+
+                if "Logging" not in _config:
+                    _config["Logging"] = OrderedDict()
+                for (key, default_value) in [
+                        ("level", "WARNING"),
+                        ("filename", "flacmanager.log"),
+                        ("filemode", 'w'),
+                        ("format", 
+                            "%(asctime)s %(levelname)s [%(threadName)s "
+                            "%(name)s.%(funcName)s] %(message)s"),
+                        ]:
+                    _config["Logging"].setdefault(key, default_value)
+                        
+
+                if "HTTP" not in _config:
+                    _config["HTTP"] = OrderedDict()
+                for (key, default_value) in [
+                        ("debuglevel", '0'),
+                        ("timeout", "5.0"),
+                        ("aggregation_deadline", "20.0"),
+                        ("cache_dir", HTTP_CACHE_DIRNAME),
+                        ("cache_max_size_mb", "64"),
+                        ("cache_ttl", "604800"),
+                        ("cache_host_ttls", ""),
+                        ("rate_limits", "musicbrainz.org=1.0:1"),
+                        ]:
+                    _config["HTTP"].setdefault(key, default_value)
+
+                if "Gracenote" not in _config:
+                    _config["Gracenote"] = OrderedDict()
+                for (key, default_value) in [
+                        ("client_id", ""),
+                        ("user_id", ""),
+                        ("deadline", "15.0"),
+                        ]:
+                    _config["Gracenote"].setdefault(key, default_value)
+
+                if "MusicBrainz" not in _config:
+                    _config["MusicBrainz"] = OrderedDict()
+                for (key, default_value) in [
+                        ("contact_url_or_email", ""),
+                        ("libdiscid_location", ""),
+                        ("deadline", "15.0"),
+                        ]:
+                    _config["MusicBrainz"].setdefault(key, default_value)
+
+                if "Offline" not in _config:
+                    _config["Offline"] = OrderedDict()
+                for (key, default_value) in [
+                        ("index_filename", ""),
+                        ("deadline", "5.0"),
+                        ("similar_toc_tolerance", "2.0"),
+                        ]:
+                    _config["Offline"].setdefault(key, default_value)
+
+                # TODO: add Discogs for metadata aggregation
+                '''
+                if "Discogs" not in _config:
+                    _config["Discogs"] = OrderedDict()
+                for (key, default_value) in [
+                        ]:
+                    _config["Discogs"].setdefault(key, default_value)
+                '''
+
+                if "Organize" not in _config:
+                    _config["Organize"] = OrderedDict()
+                for (key, default_value) in [
+                        ("library_root", ""),
+                        ("library_subroot_trie_key", "album_artist"),
+                        ("library_subroot_compilation_trie_key",
+                            "album_title"),
+                        ("library_subroot_trie_level", '1'),
+                        ("trie_ignore_leading_article", "a an the"),
+                        ("album_folder", "{album_artist}/{album_title}"),
+                        ("ndisc_album_folder", "${album_folder}"),
+                        ("compilation_album_folder", "{album_title}"),
+                        ("ndisc_compilation_album_folder",
+                            "${compilation_album_folder}"),
+                        ("track_filename", "{track_number:02d} {track_title}"),
+                        ("ndisc_track_filename",
+                            "{album_discnumber:02d}-${track_filename}"),
+                        ("compilation_track_filename",
+                            "${track_filename} ({track_artist})"),
+                        ("ndisc_compilation_track_filename",
+                            "{album_discnumber:02d}-${compilation_track_filename}"),
+                        ("use_xplatform_safe_names", "yes"),
+                        ("save_cover_image", "yes"),
+                        ("embed_cover_image_max_size", "600"),
+                        ("embed_cover_image_quality", "85"),
+                        ("staging_root", ""),
+                        ]:
+                    _config["Organize"].setdefault(key, default_value)
+
+                if "FLAC" not in _config:
+                    _config["FLAC"] = OrderedDict()
+                for (key, default_value) in [
+                        ("library_root", "${Organize:library_root}/FLAC"),
+                        ("library_subroot_trie_key",
+                            "${Organize:library_subroot_trie_key}"),
+                        ("library_subroot_compilation_trie_key",
+                            "${Organize:library_subroot_compilation_trie_key}"),
+                        ("library_subroot_trie_level",
+                            "${Organize:library_subroot_trie_level}"),
+                        ("trie_ignore_leading_article",
+                            "${Organize:trie_ignore_leading_article}"),
+                        ("album_folder", "${Organize:album_folder}"),
+                        ("ndisc_album_folder",
+                            "${Organize:ndisc_album_folder}"),
+                        ("compilation_album_folder",
+                            "${Organize:compilation_album_folder}"),
+                        ("ndisc_compilation_album_folder",
+                            "${Organize:ndisc_compilation_album_folder}"),
+                        ("track_filename", "${Organize:track_filename}"),
+                        ("ndisc_track_filename",
+                            "${Organize:ndisc_track_filename}"),
+                        ("compilation_track_filename",
+                            "${Organize:compilation_track_filename}"),
+                        ("ndisc_compilation_track_filename",
+                            "${Organize:ndisc_compilation_track_filename}"),
+                        ("track_fileext", ".flac"),
+                        ("use_xplatform_safe_names",
+                            "${Organize:use_xplatform_safe_names}"),
+                        ("save_cover_image", "${Organize:save_cover_image}"),
+                        ("flac_encode_options",
+                            "--force --keep-foreign-metadata --verify"),
+                        ("flac_decode_options", "--force"),
+                        ]:
+                    _config["FLAC"].setdefault(key, default_value)
+
+                if "Vorbis" not in _config:
+                    _config["Vorbis"] = OrderedDict()
+                for (key, default_value) in [
+                        ("ALBUM", "album_title"),
+                        ("ALBUMARTIST", "album_artist"),
+                        ("ORGANIZATION", "album_label"),
+                        ("LABEL", "${ORGANIZATION}"),
+                        ("DISCNUMBER", "{album_discnumber:d}"),
+                        ("DISCTOTAL", "{album_disctotal:d}"),
+                        ("TRACKNUMBER", "{track_number:d}"),
+                        ("TRACKTOTAL", "{album_tracktotal:d}"),
+                        ("TITLE", "track_title"),
+                        ("ARTIST", "track_artist"),
+                        ("GENRE", "track_genre"),
+                        ("DATE", "track_year"),
+                        ("COMPILATION", "{album_compilation:d}"),
+                        ]:
+                    _config["Vorbis"].setdefault(key, default_value)
+
+                if "MP3" not in _config:
+                    _config["MP3"] = OrderedDict()
+                for (key, default_value) in [
+                        ("library_root", "${Organize:library_root}/MP3"),
+                        ("library_subroot_trie_key",
+                            "${Organize:library_subroot_trie_key}"),
+                        ("library_subroot_compilation_trie_key",
+                            "${Organize:library_subroot_compilation_trie_key}"),
+                        ("library_subroot_trie_level",
+                            "${Organize:library_subroot_trie_level}"),
+                        ("trie_ignore_leading_article",
+                            "${Organize:trie_ignore_leading_article}"),
+                        ("album_folder", "${Organize:album_folder}"),
+                        ("ndisc_album_folder",
+                            "${Organize:ndisc_album_folder}"),
+                        ("compilation_album_folder",
+                            "${Organize:compilation_album_folder}"),
+                        ("ndisc_compilation_album_folder",
+                            "${Organize:ndisc_compilation_album_folder}"),
+                        ("track_filename", "${Organize:track_filename}"),
+                        ("ndisc_track_filename",
+                            "${Organize:ndisc_track_filename}"),
+                        ("compilation_track_filename",
+                            "${Organize:compilation_track_filename}"),
+                        ("ndisc_compilation_track_filename",
+                            "${Organize:ndisc_compilation_track_filename}"),
+                        ("track_fileext", ".mp3"),
+                        ("use_xplatform_safe_names",
+                            "${Organize:use_xplatform_safe_names}"),
+                        ("save_cover_image", "${Organize:save_cover_image}"),
+                        ("lame_encode_options",
+                            "--clipdetect -q 2 -V2 -b 224"),
+                        ("id3v2_version", "3"),
+                        ]:
+                    _config["MP3"].setdefault(key, default_value)
+
+                if "ID3v2" not in _config:
+                    _config["ID3v2"] = OrderedDict()
+                for (key, default_value) in [
+                        ("TALB", "album_title"),
+                        ("TPE2", "album_artist"),
+                        ("TPUB", "album_label"),
+                        ("TPOS", "{album_discnumber:d}/{album_disctotal:d}"),
+                        ("TRCK", "{track_number:d}/{album_tracktotal:d}"),
+                        ("TIT2", "track_title"),
+                        ("TIT1", "${TPE1}"),
+                        ("TPE1", "track_artist"),
+                        ("TCON", "track_genre"),
+                        ("TYER", "track_year"),
+                        ("TDRC", "${TYER}"),
+                        ("TCMP", "{album_compilation:d}"),
+                        ]:
+                    _config["ID3v2"].setdefault(key, default_value)
+
+                if "Watch" not in _config:
+                    _config["Watch"] = OrderedDict()
+                for (key, default_value) in [
+                        ("watch_root", ""),
+                        ("max_concurrent_albums", '2'),
+                        ("poll_interval", "10"),
+                        ("settle_time", "30"),
+                        ]:
+                    _config["Watch"].setdefault(key, default_value)
+
+                if "Server" not in _config:
+                    _config["Server"] = OrderedDict()
+                for (key, default_value) in [
+                        ("host", "127.0.0.1"),
+                        ("port", "8337"),
+                        ("max_concurrent_jobs", '2'),
+                        ("max_queued_jobs", "100"),
+                        ]:
+                    _config["Server"].setdefault(key, default_value)
+
+                with open("flacmanager.ini", 'w') as f:
+                    _config.write(f)
+
+        _log.return_(_config)
+        return _config
+
+
+def save_config():
+    """Write the configuration settings to an INI-style file."""
+    _log.call()
+
+    with _CONFIG_LOCK:
+        config = get_config()
+
+        with open("flacmanager.ini", 'w') as f:
+            config.write(f)
+
+    # tagging templates are compiled from the configuration
+    with _TAGGING_TEMPLATES_LOCK:
+        _TAGGING_TEMPLATES.clear()
+
+    # so are the HTTP response cache and rate limiter
+    global _HTTP_CACHE, _RATE_LIMITER
+    with _HTTP_CACHE_LOCK:
+        _HTTP_CACHE = None
+    with _RATE_LIMITER_LOCK:
+        _RATE_LIMITER = None
+
+
+def make_tempfile(suffix=".tmp", prefix="fm"):
+    """Create a temporary file.
+
+    :keyword str suffix: the default file extenstion
+    :keyword str prefix: prepended to the beginning of the filename
+    :return: the temporary file name
+    :rtype: :obj:`str`
+
+    The temporary file will be deleted automatically when the program
+    exits.
+
+    """
+    (fd, filename) = mkstemp(suffix=suffix, prefix=prefix)
+    # close the file descriptor; it isn't inherited by child processes
+    os.close(fd)
+    # clean up the temp file when FLACManager exits
+    atexit.register(_remove_tempfile, filename)
+    _log.debug("created temp file %s", filename)
+    return filename
+
+
+def _remove_tempfile(filename):
+    """Remove *filename*, unless it has already been removed."""
+    try:
+        os.unlink(filename)
+    except FileNotFoundError:
+        pass
+
+
+class FLACManagerError(Exception):
+    """The type of exception raised when FLACManager operations fail."""
+
+    def __init__(self, message, context_hint=None, cause=None):
+        """
+        :arg str message: error message for logging or display
+        :keyword context_hint: describes the error context
+        :keyword Exception cause: the exception that caused this error
+
+        The optional *context_hint* is not part of the message, and may
+        take any type or form. Exception handlers that catch
+        ``FLACManagerError`` may choose to do something with the context
+        hint, or may ignore it.
+
+        The optional *cause* is the (caught) exception that caused this
+        ``FLACManagerError``.
+
+        """
+        super().__init__(message)
+        self.context_hint = context_hint
+        self.cause = cause
+
+
+#: The standard amount of X-axis padding for the FLACManager UI.
+_PADX = 7
+
+#: The standard amount of Y-axis padding for the FLACManager UI.
+_PADY = 5
+
+
+@logged
+class FLACManager(Tk):
+    """The FLACManager GUI application."""
+
+    #: Any HTTP(S) request issued by FLACManager uses this value for the
+    #: HTTP User-Agent header value.
+    USER_AGENT = "FLACManager/{v} Python/{vi[0]:d}.{vi[1]:d}.{vi[2]:d}".format(
+        v=__version__, vi=sys.version_info)
+
+    def __init__(self):
+        self.__log.call()
+        super().__init__()
+
+        config = get_config()
+
+        self.title(config["FLACManager"]["title"])
+        self.minsize(
+            config["UI"].getint("minwidth"), config["UI"].getint("minheight"))
+
+        self.config(menu=_FMMenu(self, name="menubar"))
+
+        self._disc_frame = _FMDiscFrame(self, name="disc_frame", text="Disc")
+        self._status_frame = _FMStatusFrame(self, name="status_frame")
+        self._editor_frame = _FMEditorFrame(self, name="editor_frame")
+        self._encoding_status_frame = _FMEncodingStatusFrame(
+            self, name="encoding_status_frame", text="Encoding status")
+
+        self.reset()
+
+    @property
+    def disk(self):
+        """The disk device node for the inserted CD-DA disc."""
+        return self.__disk
+
+    @property
+    def mountpoint(self):
+        """The file system mount point for the inserted CD-DA disc."""
+        return self.__mountpoint
+
+    @property
+    def toc(self):
+        """The CD-DA disc's :obj:`TOC` (table-of-contents)."""
+        return self.__toc
+
+    def reset(self):
+        """(Re)Initialize the FLACManager GUI."""
+        self._remove()
+
+        self.__disk = None
+        self.__mountpoint = None
+        self.__toc = None
+
+        # not repacked until user initiates rip+tag
+        self._encoding_status_frame.reset()
+
+        # not repacked until metadata for an inserted disc has been aggregated
+        self._editor_frame.reset()
+
+        self._disc_frame.reset()
+        self._disc_frame.pack(anchor=N, fill=X, padx=_PADX, pady=_PADY)
+
+        self._status_frame.reset()
+        self._status_frame.pack(anchor=N, fill=X, padx=_PADX, pady=_PADY)
+
+        if self.has_required_config:
+            self.check_for_disc()
+        else:
+            self._status_frame.required_configuration_missing()
+
+        self.update()
+
+    def _remove(self):
+        self._encoding_status_frame.pack_forget()
+        self._editor_frame.pack_forget()
+        self._status_frame.pack_forget()
+        self._disc_frame.pack_forget()
+
+        self._persistence = None
+        self._aggregator = None
+
+    @property
+    def has_required_config(self):
+        """Whether or not required configuration settings have been
+        specified.
+
+        """
+        config = get_config()
+
+        # the following options MUST be set by the user before FLACManager can
+        # be used
+        return (
+            config["Organize"].get("library_root")
+            and config["Gracenote"].get("client_id")
+            and config["MusicBrainz"].get("contact_url_or_email")
+        )
+
+    def edit_required_config(self):
+        """Open a *flacmanager.ini* editor to allow the user to provide
+        required configuration settings.
+
+        """
+        EditRequiredConfigurationDialog(
+            self, title="Edit flacmanager.ini (required settings)")
+
+        if self.has_required_config:
+            self.reset()
+            self.check_for_disc()
+
+    def check_for_disc(self):
+        """Spawn the :class:`DiscCheck` thread."""
+        self.__log.call()
+
+        self._disc_frame.reset()
+        DiscCheck().start()
+        self._update_disc_info()
+
+    def _update_disc_info(self):
+        """Update the UI if a CD-DA disc is present.
+
+        If a disc is **not** present, set a UI timer to check again.
+
+        """
+        # do not trace; called indefinitely until a disc is found
+        try:
+            disc_info = _DISC_QUEUE.get_nowait()
+        except queue.Empty:
+            self.after(QUEUE_GET_NOWAIT_AFTER, self._update_disc_info)
+        else:
+            _DISC_QUEUE.task_done()
+
+            if isinstance(disc_info, Exception):
+                self.__log.error("dequeued %r", disc_info)
+                show_exception_dialog(disc_info)
+                self._disc_frame.disc_check_failed()
+                return
+
+            self.__log.debug("dequeued %r", disc_info)
+            (self.__disk, self.__mountpoint) = disc_info
+            self._disc_frame.disc_mounted(self.mountpoint)
+
+            self.__toc = read_disc_toc(self.mountpoint)
+
+            self.aggregate_metadata()
+
+    def aggregate_metadata(self):
+        """Spawn the :class:`MetadataAggregator` thread."""
+        self.__log.call()
+
+        self._status_frame.aggregating_metadata()
+        self._status_frame.pack(anchor=N, fill=X, padx=_PADX, pady=_PADY)
+
+        try:
+            self._aggregator = MetadataAggregator(self.toc, find_similar=True)
+            self._aggregator.start()
+        except Exception as e:
+            self.__log.exception("failed to start metadata aggregator")
+            show_exception_dialog(e)
+
+            self._status_frame.aggregation_failed()
+        else:
+            self._update_aggregated_metadata(self._aggregator)
+
+    def _update_aggregated_metadata(self, aggregator):
+        """Update the UI with aggregated metadata from *aggregator*.
+
+        :arg MetadataAggregator aggregator: the running aggregator
+
+        The editor is displayed as soon as persisted metadata has been
+        restored (or, if there is no persisted metadata, once all
+        sources have been aggregated); candidate values from each
+        remaining source are then merged into the editor as they arrive.
+        Until the final update is received, set a UI timer to check
+        again.
+
+        """
+        # don't log entry into this method - it calls itself recursively until
+        # the aggregated metadata is complete
+        if aggregator is not self._aggregator:
+            # the disc was reset or replaced; stop polling for this one
+            return
+
+        try:
+            update = _AGGREGATOR_QUEUE.get_nowait()
+        except queue.Empty:
+            self.after(
+                QUEUE_GET_NOWAIT_AFTER, self._update_aggregated_metadata,
+                aggregator)
+            return
+
+        self.__log.debug("dequeued %r", update)
+        _AGGREGATOR_QUEUE.task_done()
+
+        if update.aggregator is not aggregator:
+            self.__log.debug("ignoring update from a previous aggregator")
+        elif self._persistence is None:
+            if update.complete or update.persisted:
+                self._persistence = aggregator.persistence
+                # metadata may be "partial" if an error occurred while
+                # collecting or aggregating, but initialize the editor frame
+                # regardless
+                self._editor_frame.metadata_ready_for_editing(update.metadata)
+
+                if update.complete and aggregator.exceptions:
+                    show_exception_dialog(aggregator.exceptions[0])
+                    self._status_frame.aggregation_failed()
+                    return
+
+                self._edit_metadata()
+        else:
+            self._editor_frame.merge_aggregated_metadata(update.metadata)
+
+        if update.aggregator is aggregator and update.complete:
+            for e in aggregator.exceptions:
+                # the editor is already displaying the persisted metadata
+                self.__log.warning(
+                    "metadata collection error: %s: %s",
+                    e.__class__.__name__, e)
+        else:
+            self.after(
+                QUEUE_GET_NOWAIT_AFTER, self._update_aggregated_metadata,
+                aggregator)
+
+    def _edit_metadata(self):
+        """Display the metadata editor."""
+        self.__log.call()
+
+        self._status_frame.pack_forget()
+        self._editor_frame.pack(anchor=N, fill=BOTH, padx=_PADX, pady=_PADY)
+        self._disc_frame.rip_and_tag_ready()
+
+    def rip_and_tag(self):
+        """Create tagged FLAC and MP3 files of all included tracks."""
+        self.__log.call()
+
+        self._disc_frame.ripping_and_tagging()
+
+        # issues/1
+        self.persist_metadata_snapshot(showinfo=False)
+
+        per_track_metadata = self._editor_frame.flattened_metadata
+        try:
+            encoder = self._prepare_encoder(per_track_metadata)
+        except Exception as e:
+            self.__log.exception("failed to initialize the encoder")
+            show_exception_dialog(e)
+            self._disc_frame.rip_and_tag_failed()
+        else:
+            self._start_encoding(encoder, per_track_metadata)
+
+    def retag(self):
+        """Rewrite the tags of this disc's previously encoded FLAC and
+        MP3 files without re-encoding them.
+
+        The existing files are located using the *persisted* metadata,
+        which is replaced by the current metadata only after every track
+        has been retagged successfully. If the folder or file names
+        generated from the current metadata differ, the files are
+        renamed or moved.
+
+        """
+        self.__log.call()
+
+        self._disc_frame.ripping_and_tagging()
+
+        try:
+            old_snapshot = load_metadata_snapshot(
+                self._persistence.metadata_path)
+        except Exception as e:
+            self.__log.exception("failed to load the persisted metadata")
+            show_exception_dialog(e)
+            self._disc_frame.rip_and_tag_failed()
+            return
+
+        # the persisted metadata still locates the existing files until
+        # they have all been relocated and retagged
+        snapshot = self._editor_frame.metadata_snapshot
+        per_track_metadata = self._editor_frame.flattened_metadata
+        try:
+            retagger = self._prepare_retagger(
+                flatten_metadata_snapshot(old_snapshot), per_track_metadata,
+                on_success=partial(self._persistence.store, snapshot))
+        except Exception as e:
+            self.__log.exception("failed to initialize the retagger")
+            show_exception_dialog(e)
+            self._disc_frame.rip_and_tag_failed()
+        else:
+            self._start_encoding(retagger, per_track_metadata)
+
+    def _start_encoding(self, encoder, per_track_metadata):
+        """Start the *encoder* thread and monitor its progress.
+
+        :arg threading.Thread encoder:
+           a prepared :class:`FLACEncoder` or :class:`Retagger`
+        :arg list per_track_metadata: metadata mappings for each track
+
+        """
+        self.__log.call(encoder, per_track_metadata)
+
+        self._encoding_status_frame.ready_to_encode(per_track_metadata)
+
+        # at this point, the encoder is ready and the status frame has been
+        # initialized for display
+        self._editor_frame.reset()
+        self._encoding_status_frame.pack(
+            anchor=N, fill=X, expand=YES, padx=_PADX, pady=_PADY)
+
+        # rock and roll
+        encoder.start()
+
+        self.__log.info("encoding has started; monitoring progress...")
+        self._encoding_status_frame.encoding_in_progress()
+
+    def persist_metadata_snapshot(self, showinfo=True):
+        """Serialize the current metadata field values to JSON.
+
+        :keyword bool showinfo:
+           whether or not to display a messagebox with the persisted
+           metadata file path
+
+        """
+        self.__log.call()
+        self._persistence.store(self._editor_frame.metadata_snapshot)
+
+        if showinfo:
+            messagebox.showinfo(
+                "Metadata snapshot saved", self._persistence.metadata_filename)
+
+    def _prepare_encoder(self, per_track_metadata):
+        """Initialize a :class:`FLACEncoder` with instructions to encode
+        each **included** track from *per_track_metadata*.
+
+        :arg list per_track_metadata: metadata mappings for each track
+        :return:
+           an initialized :class:`FLACEncoder`, ready to execute the
+           encoding instructions in a separate thread
+
+        """
+        self.__log.call(per_track_metadata)
+
+        disc_filenames = [
+            name for name in os.listdir(self.mountpoint)
+            if not name.startswith('.')
+                and os.path.splitext(name)[1] in [
+                    ".aiff",
+                    ".aif",
+                    ".aifc",
+                    ".cdda",
+                    ".cda"]]
+
+        # sanity checks
+        if len(disc_filenames) != len(self.toc.track_offsets):
+            raise FLACManagerError(
+                ("Disc TOC contains %d tracks, but %d CD-DA files were found "
+                        "under %s") % (
+                    len(self.toc.track_offsets), len(disc_filenames),
+                    self.mountpoint),
+                context_hint="FLAC+MP3 encoding")
+        elif len(disc_filenames) != len(per_track_metadata):
+            raise FLACManagerError(
+                ("Found %d CD-DA files to encode, but there are %d metadata "
+                    "mappings") % (len(disc_filenames), len(per_track_metadata)),
+                context_hint="FLAC+MP3 encoding")
+
+        encoder = prepare_encoder(
+            [os.path.join(self.mountpoint, name) for name in disc_filenames],
+            per_track_metadata,
+            save_cover_image=self._editor_frame.is_save_cover_image)
+
+        self.__log.return_(encoder)
+        return encoder
+
+    def _prepare_retagger(
+            self, old_per_track_metadata, per_track_metadata,
+            on_success=None):
+        """Initialize a :class:`Retagger` with instructions to retag
+        each **included** track from *per_track_metadata*.
+
+        :arg list old_per_track_metadata:
+           the *persisted* metadata mappings for each track (used to
+           locate the existing files)
+        :arg list per_track_metadata: metadata mappings for each track
+        :keyword on_success:
+           called (from the :class:`Retagger` thread) if every track is
+           retagged successfully
+        :return:
+           an initialized :class:`Retagger`, ready to execute the
+           retagging instructions in a separate thread
+
+        """
+        self.__log.call(
+            old_per_track_metadata, per_track_metadata, on_success=on_success)
+
+        if len(old_per_track_metadata) != len(per_track_metadata):
+            raise FLACManagerError(
+                ("Persisted metadata has %d tracks, but there are %d metadata "
+                    "mappings") % (
+                    len(old_per_track_metadata), len(per_track_metadata)),
+                context_hint="Retagging")
+
+        (flac_library_root, mp3_library_root) = _resolve_library_roots()
+
+        album_cover = per_track_metadata[0]["album_cover"]
+        embedded_cover = (
+            make_embedded_cover_image(album_cover) if album_cover else None)
+
+        planner = AlbumPathPlanner(flac_library_root, mp3_library_root)
+        plan = planner.plan(per_track_metadata)
+        planner.make_dirs(plan)
+
+        retagger = Retagger(
+            [flac_library_root, mp3_library_root], on_success=on_success)
+        flac_cover_image_saved = False
+        mp3_cover_image_saved = False
+        for (i, track_metadata) in enumerate(per_track_metadata):
+            if not track_metadata["track_include"]:
+                continue
+
+            (old_flac_filename, old_mp3_filename) = planner.track_paths(
+                old_per_track_metadata[i])
+            (flac_filename, mp3_filename) = plan[i]
+
+            flac_dirname = os.path.dirname(flac_filename)
+            if (self._editor_frame.is_save_cover_image
+                    and get_config().getboolean("FLAC", "save_cover_image")
+                    and album_cover
+                    and (not flac_cover_image_saved)):
+                flac_cover_image_saved = _save_cover_image(
+                    flac_dirname, album_cover)
+
+            mp3_dirname = os.path.dirname(mp3_filename)
+            if (self._editor_frame.is_save_cover_image
+                    and get_config().getboolean("MP3", "save_cover_image")
+                    and album_cover
+                    and (not mp3_cover_image_saved)):
+                mp3_cover_image_saved = _save_cover_image(
+                    mp3_dirname, album_cover)
+
+            track_metadata["album_cover"] = embedded_cover
+
+            retagger.add_instruction(
+                i, old_flac_filename, flac_filename, old_mp3_filename,
+                mp3_filename, track_metadata)
+
+            self.__log.info(
+                "prepared retagging instruction:\n%s -> %s\n%s -> %s",
+                old_flac_filename, flac_filename, old_mp3_filename,
+                mp3_filename)
+
+        self.__log.return_(retagger)
+        return retagger
+
+    def eject_disc(self):
+        """Eject the current CD-DA disc and update the UI."""
+        self.__log.call()
+
+        if get_disc_monitor().eject(self.disk):
+            self.__log.info(
+                "ejected %s mounted at %s", self.disk, self.mountpoint)
+            # resetting will automatically spawn a new DiscCheck thread
+            self.reset()
+        else:
+            self.__log.error(
+                "unable to eject %s mounted at %s", self.disk, self.mountpoint)
+            messagebox.showerror(
+                title="Disk eject failure",
+                message="Unable to eject %s" % self.mountpoint)
+
+    def edit_aggregation_config(self):
+        """Open the configuration editor dialog."""
+        self.__log.call()
+        EditAggregationConfigurationDialog(
+            self, title="Edit flacmanager.ini (metadata aggregation)")
+
+    def edit_organization_config(self):
+        """Open the configuration editor dialog."""
+        self.__log.call()
+        EditOrganizationConfigurationDialog(
+            self, title="Edit flacmanager.ini (default folder and file names)")
+
+    def edit_flac_encoding_config(self):
+        """Open the configuration editor dialog."""
+        self.__log.call()
+        EditFLACEncodingConfigurationDialog(
+            self, title="Edit flacmanager.ini (FLAC encoding)")
+
+    def edit_vorbis_comments_config(self):
+        """Open the configuration editor dialog."""
+        self.__log.call()
+        EditVorbisCommentsConfigurationDialog(
+            self, title="Edit flacmanager.ini (default FLAC Vorbis comments)")
+
+    def edit_flac_organization_config(self):
+        """Open the configuration editor dialog."""
+        self.__log.call()
+        EditFLACOrganizationConfigurationDialog(
+            self, title="Edit flacmanager.ini (FLAC folder and file names)")
+
+    def edit_mp3_encoding_config(self):
+        """Open the configuration editor dialog."""
+        self.__log.call()
+        EditMP3EncodingConfigurationDialog(
+            self, title="Edit flacmanager.ini (MP3 encoding)")
+
+    def edit_id3v2_tags_config(self):
+        """Open the configuration editor dialog."""
+        self.__log.call()
+        EditID3v2TagsConfigurationDialog(
+            self, title="Edit flacmanager.ini (default MP3 ID3v2 tags)")
+
+    def edit_mp3_organization_config(self):
+        """Open the configuration editor dialog."""
+        self.__log.call()
+        EditMP3OrganizationConfigurationDialog(
+            self, title="Edit flacmanager.ini (MP3 folder and file names)")
+
+    def edit_ui_config(self):
+        """Open the configuration editor dialog."""
+        self.__log.call()
+        EditUserInterfaceConfigurationDialog(
+            self, title="Edit flacmanager.ini (UI)")
+
+    def edit_watch_config(self):
+        """Open the configuration editor dialog."""
+        self.__log.call()
+        EditWatchConfigurationDialog(
+            self, title="Edit flacmanager.ini (watch folder)")
+
+    def edit_server_config(self):
+        """Open the configuration editor dialog."""
+        self.__log.call()
+        EditServerConfigurationDialog(
+            self, title="Edit flacmanager.ini (job server)")
+
+    def edit_logging_config(self):
+        """Open the configuration editor dialog."""
+        self.__log.call()
+        EditLoggingConfigurationDialog(
+            self, title="Edit flacmanager.ini (logging/debug)")
+
+    def show_about(self):
+        """Open the application description dialog."""
+        self.__log.call()
+        _TextDialog(self, __doc__, title="About %s" % self.title())
+
+    def show_prerequisites(self):
+        """Open the prerequisites information dialog."""
+        self.__log.call()
+        _TextDialog(
+            self, _PREREQUISITES_TEXT, title="%s prerequisites" % self.title())
+
+    def show_license(self):
+        """Open the copyright/license dialog."""
+        self.__log.call()
+        _TextDialog(
+            self, __license__, title="%s copyright and license" % self.title())
+
+    def exit(self):
+        """Quit the FLACManager application."""
+        self.withdraw()
+        self.destroy()
+        self.quit()
+
+
+@logged
+class _FMMenu(Menu):
+    """The FLACManager application menu bar."""
+
+    def __init__(self, *args, **options):
+        """
+        :arg tuple args: positional arguments to initialize the menu
+        :arg dict options: ``config`` options to initialize the menu
+
+        """
+        self.__log.call(*args, **options)
+        super().__init__(*args, **options)
+
+        fm = self.master
+
+        file_menu = Menu(self, name="file_menu", tearoff=NO)
+        # only enabled while the editor frame is packed
+        file_menu.add_command(
+            label="Save metadata", command=fm.persist_metadata_snapshot,
+            state=DISABLED)
+        file_menu.add_separator()
+        file_menu.add_command(label="Exit", command=fm.exit)
+        self.add_cascade(label="File", menu=file_menu)
+
+        edit_menu = Menu(self, name="edit_menu", tearoff=YES)
+        edit_menu.add_command(
+            label="Configure metadata aggregation",
+            command=fm.edit_aggregation_config)
+        edit_menu.add_command(
+            label="Configure default folder and file names",
+            command=fm.edit_organization_config)
+        edit_menu.add_command(
+            label="Configure watch folder", command=fm.edit_watch_config)
+        edit_menu.add_command(
+            label="Configure job server", command=fm.edit_server_config)
+
+        edit_menu.add_separator()
+
+        flac_menu = Menu(edit_menu, name="flac_menu", tearoff=NO)
+        flac_menu.add_command(
+            label="FLAC encoding options",
+            command=fm.edit_flac_encoding_config)
+        flac_menu.add_command(
+            label="FLAC Vorbis comments",
+            command=fm.edit_vorbis_comments_config)
+        flac_menu.add_command(
+            label="FLAC folder and file names",
+            command=fm.edit_flac_organization_config)
+        edit_menu.add_cascade(label="Configure FLAC", menu=flac_menu)
+
+        mp3_menu = Menu(edit_menu, name="mp3_menu", tearoff=NO)
+        mp3_menu.add_command(
+            label="MP3 encoding options",
+            command=fm.edit_mp3_encoding_config)
+        mp3_menu.add_command(
+            label="MP3 ID3v2 tags", command=fm.edit_id3v2_tags_config)
+        mp3_menu.add_command(
+            label="MP3 folder and file names",
+            command=fm.edit_mp3_organization_config)
+        edit_menu.add_cascade(label="Configure MP3", menu=mp3_menu)
+
+        edit_menu.add_separator()
+
+        edit_menu.add_command(
+            label="Configure UI", command=fm.edit_ui_config)
+        self.add_cascade(label="Edit", menu=edit_menu)
+
+        edit_menu.add_command(
+            label="Configure logging", command=fm.edit_logging_config)
+        self.add_cascade(label="Edit", menu=edit_menu)
+
+        help_menu = Menu(self, name="help_menu", tearoff=NO)
+        help_menu.add_command(label="About", command=fm.show_about)
+        help_menu.add_command(
+            label="Prequisites", command=fm.show_prerequisites)
+        help_menu.add_command(label="License", command=fm.show_license)
+        self.add_cascade(label="Help", menu=help_menu)
+
+
+@logged
+class _FMDiscFrame(LabelFrame):
+    """The disc status/operation frame for FLACManager."""
+
+    def __init__(self, *args, **options):
+        """
+        :arg tuple args: positional arguments to initialize the frame
+        :arg dict options: ``config`` options to initialize the frame
+
+        All widgets for this frame are initialized, but layout is
+        deferred until methods are called to transition between states.
+
+        """
+        self.__log.call(*args, **options)
+        super().__init__(*args, **options)
+
+        fm = self.master
+
+        self._disc_eject_button = Button(
+            self, name="disc_eject_button", text="Eject",
+            command=fm.eject_disc)
+
+        self._disc_status_label = Label(self, name="disc_status_label")
+
+        self._retry_disc_check_button = Button(
+            self, name="retry_disc_check_button", text="Retry disc check",
+            command=fm.check_for_disc)
+
+        self._rip_and_tag_button = _styled(
+            Button(
+                self, name="rip_and_tag_button", text="Rip and Tag",
+                command=fm.rip_and_tag),
+            foreground="Dark Green", font="-weight bold")
+
+        self._retag_button = Button(
+            self, name="retag_button", text="Retag only",
+            command=fm.retag)
+
+        self.grid_columnconfigure(1, weight=1)
+
+    def _set_status_message(self, value, fg="Black"):
+        """Set the disc status label text and color."""
+        self.__log.call(value, fg=fg)
+        self._disc_status_label.config(text=value)
+        _styled(self._disc_status_label, foreground=fg)
+
+    def disc_mounted(self, mountpoint):
+        """Show the disk mointpoint and a button to eject the disc.
+
+        :arg str mountpoint: where the CD-DA disc is mounted
+
+        """
+        self.__log.call(mountpoint)
+
+        self._remove()
+
+        self._disc_eject_button.config(state=NORMAL)
+        self._disc_eject_button.grid(
+            row=0, column=0, sticky=W, padx=_PADX, pady=_PADY)
+
+        self._set_status_message(mountpoint)
+        self._disc_status_label.grid(
+            row=0, column=1, sticky=W, padx=_PADX, pady=_PADY)
+
+    def disc_check_failed(self):
+        """Alert the user that the disc check failed and provide a
+        button to retry.
+
+        """
+        self.__log.call()
+
+        self.reset()
+
+        self._retry_disc_check_button.grid(
+            row=0, column=2, sticky=E, padx=_PADX, pady=_PADY)
+
+    def rip_and_tag_ready(self):
+        """Provide a button to begin ripping and tagging the tracks.
+
+        If metadata for the disc was persisted, also provide a button
+        to retag the previously encoded tracks.
+
+        """
+        self.__log.call()
+
+        fm = self.master
+        if fm._persistence is not None and fm._persistence.restored:
+            self._retag_button.grid(
+                row=0, column=2, sticky=E, padx=_PADX, pady=_PADY)
+            self._retag_button.config(state=NORMAL)
+
+        self._rip_and_tag_button.grid(
+            row=0, column=3, sticky=E, padx=_PADX, pady=_PADY)
+        self._rip_and_tag_button.config(state=NORMAL)
+
+    def ripping_and_tagging(self):
+        """Change the state of the disc controls while tracks are being
+        ripped and tagged.
+
+        """
+        self.__log.call()
+
+        self._disc_eject_button.config(state=DISABLED)
+        self._rip_and_tag_button.config(state=DISABLED)
+        self._retag_button.config(state=DISABLED)
+
+    def rip_and_tag_failed(self):
+        """Restore the state of the disc controls after an encoding
+        failure.
+
+        """
+        self.__log.call()
+
+        self._disc_eject_button.config(state=NORMAL)
+        self._rip_and_tag_button.config(state=NORMAL)
+        self._retag_button.config(state=NORMAL)
+
+    def rip_and_tag_finished(self):
+        """Change the state of the disc controls to reflect that a disc
+        has been ripped and tagged.
+
+        """
+        self.__log.call()
+
+        self._disc_eject_button.config(state=NORMAL)
+        self._rip_and_tag_button.grid_remove()
+        self._retag_button.grid_remove()
+
+    def reset(self):
+        """Populate the disc status/operation frame widgets in their
+        default/initial states.
+
+        """
+        self.__log.call()
+
+        self._remove()
+
+        self._disc_eject_button.config(state=DISABLED)
+
+        self._set_status_message("Waiting for a disc to be inserted\u2026")
+        self._disc_status_label.grid(
+            row=0, column=1, sticky=W, padx=_PADX, pady=_PADY)
+
+    def _remove(self):
+        """Remove all widgets from the current layout."""
+        self.__log.call()
+
+        self._disc_eject_button.grid_remove()
+        self._disc_status_label.grid_remove()
+        self._retry_disc_check_button.grid_remove()
+        self._rip_and_tag_button.grid_remove()
+        self._retag_button.grid_remove()
+
+
+@logged
+class _FMStatusFrame(Frame):
+    """The application status frame for FLACManager."""
+
+    def __init__(self, *args, **options):
+        """
+        :arg tuple args: positional arguments to initialize the frame
+        :arg dict options: ``config`` options to initialize the frame
+
+        All widgets for this frame are initialized, but layout is
+        deferred until methods are called to transition between states.
+
+        """
+        self.__log.call(*args, **options)
+        super().__init__(*args, **options)
+
+        fm = self.master
+
+        self._status_label = _styled(
+            Label(self, name="status_label"), font="-weight bold")
+
+        self._retry_aggregation_button = Button(
+            self, name="retry_aggregation_button",
+            text="Retry metadata aggregation",
+            command=fm.aggregate_metadata)
+
+        self._edit_asis_button = Button(
+            self, name="edit_asis_button", text="Edit metadata as-is",
+            command=fm._edit_metadata)
+
+        self._open_req_config_editor_button = Button(
+            self, name="open_req_config_editor_button",
+            text="Edit flacmanager.ini",
+            command=fm.edit_required_config)
+
+        for r in range(2):
+            self.grid_rowconfigure(r, weight=1)
+        for c in range(2):
+            self.grid_columnconfigure(c, weight=1)
+
+    def _set_status_message(self, value, fg="Black"):
+        """Set the status label text and color."""
+        self.__log.call(value, fg=fg)
+        self._status_label.config(text=value)
+        _styled(self._status_label, foreground=fg)
+
+    def _show_metadata_status_buttons(self):
+        """Display the buttons that allow the user to choose an action
+        after metadata aggregation has failed.
+
+        """
+        self.__log.call()
+
+        self._retry_aggregation_button.grid(
+            row=1, column=0, padx=_PADX, pady=_PADY, sticky=NE)
+        self._edit_asis_button.grid(
+            row=1, column=1, padx=_PADX, pady=_PADY, sticky=NW)
+
+    def _hide_metadata_status_buttons(self):
+        """Remove the buttons for handling metadata aggregation
+        failures.
+
+        """
+        self.__log.call()
+
+        self._retry_aggregation_button.grid_remove()
+        self._edit_asis_button.grid_remove()
+
+    def required_configuration_missing(self):
+        """Let the user know that required configuration settings are
+        not present, and provide a button to open an editor.
+
+        """
+        self.__log.call()
+
+        self._remove()
+
+        self._set_status_message(
+            "Required configuration is missing!", fg="Red")
+        self._status_label.grid(
+            row=0, column=0, columnspan=2, padx=_PADX, pady=_PADY)
+
+        self._open_req_config_editor_button.grid(
+            row=1, column=0, columnspan=2, padx=_PADX, pady=_PADY)
+
+    def aggregating_metadata(self):
+        """Change this frame to reflect that metadata is being
+        aggregated.
+
+        """
+        self.__log.call()
+
+        self._remove()
+        self._set_status_message("Aggregating metadata\u2026", fg="Grey")
+        self._status_label.grid(
+            row=0, column=0, columnspan=2, padx=_PADX, pady=_PADY)
+
+    def aggregation_failed(self):
+        """Message the user that metadata aggregation has failed and
+        provide options for a next action.
+
+        """
+        self.__log.call()
+
+        self._set_status_message(
+            "Aggregation failed. Metadata may be missing or incomplete.",
+            fg="Red")
+        self._show_metadata_status_buttons()
+
+    def reset(self):
+        """Populate the status frame widgets in their default/initial
+        states.
+
+        """
+        self.__log.call()
+
+        self._remove()
+
+        self._set_status_message("Please insert a disc.", fg="Grey")
+        self._status_label.grid(
+            row=0, column=0, columnspan=2, padx=_PADX, pady=_PADY)
+
+    def _remove(self):
+        """Remove all widgets from the current layout."""
+        self.__log.call()
+
+        self._status_label.grid_remove()
+        self._hide_metadata_status_buttons()
+        self._open_req_config_editor_button.grid_remove()
+
+
+@logged
+class _FMEditorFrame(Frame):
+    """The metadata editing frame for FLACManager."""
+
+    def __init__(self, *args, **options):
+        """
+        :arg tuple args: positional arguments to initialize the frame
+        :arg dict options: ``config`` options to initialize the frame
+
+        All widgets for this frame are initialized, but layout is
+        deferred until methods are called to transition between states.
+
+        """
+        self.__log.call(*args, **options)
+        super().__init__(*args, **options)
+
+        # all editor widgets and vars are referenced through this mapping;
+        # these are never destroyed, only updated
+        self.__metadata_editors = dict()
+
+        self.__init_album_editors()
+        self.__init_track_editors()
+
+        # issues/5
+        self.__init_naming_editors()
+        self.__album_disctotal_observer_name = None
+
+    # issues/5
+    def __init_naming_editors(self):
+        """Create the entry widgets for album and track naming fields.
+
+        """
+        naming_editor_frame = LabelFrame(
+            self, name="naming_editor_frame", text="Folder & File Naming")
+
+        self.__row = 0  # relative to naming_editor_frame
+
+        self._create_naming_editor(naming_editor_frame, "FLAC")
+        self._create_naming_editor(naming_editor_frame, "MP3")
+
+        config = get_config()
+        mp3_naming_same_as_flac_var = BooleanVar(
+            name="mp3_naming_same_as_flac_var",
+            value=all((
+                config["FLAC"][option] == config["MP3"][option]
+                for option in [
+                    "album_folder",
+                    "ndisc_album_folder",
+                    "compilation_album_folder",
+                    "ndisc_compilation_album_folder",
+                    "library_subroot_trie_key",
+                    "library_subroot_compilation_trie_key",
+                    "track_filename",
+                    "ndisc_track_filename",
+                    "compilation_track_filename",
+                    "ndisc_compilation_track_filename",
+                    ]
+                )))
+        mp3_naming_same_as_flac_checkbutton = Checkbutton(
+            naming_editor_frame, name="mp3_naming_same_as_flac_checkbutton",
+            text="Use the same templates for both FLAC and MP3",
+            variable=mp3_naming_same_as_flac_var, onvalue=True, offvalue=False,
+            command=self.__update_mp3_naming_editor_state
+        )
+        mp3_naming_same_as_flac_checkbutton.grid(
+            row=self.__row, column=1, columnspan=5, padx=0, pady=_PADY,
+            sticky=W)
+        self.__mp3_naming_same_as_flac_var = mp3_naming_same_as_flac_var
+
+        # collapse the labels and allow the entry fields to expand
+        for i in range(8):
+            naming_editor_frame.grid_columnconfigure(i, weight=0)
+        naming_editor_frame.grid_columnconfigure(2, weight=1) # trie key
+        naming_editor_frame.grid_columnconfigure(4, weight=1) # album folder
+        naming_editor_frame.grid_columnconfigure(6, weight=2) # track filename
+
+        if mp3_naming_same_as_flac_var.get():
+            for editor_name in [
+                    "__mp3_subroot_trie",
+                    "__mp3_album_folder",
+                    "__mp3_track_filename",
+                    ]:
+                self.__metadata_editors[editor_name].config(state=DISABLED)
+
+        naming_editor_frame.pack(anchor=N, pady=11, fill=BOTH)
+
+    def _create_naming_editor(self, parent, encoding_section):
+        """Create entry widgets for the album folder and track filename
+        templates.
+
+        :arg parent: parent object of the widgets
+        :arg str encoding_section: either "FLAC" or "MP3"
+
+        """
+        trie_field = "%s_subroot_trie" % encoding_section.lower()
+        folder_field = "%s_album_folder" % encoding_section.lower()
+        track_field = "%s_track_filename" % encoding_section.lower()
+
+        config_section = get_config()[encoding_section]
+
+        _styled(
+            Label(parent, text=encoding_section), font="-weight bold"
+        ).grid(row=self.__row, column=0, padx=_PADX, pady=_PADY, sticky=E)
+
+        Label(
+            parent, text=config_section["library_root"] + '/'
+        ).grid(row=self.__row, column=1, padx=0, pady=_PADY, sticky=E)
+
+        subroot_trie_var = StringVar(name=trie_field + "_var")
+        subroot_trie = Entry(
+            parent, name=trie_field, textvariable=subroot_trie_var)
+        subroot_trie.var = subroot_trie_var
+        subroot_trie.grid(
+            row=self.__row, column=2, padx=0, pady=_PADY, sticky=W + E)
+
+        Label(parent, text='/').grid(
+            row=self.__row, column=3, padx=0, pady=_PADY, sticky=W)
+
+        album_folder_var = StringVar(name=folder_field + "_var")
+        album_folder = Entry(
+            parent, name=folder_field, textvariable=album_folder_var)
+        album_folder.var = album_folder_var
+        album_folder.grid(
+            row=self.__row, column=4, padx=0, pady=_PADY, sticky=W + E)
+
+        Label(parent, text='/').grid(
+            row=self.__row, column=5, padx=0, pady=_PADY, sticky=W)
+
+        track_filename_var = StringVar(name=track_field + "_var")
+        track_filename = Entry(
+            parent, name=track_field, textvariable=track_filename_var)
+        track_filename.var = track_filename_var
+        track_filename.grid(
+            row=self.__row, column=6, padx=0, pady=_PADY, sticky=W + E)
+
+        Label(parent, text=config_section["track_fileext"]).grid(
+            row=self.__row, column=7, padx=0, pady=_PADY, sticky=W)
+
+        self.__metadata_editors["__%s" % trie_field] = subroot_trie
+        self.__metadata_editors["__%s" % folder_field] = album_folder
+        self.__metadata_editors["__%s" % track_field] = track_filename
+
+        self.__row += 1
+
+    # issues/5
+    def _apply_naming_defaults(self, *args):
+        """Update the folder and file name templates based on the
+        current values for ``album_disctotal`` and
+        ``album_compilation``.
+
+        :arg tuple args:
+           positional arguments (empty except when this method is
+           invoked as the variable trace callback for
+           ``album_disctotal_var``)
+
+        """
+        metadata_editors = self.__metadata_editors
+
+        # yuck... but when changing the value, we get TWO traces:
+        # 1. the variable value changes from the old value to empty (""),
+        #    causing `metadata_editors["album_disctotal"].var.get()` to result
+        #    in TclError since album_disctotal_var is an IntVar
+        # 2. the variable value changes from empty ("") to the new value
+        try:
+            metadata_editors["album_disctotal"].var.get()
+        except TclError:
+            return
+
+        ndisc = (
+            "ndisc_" if metadata_editors["album_disctotal"].var.get() > 1
+            else "")
+        compilation = (
+            "compilation_" if metadata_editors["album_compilation"].var.get()
+            else "")
+        default_key_prefix = ndisc + compilation
+
+        config = get_config()
+        for encoding in ["FLAC", "MP3"]:
+            for field_suffix in [
+                    "subroot_trie", "album_folder", "track_filename"]:
+                default_key = (
+                    "library_subroot_%strie_key" % compilation
+                    if field_suffix == "subroot_trie"
+                    else default_key_prefix + field_suffix)
+                custom_key = "__%s_%s" % (encoding.lower(), field_suffix)
+                metadata_editors[custom_key].var.set(
+                    config[encoding][default_key])
+
+    # issues/5
+    def __update_mp3_naming_editor_state(self):
+        """Enable or disable the MP3 naming entry widgets."""
+        state = \
+            DISABLED if self.__mp3_naming_same_as_flac_var.get() else NORMAL
+        self.__metadata_editors["__mp3_subroot_trie"].config(state=state)
+        self.__metadata_editors["__mp3_album_folder"].config(state=state)
+        self.__metadata_editors["__mp3_track_filename"].config(state=state)
+
+    def __init_album_editors(self):
+        """Create the entry/selection widgets for album metadata fields.
+
+        """
+        album_editor_frame = LabelFrame(
+            self, name="album_editor_frame", text="Album")
+
+        create_album_choices_editor = partial(
+            self._create_choices_editor, album_editor_frame, "album")
+
+        self.__row = 0  # relative to album_editor_frame
+
+        create_album_choices_editor("title", tracks_apply=False)
+        self._create_album_disc_editor(album_editor_frame)
+        self._create_album_compilation_editor(album_editor_frame)
+        create_album_choices_editor("artist")
+        create_album_choices_editor("label", tracks_apply=False)
+        create_album_choices_editor("genre")
+        create_album_choices_editor("year")
+        self._create_album_cover_editor(album_editor_frame)
+        self._create_album_custom_metadata_editor(album_editor_frame)
+
+        album_editor_frame.grid_columnconfigure(0, weight=0)
+        album_editor_frame.grid_columnconfigure(1, weight=1)
+        album_editor_frame.grid_columnconfigure(2, weight=0)
+
+        album_editor_frame.pack(anchor=N, pady=11, fill=BOTH)
+
+    def __init_track_editors(self):
+        """Create the entry/selection widgets for track metadata fields.
+
+        """
+        track_editor_frame = LabelFrame(
+            self, name="track_editor_frame", text="Tracks")
+
+        create_track_choices_editor = partial(
+            self._create_choices_editor, track_editor_frame, "track",
+            tracks_apply=False)
+
+        self.__row = 0  # relative to track_editor_frame
+
+        self._create_track_control_editors(track_editor_frame)
+        create_track_choices_editor("title")
+        create_track_choices_editor("artist")
+        create_track_choices_editor("genre")
+        create_track_choices_editor("year")
+        self._create_track_custom_metadata_editor(track_editor_frame)
+
+        track_editor_frame.grid_columnconfigure(0, weight=0)
+        track_editor_frame.grid_columnconfigure(1, weight=1)
+
+        track_editor_frame.pack(anchor=N, pady=11, fill=BOTH)
+
+    def _create_choices_editor(
+            self, parent, editor_name, field_name, tracks_apply=True,
+            VarType=StringVar):
+        """Create an entry/selection widget for a metadata field that
+        may have multiple aggregated values.
+
+        :arg parent: parent object of the editor
+        :arg str editor_name: either "album" or "track"
+        :arg str field_name: the metadata field name
+        :keyword bool tracks_apply:
+           whether or not to create an "Apply to all tracks" button that
+           corresponds to *field_name*
+        :keyword VarType:
+           the :mod:`tkinter` variable type that will hold the value of
+           the metadata field
+        :return: the metadata field entry/selection widget
+        :rtype: :class:`tkinter.ttk.Combobox`
+
+        """
+        self.__log.call(
+            parent, editor_name, field_name, tracks_apply=tracks_apply,
+            VarType=VarType)
+
+        Label(parent, text=field_name.capitalize()).grid(
+            row=self.__row, column=0, padx=_PADX, pady=_PADY, sticky=E)
+
+        name = "%s_%s" % (editor_name, field_name)
+
+        # NOTE: for track editors, the variable will be re-*configured* on a
+        # per-track basis as the tracks spinbox is manipulated; however, the
+        # var *property* of a track editor is never re-assigned
+        var = VarType(name="%s_var" % name)
+        combobox = Combobox(
+            parent, name="%s_combobox" % name, textvariable=var
+        )
+        # attach the variable to the Combobox for easy access
+        combobox.var = var
+        if field_name != "year":
+            sticky = W + E
+        else:
+            combobox.configure(width=7)
+            sticky = W
+        combobox.grid(
+            row=self.__row, column=1, padx=_PADX, pady=_PADY, sticky=sticky)
+
+        self.__metadata_editors[name] = combobox
+
+        if tracks_apply:
+            Button(
+                parent, name="%s_apply_button" % name,
+                text="Apply %s to all tracks" % field_name,
+                command=lambda
+                        self=self, metadata_name="track_%s" % field_name,
+                        var=var:
+                    self.__apply_to_all_tracks(metadata_name, var.get())
+            ).grid(
+                row=self.__row, column=2, padx=_PADX, pady=_PADY, sticky=W+E)
+
+        self.__row += 1
+
+        return combobox
+
+    def __apply_to_all_tracks(self, field_name, value):
+        """Set **all** track variables for *field_name* to *value*.
+
+        :arg str field_name: the metadata field name
+        :arg value:
+           the variable value to set (type varies by metadata field)
+
+        """
+        self.__log.call(field_name, value)
+
+        for track_vars in self.__track_vars[1:]:
+            track_vars[field_name].set(value)
+
+    def _create_album_disc_editor(self, parent):
+        """Create entry widgets for the album disc number/total fields.
+
+        :arg parent: parent object of the entry widgets
+
+        """
+        self.__log.call(parent)
+
+        Label(parent, text="Disc").grid(
+            row=self.__row, column=0, padx=_PADX, pady=_PADY, sticky=E)
+
+        frame = Frame(parent)
+
+        number_var = IntVar(name="album_discnumber_var")
+        album_discnumber = Entry(
+            frame, name="album_discnumber_entry", exportselection=NO, width=3,
+            textvariable=number_var)
+        album_discnumber.var = number_var
+        album_discnumber.pack(side=LEFT)
+
+        self.__metadata_editors["album_discnumber"] = album_discnumber
+
+        Label(frame, text="of").pack(side=LEFT, padx=_PADX)
+
+        total_var = IntVar(name="album_disctotal_var")
+        album_disctotal = Entry(
+            frame, name="album_disctotal_entry", exportselection=NO, width=3,
+            textvariable=total_var)
+        album_disctotal.var = total_var
+        album_disctotal.pack(side=LEFT)
+
+        self.__metadata_editors["album_disctotal"] = album_disctotal
+
+        frame.grid(
+            row=self.__row, column=1, columnspan=2, padx=_PADX, pady=_PADY,
+            sticky=W)
+
+        self.__row += 1
+
+    def _create_album_compilation_editor(self, parent):
+        """Create the toggle widget for the album compilation field.
+
+        :arg parent: parent object of the toggle widget
+
+        """
+        self.__log.call(parent)
+
+        Label(parent, text="Compilation").grid(
+            row=self.__row, column=0, padx=_PADX, pady=_PADY, sticky=E)
+
+        var = BooleanVar()
+        album_compilation = Checkbutton(
+            parent, name="album_compilation_checkbutton", variable=var,
+            onvalue=True, offvalue=False,
+            command=self._apply_naming_defaults) # issues/5
+        album_compilation.var = var
+        album_compilation.grid(
+            row=self.__row, column=1, columnspan=2, padx=_PADX, pady=_PADY,
+            sticky=W)
+
+        self.__metadata_editors["album_compilation"] = album_compilation
+
+        self.__row += 1
+
+    def _create_album_cover_editor(self, parent):
+        """Create selection widget and import buttons for the album
+        cover field.
+
+        :arg parent:
+           parent object of the frame that will contain the selection
+           widget and buttons
+
+        """
+        self.__log.call(parent)
+
+        Label(parent, text="Cover").grid(
+            row=self.__row, column=0, padx=_PADX, pady=_PADY, sticky=E)
+
+        frame = Frame(parent)
+
+        var = StringVar(name="album_cover_var")
+        album_cover = OptionMenu(frame, var)
+        album_cover.var = var
+        album_cover.config(state=DISABLED)
+        album_cover.pack(side=LEFT)
+
+        self.__metadata_editors["album_cover"] = album_cover
+
+        Button(
+            frame, name="album_cover_add_url_button", text="Add URL",
+            command=self._add_album_cover_from_url
+        ).pack(side=LEFT, padx=_PADX)
+
+        Button(
+            frame, name="album_cover_add_file_button", text="Add file",
+            command=self._add_album_cover_from_file
+        ).pack(side=LEFT, padx=_PADX)
+
+        save_cover_var = BooleanVar(
+            name="album_save_cover_var",
+            value=get_config().getboolean("Organize", "save_cover_image"))
+        Checkbutton(
+            frame, name="album_cover_save_checkbutton",
+            text="Save to file?",
+            variable=save_cover_var, onvalue=True, offvalue=False
+        ).pack(side=RIGHT, padx=_PADX)
+        album_cover.save_cover_var = save_cover_var
+
+        frame.grid(
+            row=self.__row, column=1, columnspan=2, padx=_PADX, pady=_PADY,
+            sticky=W)
+
+        self.__row += 1
+
+    def choose_album_cover(self, label):
+        """Select and preview a cover image.
+
+        :arg str label: the cover image display label
+
+        .. note::
+           The Mac OS X "Preview" app is used to open the album cover
+           image identified by *label*.
+
+        """
+        self.__log.call(label)
+
+        filename = self.__album_covers.get(label)
+        if filename is None:
+            self.__log.error("%r not found in album covers", label)
+            messagebox.showerror(
+                "Album cover preview failure",
+                "Album cover %r was not found!" % label)
+            return
+
+        status = subprocess.call(["open", "-a", "Preview", filename])
+        if status == 0:
+            self.__metadata_editors["album_cover"].var.set(label)
+        else:
+            self.__log.warning(
+                "exit status %d attempting to preview %s (%s)",
+                status, label, filename)
+
+    def _add_album_cover_from_url(self):
+        """Download a cover image from a user-provided URL and open in
+        Mac OS X Preview.
+
+        The downloaded cover image is made available in the cover image
+        dropdown.
+
+        """
+        self.__log.call()
+
+        album_cover = self.__metadata_editors["album_cover"]
+
+        album_cover.config(state=DISABLED)
+
+        # leave initialvalue empty (paste-over doesn't work in XQuartz)
+        url = simpledialog.askstring(
+            "Add a cover image from a URL", "Enter the image URL:",
+            initialvalue="")
+        if not url:
+            album_cover.config(state=NORMAL)
+            self.__log.return_()
+            return
+
+        self.__log.debug("url = %r", url)
+        label = None
+        try:
+            response = urlopen(
+                url, timeout=get_config().getfloat("HTTP", "timeout"))
+            image_data = response.read()
+            response.close()
+
+            if response.status != 200:
+                raise RuntimeError(
+                    "HTTP %d %s" % (response.status, response.reason))
+
+            image_type = imghdr.what("_ignored_", h=image_data)
+            if image_type is None:
+                raise MetadataError(
+                    "Unrecognized image type.",
+                    context_hint="Add cover image from URL")
+
+            filename = make_tempfile(suffix='.' + image_type)
+            with open(filename, "wb") as f:
+                f.write(image_data)
+            self.__log.debug("wrote %s", filename)
+        except Exception as e:
+            self.__log.exception("failed to obtain image from %r", url)
+            messagebox.showerror(
+                "Image download failure",
+                "An unexpected error occurred while "
+                    "downloading the image from %s." % url)
+        else:
+            label = self.__add_album_cover_option(filename)
+        finally:
+            album_cover.config(state=NORMAL)
+
+        if label is not None:
+            self.choose_album_cover(label)
+
+    def _add_album_cover_from_file(self):
+        """Open a user-defined cover image in Mac OS X Preview.
+
+        The cover image is made available in the cover image dropdown.
+
+        """
+        self.__log.call()
+
+        album_cover = self.__metadata_editors["album_cover"]
+
+        album_cover.config(state=DISABLED)
+
+        label = None
+        filename = filedialog.askopenfilename(
+            defaultextension=".jpg",
+            filetypes=[
+                ("JPEG", "*.jpg"),
+                ("JPEG", "*.jpeg"),
+                ("PNG", "*.png"),
+            ],
+            initialdir=os.path.expanduser("~/Pictures"),
+            title="Choose a JPEG or PNG file")
+
+        if not filename:
+            album_cover.config(state=NORMAL)
+            self.__log.return_()
+            return
+        elif not os.path.isfile(filename):
+            self.__log.error("file not found: %s", filename)
+            messagebox.showerror(
+                "File not found", "File not found: %s" % filename)
+            self.__log.return_()
+            return
+
+        self.__log.debug("filename = %r", filename)
+        try:
+            with open(filename, "rb") as f:
+                image_data = f.read()
+
+            image_type = imghdr.what("_ignored_", h=image_data)
+            if image_type is None:
+                raise MetadataError(
+                    "Unrecognized image type.",
+                    context_hint="Add cover image from file")
+        except Exception as e:
+            self.__log.exception("failed to identify image from %r", filename)
+            messagebox.showerror(
+                "Image add failure",
+                "An unexpected error occurred while "
+                    "processing the image from %s." % filename)
+        else:
+            label = self.__add_album_cover_option(filename)
+        finally:
+            album_cover.config(state=NORMAL)
+
+        if label is not None:
+            self.choose_album_cover(label)
+
+    def __add_album_cover_option(self, filename, showinfo=True):
+        """Add an entry for *filename* to the album cover dropdown.
+
+        :arg str filename: absolute path to an album cover image file
+        :keyword bool showinfo:
+           whether or not to open a dialog confirming the addition of
+           *filename*
+
+        """
+        self.__log.call(filename, showinfo=showinfo)
+
+        label = "%02d (%s)" % (
+            len(self.__album_covers) + 1, os.path.basename(filename))
+        self.__album_covers[label] = filename
+
+        self.__metadata_editors["album_cover"]["menu"].add_command(
+            label=label,
+            command=
+                lambda self=self, label=label:
+                    self.choose_album_cover(label))
+
+        if showinfo:
+            messagebox.showinfo(
+                "Cover image added",
+                "%r has been added to the list of available covers." % label)
+
+        self.__log.return_(label)
+        return label
+
+    @property
+    def is_save_cover_image(self):
+        return self.__metadata_editors["album_cover"].save_cover_var.get()
+
+    def _create_album_custom_metadata_editor(self, parent):
+        """Create the UI editing controls for editing custom metadata
+        for *all* tracks.
+
+        :arg parent: parent object of the editor
+
+        """
+        self.__log.call(parent)
+
+        album_custom_tagging_button = Button(
+            parent, name="album_custom_tagging_button",
+            text="Edit custom Vorbis/ID3v2 tagging for ALL tracks",
+            command=
+                lambda self=self:
+                    EditAlbumCustomMetadataTaggingDialog(
+                        parent, self.__aggregated_metadata,
+                        self.__aggregated_metadata["__tracks"],
+                        title=self.__metadata_editors["album_title"].var.get())
+        )
+        album_custom_tagging_button.grid(
+            row=self.__row, column=0, columnspan=3, padx=_PADX, pady=_PADY,
+            sticky=W+E)
+
+        self.__metadata_editors["album_custom"] = album_custom_tagging_button
+
+        self.__row += 1
+
+    def _create_track_control_editors(self, parent):
+        """Create the widgets used to navigate and include/exclude
+        individual tracks.
+
+        :arg parent:
+           parent object of the frames that contain the control widgets
+
+        """
+        self.__log.call(parent)
+
+        Label(parent, text="Track").grid(
+            row=self.__row, column=0, padx=_PADX, pady=_PADY, sticky=E)
+
+        nav_frame = Frame(parent, name="track_nav_frame")
+
+        number_var = IntVar(name="track_number_var")
+        track_number = Spinbox(
+            nav_frame, name="track_number_spinbox",
+            from_=0, to=0, textvariable=number_var, width=3, wrap=True,
+            state="readonly", command=self._refresh_track_editors
+        )
+        track_number.var = number_var
+        track_number.pack(side=LEFT, padx=_PADX)
+
+        of_label = Label(nav_frame, name="of_label", text="of")
+        of_label.pack(side=LEFT)
+        track_number.of_label = of_label
+
+        self.__metadata_editors["track_number"] = track_number
+
+        nav_frame.grid(row=self.__row, column=1, sticky=W)
+
+        self.__row += 1
+
+        include_label = Label(parent, text="Include").grid(
+            row=self.__row, column=0, padx=_PADX, pady=_PADY, sticky=E)
+
+        include_var = BooleanVar(name="track_include_var", value=True)
+        track_include = Checkbutton(
+            parent, name="track_include_checkbutton",
+            variable=include_var, onvalue=True, offvalue=False,
+            command=self.__update_track_include_state)
+        track_include.var = include_var
+        track_include.grid(row=self.__row, column=1, padx=_PADX, sticky=W)
+
+        apply_include_button = _styled(
+            Button(
+                parent, name="track_include_apply_button",
+                text="Include all tracks",
+                command=lambda self=self:
+                    self.__apply_to_all_tracks(
+                        "track_include",
+                        self.__metadata_editors["track_include"].var.get())),
+            foreground="Blue")
+        apply_include_button.grid(
+            row=self.__row, column=2, padx=_PADX, sticky=W)
+        track_include.apply_button = apply_include_button
+
+        self.__metadata_editors["track_include"] = track_include
+
+        self.__row += 1
+
+    def _create_track_custom_metadata_editor(self, parent):
+        """Create the UI editing controls for editing custom metadata
+        for a single track.
+
+        :arg parent: parent object of the editor
+
+        """
+        self.__log.call(parent)
+
+        track_custom_tagging_button = Button(
+            parent, name="track_custom_tagging_button",
+            text="Edit custom Vorbis/ID3v2 tagging for this track",
+            command=
+                lambda self=self:
+                    EditCustomMetadataTaggingDialog(
+                        parent,
+                        self.__aggregated_metadata["__tracks"][
+                            self.current_track_number],
+                        title="%d. %s" % (
+                            self.current_track_number,
+                            self.__track_vars[self.current_track_number][
+                                "track_title"].get()))
+        )
+        track_custom_tagging_button.grid(
+            row=self.__row, column=0, columnspan=3, padx=_PADX, pady=_PADY,
+            sticky=W+E)
+
+        self.__metadata_editors["track_custom"] = track_custom_tagging_button
+
+        self.__row += 1
+
+    @property
+    def current_track_number(self):
+        """The number of the track currently being edited."""
+        return self.__metadata_editors["track_number"].var.get()
+
+    def metadata_ready_for_editing(self, aggregated_metadata):
+        """(Re)Configure the entry/selection widgets with values from
+        *aggregated_metadata*.
+
+        :arg dict aggregated_metadata:
+           the aggregated metadata field values for the current album
+           and each of its tracks
+
+        Separate variables will be created to store the entered/selected
+        values for each track.
+
+        """
+        self.__log.call(aggregated_metadata)
+
+        self.reset()
+
+        metadata_editors = self.__metadata_editors
+
+        for album_field_name in [
+                "album_title",
+                "album_artist",
+                "album_label",
+                "album_genre",
+                "album_year",
+                ]:
+            widget = metadata_editors[album_field_name]
+            widget.configure(values=aggregated_metadata[album_field_name])
+            if aggregated_metadata[album_field_name]:
+                widget.current(0)
+
+        metadata_editors["album_discnumber"].var.set(
+            aggregated_metadata["album_discnumber"])
+        metadata_editors["album_disctotal"].var.set(
+            aggregated_metadata["album_disctotal"])
+
+        metadata_editors["album_compilation"].var.set(
+            aggregated_metadata["album_compilation"])
+
+        album_cover_editor = metadata_editors["album_cover"]
+        album_cover_editor.config(state=DISABLED)
+        if aggregated_metadata["album_cover"]:
+            for filepath in aggregated_metadata["album_cover"]:
+                self.__add_album_cover_option(filepath, showinfo=False)
+            album_cover_editor.config(state=NORMAL)
+
+        # issues/5
+        self._apply_naming_defaults()
+        for encoding in ["flac", "mp3"]:
+            for field_suffix in [
+                    "subroot_trie", "album_folder", "track_filename"]:
+                custom_key = "__%s_%s" % (encoding, field_suffix)
+                custom_spec = aggregated_metadata.get(custom_key)
+                if custom_spec is not None:
+                    metadata_editors[custom_key].var.set(custom_spec)
+
+        # issues/5
+        self.__album_disctotal_observer_name = \
+            metadata_editors["album_disctotal"].var.trace(
+                'w', self._apply_naming_defaults)
+
+        self.__aggregated_metadata = deepcopy(aggregated_metadata)
+
+        self._initialize_track_vars()
+
+        # if persisted data was restored, manually select the cover image so
+        # that it opens in Preview automatically
+        fm = self.master
+        if fm._persistence.restored and self.__album_covers:
+            self.choose_album_cover(list(self.__album_covers.keys())[0])
+
+    def merge_aggregated_metadata(self, aggregated_metadata):
+        """Add newly aggregated candidate values to the entry/selection
+        widgets that are already being edited.
+
+        :arg dict aggregated_metadata:
+           the aggregated metadata field values for the current album
+           and each of its tracks, which includes (at least) all of the
+           values passed to :meth:`metadata_ready_for_editing`
+
+        Values that have already been entered or selected are not
+        changed, except that empty fields are set to the first
+        candidate value.
+
+        """
+        self.__log.call(aggregated_metadata)
+
+        metadata_editors = self.__metadata_editors
+        current_metadata = self.__aggregated_metadata
+
+        for album_field_name in [
+                "album_title",
+                "album_artist",
+                "album_label",
+                "album_genre",
+                "album_year",
+                ]:
+            values = aggregated_metadata[album_field_name]
+            current_metadata[album_field_name] = list(values)
+            widget = metadata_editors[album_field_name]
+            widget.configure(values=values)
+            if values and not widget.var.get():
+                widget.current(0)
+
+        new_album_covers = [
+            filepath for filepath in aggregated_metadata["album_cover"]
+            if filepath not in self.__album_covers.values()]
+        for filepath in new_album_covers:
+            self.__add_album_cover_option(filepath, showinfo=False)
+        if new_album_covers:
+            metadata_editors["album_cover"].config(state=NORMAL)
+
+        for (key, value) in aggregated_metadata["__custom"].items():
+            current_metadata["__custom"].setdefault(key, value)
+
+        for t in range(1, len(current_metadata["__tracks"])):
+            track_metadata = current_metadata["__tracks"][t]
+            aggregated_track_metadata = aggregated_metadata["__tracks"][t]
+            track_vars = self.__track_vars[t]
+            for track_field_name in [
+                    "track_title",
+                    "track_artist",
+                    "track_genre",
+                    "track_year",
+                    ]:
+                values = aggregated_track_metadata[track_field_name]
+                track_metadata[track_field_name] = list(values)
+                if values and not track_vars[track_field_name].get():
+                    track_vars[track_field_name].set(values[0])
+
+            for (key, value) in aggregated_track_metadata["__custom"].items():
+                track_metadata["__custom"].setdefault(key, value)
+
+        self._refresh_track_editors()
+
+    def pack(self, *args, **kwargs):
+        """Display the editor frame.
+
+        :arg tuple args: positional arguments to pack the editor frame
+        :arg dict kwargs: keyword argument to pack the editor frame
+
+        Showing the editor frame *enables* the **File | Save metadata**
+        menu command.
+
+        """
+        self.__log.call(*args, **kwargs)
+        super().pack(*args, **kwargs)
+
+        fm = self.master
+
+        # Enable the "Save metadata" command in the File menu
+        file_menu = fm.nametowidget(".menubar.file_menu")
+        file_menu.entryconfig(0, state=NORMAL)
+
+    def pack_forget(self):
+        """Hide the editor frame.
+
+        Hiding the editor frame *disables* the **File | Save metadata**
+        menu command.
+
+        """
+        self.__log.call()
+        super().pack_forget()
+
+        fm = self.master
+
+        # Disable the "Save metadata" command in the File menu
+        file_menu = fm.nametowidget(".menubar.file_menu")
+        file_menu.entryconfig(0, state=DISABLED)
+
+    @property
+    def metadata_snapshot(self):
+        """The complete (album and tracks) metadata mapping as currently
+        represented by all editor widgets and variables.
+
+        :rtype: :class:`collections.OrderedDict`
+
+        """
+        self.__log.call()
+
+        metadata_editors = self.__metadata_editors
+
+        snapshot = OrderedDict()
+        for album_field_name in [
+                "album_title",
+                "album_discnumber",
+                "album_disctotal",
+                "album_compilation",
+                "album_artist",
+                "album_label",
+                "album_genre",
+                "album_year",
+                ]:
+            snapshot[album_field_name] = \
+                metadata_editors[album_field_name].var.get()
+
+        # use the actual temp filename for the snapshot
+        snapshot["album_cover"] = \
+            self.__album_covers.get(metadata_editors["album_cover"].var.get())
+
+        track_vars = self.__track_vars
+        snapshot["album_tracktotal"] = len(track_vars) - 1
+
+        # for the metadata snapshot, the custom fields must be preserved at
+        # both the album and track level so that a disc whose persisted
+        # metadata is re-read will still have its custom metadata editable as
+        # expected
+        aggregated_metadata = self.__aggregated_metadata
+        snapshot["__custom"] = aggregated_metadata["__custom"].copy()
+
+        # issues/5
+        snapshot["__flac_subroot_trie"] = \
+            metadata_editors["__flac_subroot_trie"].var.get()
+        snapshot["__flac_album_folder"] = \
+            metadata_editors["__flac_album_folder"].var.get()
+        snapshot["__flac_track_filename"] = \
+            metadata_editors["__flac_track_filename"].var.get()
+        if self.__mp3_naming_same_as_flac_var.get():
+            snapshot["__mp3_subroot_trie"] = snapshot["__flac_subroot_trie"]
+            snapshot["__mp3_album_folder"] = snapshot["__flac_album_folder"]
+            snapshot["__mp3_track_filename"] = \
+                snapshot["__flac_track_filename"]
+        else:
+            snapshot["__mp3_subroot_trie"] = \
+                metadata_editors["__mp3_subroot_trie"].var.get()
+            snapshot["__mp3_album_folder"] = \
+                metadata_editors["__mp3_album_folder"].var.get()
+            snapshot["__mp3_track_filename"] = \
+                metadata_editors["__mp3_track_filename"].var.get()
+
+        snapshot["__tracks"] = [None]
+        for t in range(1, len(track_vars)):
+            track_metadata = OrderedDict()
+
+            track_metadata["track_number"] = t
+            for track_field_name in [
+                    "track_include",
+                    "track_title",
+                    "track_artist",
+                    "track_genre",
+                    "track_year",
+                    ]:
+                track_metadata[track_field_name] = \
+                    track_vars[t][track_field_name].get()
+
+            track_metadata["__custom"] = \
+                aggregated_metadata["__tracks"][t]["__custom"].copy()
+
+            snapshot["__tracks"].append(track_metadata)
+
+        self.__log.return_(snapshot)
+        return snapshot
+
+    @property
+    def flattened_metadata(self):
+        """The complete per-track metadata, including album metadata
+        values shared by all tracks.
+
+        :rtype: :obj:`list` of :class:`collections.OrderedDict`
+
+        .. note::
+           The list returned by this property uses zero-based indexing.
+           (This differs from most other internal representations of
+           per-track metadata, which use 1-based indexing to maintain
+           consistency with respect to track numbers.)
+
+        """
+        self.__log.call()
+
+        flattened = flatten_metadata_snapshot(self.metadata_snapshot)
+
+        self.__log.return_(flattened)
+        return flattened
+
+    def _initialize_track_vars(self):
+        """Create (and set the initial values of) variables for metadata
+        fields for each track.
+
+        """
+        self.__log.call()
+
+        track_vars = self.__track_vars = [
+            None,   # track vars use 1-based indexing
+        ]
+
+        aggregated_tracks_metadata = self.__aggregated_metadata["__tracks"]
+        last_track = len(aggregated_tracks_metadata) - 1
+        # from_ will still be 0 here, and that's intended - it means that when
+        # we invoke "buttonup" for the first time, it will increment the track
+        # spinbox to 1, triggering a refresh of track 1's metadata
+        track_number_editor = self.__metadata_editors["track_number"]
+        track_number_editor.config(to=last_track)
+        track_number_editor.of_label.config(text="of %d" % last_track)
+
+        # tracks metadata also uses 1-based indexing
+        for t in range(1, len(aggregated_tracks_metadata)):
+            track_metadata = aggregated_tracks_metadata[t]
+
+            # first initialize the individual track vars...
+            varmap = {
+                "track_include": BooleanVar(
+                    name="track_%d_include" % t,
+                    value=track_metadata["track_include"]),
+            }
+            for field in [
+                    "title",
+                    "artist",
+                    "genre",
+                    "year",
+                    ]:
+                metadata_name = "track_%s" % field
+                varmap[metadata_name] = StringVar(
+                    name="track_%d_%s" % (t, field),
+                    value=track_metadata[metadata_name][0]
+                        if track_metadata[metadata_name] else "")
+
+            track_vars.append(varmap)
+
+            # ...then initialize the editors and editor vars by using the track
+            # spinbox to trigger refreshes (but make sure this method is called
+            # BEFORE the metadata editor is packed, otherwise the user will be
+            # very disoriented and confused)
+            track_number_editor.invoke("buttonup")
+
+        # now update the from_ to 1 and initialize the spinner to track #1 by
+        # "wrapping around"
+        track_number_editor.config(from_=1)
+        track_number_editor.invoke("buttonup")
+
+    def _refresh_track_editors(self):
+        """Populate track editors with metadata for the current track.
+
+        This method is called when navigating to another track. If
+        navigation is at either end of the track list already (i.e.
+        navigating down from track 1 or up from the last track), then
+        the spinner "wraps around."
+
+        """
+        self.__log.call()
+
+        track_number = self.current_track_number
+        track_vars = self.__track_vars[track_number]
+        track_metadata = self.__aggregated_metadata["__tracks"][track_number]
+
+        metadata_editors = self.__metadata_editors
+        metadata_editors["track_include"].var.set(
+            track_vars["track_include"].get())
+        self.__update_track_include_state()
+        for track_field_name in [
+                "track_title",
+                "track_artist",
+                "track_genre",
+                "track_year",
+                ]:
+            widget = metadata_editors[track_field_name]
+            widget.configure(
+                values=track_metadata[track_field_name],
+                textvariable=track_vars[track_field_name])
+
+    def __update_track_include_state(self):
+        """Update the widgets for the current track based on whether or
+        not it is included.
+
+        """
+        self.__log.call()
+
+        track_number = self.current_track_number
+        track_include_editor = self.__metadata_editors["track_include"]
+
+        track_included = track_include_editor.var.get()
+        self.__track_vars[track_number]["track_include"].set(track_included)
+
+        if track_included:
+            track_include_editor.apply_button.config(text="Include all tracks")
+            _styled(track_include_editor.apply_button, foreground="Blue")
+        else:
+            track_include_editor.apply_button.config(text="Exclude all tracks")
+            _styled(track_include_editor.apply_button, foreground="Red")
+
+        if get_config()["UI"].getboolean("disable_editing_excluded_tracks"):
+            for track_field_name in [
+                    "track_title",
+                    "track_artist",
+                    "track_genre",
+                    "track_year",
+                    "track_custom",
+                    ]:
+                self.__metadata_editors[track_field_name].config(
+                    state=NORMAL if track_included else DISABLED)
+
+    def reset(self):
+        """Populate widgets in their default/initial states."""
+        self.__log.call()
+
+        self._remove()
+
+        metadata_editors = self.__metadata_editors
+
+        # reset all track editor vars to default
+        # (the .var property of track editors serves as the default)
+        metadata_editors["track_include"].var.set(True)
+        for track_field_name in [
+                "track_title",
+                "track_artist",
+                "track_genre",
+                "track_year",
+                ]:
+            metadata_editors[track_field_name].configure(
+                textvariable=metadata_editors[track_field_name].var)
+
+        metadata_editors["album_discnumber"].var.set(0)
+        # issues/5
+        if self.__album_disctotal_observer_name is not None:
+            metadata_editors["album_disctotal"].var.trace_vdelete(
+                'w', self.__album_disctotal_observer_name)
+            self.__album_disctotal_observer_name = None
+        metadata_editors["album_disctotal"].var.set(0)
+
+        metadata_editors["album_compilation"].var.set(False)
+
+        for field_name in [
+                "album_title",
+                "album_artist",
+                "album_label",
+                "album_genre",
+                "album_year",
+                "track_title",
+                "track_artist",
+                "track_genre",
+                "track_year",
+                ]:
+            widget = metadata_editors[field_name]
+            widget.configure(values=[])
+            widget.var.set("")
+
+        album_cover_editor = metadata_editors["album_cover"]
+        album_cover_editor["menu"].delete(0, END)
+        album_cover_editor.var.set("")
+        album_cover_editor.config(state=DISABLED)
+
+        album_cover_editor.save_cover_var.set(
+            get_config().getboolean("Organize", "save_cover_image"))
+
+        track_number_editor = metadata_editors["track_number"]
+        track_number_editor.config(from_=0, to=0)
+        track_number_editor.var.set(0)
+
+        track_include_editor = metadata_editors["track_include"]
+        # tracks are always included by default
+        track_include_editor.var.set(True)
+        track_include_editor.apply_button.config(text="Include all tracks")
+        _styled(track_include_editor.apply_button, foreground="Blue")
+
+        # issues/5
+        self._apply_naming_defaults()
+        self.__mp3_naming_same_as_flac_var.set(True)
+
+        # finally clear all cached data
+        self.__aggregated_metadata = None
+        self.__album_covers = OrderedDict()
+        self.__track_vars = None
+
+    def _remove(self):
+        """Remove widgets from the current layout."""
+        self.__log.call()
+
+        # entry widgets are NOT removed - just the editor frame itself
+        self.pack_forget()
+
+
+@logged
+class _FMEncodingStatusFrame(LabelFrame):
+    """The encoding status (monitoring) frame for FLACManager."""
+
+    def __init__(self, *args, **options):
+        """
+        :arg tuple args: positional arguments to initialize the frame
+        :arg dict options: ``config`` options to initialize the frame
+
+        """
+        self.__log.call(*args, **options)
+        super().__init__(*args, **options)
+
+        list_frame = Frame(self)
+
+        vscrollbar = Scrollbar(list_frame, orient=VERTICAL)
+        vscrollbar.pack(side=RIGHT, fill=Y, padx=0, pady=0)
+
+        self._track_encoding_status_list = Listbox(
+            list_frame, name="track_encoding_status_listbox",
+            exportselection=NO, activestyle=NONE, selectmode=SINGLE,
+            borderwidth=0, yscrollcommand=vscrollbar.set)
+        self._track_encoding_status_list.pack(fill=BOTH, padx=0, pady=0)
+
+        vscrollbar.config(command=self._track_encoding_status_list.yview)
+
+        list_frame.pack(fill=BOTH, padx=_PADX, pady=_PADY)
+
+    def ready_to_encode(self, per_track_metadata):
+        """(Re)Initialize the encoding status list to monitor encoding
+        of tracks from *per_track_metadata*.
+
+        :arg list per_track_metadata:
+           metadata field mappings for each track
+
+        """
+        track_encoding_statuses = [
+            TrackEncodingStatus(
+                "{track_number:02d} {track_title}".format(**track_metadata),
+                pending=track_metadata["track_include"])
+            for track_metadata in per_track_metadata]
+
+        # determine how many tracks are visible at once
+        number_of_tracks = len(per_track_metadata)
+        max_visible_tracks = get_config()["UI"].getint(
+            "encoding_max_visible_tracks")
+        visible_tracks = (
+            number_of_tracks if number_of_tracks < max_visible_tracks
+            else max_visible_tracks)
+
+        items_spec = StringVar(
+            value=' '.join(
+                "{%s}" % track_encoding_status.describe()
+                for track_encoding_status in track_encoding_statuses))
+        self._track_encoding_status_list.configure(
+            height=visible_tracks, listvariable=items_spec)
+
+        for i in range(number_of_tracks):
+            if not per_track_metadata[i]["track_include"]:
+                self._track_encoding_status_list.itemconfig(i, {"fg": "gray79"})
+
+        self._track_encoding_statuses = track_encoding_statuses
+
+    def encoding_in_progress(self):
+        """Update the UI as tracks are ripped."""
+        # don't log entry into this method - it is called repeatedly until all
+        # tracks are ripped
+        try:
+            (priority, status) = _ENCODING_QUEUE.get_nowait()
+        except queue.Empty:
+            self.after(QUEUE_GET_NOWAIT_AFTER, self.encoding_in_progress)
+        else:
+            _ENCODING_QUEUE.task_done()
+            self.__log.debug("dequeued %r", status)
+
+            (track_index, cdda_fn, flac_fn, stdout_fn, target_state) = status
+            if target_state == "FINISHED":
+                # all tracks have been processed
+                while _ENCODING_QUEUE.qsize() > 0:
+                    try:
+                        self.__log.debug(
+                            "finished; discarding %r",
+                            _ENCODING_QUEUE.get_nowait())
+                    except queue.Empty:
+                        break
+                    else:
+                        _ENCODING_QUEUE.task_done()
+
+                fm = self.master
+                fm._disc_frame.rip_and_tag_finished()
+                fm.bell()
+
+                self.__log.trace("exit the monitoring loop")
+                return False
+
+            track_encoding_status = self._track_encoding_statuses[track_index]
+
+            # only process "expected" state transitions
+            if track_encoding_status.transition_to(target_state):
+                if track_encoding_status.state == TRACK_FAILED:
+                    status_message = track_encoding_status.describe(
+                        message="%s: %s" %
+                            (target_state.__class__.__name__, target_state)
+                        if isinstance(target_state, Exception) else None)
+                    item_config = {"fg": "red"}
+                elif track_encoding_status.state == TRACK_ENCODING_FLAC:
+                    # ensure that the currently-ripping track is always visible
+                    self._track_encoding_status_list.see(track_index)
+                    # read encoding interval status from flac's stdout
+                    cdda_basename = os.path.basename(cdda_fn)
+                    stdout_message = self._read_current_status(
+                        cdda_basename, stdout_fn)
+                    status_message = track_encoding_status.describe(
+                        message=stdout_message if stdout_message else None)
+                    item_config = {"fg": "blue"}
+                elif (track_encoding_status.state in [
+                            TRACK_RETAGGING,
+                            TRACK_DECODING_WAV,
+                            TRACK_ENCODING_MP3,
+                            TRACK_PUBLISHING]
+                        or track_encoding_status.state.key ==
+                            "REENCODING_MP3"):
+                    status_message = track_encoding_status.describe()
+                    item_config = {"fg": "dark violet"}
+                elif track_encoding_status.state == TRACK_COMPLETE:
+                    status_message = flac_fn
+                    item_config = {"fg": "dark green"}
+                else:   # unexpected state
+                    status_message = "%s (unexpected target state %s)" % (
+                        track_encoding_status.describe(), target_state)
+                    item_config = {"fg": "red"}
+
+                self._track_encoding_status_list.delete(track_index)
+                self._track_encoding_status_list.insert(
+                    track_index, status_message)
+                self._track_encoding_status_list.itemconfig(
+                    track_index, item_config)
+
+                # ensure that last track is always visible after delete/insert
+                if (track_index ==
+                        self._track_encoding_status_list.index(END) - 1):
+                    self._track_encoding_status_list.see(track_index)
+
+            self.after(QUEUE_GET_NOWAIT_AFTER, self.encoding_in_progress)
+
+            return True
+
+    def _read_current_status(self, cdda_basename, stdout_fn):
+        """Extract the most recent FLAC encoding update from
+        *stdout_fn*.
+
+        :arg str cdda_basename: a grep pattern for *stdout_fn*
+        :arg str stdout_fn:
+           filename to which stdout has been redirected
+        :return: a line of update text from *stdout_fn*
+        :rtype: :obj:`str`
+
+        """
+        # do not trace; called from a recursive method
+        status_line = None
+        prefix = "%s: " % cdda_basename
+        with open(stdout_fn, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith(prefix):
+                    # remove the prefix, then split on ASCII BS (Backspace) and
+                    # take the last component
+                    #
+                    # output line looks like this:
+                    #   ${prefix}${status1}(BS)+${status2}(BS)+..${statusN}
+                    status_line = line.replace(prefix, "").split('\x08')[-1]
+        return status_line
+
+    def reset(self):
+        """Populate widgets in their default/initial states."""
+        self.__log.call()
+
+        self._remove()
+
+        self._track_encoding_status_list.delete(0, END)
+        self._track_encoding_status_list.configure(listvariable=None, height=0)
+
+        self._track_encoding_statuses = None
+
+    def _remove(self):
+        """Remove widgets from the current layout."""
+        self.__log.call()
+
+        # widgets are NOT removed - just the frame itself
+        self.pack_forget()
+
+
+@total_ordering
+class TrackState:
+    """Represents the state of a single track at any given time during
+    the rip-and-tag operation.
+
+    """
+
+    def __init__(self, ordinal, key, text):
+        """
+        :arg int ordinal: this state's relative value
+        :arg str key: uniquely identifies this state
+        :arg str text: a short description of this state
+
+        """
+        self._ordinal = ordinal
+        self._key = key
+        self._text = text
+
+    @property
+    def key(self):
+        """The unique identifier for this state."""
+        return self._key
+
+    @property
+    def text(self):
+        """The track-independent short description of this state."""
+        return self._text
+
+    def __int__(self):
+        """Return the relative (ordinal) value of this state."""
+        return self._ordinal
+
+    def __str__(self):
+        """Return the unique identifier for this state."""
+        return self._key
+
+    def __repr__(self):
+        """Return a string that is unique for this track state."""
+        return "%s(%d, %r, %r)" % (
+            self.__class__.__name__, self._ordinal, self._key, self._text)
+
+    def __lt__(self, other):
+        """Return ``True`` if this state's ordinal value is less than
+        *other* state's ordinal value, otherwise ``False``.
+
+        :arg flacmanager.TrackState other: the state being compared
+
+        """
+        return int(self) < int(other)
+
+    def __eq__(self, other):
+        """Return ``True`` if this state's ordinal value and key are
+        equal to *other* state's ordinal value and key, otherwise
+        ``False``.
+
+        :arg flacmanager.TrackState other: the state being compared
+
+        """
+        return (
+            isinstance(other, self.__class__)
+            and self._ordinal == other._ordinal
+            and self._key == other._key)
+
+    def __hash__(self):
+        return hash(repr(self))
+
+
+#: Indicates that a track is excluded from the rip-and-tag operation.
+TRACK_EXCLUDED = TrackState(-1, "EXCLUDED", "excluded")
+
+#: Indicates that the rip-and-tag process has not yet begun for a track.
+TRACK_PENDING = TrackState(0, "PENDING", "pending\u2026")
+
+#: Indicates that a track is being encoded from CDDA to FLAC format.
+TRACK_ENCODING_FLAC = TrackState(
+    1, "ENCODING_FLAC", "encoding CDDA to FLAC\u2026")
+
+#: Indicates that a track is being decoded from FLAC to WAV format.
+TRACK_DECODING_WAV = TrackState(
+    2, "DECODING_WAV", "decoding FLAC to WAV\u2026")
+
+#: Indicates that a track is being encoded from WAV to MP3 format.
+TRACK_ENCODING_MP3 = TrackState(3, "ENCODING_MP3", "encoding WAV to MP3\u2026")
+
+#: Indicates that a track is being re-encoded from WAV to MP3 format
+#: after clipping was detected in a prior encoding operation.
+TRACK_REENCODING_MP3 = partial(
+    lambda scale: TrackState(
+        4, "REENCODING_MP3",
+        "re-encoding MP3 at {:.2f} scale (clipping detected)\u2026".
+            format(scale)))
+
+#: Indicates that a track's files are being copied from the staging
+#: folders into the library folders.
+TRACK_PUBLISHING = TrackState(5, "PUBLISHING", "copying to library\u2026")
+
+#: Indicates that a previously encoded track's tags are being rewritten
+#: (and its files renamed or moved, if necessary).
+TRACK_RETAGGING = TrackState(1, "RETAGGING", "rewriting tags\u2026")
+
+#: Indicates that an error occurred while processing a track.
+TRACK_FAILED = TrackState(99, "FAILED", "failed")
+
+#: Indicates that the rip-and-tag process has finished for a track.
+TRACK_COMPLETE = TrackState(99, "COMPLETE", "complete")
+
+
+@logged
+class TrackEncodingStatus:
+    """A simple state machine for a single track's encoding status."""
+
+    def __init__(self, track_label, pending=True):
+        """
+        :arg str track_label: the track's display label
+        :keyword bool pending:
+           the default ``True`` initializes status as
+           :data:`TRACK_PENDING`; set to ``False`` to initialize status
+           as :data:`TRACK_EXCLUDED`
+
+        """
+        self.__log.call(track_label, pending=pending)
+
+        self.track_label = track_label
+        self.__state = TRACK_PENDING if pending else TRACK_EXCLUDED
+
+    @property
+    def state(self):
+        """The current state of encoding for this track."""
+        return self.__state
+
+    def transition_to(self, to_state):
+        """Advance this track's encoding state from its current state to
+        *to_state*, if permitted.
+
+        :arg to_state:
+           the target encoding state, or any :class:`Exception` to
+           transition to :data:`TRACK_FAILED`
+        :return:
+           ``True`` if the transition is successful, otherwise ``False``
+
+        """
+        self.__log.call(to_state)
+
+        from_state = self.__state
+        if isinstance(to_state, Exception):
+            to_state = TRACK_FAILED
+
+        if (from_state in [
+                    TRACK_EXCLUDED,
+                    TRACK_FAILED,
+                    TRACK_COMPLETE]
+                or to_state < from_state):
+            self.__log.warning(
+                "%s: illegal transition from %s to %s",
+                self.track_label, from_state, to_state)
+            self.__log.return_(False)
+            return False
+
+        self.__state = to_state
+        self.__log.return_(True)
+        return True
+
+    def describe(self, message=None):
+        """Return a short display string for this track and its current
+        status.
+
+        :arg str message:
+           short piece of text to use with the track label (instead of
+           the default message for the current state)
+
+        """
+        return "%s: %s" % (
+            self.track_label,
+            message if message is not None else self.__state.text)
+
+
+def _resolve_library_roots():
+    """Return the absolute FLAC and MP3 library directories.
+
+    :return: a 2-tuple (FLAC library root, MP3 library root)
+    :raises FLACManagerError: if either library root is not valid
+
+    """
+    _log.call()
+
+    config = get_config()
+
+    flac_library_root = config["FLAC"]["library_root"]
+    try:
+        flac_library_root = resolve_path(flac_library_root)
+    except Exception as e:
+        raise FLACManagerError(
+            "Cannot use FLAC library root %r: %s" % (flac_library_root, e),
+            context_hint="FLAC encoding", cause=e)
+
+    mp3_library_root = config["MP3"]["library_root"]
+    try:
+        mp3_library_root = resolve_path(mp3_library_root)
+    except Exception as e:
+        raise FLACManagerError(
+            "Cannot use MP3 library root %r: %s" % (mp3_library_root, e),
+            context_hint="MP3 encoding", cause=e)
+
+    rv = (flac_library_root, mp3_library_root)
+    _log.return_(rv)
+    return rv
+
+
+def _resolve_staging_roots():
+    """Return the absolute FLAC and MP3 staging directories.
+
+    :return:
+       a 2-tuple (FLAC staging root, MP3 staging root), or ``None`` if
+       staging is disabled
+    :raises FLACManagerError: if the staging root is not valid
+
+    """
+    _log.call()
+
+    staging_root = get_config()["Organize"].get("staging_root", "")
+    if not staging_root:
+        _log.return_(None)
+        return None
+
+    try:
+        staging_root = resolve_path(staging_root)
+    except Exception as e:
+        raise FLACManagerError(
+            "Cannot use staging root %r: %s" % (staging_root, e),
+            context_hint="FLAC+MP3 encoding", cause=e)
+
+    rv = (
+        os.path.join(staging_root, "FLAC"), os.path.join(staging_root, "MP3"))
+    for root in rv:
+        # the staging root is expected to be local storage
+        os.makedirs(root, exist_ok=True)
+
+    _log.return_(rv)
+    return rv
+
+
+@logged
+class AlbumPathPlanner:
+    """Computes the FLAC and MP3 file names for all tracks of an album.
+
+    Album folder names are only generated once per distinct folder, and
+    all folders are created at once (see :meth:`make_dirs`).
+
+    """
+
+    def __init__(self, flac_library_root, mp3_library_root):
+        """
+        :arg str flac_library_root: the FLAC library directory
+        :arg str mp3_library_root: the MP3 library directory
+
+        """
+        self.__log.call(flac_library_root, mp3_library_root)
+
+        self._library_roots = {
+            "FLAC": flac_library_root,
+            "MP3": mp3_library_root,
+        }
+        self._dirnames = {}
+
+    def plan(self, per_track_metadata):
+        """Compute the file names for every **included** track.
+
+        :arg list per_track_metadata: metadata mappings for each track
+        :return:
+           a list of (FLAC file name, MP3 file name) pairs, with
+           ``None`` in place of each excluded track
+        :raises FLACManagerError:
+           if two tracks would be written to the same file
+
+        File names are compared case-insensitively, because the library
+        may be on a case-insensitive file system.
+
+        """
+        self.__log.call(per_track_metadata)
+
+        plan = []
+        planned = {}
+        for (i, track_metadata) in enumerate(per_track_metadata):
+            if not track_metadata["track_include"]:
+                plan.append(None)
+                continue
+
+            track_paths = self.track_paths(track_metadata)
+            for filename in track_paths:
+                other = planned.setdefault(filename.casefold(), i)
+                if other != i:
+                    raise FLACManagerError(
+                        "Tracks %d and %d would both be saved as %s" % (
+                            other + 1, i + 1, filename),
+                        context_hint="Organizing")
+            plan.append(track_paths)
+
+        self.__log.return_(plan)
+        return plan
+
+    def track_paths(self, track_metadata):
+        """Compute the file names for a single track.
+
+        :arg dict track_metadata: the finalized metadata for a track
+        :return: a 2-tuple (FLAC file name, MP3 file name)
+
+        """
+        return (
+            os.path.join(
+                self._dirname("FLAC", track_metadata),
+                generate_flac_basename(track_metadata)),
+            os.path.join(
+                self._dirname("MP3", track_metadata),
+                generate_mp3_basename(track_metadata)))
+
+    def make_dirs(self, plan):
+        """Create all folders needed by *plan*.
+
+        :arg list plan: the list returned by :meth:`plan`
+
+        """
+        self.__log.call(plan)
+
+        dirnames = []
+        for track_paths in plan:
+            for filename in (track_paths or []):
+                dirname = os.path.dirname(filename)
+                if dirname not in dirnames:
+                    dirnames.append(dirname)
+
+        if dirnames:
+            # doesn't work as expected for external media
+            #os.makedirs(dirname, exist_ok=True)
+            subprocess.check_call(["mkdir", "-p"] + dirnames)
+
+    def _dirname(self, section, metadata):
+        """Return the (cached) album folder for a track.
+
+        :arg str section: "FLAC" or "MP3"
+        :arg dict metadata: the finalized metadata for a single track
+
+        """
+        prefix = "__%s_" % section.lower()
+        trie_key = metadata[prefix + "subroot_trie"]
+        cache_key = (
+            section,
+            trie_key,
+            metadata[trie_key] if trie_key else None,
+            metadata[prefix + "album_folder"].format(**metadata))
+
+        if cache_key not in self._dirnames:
+            self._dirnames[cache_key] = _generate_dirname(
+                section, self._library_roots[section], metadata,
+                makedirs=False)
+
+        return self._dirnames[cache_key]
+
+
+def generate_flac_dirname(library_root, metadata, makedirs=True):
+    """Build the directory for a track's FLAC file.
+
+    :arg str library_root: the FLAC library directory
+    :arg dict metadata: the finalized metadata for a single track
+    :keyword bool makedirs:
+       whether or not to create the directory if it does not exist
+    :return: an absolute directory path
+    :rtype: :obj:`str`
+
+    """
+    _log.call(library_root, metadata, makedirs=makedirs)
+    return _generate_dirname(
+        "FLAC", library_root, metadata, makedirs=makedirs)
+
+
+def generate_flac_basename(metadata):
+    """Build the filename for a track's FLAC file.
+
+    :arg dict metadata: the finalized metadata for a single track
+    :return: a relative file name
+    :rtype: :obj:`str`
+
+    """
+    _log.call(metadata)
+    return _generate_basename("FLAC", metadata)
+
+
+def generate_mp3_dirname(library_root, metadata, makedirs=True):
+    """Build the directory for a track's MP3 file.
+
+    :arg str library_root: the MP3 library directory
+    :arg dict metadata: the finalized metadata for a single track
+    :keyword bool makedirs:
+       whether or not to create the directory if it does not exist
+    :return: an absolute directory path
+    :rtype: :obj:`str`
+
+    """
+    _log.call(library_root, metadata, makedirs=makedirs)
+    return _generate_dirname(
+        "MP3", library_root, metadata, makedirs=makedirs)
+
+
+def generate_mp3_basename(metadata):
+    """Build the filename for a track's MP3 file.
+
+    :arg dict metadata: the finalized metadata for a single track
+    :return: a relative file name
+    :rtype: :obj:`str`
+
+    """
+    _log.call(metadata)
+    return _generate_basename("MP3", metadata)
+
+
+def _generate_dirname(section, library_root, metadata, makedirs=True):
+    """Build the directory for a track's FLAC or MP3 file.
+
+    :arg str section: "FLAC" or "MP3"
+    :arg str library_root: the MP3 library directory
+    :arg dict metadata: the finalized metadata for a single track
+    :keyword bool makedirs:
+       whether or not to create the directory if it does not exist
+    :return: an absolute directory path
+    :rtype: :obj:`str`
+
+    """
+    _log.call(section, library_root, metadata, makedirs=makedirs)
+
+    config = get_config()
+
+    # issues/5
+    folder_format_spec = metadata["__%s_album_folder" % section.lower()]
+    _log.debug("using template %r", folder_format_spec)
+
+    folder_names = [
+        name_format_spec.format(**metadata)
+        for name_format_spec in folder_format_spec.split('/')]
+    _log.debug("raw folder names %r", folder_names)
+
+    if config[section].getboolean("use_xplatform_safe_names"):
+        # paranoid-safe and compact, but less readable
+        folder_names = _xplatform_safe(folder_names)
+    else:
+        # as close to format spec as possible, but still relatively safe
+        folder_names = [
+            _RELATIVELY_SAFE_NAME.sub('_', name) for name in folder_names]
+    _log.debug("final folder names %r", folder_names)
+
+    album_folder = os.path.join(
+        library_root, *_subroot_trie(section, metadata), *folder_names)
+
+    if makedirs:
+        # doesn't work as expected for external media
+        #os.makedirs(album_folder, exist_ok=True)
+        subprocess.check_call(["mkdir", "-p", album_folder])
+
+    _log.info("using album folder %r", album_folder)
+    return album_folder
+
+
+def _generate_basename(section, metadata):
+    """Build the filename for a track's FLAC or MP3 file.
+
+    :arg str section: "FLAC" or "MP3"
+    :arg dict metadata: the finalized metadata for a single track
+    :return: a relative file name
+    :rtype: :obj:`str`
+
+    """
+    _log.call(section, metadata)
+
+    config = get_config()
+
+    # issues/5
+    track_format_spec = metadata["__%s_track_filename" % section.lower()]
+    _log.debug("using template %r", track_format_spec)
+
+    basename = track_format_spec.format(**metadata)
+    _log.debug("raw basename %r", basename)
+
+    if config[section].getboolean("use_xplatform_safe_names"):
+        # paranoid-safe and compact, but less readable
+        basename = _xplatform_safe(
+            basename, fileext=config[section]["track_fileext"])
+    else:
+        # as close to format spec as possible, but still relatively safe
+        basename = _RELATIVELY_SAFE_NAME.sub('_', basename)
+    _log.debug("final basename %r", basename)
+
+    track_filename = basename + config[section]["track_fileext"]
+    _log.info("using track filename %r", track_filename)
+
+    return track_filename
+
+
+#: Matches characters that are replaced in "relatively safe" folder and
+#: file names (see the ``use_xplatform_safe_names`` option).
+_RELATIVELY_SAFE_NAME = re.compile(r"[^0-9a-zA-Z-.,_() ]")
+
+#: The (pattern, replacement) substitutions, in order, that make a
+#: folder or file name safe across platforms.
+_XPLATFORM_SAFE_SUBSTITUTIONS = [
+    (re.compile(r"\s+"), '-'), # contiguous ws to '-'
+    (re.compile(r"[^0-9a-zA-Z-.,_]+"), '_'), # contiguous special to '_'
+    (re.compile(r"^[^0-9a-zA-Z_]"), '_'), # non-alphanum/underscore at [0] to '_'
+    (re.compile(r"([-.,_]){2,}"), r'\1') # 2+ contiguous special/replacement to \1
+]
+
+
+def _xplatform_safe(path, fileext=""):
+    """Transform *path* so that it is safe to use across platforms.
+
+    :arg path:
+       a :obj:`list` of folder names, or a file basename
+    :keyword str fileext:
+       if *path* is a file basename, this is the file extension that
+       will be appended to form the complete file name
+    :return: the transformed *path*
+    :rtype: the same type as *path* (:obj:`list` or :obj:`str`)
+
+    """
+    _log.call(path, fileext=fileext)
+
+    safe_names = path if type(path) is list else [path]
+    for (pattern, replacement) in _XPLATFORM_SAFE_SUBSTITUTIONS:
+        safe_names = [pattern.sub(replacement, name) for name in safe_names]
+
+    # can't know the target file system ahead of time, so assume 255 UTF-8
+    # bytes as the "least common denominator" limit for all path components
+    safe_names = [
+        name.encode()[:255 - len(fileext)].decode(errors="ignore")
+        for name in safe_names]
+
+    transformed = safe_names if type(path) is list else safe_names[0]
+
+    _log.debug("%r -> %r", path, transformed)
+    return transformed
+
+
+def _subroot_trie(section, metadata):
+    """Build zero or more subdirectories below the library root to form
+    an easily navigable "trie" structure for audio files.
+
+    :arg str section: "FLAC" or "MP3"
+    :arg dict metadata: the finalized metadata for a single track
+    :return:
+       a list (possibly empty) of directory names that form a trie
+       structure for organizing audio files
+
+    """
+    _log.call(metadata)
+
+    config = get_config()
+
+    # issues/5
+    key = metadata["__%s_subroot_trie" % section.lower()]
+    level = config[section].getint("library_subroot_trie_level")
+
+    # to skip building a directory trie structure, the key can be left empty or
+    # the level can be set to zero (0)
+    if not key or level <= 0:
+        _log.trace("RETURN []")
+        return []
+
+    term = metadata[key]
+
+    # issues/3
+    trie_ignore_leading_article = config[section].get(
+        "trie_ignore_leading_article", "")
+    if trie_ignore_leading_article:
+        articles = trie_ignore_leading_article.upper().split()
+        words = term.split()
+        if words[0].upper() in articles:
+            # do not simply join on space; remaining white space may be
+            # significant (e.g. NIN "THE S L  I   P" -> "S L  I   P")
+            term = term[len(words[0]):].lstrip()
+
+    term = re.sub(r"[^0-9a-zA-Z]", "", term).upper()
+    # use len(term) - 1 so trie prefixes never include the full term
+    nodes = [term[:n + 1] for n in range(min(level, len(term) - 1))]
+    # edge case - any non-alphanumeric key falls into the special '_' node
+    if not nodes:
+        nodes = ['_']
+
+    _log.return_(nodes)
+    return nodes
+
+
+def _default_naming_specs(metadata):
+    """Return the default folder and file naming templates for an album.
+
+    :arg dict metadata:
+       album metadata (only ``album_disctotal`` and
+       ``album_compilation`` are used)
+    :return:
+       a mapping of each per-album naming field
+       (``__flac_subroot_trie``, ``__flac_album_folder``, ...,
+       ``__mp3_track_filename``) to its default template from
+       *flacmanager.ini*
+    :rtype: :class:`collections.OrderedDict`
+
+    """
+    config = get_config()
+
+    # issues/5
+    ndisc = "ndisc_" if metadata["album_disctotal"] > 1 else ""
+    compilation = "compilation_" if metadata["album_compilation"] else ""
+    default_key_prefix = ndisc + compilation
+
+    specs = OrderedDict()
+    for encoding in ["FLAC", "MP3"]:
+        for field_suffix in [
+                "subroot_trie", "album_folder", "track_filename"]:
+            default_key = (
+                "library_subroot_%strie_key" % compilation
+                if field_suffix == "subroot_trie"
+                else default_key_prefix + field_suffix)
+            custom_key = "__%s_%s" % (encoding.lower(), field_suffix)
+            specs[custom_key] = config[encoding][default_key]
+
+    return specs
+
+
+def _save_cover_image(dirname, filename):
+    """Save the cover image to the album folder.
+
+    :arg str dirname: the album folder name
+    :arg str filename: the cover image file name
+    :return: ``True`` if the cover image was saved, otherwise ``False``
+
+    """
+    image_ext = os.path.splitext(filename)[1]
+    if image_ext.lower() in [".jpg", ".jpeg"]:
+        cover_filename = os.path.join(dirname, "cover.jpg")
+    elif image_ext.lower() == ".png":
+        cover_filename = os.path.join(dirname, "cover.png")
+    else:
+        _log.warning("not saving cover image %r (not a JPEG or PNG)!")
+        return False
+
+    status = subprocess.call(["cp", "-f", filename, cover_filename])
+    if status == 0:
+        _log.info("copied %s to %s", filename, cover_filename)
+        return True
+    else:
+        _log.warning(
+            "unable to copy %s to %s (error code %s)",
+            filename, cover_filename, status)
+        return False
+
+
+def make_embedded_cover_image(filename):
+    """Prepare the cover image that is embedded in each track's tags.
+
+    :arg str filename: the full-resolution cover image file name
+    :return: the file name of the image to embed
+    :rtype: :obj:`str`
+
+    The embedded image is scaled down (preserving the aspect ratio) so
+    that neither dimension exceeds the *flacmanager.ini* ``[Organize]``
+    ``embed_cover_image_max_size``, and is (re)compressed as a JPEG at
+    ``embed_cover_image_quality``. A JPEG that is already within the
+    size limit is embedded as-is.
+
+    If the image cannot be converted, or if
+    ``embed_cover_image_max_size`` is zero (0), *filename* is returned
+    unchanged.
+
+    .. note::
+       This function should be called **once** per album; every track
+       then embeds the same prepared image.
+
+    """
+    _log.call(filename)
+
+    config = get_config()
+    max_size = config["Organize"].getint("embed_cover_image_max_size", 600)
+    quality = config["Organize"].getint("embed_cover_image_quality", 85)
+
+    if max_size <= 0:
+        _log.return_(filename)
+        return filename
+
+    with open(filename, "rb") as f:
+        image_data = f.read()
+    image_type = imghdr.what("_ignored_", h=image_data)
+    dimensions = _image_dimensions(image_data)
+
+    if (image_type == "jpeg"
+            and dimensions is not None
+            and max(dimensions[:2]) <= max_size):
+        _log.info(
+            "embedding %s as-is (%dx%d)", filename, *dimensions[:2])
+        _log.return_(filename)
+        return filename
+
+    embed_filename = make_tempfile(suffix=".jpg")
+    command = [
+        "sips",
+        "-s", "format", "jpeg",
+        "-s", "formatOptions", str(quality),
+    ]
+    if dimensions is None or max(dimensions[:2]) > max_size:
+        command.extend(["-Z", str(max_size)])
+    command.extend([filename, "--out", embed_filename])
+
+    _log.info("command = %r", command)
+    try:
+        subprocess.check_call(
+            command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except Exception as e:
+        _log.warning(
+            "unable to prepare embedded cover image from %s (%s: %s); "
+                "embedding the original",
+            filename, e.__class__.__name__, e)
+        _log.return_(filename)
+        return filename
+
+    _log.info(
+        "prepared embedded cover image %s (%d bytes) from %s (%d bytes)",
+        embed_filename, os.path.getsize(embed_filename), filename,
+        len(image_data))
+    _log.return_(embed_filename)
+    return embed_filename
+
+
+def _image_dimensions(image_data):
+    """Read the dimensions of a JPEG or PNG image.
+
+    :arg bytes image_data: the raw image data
+    :return:
+       a 3-tuple of (width, height, bits-per-pixel), or ``None`` if the
+       dimensions cannot be determined
+
+    """
+    if image_data[:8] == b"\x89PNG\r\n\x1a\n" and image_data[12:16] == b"IHDR":
+        (width, height, bit_depth, color_type) = struct.unpack(
+            ">IIBB", image_data[16:26])
+        # samples per pixel by PNG color type
+        channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}.get(color_type, 1)
+        return (width, height, bit_depth * channels)
+
+    if image_data[:2] == b"\xff\xd8":
+        i = 2
+        while i + 9 < len(image_data):
+            if image_data[i] != 0xff:
+                i += 1
+                continue
+            marker = image_data[i + 1]
+            if marker in (0xd8, 0x01) or 0xd0 <= marker <= 0xd7:
+                # standalone markers (no length)
+                i += 2
+                continue
+            (length,) = struct.unpack(">H", image_data[i + 2:i + 4])
+            # any SOFn marker except DHT (C4), JPG (C8) and DAC (CC)
+            if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+                (precision, height, width, components) = struct.unpack(
+                    ">BHHB", image_data[i + 4:i + 10])
+                return (width, height, precision * components)
+            i += 2 + length
+
+    return None
+
+
+def _styled(widget, **options):
+    """Apply `Ttk Styling
+    <https://docs.python.org/3/library/tkinter.ttk.html#ttkstyling>`_ to
+    *widget*.
+
+    :arg widget: any Ttk widget
+    :arg dict options: the styling options for *widget*
+    :return: *widget* with styling applied
+
+    """
+    style_id = "%x.%s" % (id(widget), widget.winfo_class())
+    Style().configure(style_id, **options)
+    widget.config(style=style_id)
+
+    return widget
+
+
+#: The text content of the dialog that explains FLACManager's
+#: prerequisites.
+_PREREQUISITES_TEXT = """\
+FLACManager runs on Python 3.3+ compiled against Tk 8.5+.
+
+The following EXTERNAL software components are also required:
+
+* flac (http://flac.sourceforge.net/)
+* lame (http://lame.sourceforge.net/)
+* diskutil (Mac OS X command line utility)
+* open (Mac OS X command line utility)
+* mkdir (Mac OS X command line utility)
+* sips (Mac OS X command line utility)
+
+The flac and lame command line binaries must be available on
+your $PATH.
+
+The flac and lame components can be easily installed from
+MacPorts (http://www.macports.org/).
+
+Finally, You MUST register for a Gracenote developer account in
+order for FLACManager's metadata aggregation to work properly:
+
+1. Create your Gracenote developer account at
+   https://developer.gracenote.com/.
+2. Create an app named "FLACManager".
+3. Save your Gracenote Client ID in the flacmanager.ini
+   configuration file.
+
+(FLACManager will automatically obtain and store your Gracenote
+User ID in the flacmanager.ini file.)"""
+
+
+class _TextDialog(simpledialog.Dialog):
+    """A dialog that presents a simple formatted text message."""
+
+    def __init__(self, master, text, **options):
+        """
+        :arg master: the parent object of the dialog
+        :arg str text: the text to display in the dialog
+        :arg dict options: configuration options for the dialog
+
+        *text* should contain line breaks at positions desirable for
+        on-screen display. The total number of lines will determine the
+        height of the text widget,
+
+        *options* are passed directly to the parent
+        :class:`tkinter.simpledialog.Dialog` class initializer.
+
+        """
+        self._text = text # must be set BEFORE calling super __init__!
+        super().__init__(master, **options)
+
+    def body(self, frame):
+        """Create the content of the dialog."""
+        with StringIO(self._text) as f:
+            lines = f.readlines()
+
+        text = Text(frame, bd=0, relief=FLAT, height=len(lines), wrap=WORD)
+        text.insert(END, "".join(lines))
+        text.config(state=DISABLED)
+        text.pack()
+
+    def buttonbox(self):
+        """Create the button to dismiss the dialog."""
+        box = Frame(self)
+        Button(
+            box, text="OK", width=11, command=self.ok,
+            default=ACTIVE).pack(padx=_PADX, pady=_PADY)
+        self.bind("<Return>", self.ok)
+        box.pack()
+
+
+class _EditConfigurationDialog(simpledialog.Dialog):
+    """Base class for dialogs that allow the user to edit the
+    *flacmanager.ini* configuration file.
+
+    """
+
+    def body(self, frame):
+        """Create the content of the dialog.
+
+        :arg Frame frame: the frame that contains the body content
+
+        """
+        self._row = 0
+        self._variables = {} # "Section" -> { "option" -> tk-variable }
+
+        self._populate(frame, get_config())
+
+        frame.grid_columnconfigure(0, weight=0)
+
+    def section(self, parent, section_name):
+        """Add a section header to the body of the dialog.
+
+        :arg parent: the parent object of the section header
+        :arg str section_name: the name of the configuration section
+
+        """
+        section_label = _styled(
+            Label(parent, text=section_name), font="-size 13 -weight bold")
+        section_label.grid(row=self._row, columnspan=2, pady=11, sticky=W)
+
+        self._row += 1
+
+    def option(
+            self, parent, section_name, option_name, value, width=67):
+        """Add an editable option to the body of the dialog.
+
+        :arg parent: the parent object of the section header
+        :arg str section_name: the name of the configuration section
+        :arg str option_name: the name of the configuration option
+        :arg value: the default/initial value of the option
+        :keyword int width:
+           the display width of the entry box for this option's value
+
+        """
+        Label(parent, text=option_name).grid(row=self._row, sticky=E)
+
+        if type(value) is int:
+            variable = IntVar(self, value=value)
+        elif type(value) is bool:
+            variable = BooleanVar(self, value=value)
+        elif type(value) is float:
+            variable = DoubleVar(self, value=value)
+        else:
+            variable = StringVar(
+                self, value=value if type(value) is not list else value[0])
+
+        if type(value) is list:
+            widget = OptionMenu(parent, variable, *value[1:])
+        elif type(variable) is BooleanVar:
+            widget = Checkbutton(
+                parent, variable=variable, onvalue=True, offvalue=False)
+        else:
+            widget = Entry(parent, textvariable=variable, width=width)
+        widget.grid(row=self._row, column=1, sticky=W, padx=_PADX)
+
+        self._row += 1
+
+        # track the variable; see apply()
+        if section_name not in self._variables:
+            self._variables[section_name] = {}
+        self._variables[section_name][option_name] = variable
+
+    def buttonbox(self):
+        """Create the buttons to save and/or dismiss the dialog."""
+        box = Frame(self)
+
+        Button(
+            box, text="Save", width=10, command=self.ok, default=ACTIVE
+            ).pack(side=LEFT, padx=_PADX, pady=_PADY)
+
+        Button(
+            box, text="Cancel", width=10,
+            command=self.cancel
+            ).pack(side=LEFT, padx=_PADX, pady=_PADY)
+
+        self.bind("<Return>", self.ok)
+        self.bind("<Escape>", self.cancel)
+
+        box.pack()
+
+    def apply(self):
+        """Save changes to the *flacmanager.ini* file."""
+        with _CONFIG_LOCK:
+            config = get_config()
+
+            for (section, optvar) in self._variables.items():
+                if section not in config:
+                    config[section] = OrderedDict()
+                for (option, variable) in optvar.items():
+                    # values MUST be strings!
+                    if type(variable) is not BooleanVar:
+                        config[section][option] = str(variable.get())
+                    else:
+                        config[section][option] = \
+                            "yes" if variable.get() else "no"
+
+            save_config()
+
+
+class EditRequiredConfigurationDialog(_EditConfigurationDialog):
+    """A dialog that allows the user to edit **required** options from
+    the *flacmanager.ini* configuration file.
+
+    """
+
+    def _populate(self, frame, config):
+        """Create the content of the dialog."""
+        section = partial(self.section, frame)
+        option = partial(self.option, frame)
+
+        section("Organize")
+        option(
+            "Organize", "library_root", config["Organize"]["library_root"])
+
+        section("Gracenote")
+        option("Gracenote", "client_id", config["Gracenote"]["client_id"])
+
+        section("MusicBrainz")
+        option(
+            "MusicBrainz", "contact_url_or_email", 
+            config["MusicBrainz"]["contact_url_or_email"])
+
+
+class EditAggregationConfigurationDialog(_EditConfigurationDialog):
+    """A dialog that allows the user to edit metadata aggregation
+    options from the *flacmanager.ini* configuration file.
+
+    """
+
+    def _populate(self, frame, config):
+        """Create the content of the dialog."""
+        section = partial(self.section, frame)
+        option = partial(self.option, frame)
+
+        section("HTTP")
+        option("HTTP", "timeout", config["HTTP"].getfloat("timeout"), width=7)
+        option(
+            "HTTP", "aggregation_deadline",
+            config["HTTP"].getfloat(
+                "aggregation_deadline", fallback=AGGREGATION_DEADLINE),
+            width=7)
+        option(
+            "HTTP", "cache_dir",
+            config["HTTP"].get("cache_dir", fallback=HTTP_CACHE_DIRNAME))
+        option(
+            "HTTP", "cache_max_size_mb",
+            config["HTTP"].getfloat(
+                "cache_max_size_mb", fallback=HTTP_CACHE_MAX_SIZE_MB),
+            width=7)
+        option(
+            "HTTP", "cache_ttl",
+            config["HTTP"].getfloat("cache_ttl", fallback=HTTP_CACHE_TTL),
+            width=7)
+        option(
+            "HTTP", "cache_host_ttls",
+            config["HTTP"].get("cache_host_ttls", fallback=""))
+        option(
+            "HTTP", "rate_limits",
+            config["HTTP"].get("rate_limits", fallback=HTTP_RATE_LIMITS))
+
+        section("Gracenote")
+        option("Gracenote", "client_id", config["Gracenote"]["client_id"])
+        option("Gracenote", "user_id", config["Gracenote"]["user_id"])
+        option(
+            "Gracenote", "deadline",
+            config["Gracenote"].getfloat(
+                "deadline", fallback=COLLECTOR_DEADLINE),
+            width=7)
+
+        section("MusicBrainz")
+        option(
+            "MusicBrainz", "contact_url_or_email", 
+            config["MusicBrainz"]["contact_url_or_email"])
+        option(
+            "MusicBrainz", "libdiscid_location",
+            config["MusicBrainz"]["libdiscid_location"])
+        option(
+            "MusicBrainz", "deadline",
+            config["MusicBrainz"].getfloat(
+                "deadline", fallback=COLLECTOR_DEADLINE),
+            width=7)
+
+        section("Offline")
+        option(
+            "Offline", "index_filename",
+            config.get("Offline", "index_filename", fallback=""))
+        option(
+            "Offline", "deadline",
+            config.getfloat("Offline", "deadline", fallback=5.0), width=7)
+        option(
+            "Offline", "similar_toc_tolerance",
+            config.getfloat(
+                "Offline", "similar_toc_tolerance",
+                fallback=SIMILAR_TOC_TOLERANCE),
+            width=7)
+
+
+class EditOrganizationConfigurationDialog(_EditConfigurationDialog):
+    """A dialog that allows the user to edit library folder/file
+    organization options from the *flacmanager.ini* configuration file.
+
+    """
+
+    def _populate(self, frame, config):
+        """Create the content of the dialog."""
+        section = partial(self.section, frame)
+        option = partial(self.option, frame)
+
+        section("Organize")
+        option("Organize", "library_root", config["Organize"]["library_root"])
+        option(
+            "Organize", "library_subroot_trie_key",
+            config["Organize"]["library_subroot_trie_key"], width=29)
+        option(
+            "Organize", "library_subroot_trie_level",
+            config["Organize"].getint("library_subroot_trie_level"), width=5)
+        option(
+            "Organize", "album_folder",
+            config["Organize"].get("album_folder", raw=True))
+        option(
+            "Organize", "ndisc_album_folder",
+            config["Organize"].get("ndisc_album_folder", raw=True))
+        option(
+            "Organize", "compilation_album_folder",
+            config["Organize"].get("compilation_album_folder", raw=True))
+        option(
+            "Organize", "ndisc_compilation_album_folder",
+            config["Organize"].get("ndisc_compilation_album_folder", raw=True))
+        option(
+            "Organize", "track_filename",
+            config["Organize"].get("track_filename", raw=True))
+        option(
+            "Organize", "ndisc_track_filename",
+            config["Organize"].get("ndisc_track_filename", raw=True))
+        option(
+            "Organize", "compilation_track_filename",
+            config["Organize"].get("compilation_track_filename", raw=True))
+        option(
+            "Organize", "ndisc_compilation_track_filename",
+            config["Organize"].get("ndisc_compilation_track_filename", raw=True))
+        option(
+            "Organize", "use_xplatform_safe_names",
+            config["Organize"].getboolean("use_xplatform_safe_names"))
+        option(
+            "Organize", "save_cover_image",
+            config["Organize"].getboolean("save_cover_image"))
+        option(
+            "Organize", "embed_cover_image_max_size",
+            config["Organize"].getint("embed_cover_image_max_size", 600),
+            width=5)
+        option(
+            "Organize", "embed_cover_image_quality",
+            config["Organize"].getint("embed_cover_image_quality", 85),
+            width=5)
+        option(
+            "Organize", "staging_root",
+            config["Organize"].get("staging_root", ""))
+
+
+class EditFLACEncodingConfigurationDialog(_EditConfigurationDialog):
+    """A dialog that allows the user to edit FLAC encoding options from
+    the *flacmanager.ini* configuration file.
+
+    """
+
+    def _populate(self, frame, config):
+        """Create the content of the dialog."""
+        section = partial(self.section, frame)
+        option = partial(self.option, frame)
+
+        section("FLAC")
+        option(
+            "FLAC", "flac_encode_options",
+            config["FLAC"]["flac_encode_options"])
+
+
+class EditVorbisCommentsConfigurationDialog(_EditConfigurationDialog):
+    """A dialog that allows the user to edit default FLAC Vorbis comment
+    options from the *flacmanager.ini* configuration file.
+
+    """
+
+    def _populate(self, frame, config):
+        """Create the content of the dialog."""
+        section = partial(self.section, frame)
+        option = partial(self.option, frame, width=29)
+
+        section("Vorbis")
+
+        for comment in config["Vorbis"].keys():
+            option("Vorbis", comment, config["Vorbis"].get(comment, raw=True))
+
+
+class EditFLACOrganizationConfigurationDialog(_EditConfigurationDialog):
+    """A dialog that allows the user to edit FLAC folder/file
+    organization options from the *flacmanager.ini* configuration file.
+
+    """
+
+    def _populate(self, frame, config):
+        """Create the content of the dialog."""
+        section = partial(self.section, frame)
+        option = partial(self.option, frame)
+
+        section("FLAC")
+        option(
+            "FLAC", "library_root",
+            config["FLAC"].get("library_root", raw=True))
+        option(
+            "FLAC", "library_subroot_trie_key",
+            config["FLAC"].get("library_subroot_trie_key", raw=True), width=29)
+
+        # there won't be any validation if this is set to a non-interpolated,
+        # non-int value!
+        option(
+            "FLAC", "library_subroot_trie_level",
+            config["FLAC"].get("library_subroot_trie_level", raw=True))
+        Label(
+            frame, text="${Organize:library_subroot_trie_level} or a number"
+            ).grid(row=self._row, column=1, sticky=W)
+        self._row += 1
+
+        option(
+            "FLAC", "album_folder",
+            config["FLAC"].get("album_folder", raw=True))
+        option(
+            "FLAC", "ndisc_album_folder",
+            config["FLAC"].get("ndisc_album_folder", raw=True))
+        option(
+            "FLAC", "compilation_album_folder",
+            config["FLAC"].get("compilation_album_folder", raw=True))
+        option(
+            "FLAC", "ndisc_compilation_album_folder",
+            config["FLAC"].get("ndisc_compilation_album_folder", raw=True))
+        option(
+            "FLAC", "track_filename",
+            config["FLAC"].get("track_filename", raw=True))
+        option(
+            "FLAC", "ndisc_track_filename",
+            config["FLAC"].get("ndisc_track_filename", raw=True))
+        option(
+            "FLAC", "compilation_track_filename",
+            config["FLAC"].get("compilation_track_filename", raw=True))
+        option(
+            "FLAC", "ndisc_compilation_track_filename",
+            config["FLAC"].get("ndisc_compilation_track_filename", raw=True))
+
+        # there won't be any validation if this is set to a non-interpolated,
+        # non-boolean ("yes"/"no") value!
+        option(
+            "FLAC", "use_xplatform_safe_names",
+            config["FLAC"].get("use_xplatform_safe_names", raw=True))
+        Label(
+            frame, text="${Organize:use_xplatform_safe_names}, yes, or no"
+            ).grid(row=self._row, column=1, sticky=W)
+        self._row += 1
+
+        # there won't be any validation if this is set to a non-interpolated,
+        # non-boolean ("yes"/"no") value!
+        option(
+            "FLAC", "save_cover_image",
+            config["FLAC"].getboolean("save_cover_image"))
+        Label(
+            frame, text="${Organize:save_cover_image}, yes, or no"
+            ).grid(row=self._row, column=1, sticky=W)
+        self._row += 1
+
+
+class EditMP3EncodingConfigurationDialog(_EditConfigurationDialog):
+    """A dialog that allows the user to edit MP3 encoding options from
+    the *flacmanager.ini* configuration file.
+
+    """
+
+    def _populate(self, frame, config):
+        """Create the content of the dialog."""
+        section = partial(self.section, frame)
+        option = partial(self.option, frame)
+
+        section("MP3")
+        option(
+            "MP3", "lame_encode_options", config["MP3"]["lame_encode_options"])
+        option(
+            "MP3", "id3v2_version", config["MP3"].get("id3v2_version", "3"),
+            width=5)
+
+
+class EditID3v2TagsConfigurationDialog(_EditConfigurationDialog):
+    """A dialog that allows the user to edit default MP3 ID3v2 tag
+    options from the *flacmanager.ini* configuration file.
+
+    """
+
+    def _populate(self, frame, config):
+        """Create the content of the dialog."""
+        section = partial(self.section, frame)
+        option = partial(self.option, frame, width=29)
+
+        section("ID3v2")
+
+        for tag in config["ID3v2"].keys():
+            option("ID3v2", tag, config["ID3v2"].get(tag, raw=True))
+
+
+class EditMP3OrganizationConfigurationDialog(_EditConfigurationDialog):
+    """A dialog that allows the user to edit MP3 folder/file
+    organization options from the *flacmanager.ini* configuration file.
+
+    """
+
+    def _populate(self, frame, config):
+        """Create the content of the dialog."""
+        section = partial(self.section, frame)
+        option = partial(self.option, frame)
+
+        section("MP3")
+        option(
+            "MP3", "library_root",
+            config["MP3"].get("library_root", raw=True))
+        option(
+            "MP3", "library_subroot_trie_key",
+            config["MP3"].get("library_subroot_trie_key", raw=True), width=29)
+
+        # there won't be any validation if this is set to a non-interpolated,
+        # non-int value!
+        option(
+            "MP3", "library_subroot_trie_level",
+            config["MP3"].get("library_subroot_trie_level", raw=True))
+        Label(
+            frame, text="${Organize:library_subroot_trie_level} or a number"
+            ).grid(row=self._row, column=1, sticky=W)
+        self._row += 1
+
+        option(
+            "MP3", "album_folder",
+            config["MP3"].get("album_folder", raw=True))
+        option(
+            "MP3", "ndisc_album_folder",
+            config["MP3"].get("ndisc_album_folder", raw=True))
+        option(
+            "MP3", "compilation_album_folder",
+            config["MP3"].get("compilation_album_folder", raw=True))
+        option(
+            "MP3", "ndisc_compilation_album_folder",
+            config["MP3"].get("ndisc_compilation_album_folder", raw=True))
+        option(
+            "MP3", "track_filename",
+            config["MP3"].get("track_filename", raw=True))
+        option(
+            "MP3", "ndisc_track_filename",
+            config["MP3"].get("ndisc_track_filename", raw=True))
+        option(
+            "MP3", "compilation_track_filename",
+            config["MP3"].get("compilation_track_filename", raw=True))
+        option(
+            "MP3", "ndisc_compilation_track_filename",
+            config["MP3"].get("ndisc_compilation_track_filename", raw=True))
+
+        # there won't be any validation if this is set to a non-interpolated,
+        # non-boolean ("yes"/"no") value!
+        option(
+            "MP3", "use_xplatform_safe_names",
+            config["MP3"].get("use_xplatform_safe_names", raw=True))
+        Label(
+            frame, text="${Organize:use_xplatform_safe_names}, yes, or no"
+            ).grid(row=self._row, column=1, sticky=W)
+        self._row += 1
+
+        # there won't be any validation if this is set to a non-interpolated,
+        # non-boolean ("yes"/"no") value!
+        option(
+            "MP3", "save_cover_image",
+            config["MP3"].getboolean("save_cover_image"))
+        Label(
+            frame, text="${Organize:save_cover_image}, yes, or no"
+            ).grid(row=self._row, column=1, sticky=W)
+        self._row += 1
+
+
+class EditUserInterfaceConfigurationDialog(_EditConfigurationDialog):
+    """A dialog that allows the user to edit user interface settings
+    from the *flacmanager.ini* file.
+
+    """
+
+    def _populate(self, frame, config):
+        """Create the content of the dialog."""
+        section = partial(self.section, frame)
+        option = partial(self.option, frame)
+
+        section("UI")
+        option(
+            "UI", "minwidth", config["UI"].getint("minwidth", 1024), width=5)
+        option(
+            "UI", "minheight", config["UI"].getint("minheight", 768), width=5)
+        option("UI", "padx", config["UI"].getint("padx", 7), width=3)
+        option("UI", "pady", config["UI"].getint("pady", 7), width=3)
+        option(
+            "UI", "encoding_max_visible_tracks",
+            config["UI"].getint("encoding_max_visible_tracks", 29), width=3)
+
+
+class EditWatchConfigurationDialog(_EditConfigurationDialog):
+    """A dialog that allows the user to edit the watch folder settings
+    from the *flacmanager.ini* file.
+
+    """
+
+    def _populate(self, frame, config):
+        """Create the content of the dialog."""
+        section = partial(self.section, frame)
+        option = partial(self.option, frame)
+
+        section("Watch")
+        option(
+            "Watch", "watch_root",
+            config.get("Watch", "watch_root", fallback=""))
+        option(
+            "Watch", "max_concurrent_albums",
+            config.getint("Watch", "max_concurrent_albums", fallback=2),
+            width=3)
+        option(
+            "Watch", "poll_interval",
+            config.getint("Watch", "poll_interval", fallback=10), width=5)
+        option(
+            "Watch", "settle_time",
+            config.getint("Watch", "settle_time", fallback=30), width=5)
+
+
+class EditServerConfigurationDialog(_EditConfigurationDialog):
+    """A dialog that allows the user to edit the job server settings
+    from the *flacmanager.ini* file.
+
+    """
+
+    def _populate(self, frame, config):
+        """Create the content of the dialog."""
+        section = partial(self.section, frame)
+        option = partial(self.option, frame)
+
+        section("Server")
+        option(
+            "Server", "host",
+            config.get("Server", "host", fallback="127.0.0.1"), width=17)
+        option(
+            "Server", "port",
+            config.getint("Server", "port", fallback=8337), width=7)
+        option(
+            "Server", "max_concurrent_jobs",
+            config.getint("Server", "max_concurrent_jobs", fallback=2),
+            width=3)
+        option(
+            "Server", "max_queued_jobs",
+            config.getint("Server", "max_queued_jobs", fallback=100),
+            width=5)
+
+
+class EditLoggingConfigurationDialog(_EditConfigurationDialog):
+    """A dialog that allows the user to edit logging and debug settings
+    from the *flacmanager.ini* file.
+
+    """
+
+    def _populate(self, frame, config):
+        """Create the content of the dialog."""
+        section = partial(self.section, frame)
+        option = partial(self.option, frame)
+
+        section("Logging")
+        levels = [
+            "TRACE", "DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+        level = config["Logging"].get("level", "INFO")
+        option(
+            "Logging", "level",
+            [level if level in levels else "INFO"] + levels)
+        option("Logging", "filename", config["Logging"]["filename"])
+        option("Logging", "filemode", config["Logging"]["filemode"])
+        option("Logging", "format", config["Logging"].get("format", raw=True))
+
+        section("HTTP")
+        option(
+            "HTTP", "debuglevel", config["HTTP"].getint("debuglevel", 0),
+            width=3)
+
+
+#: A list of recommended and proposed Vorbis comment names.
+_VORBIS_COMMENTLIST = [
+    # https://xiph.org/vorbis/doc/v-comment.html
+    # [1] https://wiki.xiph.org/Field_names
+    # [2] http://age.hobba.nl/audio/mirroredpages/ogg-tagging.html
+    # [3] http://reallylongword.org/vorbiscomment/
+    "ALBUM (collection name)",
+    "ARRANGER (who arranged the piece)", # [2]
+    "ARTIST (artist responsible for the work)",
+    "AUTHOR (author of spoken work)", # [2]
+    "CATALOGNUMBER (producer/label catalog number)", # [3]
+    "COMMENT (user comment)", # [2]
+    "COMPOSER (composer of the work)", # [1]
+    "CONDUCTOR (conductor of the work)", # [2]
+    "CONTACT (creator/distributor contact info)",
+    "COPYRIGHT (Copyright attribution)",
+    "DATE (recording date)",
+    "DESCRIPTION (description of contents)",
+    "DISCNUMBER (multi-disc number)", # [1]
+    "DISCTOTAL (number of discs)", # [1]
+    #"ENCODER (user application name)", # [1]
+    "ENCODING (quality/bitrate settings)", # [2]
+    "ENGINEER (who produced the master)", # [3]
+    "ENSEMBLE (group playing the piece)", # [2]
+    "GENRE (music genre)",
+    "GUESTARTIST (collaborative artist)", # [3]
+    "ISRC (International Standard Recording Code)",
+    "LABEL (record label or imprint)", # [2]
+    "LICENSE (License information)",
+    "LOCATION (recording location)",
+    "LYRICIST (who wrote the lyrics)", # [2]
+    "OPUS (number of the work)", # [2]
+    "ORGANIZATION (production organization)",
+    "PART (division within a work)", # [2]
+    "PARTNUMBER (number of the division/part)", # [2]
+    "PERFORMER (artist(s) who performed the work)",
+    "PRODUCER (producer of the work)", # [3]
+    "PRODUCTNUMBER (UPC, EAN, JAN, etc.)", # [1]
+    "PUBLISHER (who published the disc)", # [2]
+    "REMIXER (who remixed the work)", # [3]
+    "SOURCEARTIST (original artist of performed work)", # [3]
+    "SOURCEMEDIA (recording media type)", # [1]
+    "TITLE (Track/Work name)",
+    "TRACKNUMBER (number of this piece)",
+    "TRACKTOTAL (number of tracks)", # [1]
+    "VERSION (differentiate multiple versions)",
+    "VOLUME (multi-volume work)", # [3]
+]
+
+
+#: A list of standard and common non-standard ID3v2 frames.
+_ID3V2_TAGLIST = [
+    # http://id3.org/id3v2.3.0 (unless otherwise noted)
+    "AENC (Audio encryption)",
+    "APIC (Attached picture)",
+    "COMM (Comments)",
+    "COMR (Commercial frame)",
+    "ENCR (Encryption method registration)",
+    "EQUA (Equalization)",
+    "ETCO (Event timing codes)",
+    "GEOB (General encapsulated object)",
+    "GRID (Group identification registration)",
+    "IPLS (Involved people list)",
+    "LINK (Linked information)",
+    "MCDI (Music CD identifier)",
+    "MLLT (MPEG location lookup table)",
+    "OWNE (Ownership frame)",
+    "PRIV (Private frame)",
+    "PCNT (Play counter)",
+    "POPM (Popularimeter)",
+    "POSS (Position synchronisation frame)",
+    "RBUF (Recommended buffer size)",
+    "RVAD (Relative volume adjustment)",
+    "RVRB (Reverb)",
+    "SYLT (Synchronized lyric/text)",
+    "SYTC (Synchronized tempo codes)",
+    "TALB (Album/Movie/Show title)",
+    "TBPM (BPM (beats per minute))",
+    "TCMP (iTunes Compilation Flag)", # http://id3.org/iTunes Compilation Flag
+    "TCOM (Composer)",
+    "TCON (Content type)",
+    "TCOP (Copyright message)",
+    "TDAT (Date)",
+    "TDLY (Playlist delay)",
+    #"TENC (Encoded by)",
+    "TEXT (Lyricist/Text writer)",
+    "TFLT (File type)",
+    "TIME (Time)",
+    "TIT1 (Content group description)",
+    "TIT2 (Title/songname/content description)",
+    "TIT3 (Subtitle/Description refinement)",
+    "TKEY (Initial key)",
+    "TLAN (Language(s))",
+    "TLEN (Length)",
+    "TMED (Media type)",
+    "TOAL (Original album/movie/show title)",
+    "TOFN (Original filename)",
+    "TOLY (Original lyricist(s)/text writer(s))",
+    "TOPE (Original artist(s)/performer(s))",
+    "TORY (Original release year)",
+    "TOWN (File owner/licensee)",
+    "TPE1 (Lead performer(s)/Soloist(s))",
+    "TPE2 (Band/orchestra/accompaniment)",
+    "TPE3 (Conductor/performer refinement)",
+    "TPE4 (Interpreted, remixed, or otherwise modified by)",
+    "TPOS (Part of a set)",
+    "TPUB (Publisher)",
+    "TRCK (Track number/Position in set)",
+    "TRDA (Recording dates)",
+    "TRSN (Internet radio station name)",
+    "TRSO (Internet radio station owner)",
+    "TSIZ (Size)",
+    "TSOT (iTunes Title Sort)", # http://id3.org/iTunes
+    "TSOP (iTunes Artist Sort)", # http://id3.org/iTunes
+    "TSOA (iTunes Album Sort)", # http://id3.org/iTunes
+    "TSO2 (iTunes Album Artist Sort)", # http://id3.org/iTunes
+    "TSOC (iTunes Composer Sort)", # http://id3.org/iTunes
+    "TSRC (ISRC (international standard recording code))",
+    "TSSE (Software/Hardware and settings used for encoding)",
+    "TYER (Year)",
+    "TXXX (User defined text information frame)",
+    "UFID (Unique file identifier)",
+    "USER (Terms of use)",
+    "USLT (Unsychronized lyric/text transcription)",
+    "WCOM (Commercial information)",
+    "WCOP (Copyright/Legal information)",
+    "WOAF (Official audio file webpage)",
+    "WOAR (Official artist/performer webpage)",
+    "WOAS (Official audio source webpage)",
+    "WORS (Official internet radio station homepage)",
+    "WPAY (Payment)",
+    "WPUB (Publishers official webpage)",
+    "WXXX (User defined URL link frame)",
+]
 
 
 @logged
-class _FMMenu(Menu):
-    """The FLACManager application menu bar."""
+class EditCustomMetadataTaggingDialog(simpledialog.Dialog):
+    """Base dialog that allows the user to add/change/remove custom
+    metadata fields for Vorbis/ID3v2 tagging.
+
+    """
+
+    class _TaggingHelp(simpledialog.Dialog):
+        """Dialog that displays a list of known and recommended Vorbis
+        comment names **or** standard and common non-standard ID3v2
+        frames.
 
-    def __init__(self, *args, **options):
         """
-        :arg tuple args: positional arguments to initialize the menu
-        :arg dict options: ``config`` options to initialize the menu
+    
+        _VORBIS_HELP_TEXT = None
+
+        _ID3V2_HELP_TEXT = None
+
+        @classmethod
+        @lru_cache(maxsize=2)
+        def _helptext(cls, type_):
+            """Format the list of Vorbis comments or ID3v2 frames.
+
+            :arg str type_:
+               either "Vorbis comment" or "ID3v2 tag"
+            :return: a text listing of Vorbis comments or ID3v2 frames
+            :rtype: :obj:`str`
+
+            """
+            if type_ == "Vorbis comment":
+                if cls._VORBIS_HELP_TEXT is None:
+                    cls._VORBIS_HELP_TEXT = '\n'.join(_VORBIS_COMMENTLIST)
+                text = cls._VORBIS_HELP_TEXT
+            else: # ID3v2 tag
+                if cls._ID3V2_HELP_TEXT is None:
+                    cls._ID3V2_HELP_TEXT = '\n'.join(_ID3V2_TAGLIST)
+                text = cls._ID3V2_HELP_TEXT
+
+            return text
+
+        def __init__(self, master, type_):
+            """
+            :arg master: the parent object of this dialog
+            :arg str type_:
+               either "Vorbis comment" or "ID3v2 tag"
+
+            """
+            self._type = type_ # must be set BEFORE calling super __init__!
+            super().__init__(master, title="%s help" % type_)
+
+        def body(self, frame):
+            """Populate this dialog."""
+            help_list = scrolledtext.ScrolledText(
+                frame, height=17, bd=0, relief=FLAT, wrap=NONE)
+            help_list.insert(END, self._helptext(self._type))
+            help_list.config(state=DISABLED)
+            help_list.pack(
+                side=LEFT, fill=BOTH, expand=YES, padx=_PADX, pady=_PADY)
+
+    def __init__(self, master, metadata, **keywords):
+        """Initialize the dialog.
+
+        :arg master: the parent object of this dialog
+        :arg metadata: the album or track metadata
+        :arg dict keywords:
+           *name=value* keywords used to configure this dialog
+
+        """
+        self.__log.call(master, metadata, **keywords)
+
+        self._metadata = metadata
+        self._fields = [] # (vorbis_var, id3v2_var, value_var)
+        self._widgets = [] # (button, vorbis_entry, id3v2_entry, value_entry)
+        # must come last, as it will call body(frame) before returning!
+        super().__init__(master, **keywords)
+
+    def body(self, frame):
+        """Create the content of the dialog.
+
+        :arg Frame frame: the frame that contains the body content
 
         """
-        self.__log.call(*args, **options)
-        super().__init__(*args, **options)
+        self.__log.call(frame)
 
-        fm = self.master
+        self._row = 0
 
-        file_menu = Menu(self, name="file_menu", tearoff=NO)
-        # only enabled while the editor frame is packed
-        file_menu.add_command(
-            label="Save metadata", command=fm.persist_metadata_snapshot,
-            state=DISABLED)
-        file_menu.add_separator()
-        file_menu.add_command(label="Exit", command=fm.exit)
-        self.add_cascade(label="File", menu=file_menu)
+        self._instructions_var = StringVar()
+        self._body_instructions()
 
-        edit_menu = Menu(self, name="edit_menu", tearoff=YES)
-        edit_menu.add_command(
-            label="Configure metadata aggregation",
-            command=fm.edit_aggregation_config)
-        edit_menu.add_command(
-            label="Configure default folder and file names",
-            command=fm.edit_organization_config)
+        Label(
+            frame, textvariable=self._instructions_var, anchor=NW
+        ).grid(row=self._row, columnspan=4, pady=7, sticky=W)
+        self._row += 1
 
-        edit_menu.add_separator()
+        add_button = _styled(
+            Button(
+                frame, text="Add", default=ACTIVE,
+                command=lambda f=self._add_field, p=frame: f(p)),
+            foreground="Blue")
+        add_button.grid(row=self._row, column=0, pady=7, sticky=W)
 
-        flac_menu = Menu(edit_menu, name="flac_menu", tearoff=NO)
-        flac_menu.add_command(
-            label="FLAC encoding options",
-            command=fm.edit_flac_encoding_config)
-        flac_menu.add_command(
-            label="FLAC Vorbis comments",
-            command=fm.edit_vorbis_comments_config)
-        flac_menu.add_command(
-            label="FLAC folder and file names",
-            command=fm.edit_flac_organization_config)
-        edit_menu.add_cascade(label="Configure FLAC", menu=flac_menu)
+        vorbis_frame = Frame(frame)
 
-        mp3_menu = Menu(edit_menu, name="mp3_menu", tearoff=NO)
-        mp3_menu.add_command(
-            label="MP3 encoding options",
-            command=fm.edit_mp3_encoding_config)
-        mp3_menu.add_command(
-            label="MP3 ID3v2 tags", command=fm.edit_id3v2_tags_config)
-        mp3_menu.add_command(
-            label="MP3 folder and file names",
-            command=fm.edit_mp3_organization_config)
-        edit_menu.add_cascade(label="Configure MP3", menu=mp3_menu)
+        vorbis_label = _styled(
+            Label(vorbis_frame, text="Vorbis"), font="-weight bold")
+        vorbis_label.pack(side=LEFT)
 
-        edit_menu.add_separator()
+        vorbis_help_button = Button(
+            vorbis_frame, text='?', width=1,
+            command=
+                lambda self=self:
+                    self._TaggingHelp(vorbis_frame, type_="Vorbis comment"))
+        vorbis_help_button.pack(side=LEFT)
 
-        edit_menu.add_command(
-            label="Configure UI", command=fm.edit_ui_config)
-        self.add_cascade(label="Edit", menu=edit_menu)
+        vorbis_frame.grid(row=self._row, column=1, pady=_PADY, sticky=W)
 
-        edit_menu.add_command(
-            label="Configure logging", command=fm.edit_logging_config)
-        self.add_cascade(label="Edit", menu=edit_menu)
+        id3v2_frame = Frame(frame)
 
-        help_menu = Menu(self, name="help_menu", tearoff=NO)
-        help_menu.add_command(label="About", command=fm.show_about)
-        help_menu.add_command(
-            label="Prequisites", command=fm.show_prerequisites)
-        help_menu.add_command(label="License", command=fm.show_license)
-        self.add_cascade(label="Help", menu=help_menu)
+        id3v2_label = _styled(
+            Label(id3v2_frame, text="ID3v2"), font="-weight bold")
+        id3v2_label.pack(side=LEFT)
 
+        id3v2_help_button = Button(
+            id3v2_frame, text='?', width=1,
+            command=
+                lambda self=self:
+                    self._TaggingHelp(id3v2_frame, type_="ID3v2 tag"))
+        id3v2_help_button.pack(side=LEFT)
 
-@logged
-class _FMDiscFrame(LabelFrame):
-    """The disc status/operation frame for FLACManager."""
+        id3v2_frame.grid(row=self._row, column=2, pady=_PADY, sticky=W)
 
-    def __init__(self, *args, **options):
-        """
-        :arg tuple args: positional arguments to initialize the frame
-        :arg dict options: ``config`` options to initialize the frame
+        value_label = _styled(Label(frame, text="Value"), font="-weight bold")
+        value_label.grid(row=self._row, column=3, pady=_PADY, sticky=W)
 
-        All widgets for this frame are initialized, but layout is
-        deferred until methods are called to transition between states.
+        self._row += 1
 
-        """
-        self.__log.call(*args, **options)
-        super().__init__(*args, **options)
+        for ((vorbis_comment, id3v2_tag), values) \
+                in self._metadata.get("__custom", {}).items():
+            self._add_field(
+                frame, vorbis_comment=vorbis_comment, id3v2_tag=id3v2_tag,
+                values=values)
 
-        fm = self.master
+    def _body_instructions(self):
+        """Populate text instructions for the dialog."""
+        self._instructions_var.set(
+            "Specify a Vorbis comment and/or ID3v2 tag name, and a value.\n"
+            "Changes to metadata are not saved unless the [Save] button is "
+            "clicked.\n"
+            "Fields with empty comment/tag names, or an empty value, are NOT "
+            "saved.\n"
+            "Specify multiple values by adding multiple fields with the same "
+            "comment and/or tag and a different value."
+        )
 
-        self._disc_eject_button = Button(
-            self, name="disc_eject_button", text="Eject",
-            command=fm.eject_disc)
+    def _add_field(self, parent, vorbis_comment="", id3v2_tag="", values=None):
+        """Render a custom field in the dialog body.
 
-        self._disc_status_label = Label(self, name="disc_status_label")
+        :arg parent: the object that contains the field controls
+        :keyword str vorbis_comment: the custom Vorbis comment
+        :keyword str id3v2_tag: the custom ID3v2 tag
+        :keyword list values: the value(s) for the custom comment/tag
 
-        self._retry_disc_check_button = Button(
-            self, name="retry_disc_check_button", text="Retry disc check",
-            command=fm.check_for_disc)
+        """
+        self.__log.call(
+            parent, vorbis_comment=vorbis_comment, id3v2_tag=id3v2_tag,
+            values=values)
 
-        self._rip_and_tag_button = _styled(
-            Button(
-                self, name="rip_and_tag_button", text="Rip and Tag",
-                command=fm.rip_and_tag),
-            foreground="Dark Green", font="-weight bold")
+        if values is None:
+            values = [""]
 
-        self.grid_columnconfigure(1, weight=1)
+        for value in values:
+            # len(self._fields) will be the index where references to the
+            # variables are stored
+            fields_ix = len(self._fields)
 
-    def _set_status_message(self, value, fg="Black"):
-        """Set the disc status label text and color."""
-        self.__log.call(value, fg=fg)
-        self._disc_status_label.config(text=value)
-        _styled(self._disc_status_label, foreground=fg)
+            clear_button = _styled(
+                Button(
+                    parent, text="\u00d7", width=1,
+                    command=lambda f=self._clear_field, ix=fields_ix: f(ix)),
+                foreground="Red", font="-weight bold")
+            clear_button.grid(row=self._row, column=0)
 
-    def disc_mounted(self, mountpoint):
-        """Show the disk mointpoint and a button to eject the disc.
+            vorbis_var = StringVar(parent, value=vorbis_comment)
+            vorbis_entry = Entry(parent, textvariable=vorbis_var, width=17)
+            vorbis_entry.grid(row=self._row, column=1, sticky=W)
 
-        :arg str mountpoint: where the CD-DA disc is mounted
+            id3v2_var = StringVar(parent, value=id3v2_tag)
+            id3v2_entry = Entry(parent, textvariable=id3v2_var, width=7)
+            id3v2_entry.grid(row=self._row, column=2, sticky=W)
 
-        """
-        self.__log.call(mountpoint)
+            value_var = StringVar(parent, value=value)
+            value_entry = Entry(parent, textvariable=value_var, width=59)
+            value_entry.grid(row=self._row, column=3, sticky=W)
 
-        self._remove()
+            self._fields.append((vorbis_var, id3v2_var, value_var))
+            self._widgets.append(
+                (clear_button, vorbis_entry, id3v2_entry, value_entry))
 
-        self._disc_eject_button.config(state=NORMAL)
-        self._disc_eject_button.grid(
-            row=0, column=0, sticky=W, padx=_PADX, pady=_PADY)
+            self._row += 1
 
-        self._set_status_message(mountpoint)
-        self._disc_status_label.grid(
-            row=0, column=1, sticky=W, padx=_PADX, pady=_PADY)
+    def _clear_field(self, index):
+        """Clear (effectively removing) the *index* -th field.
 
-    def disc_check_failed(self):
-        """Alert the user that the disc check failed and provide a
-        button to retry.
+        :arg int index: index into the *fields* list of variables
 
         """
-        self.__log.call()
+        self.__log.call(index)
 
-        self.reset()
+        for var in self._fields[index]:
+            var.set("")
+        for i in range(4):
+            self._widgets[index][i].destroy()
+            
 
-        self._retry_disc_check_button.grid(
-            row=0, column=2, sticky=E, padx=_PADX, pady=_PADY)
+    def buttonbox(self):
+        """Create the buttons to save and/or dismiss the dialog."""
+        box = Frame(self)
 
-    def rip_and_tag_ready(self):
-        """Provide a button to begin ripping and tagging the tracks."""
-        self.__log.call()
+        Button(box, text="Save", width=10, command=self.ok).pack(
+            side=LEFT, padx=_PADX, pady=_PADY)
 
-        self._rip_and_tag_button.grid(
-            row=0, column=2, sticky=E, padx=_PADX, pady=_PADY)
-        self._rip_and_tag_button.config(state=NORMAL)
+        Button(box, text="Cancel", width=10, command=self.cancel).pack(
+            side=LEFT, padx=_PADX, pady=_PADY)
 
-    def ripping_and_tagging(self):
-        """Change the state of the disc controls while tracks are being
-        ripped and tagged.
+        self.bind("<Return>", self.ok)
+        self.bind("<Escape>", self.cancel)
 
-        """
-        self.__log.call()
+        box.pack()
 
-        self._disc_eject_button.config(state=DISABLED)
-        self._rip_and_tag_button.config(state=DISABLED)
+    def apply(self):
+        """Save changes to *metadata*."""
+        self.__log.call()
 
-    def rip_and_tag_failed(self):
-        """Restore the state of the disc controls after an encoding
-        failure.
+        custom = self._metadata["__custom"] = OrderedDict()
 
-        """
-        self.__log.call()
+        for (vorbis_var, id3v2_var, value_var) in self._fields:
+            vorbis_comment = vorbis_var.get()
+            id3v2_tag = id3v2_var.get()
+            value = value_var.get()
 
-        self._disc_eject_button.config(state=NORMAL)
-        self._rip_and_tag_button.config(state=NORMAL)
+            if value and (vorbis_comment or id3v2_tag):
+                key = (vorbis_comment, id3v2_tag)
 
-    def rip_and_tag_finished(self):
-        """Change the state of the disc controls to reflect that a disc
-        has been ripped and tagged.
+                if key not in custom:
+                    custom[key] = [value]
+                else:
+                    custom[key].append(value)
 
-        """
-        self.__log.call()
+                self.__log.info("saved custom %r = %r", key, value)
+            elif vorbis_comment or id3v2_tag or value:
+                self.__log.warning(
+                    "ignoring (%r, %r) = %r", vorbis_comment, id3v2_tag, value)
 
-        self._disc_eject_button.config(state=NORMAL)
-        self._rip_and_tag_button.grid_remove()
 
-    def reset(self):
-        """Populate the disc status/operation frame widgets in their
-        default/initial states.
+@logged
+class EditAlbumCustomMetadataTaggingDialog(EditCustomMetadataTaggingDialog):
+    """Dialog that allows the user to add/change/remove custom metadata
+    fields for *all tracks* (i.e. the album) at once for Vorbis/ID3v2
+    tagging.
 
-        """
-        self.__log.call()
+    """
 
-        self._remove()
+    def __init__(self, master, album_metadata, tracks_metadata, **keywords):
+        """Initialize the dialog.
 
-        self._disc_eject_button.config(state=DISABLED)
+        :arg master: the parent object of this dialog
+        :arg album_metadata: the album metadata
+        :arg tracks_metadata: the track metadata
+        :arg dict keywords:
+           *name=value* keywords used to configure this dialog
 
-        self._set_status_message("Waiting for a disc to be inserted\u2026")
-        self._disc_status_label.grid(
-            row=0, column=1, sticky=W, padx=_PADX, pady=_PADY)
+        """
+        self.__log.call(master, album_metadata, tracks_metadata, **keywords)
 
-    def _remove(self):
-        """Remove all widgets from the current layout."""
-        self.__log.call()
+        self._tracks_metadata = tracks_metadata
+        self._cleared = set()
+        # must come last, as it will call body(frame) before returning!
+        super().__init__(master, album_metadata, **keywords)
 
-        self._disc_eject_button.grid_remove()
-        self._disc_status_label.grid_remove()
-        self._retry_disc_check_button.grid_remove()
-        self._rip_and_tag_button.grid_remove()
+    def _body_instructions(self):
+        """Populate text instructions for the dialog."""
+        super()._body_instructions()
+        self._instructions_var.set(
+            self._instructions_var.get() + '\n' +
+            "Changes applied (saved) to custom metadata tagging fields at the "
+            "album level are applied to ALL tracks."
+        )
+
+    def _add_field(self, parent, vorbis_comment="", id3v2_tag="", values=None):
+        """Render a custom field in the dialog body.
 
+        :arg parent: the object that contains the field controls
+        :keyword str vorbis_comment: the custom Vorbis comment
+        :keyword str id3v2_tag: the custom ID3v2 tag
+        :keyword list values: the value(s) for the custom comment/tag
 
-@logged
-class _FMStatusFrame(Frame):
-    """The application status frame for FLACManager."""
+        If adding an already-populated field, the entry widgets will be
+        disabled. This is a bit ugly, but it greatly simplifies change
+        tracking - modify is modeled as a remove-then-add operation
+        instead of having to keep track of old and new values.
 
-    def __init__(self, *args, **options):
         """
-        :arg tuple args: positional arguments to initialize the frame
-        :arg dict options: ``config`` options to initialize the frame
+        self.__log.call(
+            parent, vorbis_comment=vorbis_comment, id3v2_tag=id3v2_tag,
+            values=values)
 
-        All widgets for this frame are initialized, but layout is
-        deferred until methods are called to transition between states.
+        super()._add_field(
+            parent, vorbis_comment=vorbis_comment, id3v2_tag=id3v2_tag,
+            values=values)
 
-        """
-        self.__log.call(*args, **options)
-        super().__init__(*args, **options)
+        if (vorbis_comment or id3v2_tag) and values:
+            for added in self._widgets[-len(values):]:
+                for widget in added[1:]:
+                    widget.config(state=DISABLED)
 
-        fm = self.master
+    def _clear_field(self, index):
+        """Clear (effectively removing) the *index* -th field.
 
-        self._status_label = _styled(
-            Label(self, name="status_label"), font="-weight bold")
+        :arg int index: index into the *fields* list of variables
 
-        self._retry_aggregation_button = Button(
-            self, name="retry_aggregation_button",
-            text="Retry metadata aggregation",
-            command=fm.aggregate_metadata)
+        This method keeps track of which fields have been cleared so
+        that the changes can be "replayed" for each track.
 
-        self._edit_asis_button = Button(
-            self, name="edit_asis_button", text="Edit metadata as-is",
-            command=fm._edit_metadata)
+        """
+        self.__log.call(index)
 
-        self._open_req_config_editor_button = Button(
-            self, name="open_req_config_editor_button",
-            text="Edit flacmanager.ini",
-            command=fm.edit_required_config)
+        key = (
+            self._fields[index][0].get(), # Vorbis comment
+            self._fields[index][1].get() # ID3v2 tag
+        )
+        value = self._fields[index][2].get() # value
+        self._cleared.add((key, value))
 
-        for r in range(2):
-            self.grid_rowconfigure(r, weight=1)
-        for c in range(2):
-            self.grid_columnconfigure(c, weight=1)
+        super()._clear_field(index)
 
-    def _set_status_message(self, value, fg="Black"):
-        """Set the status label text and color."""
-        self.__log.call(value, fg=fg)
-        self._status_label.config(text=value)
-        _styled(self._status_label, foreground=fg)
+    def apply(self):
+        """Save changes to the album metadata.
 
-    def _show_metadata_status_buttons(self):
-        """Display the buttons that allow the user to choose an action
-        after metadata aggregation has failed.
+        The changes will also be applied to all tracks.
 
         """
         self.__log.call()
+        super().apply()
 
-        self._retry_aggregation_button.grid(
-            row=1, column=0, padx=_PADX, pady=_PADY, sticky=NE)
-        self._edit_asis_button.grid(
-            row=1, column=1, padx=_PADX, pady=_PADY, sticky=NW)
+        album_custom = self._metadata["__custom"]
 
-    def _hide_metadata_status_buttons(self):
-        """Remove the buttons for handling metadata aggregation
-        failures.
+        for i in range(1, len(self._tracks_metadata)):
+            track_custom = \
+                self._tracks_metadata[i].setdefault("__custom", OrderedDict())
 
-        """
-        self.__log.call()
+            self._replay_clear(track_custom, i)
 
-        self._retry_aggregation_button.grid_remove()
-        self._edit_asis_button.grid_remove()
+            for (key, values) in album_custom.items():
+                track_custom[key] = values
+                self.__log.info(
+                    "applied custom %r = %r to track %d", key, values, i)
 
-    def required_configuration_missing(self):
-        """Let the user know that required configuration settings are
-        not present, and provide a button to open an editor.
+    def _replay_clear(self, track_custom, i):
+        """Clear the same fields in each track that were cleared in the
+        album.
+
+        :arg dict track_custom:
+           the custom metadata tagging fields for track *i*
+        :arg int i:
+           the track number
 
         """
-        self.__log.call()
+        self.__log.call(track_custom, i)
 
-        self._remove()
+        if self._cleared:
+            self.__log.debug("clearing %r from track %d", self._cleared, i)
 
-        self._set_status_message(
-            "Required configuration is missing!", fg="Red")
-        self._status_label.grid(
-            row=0, column=0, columnspan=2, padx=_PADX, pady=_PADY)
+        for (key, value) in self._cleared:
+            track_values = track_custom.get(key)
 
-        self._open_req_config_editor_button.grid(
-            row=1, column=0, columnspan=2, padx=_PADX, pady=_PADY)
+            if track_values and value in track_values:
+                track_values[:] = [v for v in track_values if v != value]
+                self.__log.info(
+                    "cleared %r = %r from track %d", key, value, i)
 
-    def aggregating_metadata(self):
-        """Change this frame to reflect that metadata is being
-        aggregated.
+            if track_values == []:
+                del track_custom[key]
 
-        """
-        self.__log.call()
 
-        self._remove()
-        self._set_status_message("Aggregating metadata\u2026", fg="Grey")
-        self._status_label.grid(
-            row=0, column=0, columnspan=2, padx=_PADX, pady=_PADY)
+def resolve_path(spec):
+    """Evaluate all variables in *spec* and make sure it's absolute.
 
-    def aggregation_failed(self):
-        """Message the user that metadata aggregation has failed and
-        provide options for a next action.
+    :arg str spec: a directory or file path template
+    :return: a valid, absolute file system path
+    :rtype: :obj:`str`
 
-        """
-        self.__log.call()
+    """
+    _log.call(spec)
 
-        self._set_status_message(
-            "Aggregation failed. Metadata may be missing or incomplete.",
-            fg="Red")
-        self._show_metadata_status_buttons()
+    resolved_path = os.path.realpath(
+        os.path.abspath(
+            os.path.expandvars(
+                os.path.expanduser(spec))))
 
-    def reset(self):
-        """Populate the status frame widgets in their default/initial
-        states.
+    if not os.path.exists(resolved_path):
+        raise RuntimeError("not a valid path: " + resolved_path)
 
-        """
-        self.__log.call()
+    _log.return_(resolved_path)
+    return resolved_path
 
-        self._remove()
 
-        self._set_status_message("Please insert a disc.", fg="Grey")
-        self._status_label.grid(
-            row=0, column=0, columnspan=2, padx=_PADX, pady=_PADY)
+def encode_flac(
+        cdda_filename, flac_filename, track_metadata, stdout_filename=None):
+    """Rip a CDDA file to a tagged FLAC file.
 
-    def _remove(self):
-        """Remove all widgets from the current layout."""
-        self.__log.call()
+    :arg cdda_filename:
+       absolute CD-DA file name, or a :obj:`TrackSource` that locates
+       the track's audio within a larger file
+    :arg str flac_filename: absolute *.flac* file name
+    :arg dict track_metadata: tagging fields for this track
+    :keyword str stdout_filename:
+       absolute file name for redirected stdout
 
-        self._status_label.grid_remove()
-        self._hide_metadata_status_buttons()
-        self._open_req_config_editor_button.grid_remove()
+    The ``flac`` encoder only produces the (untagged) audio. It is
+    instructed to reserve enough padding for the tags, which are then
+    written in place by :func:`tag_flac`.
 
+    A :obj:`TrackSource` is read directly by ``flac`` (using its
+    ``--skip`` and ``--until`` options), so the tracks of a disc image
+    are encoded without first being split into separate files.
 
-@logged
-class _FMEditorFrame(Frame):
-    """The metadata editing frame for FLACManager."""
+    """
+    _log.call(
+        cdda_filename, flac_filename, track_metadata,
+        stdout_filename=stdout_filename)
 
-    def __init__(self, *args, **options):
-        """
-        :arg tuple args: positional arguments to initialize the frame
-        :arg dict options: ``config`` options to initialize the frame
+    tag_blocks = _make_flac_tag_blocks(track_metadata)
 
-        All widgets for this frame are initialized, but layout is
-        deferred until methods are called to transition between states.
+    command = ["flac"]
+    encode_options = get_config().get("FLAC", "flac_encode_options").split()
+    if isinstance(cdda_filename, TrackSource):
+        # a track is only part of the source file, so the source file's
+        # foreign metadata (if any) does not apply
+        encode_options = [
+            option for option in encode_options
+            if option != "--keep-foreign-metadata"]
+    command.extend(encode_options)
+    # reserve room for the tags (plus the usual amount of padding) so that
+    # tagging never needs to rewrite the audio
+    command.append(
+        "--padding=%d" % (
+            sum(4 + len(data) for (_, data) in tag_blocks)
+            + FLAC_DEFAULT_PADDING))
 
-        """
-        self.__log.call(*args, **options)
-        super().__init__(*args, **options)
+    command.append("--output-name=%s" % flac_filename)
+    if isinstance(cdda_filename, TrackSource):
+        if cdda_filename.raw_endian is not None:
+            command.extend([
+                "--force-raw-format",
+                "--endian=%s" % cdda_filename.raw_endian,
+                "--sign=signed",
+                "--channels=2",
+                "--bps=16",
+                "--sample-rate=44100",
+                ])
+        command.append("--skip=%d" % cdda_filename.skip)
+        if cdda_filename.until is not None:
+            command.append("--until=%d" % cdda_filename.until)
+        command.append(cdda_filename.filename)
+    else:
+        command.append(cdda_filename)
 
-        # all editor widgets and vars are referenced through this mapping;
-        # these are never destroyed, only updated
-        self.__metadata_editors = dict()
+    _log.info("command = %r", command)
+
+    if stdout_filename:
+        with open(stdout_filename, "wb") as f:
+            subprocess.check_call(
+                command, stdout=f, stderr=subprocess.STDOUT)
+    else:
+        subprocess.check_call(command)
 
-        self.__init_album_editors()
-        self.__init_track_editors()
+    _write_flac_metadata_blocks(flac_filename, tag_blocks)
 
-        # issues/5
-        self.__init_naming_editors()
-        self.__album_disctotal_observer_name = None
+    _log.info("finished %s", flac_filename)
 
-    # issues/5
-    def __init_naming_editors(self):
-        """Create the entry widgets for album and track naming fields.
 
-        """
-        naming_editor_frame = LabelFrame(
-            self, name="naming_editor_frame", text="Folder & File Naming")
+#: FLAC ``STREAMINFO`` metadata block type.
+_FLAC_STREAMINFO = 0
 
-        self.__row = 0  # relative to naming_editor_frame
+#: FLAC ``PADDING`` metadata block type.
+_FLAC_PADDING = 1
 
-        self._create_naming_editor(naming_editor_frame, "FLAC")
-        self._create_naming_editor(naming_editor_frame, "MP3")
+#: FLAC ``VORBIS_COMMENT`` metadata block type.
+_FLAC_VORBIS_COMMENT = 4
 
-        config = get_config()
-        mp3_naming_same_as_flac_var = BooleanVar(
-            name="mp3_naming_same_as_flac_var",
-            value=all((
-                config["FLAC"][option] == config["MP3"][option]
-                for option in [
-                    "album_folder",
-                    "ndisc_album_folder",
-                    "compilation_album_folder",
-                    "ndisc_compilation_album_folder",
-                    "library_subroot_trie_key",
-                    "library_subroot_compilation_trie_key",
-                    "track_filename",
-                    "ndisc_track_filename",
-                    "compilation_track_filename",
-                    "ndisc_compilation_track_filename",
-                    ]
-                )))
-        mp3_naming_same_as_flac_checkbutton = Checkbutton(
-            naming_editor_frame, name="mp3_naming_same_as_flac_checkbutton",
-            text="Use the same templates for both FLAC and MP3",
-            variable=mp3_naming_same_as_flac_var, onvalue=True, offvalue=False,
-            command=self.__update_mp3_naming_editor_state
-        )
-        mp3_naming_same_as_flac_checkbutton.grid(
-            row=self.__row, column=1, columnspan=5, padx=0, pady=_PADY,
-            sticky=W)
-        self.__mp3_naming_same_as_flac_var = mp3_naming_same_as_flac_var
+#: FLAC ``PICTURE`` metadata block type.
+_FLAC_PICTURE = 6
 
-        # collapse the labels and allow the entry fields to expand
-        for i in range(8):
-            naming_editor_frame.grid_columnconfigure(i, weight=0)
-        naming_editor_frame.grid_columnconfigure(2, weight=1) # trie key
-        naming_editor_frame.grid_columnconfigure(4, weight=1) # album folder
-        naming_editor_frame.grid_columnconfigure(6, weight=2) # track filename
+#: The number of bytes of ``PADDING`` reserved whenever a FLAC file's
+#: metadata must be (re)written from scratch.
+FLAC_DEFAULT_PADDING = 8192
 
-        if mp3_naming_same_as_flac_var.get():
-            for editor_name in [
-                    "__mp3_subroot_trie",
-                    "__mp3_album_folder",
-                    "__mp3_track_filename",
-                    ]:
-                self.__metadata_editors[editor_name].config(state=DISABLED)
 
-        naming_editor_frame.pack(anchor=N, pady=11, fill=BOTH)
+def tag_flac(flac_filename, track_metadata):
+    """Write (or replace) the Vorbis comments and front cover picture
+    of an existing FLAC file.
 
-    def _create_naming_editor(self, parent, encoding_section):
-        """Create entry widgets for the album folder and track filename
-        templates.
+    :arg str flac_filename: absolute *.flac* file name
+    :arg dict track_metadata: tagging fields for this track
 
-        :arg parent: parent object of the widgets
-        :arg str encoding_section: either "FLAC" or "MP3"
+    Tags are written in place when they fit in the space occupied by the
+    file's current ``VORBIS_COMMENT``, ``PICTURE`` and ``PADDING``
+    blocks (the remainder becomes padding). Only if they do not fit is
+    the file rewritten, with :data:`FLAC_DEFAULT_PADDING` bytes of
+    padding reserved for next time.
 
-        """
-        trie_field = "%s_subroot_trie" % encoding_section.lower()
-        folder_field = "%s_album_folder" % encoding_section.lower()
-        track_field = "%s_track_filename" % encoding_section.lower()
+    """
+    _log.call(flac_filename, track_metadata)
 
-        config_section = get_config()[encoding_section]
+    _write_flac_metadata_blocks(
+        flac_filename, _make_flac_tag_blocks(track_metadata))
 
-        _styled(
-            Label(parent, text=encoding_section), font="-weight bold"
-        ).grid(row=self.__row, column=0, padx=_PADX, pady=_PADY, sticky=E)
+    _log.info("tagged %s", flac_filename)
 
-        Label(
-            parent, text=config_section["library_root"] + '/'
-        ).grid(row=self.__row, column=1, padx=0, pady=_PADY, sticky=E)
 
-        subroot_trie_var = StringVar(name=trie_field + "_var")
-        subroot_trie = Entry(
-            parent, name=trie_field, textvariable=subroot_trie_var)
-        subroot_trie.var = subroot_trie_var
-        subroot_trie.grid(
-            row=self.__row, column=2, padx=0, pady=_PADY, sticky=W + E)
+def read_flac_vorbis_comments(flac_filename):
+    """Read the Vorbis comments of an existing FLAC file.
 
-        Label(parent, text='/').grid(
-            row=self.__row, column=3, padx=0, pady=_PADY, sticky=W)
+    :arg str flac_filename: absolute *.flac* file name
+    :return: Vorbis comment name/value pairs
+    :rtype: :class:`collections.OrderedDict`
 
-        album_folder_var = StringVar(name=folder_field + "_var")
-        album_folder = Entry(
-            parent, name=folder_field, textvariable=album_folder_var)
-        album_folder.var = album_folder_var
-        album_folder.grid(
-            row=self.__row, column=4, padx=0, pady=_PADY, sticky=W + E)
+    Comment names are normalized to upper case.
 
-        Label(parent, text='/').grid(
-            row=self.__row, column=5, padx=0, pady=_PADY, sticky=W)
+    """
+    _log.call(flac_filename)
 
-        track_filename_var = StringVar(name=track_field + "_var")
-        track_filename = Entry(
-            parent, name=track_field, textvariable=track_filename_var)
-        track_filename.var = track_filename_var
-        track_filename.grid(
-            row=self.__row, column=6, padx=0, pady=_PADY, sticky=W + E)
+    with open(flac_filename, "rb") as f:
+        (blocks, _) = _read_flac_metadata_blocks(f)
 
-        Label(parent, text=config_section["track_fileext"]).grid(
-            row=self.__row, column=7, padx=0, pady=_PADY, sticky=W)
+    comments = OrderedDict()
+    for (block_type, data) in blocks:
+        if block_type == _FLAC_VORBIS_COMMENT:
+            (_, fields) = _parse_flac_vorbis_comment_block(data)
+            for field in fields:
+                (name, value) = field.split('=', 1)
+                comments.setdefault(name.upper(), []).append(value)
 
-        self.__metadata_editors["__%s" % trie_field] = subroot_trie
-        self.__metadata_editors["__%s" % folder_field] = album_folder
-        self.__metadata_editors["__%s" % track_field] = track_filename
+    _log.return_(comments)
+    return comments
 
-        self.__row += 1
 
-    # issues/5
-    def _apply_naming_defaults(self, *args):
-        """Update the folder and file name templates based on the
-        current values for ``album_disctotal`` and
-        ``album_compilation``.
+def _make_flac_tag_blocks(track_metadata):
+    """Build the FLAC metadata blocks that carry a track's tags.
 
-        :arg tuple args:
-           positional arguments (empty except when this method is
-           invoked as the variable trace callback for
-           ``album_disctotal_var``)
+    :arg dict track_metadata: tagging fields for this track
+    :return:
+       a list of (block type, block data) pairs for the
+       ``VORBIS_COMMENT`` and (optional) ``PICTURE`` blocks
 
-        """
-        metadata_editors = self.__metadata_editors
+    """
+    vorbis_comments = make_vorbis_comments(track_metadata)
+    fields = [
+        "%s=%s" % (name, value)
+        for (name, values) in vorbis_comments.items() if values
+        for value in values]
 
-        # yuck... but when changing the value, we get TWO traces:
-        # 1. the variable value changes from the old value to empty (""),
-        #    causing `metadata_editors["album_disctotal"].var.get()` to result
-        #    in TclError since album_disctotal_var is an IntVar
-        # 2. the variable value changes from empty ("") to the new value
-        try:
-            metadata_editors["album_disctotal"].var.get()
-        except TclError:
-            return
+    blocks = [
+        (_FLAC_VORBIS_COMMENT, _make_flac_vorbis_comment_block(fields))]
 
-        ndisc = (
-            "ndisc_" if metadata_editors["album_disctotal"].var.get() > 1
-            else "")
-        compilation = (
-            "compilation_" if metadata_editors["album_compilation"].var.get()
-            else "")
-        default_key_prefix = ndisc + compilation
+    if track_metadata["album_cover"]:
+        blocks.append(
+            (_FLAC_PICTURE,
+                _make_flac_picture_block(track_metadata["album_cover"])))
 
-        config = get_config()
-        for encoding in ["FLAC", "MP3"]:
-            for field_suffix in [
-                    "subroot_trie", "album_folder", "track_filename"]:
-                default_key = (
-                    "library_subroot_%strie_key" % compilation
-                    if field_suffix == "subroot_trie"
-                    else default_key_prefix + field_suffix)
-                custom_key = "__%s_%s" % (encoding.lower(), field_suffix)
-                metadata_editors[custom_key].var.set(
-                    config[encoding][default_key])
+    return blocks
 
-    # issues/5
-    def __update_mp3_naming_editor_state(self):
-        """Enable or disable the MP3 naming entry widgets."""
-        state = \
-            DISABLED if self.__mp3_naming_same_as_flac_var.get() else NORMAL
-        self.__metadata_editors["__mp3_subroot_trie"].config(state=state)
-        self.__metadata_editors["__mp3_album_folder"].config(state=state)
-        self.__metadata_editors["__mp3_track_filename"].config(state=state)
 
-    def __init_album_editors(self):
-        """Create the entry/selection widgets for album metadata fields.
+def _make_flac_vorbis_comment_block(fields, vendor=None):
+    """Serialize a ``VORBIS_COMMENT`` block.
 
-        """
-        album_editor_frame = LabelFrame(
-            self, name="album_editor_frame", text="Album")
+    :arg list fields: "NAME=value" strings
+    :keyword str vendor:
+       the vendor string (a placeholder is used if not specified; see
+       :func:`_write_flac_metadata_blocks`)
+    :return: the block data (without the block header)
+    :rtype: :obj:`bytes`
 
-        create_album_choices_editor = partial(
-            self._create_choices_editor, album_editor_frame, "album")
+    """
+    if vendor is None:
+        vendor = "FLACManager %s" % __version__
 
-        self.__row = 0  # relative to album_editor_frame
+    buf = BytesIO()
+    vendor = vendor.encode("utf-8")
+    buf.write(struct.pack("<I", len(vendor)))
+    buf.write(vendor)
+    buf.write(struct.pack("<I", len(fields)))
+    for field in fields:
+        field = field.encode("utf-8")
+        buf.write(struct.pack("<I", len(field)))
+        buf.write(field)
 
-        create_album_choices_editor("title", tracks_apply=False)
-        self._create_album_disc_editor(album_editor_frame)
-        self._create_album_compilation_editor(album_editor_frame)
-        create_album_choices_editor("artist")
-        create_album_choices_editor("label", tracks_apply=False)
-        create_album_choices_editor("genre")
-        create_album_choices_editor("year")
-        self._create_album_cover_editor(album_editor_frame)
-        self._create_album_custom_metadata_editor(album_editor_frame)
+    return buf.getvalue()
 
-        album_editor_frame.grid_columnconfigure(0, weight=0)
-        album_editor_frame.grid_columnconfigure(1, weight=1)
-        album_editor_frame.grid_columnconfigure(2, weight=0)
 
-        album_editor_frame.pack(anchor=N, pady=11, fill=BOTH)
+def _parse_flac_vorbis_comment_block(data):
+    """Deserialize a ``VORBIS_COMMENT`` block.
 
-    def __init_track_editors(self):
-        """Create the entry/selection widgets for track metadata fields.
+    :arg bytes data: the block data (without the block header)
+    :return: a 2-tuple (vendor string, list of "NAME=value" strings)
 
-        """
-        track_editor_frame = LabelFrame(
-            self, name="track_editor_frame", text="Tracks")
+    """
+    (length,) = struct.unpack_from("<I", data, 0)
+    vendor = data[4:4 + length].decode("utf-8", errors="replace")
+    i = 4 + length
+    (count,) = struct.unpack_from("<I", data, i)
+    i += 4
 
-        create_track_choices_editor = partial(
-            self._create_choices_editor, track_editor_frame, "track",
-            tracks_apply=False)
+    fields = []
+    for _ in range(count):
+        (length,) = struct.unpack_from("<I", data, i)
+        i += 4
+        fields.append(data[i:i + length].decode("utf-8", errors="replace"))
+        i += length
 
-        self.__row = 0  # relative to track_editor_frame
+    return (vendor, fields)
 
-        self._create_track_control_editors(track_editor_frame)
-        create_track_choices_editor("title")
-        create_track_choices_editor("artist")
-        create_track_choices_editor("genre")
-        create_track_choices_editor("year")
-        self._create_track_custom_metadata_editor(track_editor_frame)
 
-        track_editor_frame.grid_columnconfigure(0, weight=0)
-        track_editor_frame.grid_columnconfigure(1, weight=1)
+def _make_flac_picture_block(image_filename):
+    """Serialize a ``PICTURE`` block for a front cover image.
 
-        track_editor_frame.pack(anchor=N, pady=11, fill=BOTH)
+    :arg str image_filename: absolute JPEG or PNG file name
+    :return: the block data (without the block header)
+    :rtype: :obj:`bytes`
 
-    def _create_choices_editor(
-            self, parent, editor_name, field_name, tracks_apply=True,
-            VarType=StringVar):
-        """Create an entry/selection widget for a metadata field that
-        may have multiple aggregated values.
+    """
+    with open(image_filename, "rb") as f:
+        image_data = f.read()
 
-        :arg parent: parent object of the editor
-        :arg str editor_name: either "album" or "track"
-        :arg str field_name: the metadata field name
-        :keyword bool tracks_apply:
-           whether or not to create an "Apply to all tracks" button that
-           corresponds to *field_name*
-        :keyword VarType:
-           the :mod:`tkinter` variable type that will hold the value of
-           the metadata field
-        :return: the metadata field entry/selection widget
-        :rtype: :class:`tkinter.ttk.Combobox`
+    image_type = imghdr.what("_ignored_", h=image_data)
+    mime_type = ("image/%s" % (image_type or "jpeg")).encode()
+    (width, height, depth) = _image_dimensions(image_data) or (0, 0, 0)
 
-        """
-        self.__log.call(
-            parent, editor_name, field_name, tracks_apply=tracks_apply,
-            VarType=VarType)
+    buf = BytesIO()
+    buf.write(struct.pack(">I", 3)) # front cover
+    buf.write(struct.pack(">I", len(mime_type)))
+    buf.write(mime_type)
+    buf.write(struct.pack(">I", 0)) # (empty) description
+    buf.write(struct.pack(">IIII", width, height, depth, 0))
+    buf.write(struct.pack(">I", len(image_data)))
+    buf.write(image_data)
 
-        Label(parent, text=field_name.capitalize()).grid(
-            row=self.__row, column=0, padx=_PADX, pady=_PADY, sticky=E)
+    return buf.getvalue()
 
-        name = "%s_%s" % (editor_name, field_name)
 
-        # NOTE: for track editors, the variable will be re-*configured* on a
-        # per-track basis as the tracks spinbox is manipulated; however, the
-        # var *property* of a track editor is never re-assigned
-        var = VarType(name="%s_var" % name)
-        combobox = Combobox(
-            parent, name="%s_combobox" % name, textvariable=var
-        )
-        # attach the variable to the Combobox for easy access
-        combobox.var = var
-        if field_name != "year":
-            sticky = W + E
-        else:
-            combobox.configure(width=7)
-            sticky = W
-        combobox.grid(
-            row=self.__row, column=1, padx=_PADX, pady=_PADY, sticky=sticky)
+def _read_flac_metadata_blocks(f):
+    """Read all metadata blocks from the FLAC file object *f*.
 
-        self.__metadata_editors[name] = combobox
+    :arg f: a FLAC file opened in binary mode and positioned at 0
+    :return:
+       a 2-tuple containing the list of (block type, block data) pairs,
+       and the file offset at which the audio frames begin
+    :raises FLACManagerError: if *f* is not a FLAC file
 
-        if tracks_apply:
-            Button(
-                parent, name="%s_apply_button" % name,
-                text="Apply %s to all tracks" % field_name,
-                command=lambda
-                        self=self, metadata_name="track_%s" % field_name,
-                        var=var:
-                    self.__apply_to_all_tracks(metadata_name, var.get())
-            ).grid(
-                row=self.__row, column=2, padx=_PADX, pady=_PADY, sticky=W+E)
+    """
+    if f.read(4) != b"fLaC":
+        raise FLACManagerError(
+            "%s is not a FLAC file" % getattr(f, "name", f),
+            context_hint="FLAC tagging")
+
+    blocks = []
+    is_last = False
+    while not is_last:
+        header = f.read(4)
+        if len(header) != 4:
+            raise FLACManagerError(
+                "%s has truncated metadata" % getattr(f, "name", f),
+                context_hint="FLAC tagging")
+        is_last = bool(header[0] & 0x80)
+        block_type = header[0] & 0x7f
+        length = int.from_bytes(header[1:], "big")
+        blocks.append((block_type, f.read(length)))
 
-        self.__row += 1
+    return (blocks, f.tell())
 
-        return combobox
 
-    def __apply_to_all_tracks(self, field_name, value):
-        """Set **all** track variables for *field_name* to *value*.
+def _write_flac_metadata_blocks(flac_filename, tag_blocks):
+    """Replace the tagging metadata blocks of *flac_filename*.
 
-        :arg str field_name: the metadata field name
-        :arg value:
-           the variable value to set (type varies by metadata field)
+    :arg str flac_filename: absolute *.flac* file name
+    :arg list tag_blocks:
+       (block type, block data) pairs as produced by
+       :func:`_make_flac_tag_blocks`
 
-        """
-        self.__log.call(field_name, value)
+    All existing ``VORBIS_COMMENT``, ``PICTURE`` and ``PADDING`` blocks
+    are replaced by *tag_blocks* and (if possible) a ``PADDING`` block
+    that fills the remaining space. All other blocks (``STREAMINFO``,
+    ``SEEKTABLE``, foreign metadata, etc.) are preserved as-is.
 
-        for track_vars in self.__track_vars[1:]:
-            track_vars[field_name].set(value)
+    """
+    _log.call(flac_filename, tag_blocks)
+
+    with open(flac_filename, "rb") as f:
+        (blocks, audio_offset) = _read_flac_metadata_blocks(f)
+
+    vendor = None
+    retained_blocks = []
+    for (block_type, data) in blocks:
+        if block_type == _FLAC_VORBIS_COMMENT:
+            # preserve the encoder's vendor string
+            (vendor, _) = _parse_flac_vorbis_comment_block(data)
+        elif block_type not in (_FLAC_PICTURE, _FLAC_PADDING):
+            retained_blocks.append((block_type, data))
+
+    new_blocks = list(retained_blocks)
+    for (block_type, data) in tag_blocks:
+        if block_type == _FLAC_VORBIS_COMMENT and vendor is not None:
+            (_, fields) = _parse_flac_vorbis_comment_block(data)
+            data = _make_flac_vorbis_comment_block(fields, vendor=vendor)
+        if len(data) >= 1 << 24:
+            raise FLACManagerError(
+                "FLAC metadata block type %d is too large (%d bytes)" % (
+                    block_type, len(data)),
+                context_hint="FLAC tagging")
+        new_blocks.append((block_type, data))
+
+    # 4 bytes for "fLaC", plus a 4-byte header per block
+    available = audio_offset - 4
+    needed = sum(4 + len(data) for (_, data) in new_blocks)
+    if needed == available:
+        rewrite = False
+    elif needed + 4 <= available:
+        new_blocks.append((_FLAC_PADDING, bytes(available - needed - 4)))
+        rewrite = False
+    else:
+        new_blocks.append((_FLAC_PADDING, bytes(FLAC_DEFAULT_PADDING)))
+        rewrite = True
+
+    metadata = BytesIO()
+    metadata.write(b"fLaC")
+    for (i, (block_type, data)) in enumerate(new_blocks):
+        is_last = (i == len(new_blocks) - 1)
+        metadata.write(bytes([(0x80 if is_last else 0) | block_type]))
+        metadata.write(len(data).to_bytes(3, "big"))
+        metadata.write(data)
+    metadata = metadata.getvalue()
+
+    if not rewrite:
+        with open(flac_filename, "r+b") as f:
+            f.write(metadata)
+        _log.debug(
+            "rewrote %d bytes of metadata in place in %s",
+            len(metadata), flac_filename)
+    else:
+        _rewrite_file_head(flac_filename, metadata, audio_offset)
+        _log.info(
+            "metadata did not fit in %d bytes; rewrote %s",
+            available, flac_filename)
 
-    def _create_album_disc_editor(self, parent):
-        """Create entry widgets for the album disc number/total fields.
 
-        :arg parent: parent object of the entry widgets
+def _rewrite_file_head(filename, head, offset):
+    """Replace everything before *offset* in *filename* with *head*.
 
-        """
-        self.__log.call(parent)
+    :arg str filename: absolute file name
+    :arg bytes head: the new leading content of the file
+    :arg int offset: the offset of the content to be kept
 
-        Label(parent, text="Disc").grid(
-            row=self.__row, column=0, padx=_PADX, pady=_PADY, sticky=E)
+    The new file is written to a temporary file in the same folder,
+    which then atomically replaces *filename*.
 
-        frame = Frame(parent)
+    """
+    (fd, temp_filename) = mkstemp(
+        suffix=".tmp", prefix=".fm", dir=os.path.dirname(filename))
+    try:
+        with os.fdopen(fd, "wb") as temp_f, open(filename, "rb") as f:
+            temp_f.write(head)
+            f.seek(offset)
+            shutil.copyfileobj(f, temp_f, 1 << 20)
+        shutil.copymode(filename, temp_filename)
+        os.replace(temp_filename, filename)
+    finally:
+        if os.path.exists(temp_filename):
+            os.unlink(temp_filename)
 
-        number_var = IntVar(name="album_discnumber_var")
-        album_discnumber = Entry(
-            frame, name="album_discnumber_entry", exportselection=NO, width=3,
-            textvariable=number_var)
-        album_discnumber.var = number_var
-        album_discnumber.pack(side=LEFT)
 
-        self.__metadata_editors["album_discnumber"] = album_discnumber
+def decode_wav(flac_filename, wav_filename, stdout_filename=None):
+    """Convert a FLAC file to a WAV file.
 
-        Label(frame, text="of").pack(side=LEFT, padx=_PADX)
+    :arg str flac_filename: absolute *.flac* file name
+    :arg str wav_filename: absolute *.wav* file name
+    :keyword str stdout_filename:
+       absolute file name for redirected stdout
 
-        total_var = IntVar(name="album_disctotal_var")
-        album_disctotal = Entry(
-            frame, name="album_disctotal_entry", exportselection=NO, width=3,
-            textvariable=total_var)
-        album_disctotal.var = total_var
-        album_disctotal.pack(side=LEFT)
+    """
+    _log.call(flac_filename, wav_filename, stdout_filename=stdout_filename)
 
-        self.__metadata_editors["album_disctotal"] = album_disctotal
+    command = ["flac", "--decode"]
+    command.extend(get_config().get("FLAC", "flac_decode_options").split())
+    command.append("--output-name=%s" % wav_filename)
+    command.append(flac_filename)
 
-        frame.grid(
-            row=self.__row, column=1, columnspan=2, padx=_PADX, pady=_PADY,
-            sticky=W)
+    _log.info("command = %r", command)
 
-        self.__row += 1
+    if stdout_filename:
+        with open(stdout_filename, "wb") as f:
+            subprocess.check_call(
+                command, stdout=f, stderr=subprocess.STDOUT)
+    else:
+        subprocess.check_call(command)
 
-    def _create_album_compilation_editor(self, parent):
-        """Create the toggle widget for the album compilation field.
+    _log.info("finished %s", wav_filename)
 
-        :arg parent: parent object of the toggle widget
 
-        """
-        self.__log.call(parent)
+def encode_mp3(
+        wav_filename, mp3_filename, track_metadata, scale=None,
+        stdout_filename=None):
+    """Convert a WAV file to a tagged MP3 file.
 
-        Label(parent, text="Compilation").grid(
-            row=self.__row, column=0, padx=_PADX, pady=_PADY, sticky=E)
+    :arg str wav_filename: absolute *.wav* file name
+    :arg str mp3_filename: absolute *.mp3* file name
+    :arg dict track_metadata: tagging fields for this track
+    :keyword float scale:
+      multiply PCM data by this factor
+    :keyword str stdout_filename:
+       absolute file name for redirected stdout
 
-        var = BooleanVar()
-        album_compilation = Checkbutton(
-            parent, name="album_compilation_checkbutton", variable=var,
-            onvalue=True, offvalue=False,
-            command=self._apply_naming_defaults) # issues/5
-        album_compilation.var = var
-        album_compilation.grid(
-            row=self.__row, column=1, columnspan=2, padx=_PADX, pady=_PADY,
-            sticky=W)
+    The ``lame`` encoder only produces the audio and an (empty) ID3v2
+    tag that reserves enough padding for the frames, which are then
+    written in place (see :func:`tag_mp3`).
 
-        self.__metadata_editors["album_compilation"] = album_compilation
+    """
+    _log.call(
+        wav_filename, mp3_filename, track_metadata, scale=scale,
+        stdout_filename=stdout_filename)
 
-        self.__row += 1
+    version = _id3v2_version()
+    frames = _make_id3v2_frames(track_metadata, version)
 
-    def _create_album_cover_editor(self, parent):
-        """Create selection widget and import buttons for the album
-        cover field.
+    command = ["lame"]
+    command.extend(get_config()["MP3"]["lame_encode_options"].split())
+    if scale is not None:
+        command.extend(["--scale", "%.2f" % scale])
+    command.append("--id3v2-only")
+    # reserve room for the frames (plus the usual amount of padding) so
+    # that tagging never needs to rewrite the audio
+    command.extend([
+        "--pad-id3v2-size",
+        "%d" % (
+            len(_serialize_id3v2_frames(frames, version))
+            + ID3V2_DEFAULT_PADDING)])
 
-        :arg parent:
-           parent object of the frame that will contain the selection
-           widget and buttons
+    command.append(wav_filename)
+    command.append(mp3_filename)
 
-        """
-        self.__log.call(parent)
+    _log.info("command = %r", command)
 
-        Label(parent, text="Cover").grid(
-            row=self.__row, column=0, padx=_PADX, pady=_PADY, sticky=E)
+    if stdout_filename:
+        with open(stdout_filename, "wb") as f:
+            subprocess.check_call(
+                command, stdout=f, stderr=subprocess.STDOUT)
+    else:
+        subprocess.check_call(command)
 
-        frame = Frame(parent)
+    _write_id3v2_tag(mp3_filename, frames, version)
 
-        var = StringVar(name="album_cover_var")
-        album_cover = OptionMenu(frame, var)
-        album_cover.var = var
-        album_cover.config(state=DISABLED)
-        album_cover.pack(side=LEFT)
+    _log.debug("finished %s", mp3_filename)
 
-        self.__metadata_editors["album_cover"] = album_cover
 
-        Button(
-            frame, name="album_cover_add_url_button", text="Add URL",
-            command=self._add_album_cover_from_url
-        ).pack(side=LEFT, padx=_PADX)
+#: The number of bytes of padding reserved whenever an MP3 file's ID3v2
+#: tag must be (re)written from scratch.
+ID3V2_DEFAULT_PADDING = 4096
 
-        Button(
-            frame, name="album_cover_add_file_button", text="Add file",
-            command=self._add_album_cover_from_file
-        ).pack(side=LEFT, padx=_PADX)
+#: ID3v2 frames that are written by the encoder (rather than by
+#: FLACManager), and are therefore preserved when an MP3 file is
+#: retagged.
+_ID3V2_PRESERVED_FRAMES = ["TSSE"]
 
-        save_cover_var = BooleanVar(
-            name="album_save_cover_var",
-            value=get_config().getboolean("Organize", "save_cover_image"))
-        Checkbutton(
-            frame, name="album_cover_save_checkbutton",
-            text="Save to file?",
-            variable=save_cover_var, onvalue=True, offvalue=False
-        ).pack(side=RIGHT, padx=_PADX)
-        album_cover.save_cover_var = save_cover_var
 
-        frame.grid(
-            row=self.__row, column=1, columnspan=2, padx=_PADX, pady=_PADY,
-            sticky=W)
+def encode_mp3_without_clipping(
+        wav_filename, mp3_filename, track_metadata, stdout_filename,
+        rescaling=None):
+    """Encode a WAV file to a tagged MP3 file, re-encoding with scaled
+    PCM data until no clipping is detected.
 
-        self.__row += 1
+    :arg str wav_filename: absolute *.wav* file name
+    :arg str mp3_filename: absolute *.mp3* file name
+    :arg dict track_metadata: tagging fields for this track
+    :arg str stdout_filename:
+       absolute file name for redirected stdout (which is inspected for
+       ``lame`` clipping warnings)
+    :keyword rescaling:
+       a function that is called with the scale before each re-encoding
 
-    def choose_album_cover(self, label):
-        """Select and preview a cover image.
+    """
+    _log.call(
+        wav_filename, mp3_filename, track_metadata, stdout_filename,
+        rescaling=rescaling)
 
-        :arg str label: the cover image display label
+    encode_mp3(
+        wav_filename, mp3_filename, track_metadata,
+        stdout_filename=stdout_filename)
 
-        .. note::
-           The Mac OS X "Preview" app is used to open the album cover
-           image identified by *label*.
+    # check for clipping
+    stdout = _read_text(stdout_filename)
+    if "WARNING: clipping occurs at the current gain." in stdout:
+        clipping_occurs = True
+        m = re.search(
+            r"encode\s+again\s+using\s+\-\-scale\s+(\d+\.\d+)", stdout)
+        scale = float(m.group(1)) if m else 0.99
 
-        """
-        self.__log.call(label)
+        # re-encode, scaling the PCM data, until there is no clipping
+        while clipping_occurs:
+            _log.info(
+                "detected clipping in %s; re-encoding at %.2f scale...",
+                mp3_filename, scale)
+            if rescaling is not None:
+                rescaling(scale)
 
-        filename = self.__album_covers.get(label)
-        if filename is None:
-            self.__log.error("%r not found in album covers", label)
-            messagebox.showerror(
-                "Album cover preview failure",
-                "Album cover %r was not found!" % label)
-            return
+            encode_mp3(
+                wav_filename, mp3_filename, track_metadata,
+                scale=scale, stdout_filename=stdout_filename)
 
-        status = subprocess.call(["open", "-a", "Preview", filename])
-        if status == 0:
-            self.__metadata_editors["album_cover"].var.set(label)
-        else:
-            self.__log.warning(
-                "exit status %d attempting to preview %s (%s)",
-                status, label, filename)
+            clipping_occurs = (
+                "WARNING: clipping occurs at the current gain."
+                in _read_text(stdout_filename))
+            scale -= 0.01
 
-    def _add_album_cover_from_url(self):
-        """Download a cover image from a user-provided URL and open in
-        Mac OS X Preview.
 
-        The downloaded cover image is made available in the cover image
-        dropdown.
+def _read_text(filename):
+    """Return the contents of the text file *filename*."""
+    with open(filename) as f:
+        return f.read()
 
-        """
-        self.__log.call()
 
-        album_cover = self.__metadata_editors["album_cover"]
+def tag_mp3(mp3_filename, track_metadata):
+    """Write (or replace) the ID3v2 tag of an existing MP3 file.
 
-        album_cover.config(state=DISABLED)
+    :arg str mp3_filename: absolute *.mp3* file name
+    :arg dict track_metadata: tagging fields for this track
 
-        # leave initialvalue empty (paste-over doesn't work in XQuartz)
-        url = simpledialog.askstring(
-            "Add a cover image from a URL", "Enter the image URL:",
-            initialvalue="")
-        if not url:
-            album_cover.config(state=NORMAL)
-            self.__log.return_()
-            return
+    The tag is written in place when its frames fit in the space
+    occupied by the file's current ID3v2 tag (the remainder becomes
+    padding). Only if they do not fit is the file rewritten, with
+    :data:`ID3V2_DEFAULT_PADDING` bytes of padding reserved for next
+    time.
 
-        self.__log.debug("url = %r", url)
-        label = None
-        try:
-            response = urlopen(
-                url, timeout=get_config().getfloat("HTTP", "timeout"))
-            image_data = response.read()
-            response.close()
+    The ID3v2 version (2.3 or 2.4) is determined by the ``[MP3]
+    id3v2_version`` option in *flacmanager.ini*.
 
-            if response.status != 200:
-                raise RuntimeError(
-                    "HTTP %d %s" % (response.status, response.reason))
+    """
+    _log.call(mp3_filename, track_metadata)
 
-            image_type = imghdr.what("_ignored_", h=image_data)
-            if image_type is None:
-                raise MetadataError(
-                    "Unrecognized image type.",
-                    context_hint="Add cover image from URL")
+    version = _id3v2_version()
+    _write_id3v2_tag(
+        mp3_filename, _make_id3v2_frames(track_metadata, version), version)
 
-            filename = make_tempfile(suffix='.' + image_type)
-            with open(filename, "wb") as f:
-                f.write(image_data)
-            self.__log.debug("wrote %s", filename)
-        except Exception as e:
-            self.__log.exception("failed to obtain image from %r", url)
-            messagebox.showerror(
-                "Image download failure",
-                "An unexpected error occurred while "
-                    "downloading the image from %s." % url)
-        else:
-            label = self.__add_album_cover_option(filename)
-        finally:
-            album_cover.config(state=NORMAL)
+    _log.info("tagged %s", mp3_filename)
 
-        if label is not None:
-            self.choose_album_cover(label)
 
-    def _add_album_cover_from_file(self):
-        """Open a user-defined cover image in Mac OS X Preview.
+def read_id3v2_tags(mp3_filename):
+    """Read the text and URL frames of an existing MP3 file's ID3v2
+    tag.
 
-        The cover image is made available in the cover image dropdown.
+    :arg str mp3_filename: absolute *.mp3* file name
+    :return: ID3v2 frame name/value pairs
+    :rtype: :class:`collections.OrderedDict`
 
-        """
-        self.__log.call()
+    ``TXXX``, ``COMM`` and ``WXXX`` values are returned as
+    "description=value" strings. Binary frames (e.g. ``APIC``) are not
+    included.
 
-        album_cover = self.__metadata_editors["album_cover"]
+    """
+    _log.call(mp3_filename)
 
-        album_cover.config(state=DISABLED)
+    with open(mp3_filename, "rb") as f:
+        (_, frames, _) = _read_id3v2_tag(f)
+
+    tags = OrderedDict()
+    for (frame_id, data) in frames:
+        value = _parse_id3v2_frame(frame_id, data)
+        if value is not None:
+            tags.setdefault(frame_id, []).append(value)
+
+    _log.return_(tags)
+    return tags
 
-        label = None
-        filename = filedialog.askopenfilename(
-            defaultextension=".jpg",
-            filetypes=[
-                ("JPEG", "*.jpg"),
-                ("JPEG", "*.jpeg"),
-                ("PNG", "*.png"),
-            ],
-            initialdir=os.path.expanduser("~/Pictures"),
-            title="Choose a JPEG or PNG file")
 
-        if not filename:
-            album_cover.config(state=NORMAL)
-            self.__log.return_()
-            return
-        elif not os.path.isfile(filename):
-            self.__log.error("file not found: %s", filename)
-            messagebox.showerror(
-                "File not found", "File not found: %s" % filename)
-            self.__log.return_()
-            return
+def _id3v2_version():
+    """Return the configured ID3v2 major version (3 or 4)."""
+    version = get_config()["MP3"].getint("id3v2_version", 3)
+    if version not in (3, 4):
+        _log.warning("unsupported id3v2_version %r; using 3", version)
+        version = 3
 
-        self.__log.debug("filename = %r", filename)
-        try:
-            with open(filename, "rb") as f:
-                image_data = f.read()
+    return version
 
-            image_type = imghdr.what("_ignored_", h=image_data)
-            if image_type is None:
-                raise MetadataError(
-                    "Unrecognized image type.",
-                    context_hint="Add cover image from file")
-        except Exception as e:
-            self.__log.exception("failed to identify image from %r", filename)
-            messagebox.showerror(
-                "Image add failure",
-                "An unexpected error occurred while "
-                    "processing the image from %s." % filename)
-        else:
-            label = self.__add_album_cover_option(filename)
-        finally:
-            album_cover.config(state=NORMAL)
 
-        if label is not None:
-            self.choose_album_cover(label)
+def _make_id3v2_frames(track_metadata, version):
+    """Build the ID3v2 frames that carry a track's tags.
 
-    def __add_album_cover_option(self, filename, showinfo=True):
-        """Add an entry for *filename* to the album cover dropdown.
+    :arg dict track_metadata: tagging fields for this track
+    :arg int version: the ID3v2 major version (3 or 4)
+    :return: a list of (frame ID, frame data) pairs
 
-        :arg str filename: absolute path to an album cover image file
-        :keyword bool showinfo:
-           whether or not to open a dialog confirming the addition of
-           *filename*
+    Text frames with multiple values are written as a single frame.
+    Each ``TXXX``, ``COMM``, ``WXXX`` and URL link frame value is
+    written as a separate frame; values of the form
+    "description=value" specify the frame's description. Unsupported
+    frames are skipped.
 
-        """
-        self.__log.call(filename, showinfo=showinfo)
+    """
+    frames = []
+    for (frame_id, values) in make_id3v2_tags(track_metadata).items():
+        if not values:
+            continue
 
-        label = "%02d (%s)" % (
-            len(self.__album_covers) + 1, os.path.basename(filename))
-        self.__album_covers[label] = filename
+        if not re.match(r"^[A-Z0-9]{4}$", frame_id):
+            _log.warning(
+                "skipping invalid ID3v2 frame %r = %r", frame_id, values)
+        elif frame_id in ["TXXX", "COMM", "WXXX"]:
+            for value in values:
+                (description, value) = (
+                    value.split('=', 1) if '=' in value else ("", value))
+                if frame_id == "WXXX":
+                    (encoding, codec, terminator) = _id3v2_text_encoding(
+                        version, description)
+                    value = value.encode("latin-1", errors="replace")
+                else:
+                    (encoding, codec, terminator) = _id3v2_text_encoding(
+                        version, description, value)
+                    value = value.encode(codec)
+                frames.append((
+                    frame_id,
+                    bytes([encoding])
+                        + (b"eng" if frame_id == "COMM" else b"")
+                        + description.encode(codec) + terminator
+                        + value))
+        elif frame_id[0] == 'T':
+            # ID3v2 spec calls for '/' separator, but iTunes only handles ','
+            # separator correctly
+            frames.append(
+                (frame_id, _make_id3v2_text_frame(", ".join(values), version)))
+        elif frame_id[0] == 'W':
+            for value in values:
+                frames.append(
+                    (frame_id, value.encode("latin-1", errors="replace")))
+        else:
+            _log.warning(
+                "skipping unsupported ID3v2 frame %s = %r", frame_id, values)
 
-        self.__metadata_editors["album_cover"]["menu"].add_command(
-            label=label,
-            command=
-                lambda self=self, label=label:
-                    self.choose_album_cover(label))
+    if track_metadata["album_cover"]:
+        frames.append(
+            ("APIC", _make_id3v2_apic_frame(track_metadata["album_cover"])))
 
-        if showinfo:
-            messagebox.showinfo(
-                "Cover image added",
-                "%r has been added to the list of available covers." % label)
+    return frames
 
-        self.__log.return_(label)
-        return label
 
-    @property
-    def is_save_cover_image(self):
-        return self.__metadata_editors["album_cover"].save_cover_var.get()
+def _id3v2_text_encoding(version, *texts):
+    """Choose the most compatible ID3v2 text encoding for *texts*.
 
-    def _create_album_custom_metadata_editor(self, parent):
-        """Create the UI editing controls for editing custom metadata
-        for *all* tracks.
+    :arg int version: the ID3v2 major version (3 or 4)
+    :arg texts: the strings that will share an encoding
+    :return:
+       a 3-tuple (ID3v2 encoding byte, Python codec name, string
+       terminator)
 
-        :arg parent: parent object of the editor
+    ISO-8859-1 is used if possible; otherwise UTF-16 (with BOM) for
+    ID3v2.3, or UTF-8 for ID3v2.4.
 
-        """
-        self.__log.call(parent)
+    """
+    try:
+        for text in texts:
+            text.encode("latin-1")
+    except UnicodeEncodeError:
+        return (3, "utf-8", b"\0") if version == 4 \
+            else (1, "utf-16", b"\0\0")
+    else:
+        return (0, "latin-1", b"\0")
 
-        album_custom_tagging_button = Button(
-            parent, name="album_custom_tagging_button",
-            text="Edit custom Vorbis/ID3v2 tagging for ALL tracks",
-            command=
-                lambda self=self:
-                    EditAlbumCustomMetadataTaggingDialog(
-                        parent, self.__aggregated_metadata,
-                        self.__aggregated_metadata["__tracks"],
-                        title=self.__metadata_editors["album_title"].var.get())
-        )
-        album_custom_tagging_button.grid(
-            row=self.__row, column=0, columnspan=3, padx=_PADX, pady=_PADY,
-            sticky=W+E)
 
-        self.__metadata_editors["album_custom"] = album_custom_tagging_button
+def _make_id3v2_text_frame(text, version):
+    """Serialize the data of an ID3v2 text information frame.
 
-        self.__row += 1
+    :arg str text: the frame's value
+    :arg int version: the ID3v2 major version (3 or 4)
+    :return: the frame data (without the frame header)
+    :rtype: :obj:`bytes`
 
-    def _create_track_control_editors(self, parent):
-        """Create the widgets used to navigate and include/exclude
-        individual tracks.
+    """
+    (encoding, codec, _) = _id3v2_text_encoding(version, text)
+    return bytes([encoding]) + text.encode(codec)
 
-        :arg parent:
-           parent object of the frames that contain the control widgets
 
-        """
-        self.__log.call(parent)
+def _make_id3v2_apic_frame(image_filename):
+    """Serialize the data of an ID3v2 ``APIC`` frame for a front cover
+    image.
 
-        Label(parent, text="Track").grid(
-            row=self.__row, column=0, padx=_PADX, pady=_PADY, sticky=E)
+    :arg str image_filename: absolute JPEG or PNG file name
+    :return: the frame data (without the frame header)
+    :rtype: :obj:`bytes`
 
-        nav_frame = Frame(parent, name="track_nav_frame")
+    """
+    with open(image_filename, "rb") as f:
+        image_data = f.read()
 
-        number_var = IntVar(name="track_number_var")
-        track_number = Spinbox(
-            nav_frame, name="track_number_spinbox",
-            from_=0, to=0, textvariable=number_var, width=3, wrap=True,
-            state="readonly", command=self._refresh_track_editors
-        )
-        track_number.var = number_var
-        track_number.pack(side=LEFT, padx=_PADX)
+    image_type = imghdr.what("_ignored_", h=image_data)
+    mime_type = ("image/%s" % (image_type or "jpeg")).encode()
 
-        of_label = Label(nav_frame, name="of_label", text="of")
-        of_label.pack(side=LEFT)
-        track_number.of_label = of_label
+    return (
+        b"\0" # ISO-8859-1 (empty) description
+        + mime_type + b"\0"
+        + bytes([3]) # front cover
+        + b"\0"
+        + image_data)
 
-        self.__metadata_editors["track_number"] = track_number
 
-        nav_frame.grid(row=self.__row, column=1, sticky=W)
+def _parse_id3v2_frame(frame_id, data):
+    """Deserialize the value of an ID3v2 text or URL link frame.
 
-        self.__row += 1
+    :arg str frame_id: the ID3v2 frame ID
+    :arg bytes data: the frame data (without the frame header)
+    :return:
+       the frame's value (as a "description=value" string for
+       ``TXXX``, ``COMM`` and ``WXXX`` frames), or ``None`` if
+       *frame_id* is not a text or URL link frame
 
-        include_label = Label(parent, text="Include").grid(
-            row=self.__row, column=0, padx=_PADX, pady=_PADY, sticky=E)
+    """
+    if not data:
+        return None
 
-        include_var = BooleanVar(name="track_include_var", value=True)
-        track_include = Checkbutton(
-            parent, name="track_include_checkbutton",
-            variable=include_var, onvalue=True, offvalue=False,
-            command=self.__update_track_include_state)
-        track_include.var = include_var
-        track_include.grid(row=self.__row, column=1, padx=_PADX, sticky=W)
+    if frame_id in ["TXXX", "COMM", "WXXX"]:
+        encoding = data[0]
+        data = data[4:] if frame_id == "COMM" else data[1:]
+        (description, data) = _split_id3v2_string(data, encoding)
+        value = (
+            data.decode("latin-1") if frame_id == "WXXX"
+            else _decode_id3v2_string(data, encoding))
+        return "%s=%s" % (description, value.rstrip('\0'))
+    elif frame_id[0] == 'T':
+        return _decode_id3v2_string(data[1:], data[0]).rstrip('\0')
+    elif frame_id[0] == 'W':
+        return data.decode("latin-1").rstrip('\0')
 
-        apply_include_button = _styled(
-            Button(
-                parent, name="track_include_apply_button",
-                text="Include all tracks",
-                command=lambda self=self:
-                    self.__apply_to_all_tracks(
-                        "track_include",
-                        self.__metadata_editors["track_include"].var.get())),
-            foreground="Blue")
-        apply_include_button.grid(
-            row=self.__row, column=2, padx=_PADX, sticky=W)
-        track_include.apply_button = apply_include_button
 
-        self.__metadata_editors["track_include"] = track_include
+def _decode_id3v2_string(data, encoding):
+    """Decode *data* using the ID3v2 text *encoding* (0 - 3)."""
+    codec = ["latin-1", "utf-16", "utf-16-be", "utf-8"][encoding & 0x3]
+    return data.decode(codec, errors="replace")
 
-        self.__row += 1
 
-    def _create_track_custom_metadata_editor(self, parent):
-        """Create the UI editing controls for editing custom metadata
-        for a single track.
+def _split_id3v2_string(data, encoding):
+    """Split a terminated string off the front of *data*.
 
-        :arg parent: parent object of the editor
+    :arg bytes data: ID3v2 frame data
+    :arg int encoding: the ID3v2 text encoding (0 - 3)
+    :return: a 2-tuple (decoded string, remaining data)
 
-        """
-        self.__log.call(parent)
+    """
+    terminator = b"\0\0" if encoding in [1, 2] else b"\0"
+    for i in range(0, len(data), len(terminator)):
+        if data[i:i + len(terminator)] == terminator:
+            return (
+                _decode_id3v2_string(data[:i], encoding),
+                data[i + len(terminator):])
 
-        track_custom_tagging_button = Button(
-            parent, name="track_custom_tagging_button",
-            text="Edit custom Vorbis/ID3v2 tagging for this track",
-            command=
-                lambda self=self:
-                    EditCustomMetadataTaggingDialog(
-                        parent,
-                        self.__aggregated_metadata["__tracks"][
-                            self.current_track_number],
-                        title="%d. %s" % (
-                            self.current_track_number,
-                            self.__track_vars[self.current_track_number][
-                                "track_title"].get()))
-        )
-        track_custom_tagging_button.grid(
-            row=self.__row, column=0, columnspan=3, padx=_PADX, pady=_PADY,
-            sticky=W+E)
+    return (_decode_id3v2_string(data, encoding), b"")
 
-        self.__metadata_editors["track_custom"] = track_custom_tagging_button
 
-        self.__row += 1
+def _id3v2_synchsafe(n):
+    """Encode *n* as a 4-byte ID3v2 "synchsafe" integer."""
+    return bytes((n >> shift) & 0x7f for shift in [21, 14, 7, 0])
 
-    @property
-    def current_track_number(self):
-        """The number of the track currently being edited."""
-        return self.__metadata_editors["track_number"].var.get()
 
-    def metadata_ready_for_editing(self, aggregated_metadata):
-        """(Re)Configure the entry/selection widgets with values from
-        *aggregated_metadata*.
+def _id3v2_unsynchsafe(data):
+    """Decode the 4-byte ID3v2 "synchsafe" integer *data*."""
+    n = 0
+    for byte in data:
+        n = (n << 7) | (byte & 0x7f)
 
-        :arg dict aggregated_metadata:
-           the aggregated metadata field values for the current album
-           and each of its tracks
+    return n
 
-        Separate variables will be created to store the entered/selected
-        values for each track.
 
-        """
-        self.__log.call(aggregated_metadata)
+def _serialize_id3v2_frames(frames, version):
+    """Serialize ID3v2 frames (including their headers).
 
-        self.reset()
+    :arg list frames: (frame ID, frame data) pairs
+    :arg int version: the ID3v2 major version (3 or 4)
+    :return: the serialized frames
+    :rtype: :obj:`bytes`
 
-        metadata_editors = self.__metadata_editors
+    """
+    buf = BytesIO()
+    for (frame_id, data) in frames:
+        buf.write(frame_id.encode("ascii"))
+        buf.write(
+            _id3v2_synchsafe(len(data)) if version == 4
+            else struct.pack(">I", len(data)))
+        buf.write(b"\0\0") # no flags
+        buf.write(data)
 
-        for album_field_name in [
-                "album_title",
-                "album_artist",
-                "album_label",
-                "album_genre",
-                "album_year",
-                ]:
-            widget = metadata_editors[album_field_name]
-            widget.configure(values=aggregated_metadata[album_field_name])
-            if aggregated_metadata[album_field_name]:
-                widget.current(0)
+    return buf.getvalue()
 
-        metadata_editors["album_discnumber"].var.set(
-            aggregated_metadata["album_discnumber"])
-        metadata_editors["album_disctotal"].var.set(
-            aggregated_metadata["album_disctotal"])
 
-        metadata_editors["album_compilation"].var.set(
-            aggregated_metadata["album_compilation"])
+def _read_id3v2_tag(f):
+    """Read the ID3v2 tag (if any) from the MP3 file object *f*.
 
-        album_cover_editor = metadata_editors["album_cover"]
-        album_cover_editor.config(state=DISABLED)
-        if aggregated_metadata["album_cover"]:
-            for filepath in aggregated_metadata["album_cover"]:
-                self.__add_album_cover_option(filepath, showinfo=False)
-            album_cover_editor.config(state=NORMAL)
+    :arg f: an MP3 file opened in binary mode and positioned at 0
+    :return:
+       a 3-tuple containing the tag's major version (or ``None`` if
+       there is no tag), the list of (frame ID, frame data) pairs, and
+       the file offset at which the audio frames begin
 
-        # issues/5
-        self._apply_naming_defaults()
-        for encoding in ["flac", "mp3"]:
-            for field_suffix in [
-                    "subroot_trie", "album_folder", "track_filename"]:
-                custom_key = "__%s_%s" % (encoding, field_suffix)
-                custom_spec = aggregated_metadata.get(custom_key)
-                if custom_spec is not None:
-                    metadata_editors[custom_key].var.set(custom_spec)
+    Frames are only parsed from unsynchronised-free ID3v2.3 and ID3v2.4
+    tags; compressed or encrypted frames are skipped.
 
-        # issues/5
-        self.__album_disctotal_observer_name = \
-            metadata_editors["album_disctotal"].var.trace(
-                'w', self._apply_naming_defaults)
+    """
+    header = f.read(10)
+    if len(header) != 10 or header[:3] != b"ID3":
+        return (None, [], 0)
 
-        self.__aggregated_metadata = deepcopy(aggregated_metadata)
+    (version, flags) = (header[3], header[5])
+    size = _id3v2_unsynchsafe(header[6:])
+    audio_offset = 10 + size + (10 if flags & 0x10 else 0) # footer
+    data = f.read(size)
 
-        self._initialize_track_vars()
+    frames = []
+    if version not in [3, 4] or flags & 0xc0:
+        _log.debug(
+            "not parsing frames of %s (ID3v2.%d, flags 0x%02x)",
+            getattr(f, "name", f), version, flags)
+        return (version, frames, audio_offset)
 
-        # if persisted data was restored, manually select the cover image so
-        # that it opens in Preview automatically
-        fm = self.master
-        if fm._persistence.restored and self.__album_covers:
-            self.choose_album_cover(list(self.__album_covers.keys())[0])
+    i = 0
+    while i + 10 <= len(data) and data[i] != 0: # stop at padding
+        frame_id = data[i:i + 4].decode("latin-1")
+        frame_size = (
+            _id3v2_unsynchsafe(data[i + 4:i + 8]) if version == 4
+            else struct.unpack_from(">I", data, i + 4)[0])
+        if not data[i + 9]: # no compression, encryption, etc.
+            frames.append((frame_id, data[i + 10:i + 10 + frame_size]))
+        i += 10 + frame_size
 
-    def pack(self, *args, **kwargs):
-        """Display the editor frame.
+    return (version, frames, audio_offset)
 
-        :arg tuple args: positional arguments to pack the editor frame
-        :arg dict kwargs: keyword argument to pack the editor frame
 
-        Showing the editor frame *enables* the **File | Save metadata**
-        menu command.
+def _write_id3v2_tag(mp3_filename, frames, version):
+    """Replace the ID3v2 tag of *mp3_filename*.
 
-        """
-        self.__log.call(*args, **kwargs)
-        super().pack(*args, **kwargs)
+    :arg str mp3_filename: absolute *.mp3* file name
+    :arg list frames:
+       (frame ID, frame data) pairs as produced by
+       :func:`_make_id3v2_frames`
+    :arg int version: the ID3v2 major version (3 or 4)
 
-        fm = self.master
+    All existing frames are replaced by *frames*, except for encoder
+    frames (see :data:`_ID3V2_PRESERVED_FRAMES`) that are not also
+    present in *frames*.
 
-        # Enable the "Save metadata" command in the File menu
-        file_menu = fm.nametowidget(".menubar.file_menu")
-        file_menu.entryconfig(0, state=NORMAL)
+    """
+    _log.call(mp3_filename, frames, version)
+
+    with open(mp3_filename, "rb") as f:
+        (old_version, old_frames, audio_offset) = _read_id3v2_tag(f)
+
+    frame_ids = set(frame_id for (frame_id, _) in frames)
+    preserved_frames = [
+        # (re-)serialize, since text encodings differ between versions
+        (frame_id, _make_id3v2_text_frame(
+            _parse_id3v2_frame(frame_id, data), version))
+        for (frame_id, data) in old_frames
+        if frame_id in _ID3V2_PRESERVED_FRAMES and frame_id not in frame_ids
+            and data]
+
+    frame_data = _serialize_id3v2_frames(preserved_frames + frames, version)
+
+    # 10 bytes for the tag header
+    available = audio_offset - 10
+    if old_version is not None and len(frame_data) <= available:
+        size = available
+        rewrite = False
+    else:
+        size = len(frame_data) + ID3V2_DEFAULT_PADDING
+        rewrite = True
 
-    def pack_forget(self):
-        """Hide the editor frame.
+    if size >= 1 << 28:
+        raise FLACManagerError(
+            "ID3v2 tag is too large (%d bytes)" % size,
+            context_hint="MP3 tagging")
+
+    tag = (
+        b"ID3" + bytes([version, 0, 0]) + _id3v2_synchsafe(size)
+        + frame_data + bytes(size - len(frame_data)))
+
+    if not rewrite:
+        with open(mp3_filename, "r+b") as f:
+            f.write(tag)
+        _log.debug(
+            "rewrote %d bytes of ID3v2 tag in place in %s",
+            len(tag), mp3_filename)
+    else:
+        _rewrite_file_head(mp3_filename, tag, audio_offset)
+        _log.info(
+            "ID3v2 frames did not fit in %d bytes; rewrote %s",
+            max(0, available), mp3_filename)
+
+
+def make_vorbis_comments(metadata):
+    """Create Vorbis comments for tagging from *metadata*.
 
-        Hiding the editor frame *disables* the **File | Save metadata**
-        menu command.
+    :arg dict metadata: the metadata for a single track
+    :return: Vorbis comment name/value pairs
+    :rtype: :obj:`dict`
 
-        """
-        self.__log.call()
-        super().pack_forget()
+    .. seealso::
 
-        fm = self.master
+       `Ogg Vorbis I format specification: comment field and header specification <https://xiph.org/vorbis/doc/v-comment.html>`_
+          The only (?) "official recommendation" for Vorbis comments
 
-        # Disable the "Save metadata" command in the File menu
-        file_menu = fm.nametowidget(".menubar.file_menu")
-        file_menu.entryconfig(0, state=DISABLED)
+       `Xiph Wiki: VorbisComment <https://wiki.xiph.org/VorbisComment>`_
+          a (very) basic metadata format
 
-    @property
-    def metadata_snapshot(self):
-        """The complete (album and tracks) metadata mapping as currently
-        represented by all editor widgets and variables.
+       `Xiph Wiki: Field_names <https://wiki.xiph.org/Field_names>`_
+          official (?) proposed updates to the VorbisComment recommendations
 
-        :rtype: :class:`collections.OrderedDict`
+       `Ogg Vorbis Comment Field Recommendations <http://age.hobba.nl/audio/mirroredpages/ogg-tagging.html>`_
+          Just a proposal, but linked directly from Xiph Wiki
 
-        """
-        self.__log.call()
+    """
+    _log.call(metadata)
 
-        metadata_editors = self.__metadata_editors
+    comments = _make_tagging_map("Vorbis", metadata)
 
-        snapshot = OrderedDict()
-        for album_field_name in [
-                "album_title",
-                "album_discnumber",
-                "album_disctotal",
-                "album_compilation",
-                "album_artist",
-                "album_label",
-                "album_genre",
-                "album_year",
-                ]:
-            snapshot[album_field_name] = \
-                metadata_editors[album_field_name].var.get()
+    # only use COMPILATION=1
+    if comments["COMPILATION"] == ['0']:
+        del comments["COMPILATION"]
 
-        # use the actual temp filename for the snapshot
-        snapshot["album_cover"] = \
-            self.__album_covers.get(metadata_editors["album_cover"].var.get())
+    # flac automatically includes a vendor string to identify itself
+    comments["ENCODER"] = [
+        "http://ninthtest.info/flac-mp3-audio-manager/ %s" % __version__]
 
-        track_vars = self.__track_vars
-        snapshot["album_tracktotal"] = len(track_vars) - 1
+    _log.return_(comments)
+    return comments
 
-        # for the metadata snapshot, the custom fields must be preserved at
-        # both the album and track level so that a disc whose persisted
-        # metadata is re-read will still have its custom metadata editable as
-        # expected
-        aggregated_metadata = self.__aggregated_metadata
-        snapshot["__custom"] = aggregated_metadata["__custom"].copy()
 
-        # issues/5
-        snapshot["__flac_subroot_trie"] = \
-            metadata_editors["__flac_subroot_trie"].var.get()
-        snapshot["__flac_album_folder"] = \
-            metadata_editors["__flac_album_folder"].var.get()
-        snapshot["__flac_track_filename"] = \
-            metadata_editors["__flac_track_filename"].var.get()
-        if self.__mp3_naming_same_as_flac_var.get():
-            snapshot["__mp3_subroot_trie"] = snapshot["__flac_subroot_trie"]
-            snapshot["__mp3_album_folder"] = snapshot["__flac_album_folder"]
-            snapshot["__mp3_track_filename"] = \
-                snapshot["__flac_track_filename"]
-        else:
-            snapshot["__mp3_subroot_trie"] = \
-                metadata_editors["__mp3_subroot_trie"].var.get()
-            snapshot["__mp3_album_folder"] = \
-                metadata_editors["__mp3_album_folder"].var.get()
-            snapshot["__mp3_track_filename"] = \
-                metadata_editors["__mp3_track_filename"].var.get()
+def make_id3v2_tags(metadata):
+    """Create ID3v2 frames for tagging from *metadata*.
 
-        snapshot["__tracks"] = [None]
-        for t in range(1, len(track_vars)):
-            track_metadata = OrderedDict()
+    :arg dict metadata: the metadata for a single track
+    :return: ID3v2 frame name/value pairs
+    :rtype: :obj:`dict`
 
-            track_metadata["track_number"] = t
-            for track_field_name in [
-                    "track_include",
-                    "track_title",
-                    "track_artist",
-                    "track_genre",
-                    "track_year",
-                    ]:
-                track_metadata[track_field_name] = \
-                    track_vars[t][track_field_name].get()
+    .. seealso::
 
-            track_metadata["__custom"] = \
-                aggregated_metadata["__tracks"][t]["__custom"].copy()
+       `ID3 tag version 2.3.0 <http://id3.org/id3v2.3.0>`_
+          The most compatible standard for ID3 tagging
 
-            snapshot["__tracks"].append(track_metadata)
+       http://id3.org/iTunes
+          ID3 tagging idiosyncracies in Apple iTunes
 
-        self.__log.return_(snapshot)
-        return snapshot
+       `MusicBrainz Picard <http://picard.musicbrainz.org/>`_
+          FLACManager does its best to get the tagging right the first
+          time, but Picard is a fantastic post-encoding fixer-upper.
 
-    @property
-    def flattened_metadata(self):
-        """The complete per-track metadata, including album metadata
-        values shared by all tracks.
+    """
+    _log.call(metadata)
 
-        :rtype: :obj:`list` of :class:`collections.OrderedDict`
+    tags = _make_tagging_map("ID3v2", metadata)
 
-        .. note::
-           The list returned by this property uses zero-based indexing.
-           (This differs from most other internal representations of
-           per-track metadata, which use 1-based indexing to maintain
-           consistency with respect to track numbers.)
+    # only use TCMP=1
+    if tags["TCMP"] == ['0']:
+        del tags["TCMP"]
 
-        """
-        self.__log.call()
+    # lame automatically includes TSSE to identify itself
+    tags["TENC"] = ["http://ninthtest.info/flac-mp3-audio-manager/"]
 
-        snapshot = self.metadata_snapshot
-        snapshot.pop("__custom") # already incorporated into each track
+    _log.return_(tags)
+    return tags
 
-        # to "flatten" the metadata, just add the album metadata to each track
-        flattened = snapshot.pop("__tracks")[1:]    # zero-based indexing here
-        for i in range(len(flattened)):
-            flattened[i].update(snapshot)
 
-        self.__log.return_(flattened)
-        return flattened
+def _make_tagging_map(type_, metadata):
+    """Create Vorbis comments or ID3v2 frames for tagging from
+    *metadata*.
 
-    def _initialize_track_vars(self):
-        """Create (and set the initial values of) variables for metadata
-        fields for each track.
+    :arg str type_:
+       "Vorbis" or "ID3v2" (corresponds to a tagging section in the
+       flacmanager.ini configuration file)
+    :arg dict metadata: the metadata for a single track
+    :return: Vorbis commen or ID3v2 frame name/value pairs
+    :rtype: :obj:`dict`
 
-        """
-        self.__log.call()
+    """
+    _log.call(metadata)
 
-        track_vars = self.__track_vars = [
-            None,   # track vars use 1-based indexing
-        ]
+    tags = get_tagging_template(type_, metadata).evaluate(metadata)
 
-        aggregated_tracks_metadata = self.__aggregated_metadata["__tracks"]
-        last_track = len(aggregated_tracks_metadata) - 1
-        # from_ will still be 0 here, and that's intended - it means that when
-        # we invoke "buttonup" for the first time, it will increment the track
-        # spinbox to 1, triggering a refresh of track 1's metadata
-        track_number_editor = self.__metadata_editors["track_number"]
-        track_number_editor.config(to=last_track)
-        track_number_editor.of_label.config(text="of %d" % last_track)
+    _log.return_(tags)
+    return tags
 
-        # tracks metadata also uses 1-based indexing
-        for t in range(1, len(aggregated_tracks_metadata)):
-            track_metadata = aggregated_tracks_metadata[t]
 
-            # first initialize the individual track vars...
-            varmap = {
-                "track_include": BooleanVar(
-                    name="track_%d_include" % t,
-                    value=track_metadata["track_include"]),
-            }
-            for field in [
-                    "title",
-                    "artist",
-                    "genre",
-                    "year",
-                    ]:
-                metadata_name = "track_%s" % field
-                varmap[metadata_name] = StringVar(
-                    name="track_%d_%s" % (t, field),
-                    value=track_metadata[metadata_name][0]
-                        if track_metadata[metadata_name] else "")
+#: Compiled :class:`TaggingTemplate` objects, keyed by tagging type and
+#: album metadata (see :func:`get_tagging_template`).
+_TAGGING_TEMPLATES = OrderedDict()
 
-            track_vars.append(varmap)
+#: Guards access to :data:`_TAGGING_TEMPLATES`.
+_TAGGING_TEMPLATES_LOCK = threading.Lock()
 
-            # ...then initialize the editors and editor vars by using the track
-            # spinbox to trigger refreshes (but make sure this method is called
-            # BEFORE the metadata editor is packed, otherwise the user will be
-            # very disoriented and confused)
-            track_number_editor.invoke("buttonup")
+#: The maximum number of compiled tagging templates to keep.
+TAGGING_TEMPLATES_CACHE_SIZE = 8
 
-        # now update the from_ to 1 and initialize the spinner to track #1 by
-        # "wrapping around"
-        track_number_editor.config(from_=1)
-        track_number_editor.invoke("buttonup")
 
-    def _refresh_track_editors(self):
-        """Populate track editors with metadata for the current track.
+def get_tagging_template(type_, metadata):
+    """Return the compiled tagging template for the album that a track
+    belongs to.
 
-        This method is called when navigating to another track. If
-        navigation is at either end of the track list already (i.e.
-        navigating down from track 1 or up from the last track), then
-        the spinner "wraps around."
+    :arg str type_: "Vorbis" or "ID3v2"
+    :arg dict metadata: the metadata for a single track
+    :rtype: :class:`TaggingTemplate`
 
-        """
-        self.__log.call()
+    A template is only compiled for the first track of an album; all
+    tracks that share the same album metadata reuse it.
 
-        track_number = self.current_track_number
-        track_vars = self.__track_vars[track_number]
-        track_metadata = self.__aggregated_metadata["__tracks"][track_number]
+    """
+    key = (type_, repr(sorted(
+        (name, value) for (name, value) in metadata.items()
+        if name.startswith("album_"))))
 
-        metadata_editors = self.__metadata_editors
-        metadata_editors["track_include"].var.set(
-            track_vars["track_include"].get())
-        self.__update_track_include_state()
-        for track_field_name in [
-                "track_title",
-                "track_artist",
-                "track_genre",
-                "track_year",
-                ]:
-            widget = metadata_editors[track_field_name]
-            widget.configure(
-                values=track_metadata[track_field_name],
-                textvariable=track_vars[track_field_name])
+    with _TAGGING_TEMPLATES_LOCK:
+        template = _TAGGING_TEMPLATES.get(key)
+        if template is not None:
+            _TAGGING_TEMPLATES.move_to_end(key)
+            return template
 
-    def __update_track_include_state(self):
-        """Update the widgets for the current track based on whether or
-        not it is included.
+    template = TaggingTemplate(type_, metadata)
 
-        """
-        self.__log.call()
+    with _TAGGING_TEMPLATES_LOCK:
+        _TAGGING_TEMPLATES[key] = template
+        while len(_TAGGING_TEMPLATES) > TAGGING_TEMPLATES_CACHE_SIZE:
+            _TAGGING_TEMPLATES.popitem(last=False)
 
-        track_number = self.current_track_number
-        track_include_editor = self.__metadata_editors["track_include"]
+    return template
 
-        track_included = track_include_editor.var.get()
-        self.__track_vars[track_number]["track_include"].set(track_included)
 
-        if track_included:
-            track_include_editor.apply_button.config(text="Include all tracks")
-            _styled(track_include_editor.apply_button, foreground="Blue")
-        else:
-            track_include_editor.apply_button.config(text="Exclude all tracks")
-            _styled(track_include_editor.apply_button, foreground="Red")
+@logged
+class TaggingTemplate:
+    """The ``[Vorbis]`` or ``[ID3v2]`` tagging map (and any custom
+    tagging) compiled for a single album.
 
-        if get_config()["UI"].getboolean("disable_editing_excluded_tracks"):
-            for track_field_name in [
-                    "track_title",
-                    "track_artist",
-                    "track_genre",
-                    "track_year",
-                    "track_custom",
-                    ]:
-                self.__metadata_editors[track_field_name].config(
-                    state=NORMAL if track_included else DISABLED)
+    Album fields (``album_*``) are bound when the template is compiled,
+    so evaluating the template for a track only formats the fields that
+    vary by track.
 
-    def reset(self):
-        """Populate widgets in their default/initial states."""
-        self.__log.call()
+    """
+
+    #: Used to parse format specifications.
+    _formatter = string.Formatter()
 
-        self._remove()
+    def __init__(self, type_, album_metadata):
+        """
+        :arg str type_:
+           "Vorbis" or "ID3v2" (corresponds to a tagging section in the
+           flacmanager.ini configuration file)
+        :arg dict album_metadata:
+           the metadata for any track of the album (only the
+           ``album_*`` fields are used)
 
-        metadata_editors = self.__metadata_editors
+        """
+        self.__log.call(type_, album_metadata)
 
-        # reset all track editor vars to default
-        # (the .var property of track editors serves as the default)
-        metadata_editors["track_include"].var.set(True)
-        for track_field_name in [
-                "track_title",
-                "track_artist",
-                "track_genre",
-                "track_year",
-                ]:
-            metadata_editors[track_field_name].configure(
-                textvariable=metadata_editors[track_field_name].var)
+        self.type_ = type_
+        self._album_metadata = dict(
+            (name, value) for (name, value) in album_metadata.items()
+            if name.startswith("album_"))
 
-        metadata_editors["album_discnumber"].var.set(0)
-        # issues/5
-        if self.__album_disctotal_observer_name is not None:
-            metadata_editors["album_disctotal"].var.trace_vdelete(
-                'w', self.__album_disctotal_observer_name)
-            self.__album_disctotal_observer_name = None
-        metadata_editors["album_disctotal"].var.set(0)
+        self._program = [
+            (tag, self._compile(spec, formatted=(spec[:1] == '{')))
+            for (tag, spec) in get_config()[type_].items()]
+        self._custom_specs = {}
 
-        metadata_editors["album_compilation"].var.set(False)
+    def evaluate(self, metadata):
+        """Create the tagging map for a single track.
 
-        for field_name in [
-                "album_title",
-                "album_artist",
-                "album_label",
-                "album_genre",
-                "album_year",
-                "track_title",
-                "track_artist",
-                "track_genre",
-                "track_year",
-                ]:
-            widget = metadata_editors[field_name]
-            widget.configure(values=[])
-            widget.var.set("")
+        :arg dict metadata: the metadata for a single track
+        :return: Vorbis comment or ID3v2 frame name/value pairs
+        :rtype: :class:`collections.OrderedDict`
 
-        album_cover_editor = metadata_editors["album_cover"]
-        album_cover_editor["menu"].delete(0, END)
-        album_cover_editor.var.set("")
-        album_cover_editor.config(state=DISABLED)
+        """
+        tags = OrderedDict()
+        for (tag, evaluate) in self._program:
+            value = evaluate(metadata)
 
-        album_cover_editor.save_cover_var.set(
-            get_config().getboolean("Organize", "save_cover_image"))
+            # only include truthy values
+            if value:
+                tags[tag] = value if type(value) is list else [value]
 
-        track_number_editor = metadata_editors["track_number"]
-        track_number_editor.config(from_=0, to=0)
-        track_number_editor.var.set(0)
+        _update_custom_tagging(tags, self, metadata)
 
-        track_include_editor = metadata_editors["track_include"]
-        # tracks are always included by default
-        track_include_editor.var.set(True)
-        track_include_editor.apply_button.config(text="Include all tracks")
-        _styled(track_include_editor.apply_button, foreground="Blue")
+        return tags
 
-        # issues/5
-        self._apply_naming_defaults()
-        self.__mp3_naming_same_as_flac_var.set(True)
+    def evaluate_spec(self, spec, metadata):
+        """Format a custom tagging value for a single track.
 
-        # finally clear all cached data
-        self.__aggregated_metadata = None
-        self.__album_covers = OrderedDict()
-        self.__track_vars = None
+        :arg str spec: a format specification
+        :arg dict metadata: the metadata for a single track
+        :return: the formatted value
+        :rtype: :obj:`str`
 
-    def _remove(self):
-        """Remove widgets from the current layout."""
-        self.__log.call()
+        """
+        evaluate = self._custom_specs.get(spec)
+        if evaluate is None:
+            evaluate = self._custom_specs[spec] = self._compile(spec)
 
-        # entry widgets are NOT removed - just the editor frame itself
-        self.pack_forget()
+        return evaluate(metadata)
 
+    def _compile(self, spec, formatted=True):
+        """Compile a single tagging specification.
 
-@logged
-class _FMEncodingStatusFrame(LabelFrame):
-    """The encoding status (monitoring) frame for FLACManager."""
+        :arg str spec: a format specification or a metadata key
+        :keyword bool formatted:
+           ``False`` if *spec* is a (direct lookup) metadata key
+        :return:
+           a function that accepts a track's metadata and returns the
+           tagging value
 
-    def __init__(self, *args, **options):
         """
-        :arg tuple args: positional arguments to initialize the frame
-        :arg dict options: ``config`` options to initialize the frame
+        if not formatted:
+            if spec in self._album_metadata:
+                value = self._album_metadata[spec]
+                return lambda metadata: value
+            return lambda metadata: metadata[spec]
+
+        escape = lambda s: s.replace('{', "{{").replace('}', "}}")
+        pieces = []
+        track_dependent = False
+        for (literal, field_name, format_spec, conversion) in \
+                self._formatter.parse(spec):
+            pieces.append(escape(literal))
+            if field_name is None:
+                continue
 
-        """
-        self.__log.call(*args, **options)
-        super().__init__(*args, **options)
+            name = re.match(r"[^.\[]*", field_name).group()
+            if name in self._album_metadata and '{' not in format_spec:
+                (value, _) = self._formatter.get_field(
+                    field_name, (), self._album_metadata)
+                value = self._formatter.convert_field(value, conversion)
+                pieces.append(
+                    escape(self._formatter.format_field(value, format_spec)))
+            else:
+                track_dependent = True
+                pieces.append(
+                    "{%s%s%s}" % (
+                        field_name,
+                        '!' + conversion if conversion else "",
+                        ':' + format_spec if format_spec else ""))
 
-        list_frame = Frame(self)
+        program = "".join(pieces)
+        if not track_dependent:
+            value = program.format()
+            return lambda metadata: value
 
-        vscrollbar = Scrollbar(list_frame, orient=VERTICAL)
-        vscrollbar.pack(side=RIGHT, fill=Y, padx=0, pady=0)
+        return program.format_map
 
-        self._track_encoding_status_list = Listbox(
-            list_frame, name="track_encoding_status_listbox",
-            exportselection=NO, activestyle=NONE, selectmode=SINGLE,
-            borderwidth=0, yscrollcommand=vscrollbar.set)
-        self._track_encoding_status_list.pack(fill=BOTH, padx=0, pady=0)
 
-        vscrollbar.config(command=self._track_encoding_status_list.yview)
+def _update_custom_tagging(tags, template, metadata):
+    """Update *tags* with any custom Vorbis comments or ID3v2 tags from
+    *metadata["__custom"]* (if defined).
 
-        list_frame.pack(fill=BOTH, padx=_PADX, pady=_PADY)
+    :arg dict tags: the tagging map for a track
+    :arg TaggingTemplate template:
+       the compiled tagging template for the track's album
+    :arg dict metadata: the metadata for a single track
 
-    def ready_to_encode(self, per_track_metadata):
-        """(Re)Initialize the encoding status list to monitor encoding
-        of tracks from *per_track_metadata*.
+    *tags* is updated in place.
+    
+    .. note::
+       Custom tags with the same name as a preconfigured tag will
+       **replace** the preconfigured tag.
 
-        :arg list per_track_metadata:
-           metadata field mappings for each track
+    """
+    _log.call(metadata)
 
-        """
-        track_encoding_statuses = [
-            TrackEncodingStatus(
-                "{track_number:02d} {track_title}".format(**track_metadata),
-                pending=track_metadata["track_include"])
-            for track_metadata in per_track_metadata]
+    type_ = template.type_
+    if "__custom" in metadata:
+        custom_tagpairs = []
+        for ((vorbis_comment, id3v2_tag), values) \
+                in metadata["__custom"].items():
+            if type_ == "Vorbis" and vorbis_comment:
+                custom_tagpairs.append((vorbis_comment, values))
+            elif type_ == "ID3v2" and id3v2_tag:
+                custom_tagpairs.append((id3v2_tag, values))
+            else:
+                _log.warning(
+                    "skipping custom (%r, %r) = %r",
+                    vorbis_comment, id3v2_tag, values)
 
-        # determine how many tracks are visible at once
-        number_of_tracks = len(per_track_metadata)
-        max_visible_tracks = get_config()["UI"].getint(
-            "encoding_max_visible_tracks")
-        visible_tracks = (
-            number_of_tracks if number_of_tracks < max_visible_tracks
-            else max_visible_tracks)
+        _log.debug(
+            "custom tag pairs (before formatting):\n%r", custom_tagpairs)
 
-        items_spec = StringVar(
-            value=' '.join(
-                "{%s}" % track_encoding_status.describe()
-                for track_encoding_status in track_encoding_statuses))
-        self._track_encoding_status_list.configure(
-            height=visible_tracks, listvariable=items_spec)
+        custom_tags = OrderedDict()
+        for (tag, values) in custom_tagpairs:
+            # custom values are always formatted, but only keep if non-empty
+            values = [
+                value for value in (
+                    template.evaluate_spec(spec, metadata) for spec in values)
+                if value]
 
-        for i in range(number_of_tracks):
-            if not per_track_metadata[i]["track_include"]:
-                self._track_encoding_status_list.itemconfig(i, {"fg": "gray79"})
+            if values:
+                if tag not in custom_tags:
+                    custom_tags[tag] = values
+                else:
+                    custom_tags[tag].extend(values)
 
-        self._track_encoding_statuses = track_encoding_statuses
+                _log.debug("custom %s %s = %r", type_, tag, custom_tags[tag])
+            else:
+                _log.warning(
+                    "custom %s %s evaluated to an empty list", type_, tag)
 
-    def encoding_in_progress(self):
-        """Update the UI as tracks are ripped."""
-        # don't log entry into this method - it is called repeatedly until all
-        # tracks are ripped
-        try:
-            (priority, status) = _ENCODING_QUEUE.get_nowait()
-        except queue.Empty:
-            self.after(QUEUE_GET_NOWAIT_AFTER, self.encoding_in_progress)
-        else:
-            _ENCODING_QUEUE.task_done()
-            self.__log.debug("dequeued %r", status)
+        if custom_tags:
+            _log.info("updating tagging map with %r", custom_tags)
+            tags.update(custom_tags)
 
-            (track_index, cdda_fn, flac_fn, stdout_fn, target_state) = status
-            if target_state == "FINISHED":
-                # all tracks have been processed
-                while _ENCODING_QUEUE.qsize() > 0:
-                    try:
-                        self.__log.debug(
-                            "finished; discarding %r",
-                            _ENCODING_QUEUE.get_nowait())
-                    except queue.Empty:
-                        break
-                    else:
-                        _ENCODING_QUEUE.task_done()
 
-                fm = self.master
-                fm._disc_frame.rip_and_tag_finished()
-                fm.bell()
+def prepare_encoder(
+        source_filenames, per_track_metadata, save_cover_image=True,
+        status_queue=None):
+    """Initialize a :class:`FLACEncoder` with instructions to encode
+    each **included** track from *per_track_metadata*.
+
+    :arg list source_filenames:
+       absolute CD-DA (or other ``flac``-readable audio) file names
+       and/or :obj:`TrackSource` items, in track order
+    :arg list per_track_metadata: metadata mappings for each track
+    :keyword bool save_cover_image:
+       whether or not to save the cover image in the album folders
+       (subject to the ``save_cover_image`` options)
+    :keyword queue.Queue status_queue:
+       where (priority, status) encoding updates are reported (default
+       :data:`_ENCODING_QUEUE`)
+    :return:
+       an initialized :class:`FLACEncoder`, ready to execute the
+       encoding instructions in a separate thread
 
-                self.__log.trace("exit the monitoring loop")
-                return False
+    """
+    _log.call(
+        source_filenames, per_track_metadata,
+        save_cover_image=save_cover_image, status_queue=status_queue)
+
+    (flac_library_root, mp3_library_root) = _resolve_library_roots()
+
+    staging_roots = _resolve_staging_roots()
+    if staging_roots is not None:
+        # flac and lame write to the (local) staging folders, and the
+        # publisher copies the finished files into the library folders
+        publisher = LibraryPublisher(
+            staging_roots, [flac_library_root, mp3_library_root],
+            status_queue=status_queue)
+        (flac_library_root, mp3_library_root) = staging_roots
+    else:
+        publisher = None
+
+    # the full-resolution cover is only ever saved as cover.jpg/png; every
+    # track embeds the same (smaller) image, which is prepared only once
+    album_cover = per_track_metadata[0]["album_cover"]
+    embedded_cover = (
+        make_embedded_cover_image(album_cover) if album_cover else None)
+
+    # all file names are planned (and checked for collisions) up front
+    planner = AlbumPathPlanner(flac_library_root, mp3_library_root)
+    plan = planner.plan(per_track_metadata)
+    planner.make_dirs(plan)
+
+    encoder = FLACEncoder(publisher=publisher, status_queue=status_queue)
+    flac_cover_image_saved = False
+    mp3_cover_image_saved = False
+    cover_dirnames = []
+    for (i, track_metadata) in enumerate(per_track_metadata):
+        if not track_metadata["track_include"]:
+            continue
 
-            track_encoding_status = self._track_encoding_statuses[track_index]
+        cdda_filename = source_filenames[i]
+        (flac_filename, mp3_filename) = plan[i]
+
+        flac_dirname = os.path.dirname(flac_filename)
+        if (save_cover_image
+                and get_config().getboolean("FLAC", "save_cover_image")
+                and album_cover
+                and (not flac_cover_image_saved)):
+            flac_cover_image_saved = _save_cover_image(
+                flac_dirname, album_cover)
+            if flac_cover_image_saved:
+                cover_dirnames.append(flac_dirname)
+
+        mp3_dirname = os.path.dirname(mp3_filename)
+        if (save_cover_image
+                and get_config().getboolean("MP3", "save_cover_image")
+                and album_cover
+                and (not mp3_cover_image_saved)):
+            mp3_cover_image_saved = _save_cover_image(
+                mp3_dirname, album_cover)
+            if mp3_cover_image_saved:
+                cover_dirnames.append(mp3_dirname)
+
+        track_metadata["album_cover"] = embedded_cover
+
+        encoder.add_instruction(
+            i, cdda_filename, flac_filename, mp3_filename, track_metadata)
+
+        _log.info(
+            "prepared encoding instruction:\n%s\n-> %s\n-> %s",
+            cdda_filename, flac_filename, mp3_filename)
+
+    if publisher is not None:
+        for dirname in cover_dirnames:
+            publisher.publish([
+                os.path.join(dirname, cover_basename)
+                for cover_basename in ["cover.jpg", "cover.png"]
+                if os.path.isfile(os.path.join(dirname, cover_basename))])
+
+    _log.return_(encoder)
+    return encoder
 
-            # only process "expected" state transitions
-            if track_encoding_status.transition_to(target_state):
-                if track_encoding_status.state == TRACK_FAILED:
-                    status_message = track_encoding_status.describe(
-                        message="%s: %s" %
-                            (target_state.__class__.__name__, target_state)
-                        if isinstance(target_state, Exception) else None)
-                    item_config = {"fg": "red"}
-                elif track_encoding_status.state == TRACK_ENCODING_FLAC:
-                    # ensure that the currently-ripping track is always visible
-                    self._track_encoding_status_list.see(track_index)
-                    # read encoding interval status from flac's stdout
-                    cdda_basename = os.path.basename(cdda_fn)
-                    stdout_message = self._read_current_status(
-                        cdda_basename, stdout_fn)
-                    status_message = track_encoding_status.describe(
-                        message=stdout_message if stdout_message else None)
-                    item_config = {"fg": "blue"}
-                elif (track_encoding_status.state in [
-                            TRACK_DECODING_WAV,
-                            TRACK_ENCODING_MP3]
-                        or track_encoding_status.state.key ==
-                            "REENCODING_MP3"):
-                    status_message = track_encoding_status.describe()
-                    item_config = {"fg": "dark violet"}
-                elif track_encoding_status.state == TRACK_COMPLETE:
-                    status_message = flac_fn
-                    item_config = {"fg": "dark green"}
-                else:   # unexpected state
-                    status_message = "%s (unexpected target state %s)" % (
-                        track_encoding_status.describe(), target_state)
-                    item_config = {"fg": "red"}
 
-                self._track_encoding_status_list.delete(track_index)
-                self._track_encoding_status_list.insert(
-                    track_index, status_message)
-                self._track_encoding_status_list.itemconfig(
-                    track_index, item_config)
+#: Used to pass data between a :class:`FLACEncoder` thread and the main
+#: thread.
+_ENCODING_QUEUE = queue.PriorityQueue()
+
+#: The number of seconds to wait between enqueuing a FLAC encoding
+#: status.
+FLAC_ENCODING_STATUS_WAIT = 1.25
+
+
+@logged
+class FLACEncoder(threading.Thread):
+    """A thread that rips CD-DA tracks to FLAC."""
+
+    def __init__(self, publisher=None, status_queue=None):
+        """
+        :keyword LibraryPublisher publisher:
+           if specified, the FLAC and MP3 file names are in the staging
+           folders, and *publisher* moves each track's finished files
+           into the library folders
+        :keyword queue.Queue status_queue:
+           where (priority, status) encoding updates are reported
+           (default :data:`_ENCODING_QUEUE`, which is monitored by the
+           UI)
+
+        ``FLACEncoder`` threads are daemonized so that they are
+        killed automatically if the program exits.
+
+        """
+        self.__log.call(publisher=publisher, status_queue=status_queue)
+        super().__init__(daemon=True)
+
+        self._publisher = publisher
+        self._status_queue = (
+            status_queue if status_queue is not None else _ENCODING_QUEUE)
+        self._instructions = []
+
+    def add_instruction(
+            self, track_index, cdda_filename, flac_filename, mp3_filename,
+            track_metadata):
+        """Schedule a track for FLAC encoding.
+
+        :arg int track_index: index (not ordinal) of the track
+        :arg str cdda_filename: absolute CD-DA file name
+        :arg str flac_filename: absolute *.flac* file name
+        :arg str mp3_filename: absolute *.mp3* file name
+        :arg dict track_metadata: tagging fields for this track
+
+        """
+        self.__log.call(
+            track_index, cdda_filename, flac_filename, mp3_filename,
+            track_metadata)
 
-                # ensure that last track is always visible after delete/insert
-                if (track_index ==
-                        self._track_encoding_status_list.index(END) - 1):
-                    self._track_encoding_status_list.see(track_index)
+        self._instructions.append(
+            (track_index, cdda_filename, flac_filename, mp3_filename,
+                track_metadata))
 
-            self.after(QUEUE_GET_NOWAIT_AFTER, self.encoding_in_progress)
+    def run(self):
+        """Rip CD-DA tracks to FLAC."""
+        self.__log.call()
 
-            return True
+        if self._publisher is not None:
+            self._publisher.start()
 
-    def _read_current_status(self, cdda_basename, stdout_fn):
-        """Extract the most recent FLAC encoding update from
-        *stdout_fn*.
+        mp3_encoder_threads = []
+        for (index, cdda_fn, flac_fn, mp3_fn, metadata) in self._instructions:
+            stdout_fn = make_tempfile(suffix=".out")
 
-        :arg str cdda_basename: a grep pattern for *stdout_fn*
-        :arg str stdout_fn:
-           filename to which stdout has been redirected
-        :return: a line of update text from *stdout_fn*
-        :rtype: :obj:`str`
+            # the FLAC encoding must block because it needs exclusive access to
+            # the drive; so run the status updates in a separate thread
+            status_interval_thread = threading.Thread(
+                target=self._enqueue_status_interval,
+                args=(index, cdda_fn, flac_fn, stdout_fn),
+                daemon=True)
+            status_interval_thread.start()
 
-        """
-        # do not trace; called from a recursive method
-        status_line = None
-        prefix = "%s: " % cdda_basename
-        with open(stdout_fn, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith(prefix):
-                    # remove the prefix, then split on ASCII BS (Backspace) and
-                    # take the last component
-                    #
-                    # output line looks like this:
-                    #   ${prefix}${status1}(BS)+${status2}(BS)+..${statusN}
-                    status_line = line.replace(prefix, "").split('\x08')[-1]
-        return status_line
+            flac_encoding_error = None
+            try:
+                encode_flac(
+                    cdda_fn, flac_fn, metadata, stdout_filename=stdout_fn)
+            except Exception as e:
+                self.__log.exception("FLAC encoding failed")
+                flac_encoding_error = e
 
-    def reset(self):
-        """Populate widgets in their default/initial states."""
-        self.__log.call()
+            # touch the done file; see _enqueue_status_interval
+            open("%s.done" % stdout_fn, 'w').close()
 
-        self._remove()
+            # block until the status updates thread exits
+            status_interval_thread.join()
 
-        self._track_encoding_status_list.delete(0, END)
-        self._track_encoding_status_list.configure(listvariable=None, height=0)
+            if flac_encoding_error is None:
+                # run the MP3 encoding in a separate thread so we can move on
+                # to the next CD-DA -> FLAC encoding; the MP3 encoder will
+                # enqueue the "TRACK_COMPLETE" state when it's finished
+                mp3_encoder = MP3Encoder(
+                    index, cdda_fn, flac_fn, mp3_fn, stdout_fn, metadata,
+                    publisher=self._publisher,
+                    status_queue=self._status_queue)
+                mp3_encoder.start()
+                mp3_encoder_threads.append(mp3_encoder)
+            else:
+                status = (
+                    index, cdda_fn, flac_fn, stdout_fn, flac_encoding_error)
+                self.__log.error("enqueueing %r", status)
+                self._status_queue.put((2, status))
 
-        self._track_encoding_statuses = None
+        # make sure all MP3 encoders are done before enqueueing "FINISHED"
+        for mp3_encoder_thread in mp3_encoder_threads:
+            mp3_encoder_thread.join()
 
-    def _remove(self):
-        """Remove widgets from the current layout."""
-        self.__log.call()
+        # ... and that all files have been moved into the library
+        if self._publisher is not None:
+            self._publisher.finish()
+            self._publisher.join()
 
-        # widgets are NOT removed - just the frame itself
-        self.pack_forget()
+        status = (index, cdda_fn, flac_fn, stdout_fn, "FINISHED")
+        self.__log.info("enqueueing %r", status)
+        self._status_queue.put((13, status))
 
+        # do not terminate until "FINISHED" status has been processed
+        self._status_queue.join()
 
-@total_ordering
-class TrackState:
-    """Represents the state of a single track at any given time during
-    the rip-and-tag operation.
+        self.__log.info("thread is exiting")
 
-    """
+    def _enqueue_status_interval(
+            self, track_index, cdda_filename, flac_filename,
+            stdout_filename=None):
+        """Enqueue a status update notification on an interval.
 
-    def __init__(self, ordinal, key, text):
-        """
-        :arg int ordinal: this state's relative value
-        :arg str key: uniquely identifies this state
-        :arg str text: a short description of this state
+        :arg int track_index: index (**not** ordinal) of the track
+        :arg str cdda_filename: absolute CD-DA file name
+        :arg str flac_filename: absolute .flac file name
+        :keyword str stdout_filename:
+           absolute file name for redirected stdout
+
+        .. note::
+           This method is run in a separate thread (see :meth:`run`).
 
         """
-        self._ordinal = ordinal
-        self._key = key
-        self._text = text
+        # enqueueing this status causes UI to read latest status line from the
+        # stdout file
+        status = (
+            track_index, cdda_filename, flac_filename, stdout_filename,
+            TRACK_ENCODING_FLAC)
 
-    @property
-    def key(self):
-        """The unique identifier for this state."""
-        return self._key
+        # when the FLAC encoding is complete, this file will be created whether
+        # an error occurred or not
+        done_filename = "%s.done" % stdout_filename
 
-    @property
-    def text(self):
-        """The track-independent short description of this state."""
-        return self._text
+        self.__log.info(
+            "enqueueing %r every %s seconds...",
+            status, FLAC_ENCODING_STATUS_WAIT)
 
-    def __int__(self):
-        """Return the relative (ordinal) value of this state."""
-        return self._ordinal
+        # as long as the ".done" file doesn't exist, keep telling the UI to
+        # read a status update from the stdout file
+        exists = os.path.isfile
+        while not exists(done_filename):
+            self._status_queue.put((7, status))
+            time.sleep(FLAC_ENCODING_STATUS_WAIT)
 
-    def __str__(self):
-        """Return the unique identifier for this state."""
-        return self._key
 
-    def __repr__(self):
-        """Return a string that is unique for this track state."""
-        return "%s(%d, %r, %r)" % (
-            self.__class__.__name__, self._ordinal, self._key, self._text)
+@logged
+class MP3Encoder(threading.Thread):
+    """A thread that converts WAV files to MP3 files."""
 
-    def __lt__(self, other):
-        """Return ``True`` if this state's ordinal value is less than
-        *other* state's ordinal value, otherwise ``False``.
+    def __init__(
+            self, track_index, cdda_filename, flac_filename, mp3_filename,
+            stdout_filename, track_metadata, publisher=None,
+            status_queue=None):
+        """
+        :arg int track_index: index (not ordinal) of the track
+        :arg str cdda_filename: absolute CD-DA file name
+        :arg str flac_filename: absolute *.flac* file name
+        :arg str stdout_filename:
+           absolute file name for redirected stdout
+        :arg dict track_metadata: tagging fields for this track
+        :keyword LibraryPublisher publisher:
+           if specified, the finished FLAC and MP3 files are handed off
+           to *publisher* to be moved into the library folders
+        :keyword queue.Queue status_queue:
+           where (priority, status) encoding updates are reported
+           (default :data:`_ENCODING_QUEUE`)
 
-        :arg flacmanager.TrackState other: the state being compared
+        ``MP3Encoder`` threads are daemonized so that they are killed
+        automatically if the program exits.
 
         """
-        return int(self) < int(other)
+        self.__log.call(
+            track_index, cdda_filename, flac_filename, mp3_filename,
+            stdout_filename, track_metadata, publisher=publisher,
+            status_queue=status_queue)
 
-    def __eq__(self, other):
-        """Return ``True`` if this state's ordinal value and key are
-        equal to *other* state's ordinal value and key, otherwise
-        ``False``.
+        super().__init__(daemon=True)
 
-        :arg flacmanager.TrackState other: the state being compared
+        self.track_index = track_index
+        self.cdda_filename = cdda_filename
+        self.flac_filename = flac_filename
+        self.mp3_filename = mp3_filename
+        self.stdout_filename = stdout_filename
+        self.track_metadata = track_metadata
+        self.publisher = publisher
+        self.status_queue = (
+            status_queue if status_queue is not None else _ENCODING_QUEUE)
+
+    def run(self):
+        """Decode FLAC to WAV, then encode WAV to MP3."""
+        self.__log.call()
+
+        flac_basename = os.path.basename(self.flac_filename)
+        wav_tempdir = TemporaryDirectory(prefix="fm")
+        wav_basename = os.path.splitext(flac_basename)[0] + ".wav"
+        wav_filename = os.path.join(wav_tempdir.name, wav_basename)
+
+        # make sure the UI gets a status update for decoding FLAC to WAV
+        status = (
+            self.track_index, self.cdda_filename, self.flac_filename,
+            self.stdout_filename, TRACK_DECODING_WAV)
+        self.__log.info("enqueueing %r", status)
+        self.status_queue.put((3, status))
+
+        try:
+            decode_wav(
+                self.flac_filename, wav_filename,
+                stdout_filename=self.stdout_filename)
+        except Exception as e:
+            self.__log.exception("WAV decoding failed")
+            del wav_tempdir
+            self._publish_flac_only()
+            status = (
+                self.track_index, self.cdda_filename, self.flac_filename,
+                self.stdout_filename, e)
+            self.__log.error("enqueueing %r", status)
+            self.status_queue.put((2, status))
+            return
+
+        # make sure the UI gets a status update for encoding WAV to MP3
+        status = (
+            self.track_index, self.cdda_filename, self.flac_filename,
+            self.stdout_filename, TRACK_ENCODING_MP3)
+        self.__log.info("enqueueing %r", status)
+        self.status_queue.put((5, status))
+
+        try:
+            self._encode_mp3(wav_filename)
+        except Exception as e:
+            self.__log.exception("MP3 encoding failed")
+            self._publish_flac_only()
+            status = (
+                self.track_index, self.cdda_filename, self.flac_filename,
+                self.stdout_filename, e)
+            self.__log.error("enqueueing %r", status)
+            self.status_queue.put((2, status))
+        else:
+            if self.publisher is not None:
+                # the publisher will enqueue the "TRACK_COMPLETE" state when
+                # the files have been moved into the library
+                self.publisher.publish(
+                    [self.flac_filename, self.mp3_filename],
+                    status=(
+                        self.track_index, self.cdda_filename,
+                        self.flac_filename, self.stdout_filename))
+            else:
+                status = (
+                    self.track_index, self.cdda_filename, self.flac_filename,
+                    self.stdout_filename, TRACK_COMPLETE)
+                self.__log.info("enqueueing %r", status)
+                self.status_queue.put((11, status))
+        finally:
+            del wav_tempdir
+
+    def _publish_flac_only(self):
+        """Move a (successfully encoded) staged FLAC file into the
+        library even though the MP3 encoding failed.
 
         """
-        return (
-            isinstance(other, self.__class__)
-            and self._ordinal == other._ordinal
-            and self._key == other._key)
+        if self.publisher is not None:
+            self.publisher.publish([self.flac_filename])
 
-    def __hash__(self):
-        return hash(repr(self))
+    def _encode_mp3(self, wav_filename):
+        """Encode *wav_filename* to MP3 format.
 
+        :arg str wav_filename:
+           absolute path to a (temporary) WAV file
 
-#: Indicates that a track is excluded from the rip-and-tag operation.
-TRACK_EXCLUDED = TrackState(-1, "EXCLUDED", "excluded")
+        If clipping is detected in the encoded MP3 file, *wav_filename*
+        will be **re-encoded** with scaled PCM data until there is no
+        clipping detected.
+
+        """
+        def rescaling(scale):
+            status = (
+                self.track_index, self.cdda_filename, self.flac_filename,
+                self.stdout_filename, TRACK_REENCODING_MP3(scale))
+            self.status_queue.put((5, status))
 
-#: Indicates that the rip-and-tag process has not yet begun for a track.
-TRACK_PENDING = TrackState(0, "PENDING", "pending\u2026")
+        encode_mp3_without_clipping(
+            wav_filename, self.mp3_filename, self.track_metadata,
+            self.stdout_filename, rescaling=rescaling)
 
-#: Indicates that a track is being encoded from CDDA to FLAC format.
-TRACK_ENCODING_FLAC = TrackState(
-    1, "ENCODING_FLAC", "encoding CDDA to FLAC\u2026")
 
-#: Indicates that a track is being decoded from FLAC to WAV format.
-TRACK_DECODING_WAV = TrackState(
-    2, "DECODING_WAV", "decoding FLAC to WAV\u2026")
+#: The number of times that a :class:`LibraryPublisher` retries a failed
+#: copy into the library.
+PUBLISH_RETRIES = 3
 
-#: Indicates that a track is being encoded from WAV to MP3 format.
-TRACK_ENCODING_MP3 = TrackState(3, "ENCODING_MP3", "encoding WAV to MP3\u2026")
+#: The number of seconds to wait before retrying a failed copy.
+PUBLISH_RETRY_WAIT = 5
 
-#: Indicates that a track is being re-encoded from WAV to MP3 format
-#: after clipping was detected in a prior encoding operation.
-TRACK_REENCODING_MP3 = partial(
-    lambda scale: TrackState(
-        4, "REENCODING_MP3",
-        "re-encoding MP3 at {:.2f} scale (clipping detected)\u2026".
-            format(scale)))
+#: The buffer size (in bytes) used to copy staged files into the library
+#: when the data cannot be copied by the kernel.
+PUBLISH_BUFFER_SIZE = 8 << 20
 
-#: Indicates that an error occurred while processing a track.
-TRACK_FAILED = TrackState(99, "FAILED", "failed")
 
-#: Indicates that the rip-and-tag process has finished for a track.
-TRACK_COMPLETE = TrackState(99, "COMPLETE", "complete")
+@logged
+class LibraryPublisher(threading.Thread):
+    """A thread that moves finished files from the (local) staging
+    folders into the library folders.
 
+    Staging decouples the drive and the encoders from the speed of the
+    library's storage (e.g. external or network media): ``flac`` and
+    ``lame`` write to local disk, and the files are copied into the
+    library in the background.
 
-@logged
-class TrackEncodingStatus:
-    """A simple state machine for a single track's encoding status."""
+    """
 
-    def __init__(self, track_label, pending=True):
+    def __init__(self, staging_roots, library_roots, status_queue=None):
         """
-        :arg str track_label: the track's display label
-        :keyword bool pending:
-           the default ``True`` initializes status as
-           :data:`TRACK_PENDING`; set to ``False`` to initialize status
-           as :data:`TRACK_EXCLUDED`
+        :arg list staging_roots:
+           the FLAC and MP3 staging directories
+        :arg list library_roots:
+           the corresponding FLAC and MP3 library directories
+        :keyword queue.Queue status_queue:
+           where (priority, status) track updates are reported (default
+           :data:`_ENCODING_QUEUE`)
+
+        ``LibraryPublisher`` threads are daemonized so that they are
+        killed automatically if the program exits.
 
         """
-        self.__log.call(track_label, pending=pending)
-
-        self.track_label = track_label
-        self.__state = TRACK_PENDING if pending else TRACK_EXCLUDED
+        self.__log.call(
+            staging_roots, library_roots, status_queue=status_queue)
+        super().__init__(daemon=True)
 
-    @property
-    def state(self):
-        """The current state of encoding for this track."""
-        return self.__state
+        self._roots = list(zip(staging_roots, library_roots))
+        self._status_queue = (
+            status_queue if status_queue is not None else _ENCODING_QUEUE)
+        self._queue = queue.Queue()
+        self._created_dirnames = set()
+        self._staged_dirnames = OrderedDict()
 
-    def transition_to(self, to_state):
-        """Advance this track's encoding state from its current state to
-        *to_state*, if permitted.
+    def library_filename(self, staged_filename):
+        """Return the library file name for *staged_filename*.
 
-        :arg to_state:
-           the target encoding state, or any :class:`Exception` to
-           transition to :data:`TRACK_FAILED`
-        :return:
-           ``True`` if the transition is successful, otherwise ``False``
+        :arg str staged_filename: an absolute file name in a staging root
+        :return: the corresponding absolute file name in a library root
+        :rtype: :obj:`str`
 
         """
-        self.__log.call(to_state)
+        for (staging_root, library_root) in self._roots:
+            if staged_filename.startswith(staging_root + os.sep):
+                return os.path.join(
+                    library_root,
+                    os.path.relpath(staged_filename, staging_root))
 
-        from_state = self.__state
-        if isinstance(to_state, Exception):
-            to_state = TRACK_FAILED
+        raise FLACManagerError(
+            "%s is not in a staging folder" % staged_filename,
+            context_hint="Publishing")
 
-        if (from_state in [
-                    TRACK_EXCLUDED,
-                    TRACK_FAILED,
-                    TRACK_COMPLETE]
-                or to_state < from_state):
-            self.__log.warning(
-                "%s: illegal transition from %s to %s",
-                self.track_label, from_state, to_state)
-            self.__log.return_(False)
-            return False
+    def publish(self, staged_filenames, status=None):
+        """Schedule files to be moved into the library.
 
-        self.__state = to_state
-        self.__log.return_(True)
-        return True
+        :arg list staged_filenames: absolute file names in a staging root
+        :keyword tuple status:
+           the (track index, CD-DA file name, FLAC file name, stdout
+           file name) of the track that *staged_filenames* belong to;
+           if specified, the track's progress is reported to the UI
 
-    def describe(self, message=None):
-        """Return a short display string for this track and its current
-        status.
+        """
+        self.__log.call(staged_filenames, status=status)
+        self._queue.put((staged_filenames, status))
 
-        :arg str message:
-           short piece of text to use with the track label (instead of
-           the default message for the current state)
+    def finish(self):
+        """Signal that no more files will be scheduled.
+
+        The thread exits once all scheduled files have been published.
 
         """
-        return "%s: %s" % (
-            self.track_label,
-            message if message is not None else self.__state.text)
+        self.__log.call()
+        self._queue.put(None)
 
+    def run(self):
+        """Publish files (in batches) as they are scheduled."""
+        self.__log.call()
 
-def generate_flac_dirname(library_root, metadata):
-    """Build the directory for a track's FLAC file.
+        finished = False
+        while not finished:
+            batch = [self._queue.get()]
+            # everything that is already waiting is published together
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
 
-    :arg str library_root: the FLAC library directory
-    :arg dict metadata: the finalized metadata for a single track
-    :return: an absolute directory path
-    :rtype: :obj:`str`
+            if None in batch:
+                finished = True
+                batch = [item for item in batch if item is not None]
 
-    """
-    _log.call(library_root, metadata)
-    return _generate_dirname("FLAC", library_root, metadata)
+            if batch:
+                self._publish_batch(batch)
 
+        self._clean_up()
 
-def generate_flac_basename(metadata):
-    """Build the filename for a track's FLAC file.
+        self.__log.info("thread is exiting")
 
-    :arg dict metadata: the finalized metadata for a single track
-    :return: a relative file name
-    :rtype: :obj:`str`
+    def _publish_batch(self, batch):
+        """Publish a batch of scheduled files.
 
-    """
-    _log.call(metadata)
-    return _generate_basename("FLAC", metadata)
+        :arg list batch: (staged file names, status) pairs
 
+        All library folders needed by the batch are created at once.
 
-def generate_mp3_dirname(library_root, metadata):
-    """Build the directory for a track's MP3 file.
+        """
+        self.__log.call(batch)
+
+        for (_, status) in batch:
+            if status is not None:
+                status = status + (TRACK_PUBLISHING,)
+                self.__log.info("enqueueing %r", status)
+                self._status_queue.put((9, status))
+
+        dirnames = []
+        for (staged_filenames, _) in batch:
+            for staged_filename in staged_filenames:
+                self._staged_dirnames[os.path.dirname(staged_filename)] = None
+                dirname = os.path.dirname(
+                    self.library_filename(staged_filename))
+                if (dirname not in self._created_dirnames
+                        and dirname not in dirnames):
+                    dirnames.append(dirname)
+
+        if dirnames:
+            # os.makedirs doesn't work as expected for external media
+            status = subprocess.call(["mkdir", "-p"] + dirnames)
+            if status == 0:
+                self._created_dirnames.update(dirnames)
+            else:
+                # not fatal (yet); each failed copy will try again
+                self.__log.warning(
+                    "unable to create %r (error code %s)", dirnames, status)
 
-    :arg str library_root: the MP3 library directory
-    :arg dict metadata: the finalized metadata for a single track
-    :return: an absolute directory path
-    :rtype: :obj:`str`
+        for (staged_filenames, status) in batch:
+            try:
+                for staged_filename in staged_filenames:
+                    self._publish_file(staged_filename)
+            except Exception as e:
+                self.__log.exception(
+                    "publishing failed; staged files remain at %r",
+                    staged_filenames)
+                if status is not None:
+                    status = status + (e,)
+                    self.__log.error("enqueueing %r", status)
+                    self._status_queue.put((2, status))
+            else:
+                if status is not None:
+                    (track_index, cdda_filename, flac_filename,
+                        stdout_filename) = status
+                    status = (
+                        track_index, cdda_filename,
+                        self.library_filename(flac_filename), stdout_filename,
+                        TRACK_COMPLETE)
+                    self.__log.info("enqueueing %r", status)
+                    self._status_queue.put((11, status))
 
-    """
-    _log.call(library_root, metadata)
-    return _generate_dirname("MP3", library_root, metadata)
+    def _publish_file(self, staged_filename):
+        """Copy *staged_filename* into the library, then remove it.
 
+        :arg str staged_filename: an absolute file name in a staging root
 
-def generate_mp3_basename(metadata):
-    """Build the filename for a track's MP3 file.
+        A failed copy is retried up to :data:`PUBLISH_RETRIES` times.
 
-    :arg dict metadata: the finalized metadata for a single track
-    :return: a relative file name
-    :rtype: :obj:`str`
+        """
+        self.__log.call(staged_filename)
 
-    """
-    _log.call(metadata)
-    return _generate_basename("MP3", metadata)
+        filename = self.library_filename(staged_filename)
+        attempt = 0
+        while True:
+            try:
+                _copy_file(staged_filename, filename)
+            except OSError as e:
+                attempt += 1
+                if attempt > PUBLISH_RETRIES:
+                    raise
 
+                self.__log.warning(
+                    "unable to copy %s to %s (%s); retry %d of %d in %s "
+                        "seconds",
+                    staged_filename, filename, e, attempt, PUBLISH_RETRIES,
+                    PUBLISH_RETRY_WAIT)
+                time.sleep(PUBLISH_RETRY_WAIT)
+                subprocess.call(["mkdir", "-p", os.path.dirname(filename)])
+            else:
+                break
 
-def _generate_dirname(section, library_root, metadata):
-    """Build the directory for a track's FLAC or MP3 file.
+        os.unlink(staged_filename)
+        self.__log.info("published %s", filename)
+
+    def _clean_up(self):
+        """Remove the emptied staging folders."""
+        self.__log.call()
+
+        for staged_dirname in self._staged_dirnames:
+            for (staging_root, _) in self._roots:
+                if staged_dirname.startswith(staging_root + os.sep):
+                    while staged_dirname != staging_root:
+                        try:
+                            os.rmdir(staged_dirname)
+                        except OSError:
+                            break   # not empty (or already removed)
+                        staged_dirname = os.path.dirname(staged_dirname)
+                    break
 
-    :arg str section: "FLAC" or "MP3"
-    :arg str library_root: the MP3 library directory
-    :arg dict metadata: the finalized metadata for a single track
-    :return: an absolute directory path
-    :rtype: :obj:`str`
+
+def _copy_file(src_filename, dst_filename):
+    """Copy *src_filename* to *dst_filename*, replacing it atomically.
+
+    :arg str src_filename: the absolute source file name
+    :arg str dst_filename: the absolute destination file name
+
+    The data is copied by the kernel (``copy_file_range``) if possible,
+    otherwise in :data:`PUBLISH_BUFFER_SIZE` chunks, to a temporary file
+    alongside *dst_filename* that is then renamed.
 
     """
-    _log.call(section, library_root, metadata)
+    _log.call(src_filename, dst_filename)
 
-    config = get_config()
+    temp_filename = os.path.join(
+        os.path.dirname(dst_filename),
+        ".%s.fmtmp" % os.path.basename(dst_filename))
+    try:
+        with open(src_filename, "rb") as src_f, \
+                open(temp_filename, "wb") as dst_f:
+            if hasattr(os, "copy_file_range"):
+                try:
+                    while os.copy_file_range(
+                            src_f.fileno(), dst_f.fileno(),
+                            PUBLISH_BUFFER_SIZE):
+                        pass
+                except OSError as e:
+                    # e.g. not supported between these file systems; the
+                    # copy below continues from the current offsets
+                    _log.debug("copy_file_range failed (%s)", e)
+            shutil.copyfileobj(src_f, dst_f, PUBLISH_BUFFER_SIZE)
+            dst_f.flush()
+            os.fsync(dst_f.fileno())
+        shutil.copymode(src_filename, temp_filename)
+        os.replace(temp_filename, dst_filename)
+    finally:
+        if os.path.exists(temp_filename):
+            os.unlink(temp_filename)
+
+
+#: The maximum number of tracks that a :class:`Retagger` processes
+#: concurrently.
+RETAG_MAX_WORKERS = 4
 
-    # issues/5
-    folder_format_spec = metadata["__%s_album_folder" % section.lower()]
-    _log.debug("using template %r", folder_format_spec)
 
-    folder_names = [
-        name_format_spec.format(**metadata)
-        for name_format_spec in folder_format_spec.split('/')]
-    _log.debug("raw folder names %r", folder_names)
+@logged
+class Retagger(threading.Thread):
+    """A thread that rewrites the tags of previously encoded FLAC and
+    MP3 files (without re-encoding them).
 
-    if config[section].getboolean("use_xplatform_safe_names"):
-        # paranoid-safe and compact, but less readable
-        folder_names = _xplatform_safe(folder_names)
-    else:
-        # as close to format spec as possible, but still relatively safe
-        folder_names = [
-            re.sub(r"[^0-9a-zA-Z-.,_() ]", '_', name) for name in folder_names]
-    _log.debug("final folder names %r", folder_names)
+    If a track's folder or file name has changed, its files are renamed
+    or moved before being retagged.
 
-    album_folder = os.path.join(
-        library_root, *_subroot_trie(section, metadata), *folder_names)
+    """
 
-    # doesn't work as expected for external media
-    #os.makedirs(album_folder, exist_ok=True)
-    subprocess.check_call(["mkdir", "-p", album_folder])
+    def __init__(self, library_roots, status_queue=None, on_success=None):
+        """
+        :arg list library_roots:
+           the FLAC and MP3 library directories (emptied album folders
+           are removed up to, but not including, these directories)
+        :keyword queue.Queue status_queue:
+           where (priority, status) track updates are reported (default
+           :data:`_ENCODING_QUEUE`)
+        :keyword on_success:
+           called with no arguments (before "FINISHED" is reported) if
+           every track is retagged successfully, e.g. to persist the
+           metadata that now describes the files
+
+        ``Retagger`` threads are daemonized so that they are killed
+        automatically if the program exits.
 
-    _log.info("using album folder %r", album_folder)
-    return album_folder
+        """
+        self.__log.call(
+            library_roots, status_queue=status_queue, on_success=on_success)
+        super().__init__(daemon=True)
 
+        self._library_roots = library_roots
+        self._status_queue = (
+            status_queue if status_queue is not None else _ENCODING_QUEUE)
+        self._on_success = on_success
+        self._instructions = []
 
-def _generate_basename(section, metadata):
-    """Build the filename for a track's FLAC or MP3 file.
+        #: The number of tracks that failed to be retagged.
+        self.failed = 0
+        self._failed_lock = threading.Lock()
 
-    :arg str section: "FLAC" or "MP3"
-    :arg dict metadata: the finalized metadata for a single track
-    :return: a relative file name
-    :rtype: :obj:`str`
+    def add_instruction(
+            self, track_index, old_flac_filename, flac_filename,
+            old_mp3_filename, mp3_filename, track_metadata):
+        """Schedule a track for retagging.
 
-    """
-    _log.call(section, metadata)
+        :arg int track_index: index (not ordinal) of the track
+        :arg str old_flac_filename: current absolute *.flac* file name
+        :arg str flac_filename: new absolute *.flac* file name
+        :arg str old_mp3_filename: current absolute *.mp3* file name
+        :arg str mp3_filename: new absolute *.mp3* file name
+        :arg dict track_metadata: tagging fields for this track
 
-    config = get_config()
+        """
+        self.__log.call(
+            track_index, old_flac_filename, flac_filename, old_mp3_filename,
+            mp3_filename, track_metadata)
 
-    # issues/5
-    track_format_spec = metadata["__%s_track_filename" % section.lower()]
-    _log.debug("using template %r", track_format_spec)
+        self._instructions.append(
+            (track_index, old_flac_filename, flac_filename, old_mp3_filename,
+                mp3_filename, track_metadata))
 
-    basename = track_format_spec.format(**metadata)
-    _log.debug("raw basename %r", basename)
+    def run(self):
+        """Retag all tracks concurrently."""
+        self.__log.call()
 
-    if config[section].getboolean("use_xplatform_safe_names"):
-        # paranoid-safe and compact, but less readable
-        basename = _xplatform_safe(
-            basename, fileext=config[section]["track_fileext"])
-    else:
-        # as close to format spec as possible, but still relatively safe
-        basename = re.sub(r"[^0-9a-zA-Z-.,_() ]", '_', basename)
-    _log.debug("final basename %r", basename)
+        with ThreadPoolExecutor(max_workers=RETAG_MAX_WORKERS) as executor:
+            for instruction in self._instructions:
+                executor.submit(self._retag, *instruction)
 
-    track_filename = basename + config[section]["track_fileext"]
-    _log.info("using track filename %r", track_filename)
+        if self.failed:
+            # leave the former album folders (and any cover image) where
+            # the persisted metadata can still find them
+            self.__log.warning(
+                "%d track(s) failed; not cleaning up album folders",
+                self.failed)
+        else:
+            relocated_dirnames = OrderedDict()
+            for (_, old_flac_fn, flac_fn, old_mp3_fn, mp3_fn, _) in \
+                    self._instructions:
+                for (old_fn, fn) in [
+                        (old_flac_fn, flac_fn), (old_mp3_fn, mp3_fn)]:
+                    if os.path.dirname(old_fn) != os.path.dirname(fn):
+                        relocated_dirnames[os.path.dirname(old_fn)] = \
+                            os.path.dirname(fn)
+            for (old_dirname, dirname) in relocated_dirnames.items():
+                self._clean_up(old_dirname, dirname)
+
+            if self._on_success is not None:
+                try:
+                    self._on_success()
+                except Exception:
+                    self.__log.exception("on_success callback failed")
+
+        status = (None, None, None, None, "FINISHED")
+        self.__log.info("enqueueing %r", status)
+        self._status_queue.put((13, status))
 
-    return track_filename
+        # do not terminate until "FINISHED" status has been processed
+        self._status_queue.join()
 
+        self.__log.info("thread is exiting")
 
-def _xplatform_safe(path, fileext=""):
-    """Transform *path* so that it is safe to use across platforms.
+    def _retag(
+            self, track_index, old_flac_filename, flac_filename,
+            old_mp3_filename, mp3_filename, track_metadata):
+        """Relocate (if necessary) and retag a single track's files.
 
-    :arg path:
-       a :obj:`list` of folder names, or a file basename
-    :keyword str fileext:
-       if *path* is a file basename, this is the file extension that
-       will be appended to form the complete file name
-    :return: the transformed *path*
-    :rtype: the same type as *path* (:obj:`list` or :obj:`str`)
+        .. note::
+           This method is run in a worker thread (see :meth:`run`).
 
-    """
-    _log.call(path, fileext=fileext)
+        """
+        status = (
+            track_index, None, flac_filename, None, TRACK_RETAGGING)
+        self.__log.info("enqueueing %r", status)
+        self._status_queue.put((7, status))
 
-    safe_names = path if type(path) is list else [path]
-    for (pattern, replacement) in [
-            (r"\s+", '-'), # contiguous ws to '-'
-            (r"[^0-9a-zA-Z-.,_]+", '_'), # contiguous special to '_'
-            (r"^[^0-9a-zA-Z_]", '_'), # non-alphanum/underscore at [0] to '_'
-            (r"([-.,_]){2,}", r'\1') # 2+ contiguous special/replacement to \1
-            ]:
-        safe_names = [
-            re.sub(pattern, replacement, name) for name in safe_names]
+        try:
+            _relocate_track_file(old_flac_filename, flac_filename)
+            tag_flac(flac_filename, track_metadata)
 
-    # can't know the target file system ahead of time, so assume 255 UTF-8
-    # bytes as the "least common denominator" limit for all path components
-    safe_names = [
-        name.encode()[:255 - len(fileext)].decode(errors="ignore")
-        for name in safe_names]
+            _relocate_track_file(old_mp3_filename, mp3_filename)
+            tag_mp3(mp3_filename, track_metadata)
+        except Exception as e:
+            self.__log.exception("retagging failed")
+            with self._failed_lock:
+                self.failed += 1
+            status = (track_index, None, flac_filename, None, e)
+            self.__log.error("enqueueing %r", status)
+            self._status_queue.put((2, status))
+        else:
+            status = (
+                track_index, None, flac_filename, None, TRACK_COMPLETE)
+            self.__log.info("enqueueing %r", status)
+            self._status_queue.put((11, status))
 
-    transformed = safe_names if type(path) is list else safe_names[0]
+    def _clean_up(self, old_dirname, dirname):
+        """Remove an album folder that has been emptied by relocating
+        its tracks to *dirname*.
 
-    _log.debug("%r -> %r", path, transformed)
-    return transformed
+        :arg str old_dirname: the former album folder
+        :arg str dirname: the current album folder
 
+        A saved cover image is moved along with the tracks (unless
+        *dirname* already has one). Emptied parent (trie) folders are
+        also removed.
 
-def _subroot_trie(section, metadata):
-    """Build zero or more subdirectories below the library root to form
-    an easily navigable "trie" structure for audio files.
+        """
+        self.__log.call(old_dirname, dirname)
 
-    :arg str section: "FLAC" or "MP3"
-    :arg dict metadata: the finalized metadata for a single track
-    :return:
-       a list (possibly empty) of directory names that form a trie
-       structure for organizing audio files
+        for cover_basename in ["cover.jpg", "cover.png"]:
+            old_cover_filename = os.path.join(old_dirname, cover_basename)
+            if not os.path.isfile(old_cover_filename):
+                continue
 
-    """
-    _log.call(metadata)
+            cover_filename = os.path.join(dirname, cover_basename)
+            if not os.path.exists(cover_filename):
+                shutil.move(old_cover_filename, cover_filename)
+                self.__log.info(
+                    "moved %s to %s", old_cover_filename, cover_filename)
+            else:
+                os.unlink(old_cover_filename)
 
-    config = get_config()
+        for library_root in self._library_roots:
+            if old_dirname.startswith(library_root + os.sep):
+                while old_dirname != library_root:
+                    try:
+                        os.rmdir(old_dirname)
+                    except OSError:
+                        break   # not empty
+                    self.__log.info("removed empty folder %s", old_dirname)
+                    old_dirname = os.path.dirname(old_dirname)
+                break
 
-    # issues/5
-    key = metadata["__%s_subroot_trie" % section.lower()]
-    level = config[section].getint("library_subroot_trie_level")
 
-    # to skip building a directory trie structure, the key can be left empty or
-    # the level can be set to zero (0)
-    if not key or level <= 0:
-        _log.trace("RETURN []")
-        return []
+def _relocate_track_file(old_filename, filename):
+    """Rename or move *old_filename* to *filename*.
+
+    :arg str old_filename: the current absolute file name
+    :arg str filename: the new absolute file name
+    :raises FLACManagerError:
+       if neither file exists, or if both exist and are not the same
+       file
 
-    term = metadata[key]
+    If *old_filename* does not exist but *filename* does, then the file
+    is assumed to have been relocated already.
 
-    # issues/3
-    trie_ignore_leading_article = config[section].get(
-        "trie_ignore_leading_article", "")
-    if trie_ignore_leading_article:
-        articles = trie_ignore_leading_article.upper().split()
-        words = term.split()
-        if words[0].upper() in articles:
-            # do not simply join on space; remaining white space may be
-            # significant (e.g. NIN "THE S L  I   P" -> "S L  I   P")
-            term = term[len(words[0]):].lstrip()
+    """
+    _log.call(old_filename, filename)
 
-    term = re.sub(r"[^0-9a-zA-Z]", "", term).upper()
-    # use len(term) - 1 so trie prefixes never include the full term
-    nodes = [term[:n + 1] for n in range(min(level, len(term) - 1))]
-    # edge case - any non-alphanumeric key falls into the special '_' node
-    if not nodes:
-        nodes = ['_']
+    if old_filename == filename or not os.path.isfile(old_filename):
+        if not os.path.isfile(filename):
+            raise FLACManagerError(
+                "%s not found" % filename, context_hint="Retagging")
+        return
 
-    _log.return_(nodes)
-    return nodes
+    # a case-only rename on a case-insensitive file system is the same file
+    if (os.path.exists(filename)
+            and not os.path.samefile(old_filename, filename)):
+        raise FLACManagerError(
+            "Cannot move %s to %s (file exists)" % (old_filename, filename),
+            context_hint="Retagging")
 
+    shutil.move(old_filename, filename)
+    _log.info("moved %s to %s", old_filename, filename)
 
-def _save_cover_image(dirname, filename):
-    """Save the cover image to the album folder.
 
-    :arg str dirname: the album folder name
-    :arg str filename: the cover image file name
-    :return: ``True`` if the cover image was saved, otherwise ``False``
+#: The name of the checkpoint file (in the MP3 library root) that
+#: records each MP3 produced by a :class:`LibraryTranscoder`.
+TRANSCODE_STATE_FILENAME = ".flacmanager-transcode.jsonl"
 
-    """
-    image_ext = os.path.splitext(filename)[1]
-    if image_ext.lower() in [".jpg", ".jpeg"]:
-        cover_filename = os.path.join(dirname, "cover.jpg")
-    elif image_ext.lower() == ".png":
-        cover_filename = os.path.join(dirname, "cover.png")
-    else:
-        _log.warning("not saving cover image %r (not a JPEG or PNG)!")
-        return False
+#: The default number of processes that a :class:`LibraryTranscoder`
+#: uses to encode MP3s.
+TRANSCODE_MAX_WORKERS = os.cpu_count() or 2
 
-    status = subprocess.call(["cp", "-f", filename, cover_filename])
-    if status == 0:
-        _log.info("copied %s to %s", filename, cover_filename)
-        return True
-    else:
-        _log.warning(
-            "unable to copy %s to %s (error code %s)",
-            filename, cover_filename, status)
-        return False
 
+@logged
+class LibraryTranscoder:
+    """Regenerate the MP3 library from the FLAC library.
 
-def _styled(widget, **options):
-    """Apply `Ttk Styling
-    <https://docs.python.org/3/library/tkinter.ttk.html#ttkstyling>`_ to
-    *widget*.
+    Every FLAC file in the library is matched to its persisted album
+    metadata, which determines the expected MP3 file name (from the
+    *current* folder and file naming templates). An MP3 is encoded only
+    if it is missing, if its FLAC file has changed, or if the MP3
+    encoding options have changed since it was encoded. An MP3 that is
+    up to date but whose expected name has changed is moved and
+    retagged instead.
 
-    :arg widget: any Ttk widget
-    :arg dict options: the styling options for *widget*
-    :return: *widget* with styling applied
+    An existing MP3 that was not encoded by the transcoder is stale
+    (its encoding options are unknown), unless *adopt_existing* is
+    enabled.
+
+    Every finished MP3 is recorded (appended) to a checkpoint file
+    (:data:`TRANSCODE_STATE_FILENAME`), so an interrupted run resumes
+    where it stopped.
 
     """
-    style_id = "%x.%s" % (id(widget), widget.winfo_class())
-    Style().configure(style_id, **options)
-    widget.config(style=style_id)
 
-    return widget
+    def __init__(
+            self, max_workers=None, force=False, adopt_existing=False,
+            report=None):
+        """
+        :keyword int max_workers:
+           the number of MP3 encoding processes (default
+           :data:`TRANSCODE_MAX_WORKERS`)
+        :keyword bool force:
+           whether or not to re-encode every MP3, even if it appears to
+           be up to date
+        :keyword bool adopt_existing:
+           whether or not an existing MP3 that is newer than its FLAC
+           file, but was not encoded by the transcoder, is assumed to be
+           up to date (it is recorded with *unknown* encoding options,
+           so it is only considered up to date while *adopt_existing* is
+           enabled)
+        :keyword report:
+           a function that is called with a :obj:`dict` describing each
+           MP3 that is encoded, moved or fails (and a final summary)
 
+        """
+        self.__log.call(
+            max_workers=max_workers, force=force,
+            adopt_existing=adopt_existing, report=report)
 
-#: The text content of the dialog that explains FLACManager's
-#: prerequisites.
-_PREREQUISITES_TEXT = """\
-FLACManager runs on Python 3.3+ compiled against Tk 8.5+.
+        self.max_workers = (
+            max_workers if max_workers is not None else TRANSCODE_MAX_WORKERS)
+        self.force = force
+        self.adopt_existing = adopt_existing
+        self.report = report if report is not None else (lambda event: None)
 
-The following EXTERNAL software components are also required:
+        (self.flac_library_root, self.mp3_library_root) = \
+            _resolve_library_roots()
+        self.state_filename = os.path.join(
+            self.mp3_library_root, TRANSCODE_STATE_FILENAME)
+        self.options_hash = _mp3_options_hash()
 
-* libdiscid (http://musicbrainz.org/doc/libdiscid)
-* flac (http://flac.sourceforge.net/)
-* lame (http://lame.sourceforge.net/)
-* diskutil (Mac OS X command line utility)
-* open (Mac OS X command line utility)
-* mkdir (Mac OS X command line utility)
+    def plan(self):
+        """Determine what must be done for each FLAC file, one album at
+        a time.
 
-The flac and lame command line binaries must be available on
-your $PATH, and the location of the libdiscid library must be
-specified in the flacmanager.ini configuration file.
+        :return:
+           a generator of (album cover image file name, items) for each
+           album, where *items* is a list of (action, FLAC file name,
+           MP3 file name, old MP3 file name, recorded encoding options,
+           track metadata) and *action* is "encode", "move", "current"
+           or "adopt" (an existing MP3 that is assumed to be current but
+           has not been recorded in the checkpoint file)
+
+        Albums are planned as they are consumed, so only one album's
+        metadata is loaded at a time. The album cover image is a
+        temporary file; the caller should remove it (see
+        :func:`_remove_tempfile`) once it has finished with the album.
+
+        FLAC files that do not match any persisted album metadata are
+        reported as "unmatched" events (after every album has been
+        planned) and are not included.
 
-The libdiscid, flac and lame components can be easily installed
-from MacPorts (http://www.macports.org/).
+        """
+        self.__log.call()
 
-Finally, You MUST register for a Gracenote developer account in
-order for FLACManager's metadata aggregation to work properly:
+        state = self._load_state()
+        flac_filenames = set(self._walk_flac_library())
 
-1. Create your Gracenote developer account at
-   https://developer.gracenote.com/.
-2. Create an app named "FLACManager".
-3. Save your Gracenote Client ID in the flacmanager.ini
-   configuration file.
+        planner = AlbumPathPlanner(
+            self.flac_library_root, self.mp3_library_root)
+        library_root = resolve_path(get_config()["Organize"]["library_root"])
+        metadata_root = os.path.join(library_root, ".metadata")
+        metadata_names = (
+            sorted(os.listdir(metadata_root)) if os.path.isdir(metadata_root)
+            else [])
 
-(FLACManager will automatically obtain and store your Gracenote
-User ID in the flacmanager.ini file.)"""
+        albums = 0
+        for name in metadata_names:
+            if not name.endswith(".json"):
+                continue
+            metadata_path = os.path.join(metadata_root, name)
+            try:
+                per_track_metadata = flatten_metadata_snapshot(
+                    load_metadata_snapshot(metadata_path))
+                plan = planner.plan(per_track_metadata)
+            except Exception as e:
+                self.__log.warning("skipping %s: %s", metadata_path, e)
+                self.report(OrderedDict([
+                    ("event", "skipped"),
+                    ("metadata", metadata_path),
+                    ("error", "%s: %s" % (e.__class__.__name__, e)),
+                ]))
+                continue
 
+            album_cover = (
+                per_track_metadata[0]["album_cover"] if per_track_metadata
+                else None)
+            items = []
+            for (track_metadata, paths) in zip(per_track_metadata, plan):
+                if paths is None or paths[0] not in flac_filenames:
+                    continue
+                (flac_filename, mp3_filename) = paths
+                flac_filenames.discard(flac_filename)
+
+                record = state.get(flac_filename)
+                (action, old_mp3_filename) = self._action(
+                    record, flac_filename, mp3_filename)
+                # a moved MP3 keeps the options it was encoded with
+                options = record["options"] if action == "move" else None
+                items.append((
+                    action, flac_filename, mp3_filename, old_mp3_filename,
+                    options, track_metadata))
+
+            albums += 1
+            yield (album_cover, items)
+
+        for flac_filename in sorted(flac_filenames):
+            self.report(OrderedDict([
+                ("event", "unmatched"),
+                ("flac", flac_filename),
+            ]))
+
+        self.__log.debug("planned %d albums", albums)
+
+    def run(self, dry_run=False):
+        """Encode (or move) every MP3 that is missing or stale.
+
+        :keyword bool dry_run:
+           if ``True``, only report what would be done
+        :return: the number of MP3s that failed
+        :rtype: :obj:`int`
 
-class _TextDialog(simpledialog.Dialog):
-    """A dialog that presents a simple formatted text message."""
+        """
+        self.__log.call(dry_run=dry_run)
+
+        counts = OrderedDict(
+            [("current", 0), ("moved", 0), ("encoded", 0), ("failed", 0)])
+
+        if dry_run:
+            for (album_cover, items) in self.plan():
+                if album_cover:
+                    _remove_tempfile(album_cover)
+                for (action, flac_filename, mp3_filename, _, _, _) in items:
+                    counts[{
+                        "encode": "encoded",
+                        "move": "moved",
+                        "adopt": "current",
+                        }.get(action, action)] += 1
+                    if action in ["encode", "move"]:
+                        self.report(OrderedDict([
+                            ("event", action),
+                            ("flac", flac_filename),
+                            ("mp3", mp3_filename),
+                        ]))
+            self.report(OrderedDict([("event", "summary")] + list(
+                counts.items())))
+            return 0
+
+        with open(self.state_filename, 'a') as journal, \
+                ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {}
+            # albums are planned one at a time, and a bounded number of
+            # tasks is queued at a time, so that very large libraries do
+            # not hold every track's metadata in memory
+            max_pending = self.max_workers * 4
+            for (album_cover, items) in self.plan():
+                try:
+                    self._run_album(
+                        journal, counts, executor, pending, max_pending,
+                        album_cover, items)
+                finally:
+                    # the tasks carry the embedded image, not the file
+                    if album_cover:
+                        _remove_tempfile(album_cover)
+
+            self._collect(journal, counts, pending, list(pending))
+
+        self._compact_state()
+        self.report(OrderedDict([("event", "summary")] + list(counts.items())))
+
+        self.__log.return_(counts["failed"])
+        return counts["failed"]
+
+    def _run_album(
+            self, journal, counts, executor, pending, max_pending,
+            album_cover, items):
+        """Move, or submit encoding tasks for, one album's MP3s.
+
+        .. note::
+           At most *max_pending* tasks are left in *pending* (some may
+           still be running when this method returns).
 
-    def __init__(self, master, text, **options):
         """
-        :arg master: the parent object of the dialog
-        :arg str text: the text to display in the dialog
-        :arg dict options: configuration options for the dialog
+        embedded_cover = None
+        if album_cover and any(
+                item[0] in ["encode", "move"] for item in items):
+            # the (scaled-down) embedded image is prepared once per album
+            embedded_cover = make_embedded_cover_image(album_cover)
+
+        for (action, flac_filename, mp3_filename, old_mp3_filename, options,
+                track_metadata) in items:
+            if action == "current":
+                counts["current"] += 1
+                continue
+            elif action == "adopt":
+                # recorded with unknown (None) encoding options
+                self._finished(
+                    journal, counts, flac_filename, mp3_filename, "current")
+                continue
 
-        *text* should contain line breaks at positions desirable for
-        on-screen display. The total number of lines will determine the
-        height of the text widget,
+            track_metadata["album_cover"] = embedded_cover
+            if action == "move":
+                try:
+                    _relocate_track_file(old_mp3_filename, mp3_filename)
+                    tag_mp3(mp3_filename, track_metadata)
+                except Exception as e:
+                    self.__log.exception("failed to move %s", old_mp3_filename)
+                    self._finished(
+                        journal, counts, flac_filename, mp3_filename,
+                        "failed", e)
+                else:
+                    self._finished(
+                        journal, counts, flac_filename, mp3_filename, "moved",
+                        options=options)
+                continue
 
-        *options* are passed directly to the parent
-        :class:`tkinter.simpledialog.Dialog` class initializer.
+            if len(pending) >= max_pending:
+                self._collect(
+                    journal, counts, pending,
+                    wait(pending, return_when=FIRST_COMPLETED).done)
+
+            future = executor.submit(
+                _transcode_track, flac_filename, mp3_filename, track_metadata)
+            pending[future] = (flac_filename, mp3_filename)
+
+    def _action(self, record, flac_filename, mp3_filename):
+        """Decide what must be done to bring an MP3 up to date.
+
+        :arg dict record:
+           the checkpoint record for *flac_filename* (or ``None``)
+        :arg str flac_filename: the FLAC file name
+        :arg str mp3_filename: the expected MP3 file name
+        :return:
+           ("encode" | "move" | "current" | "adopt", old MP3 file name)
 
         """
-        self._text = text # must be set BEFORE calling super __init__!
-        super().__init__(master, **options)
+        if self.force:
+            return ("encode", None)
+
+        flac_stat = os.stat(flac_filename)
+        if record is None:
+            # an existing library was not produced by the transcoder; an
+            # MP3 that is newer than its FLAC file may be assumed to be
+            # current (but its encoding options are still unknown)
+            if (self.adopt_existing
+                    and os.path.isfile(mp3_filename)
+                    and os.stat(mp3_filename).st_mtime >= flac_stat.st_mtime):
+                return ("adopt", None)
+            return ("encode", None)
+
+        # an adopted MP3 was recorded with unknown (None) options
+        options_changed = (
+            record["options"] != self.options_hash
+            and not (record["options"] is None and self.adopt_existing))
+        if (options_changed
+                or record["flac_size"] != flac_stat.st_size
+                or record["flac_mtime"] != flac_stat.st_mtime
+                or not os.path.isfile(record["mp3"])):
+            return ("encode", None)
+        elif record["mp3"] != mp3_filename:
+            return ("move", record["mp3"])
+        else:
+            return ("current", None)
 
-    def body(self, frame):
-        """Create the content of the dialog."""
-        with StringIO(self._text) as f:
-            lines = f.readlines()
+    def _collect(self, journal, counts, pending, futures):
+        """Record the results of finished encoding tasks."""
+        for future in futures:
+            (flac_filename, mp3_filename) = pending.pop(future)
+            try:
+                future.result()
+            except Exception as e:
+                self.__log.error(
+                    "failed to encode %s: %s: %s",
+                    mp3_filename, e.__class__.__name__, e)
+                self._finished(
+                    journal, counts, flac_filename, mp3_filename, "failed", e)
+            else:
+                self._finished(
+                    journal, counts, flac_filename, mp3_filename, "encoded",
+                    options=self.options_hash)
 
-        text = Text(frame, bd=0, relief=FLAT, height=len(lines), wrap=WORD)
-        text.insert(END, "".join(lines))
-        text.config(state=DISABLED)
-        text.pack()
+    def _finished(
+            self, journal, counts, flac_filename, mp3_filename, outcome,
+            error=None, options=None):
+        """Checkpoint and report the outcome for one MP3.
 
-    def buttonbox(self):
-        """Create the button to dismiss the dialog."""
-        box = Frame(self)
-        Button(
-            box, text="OK", width=11, command=self.ok,
-            default=ACTIVE).pack(padx=_PADX, pady=_PADY)
-        self.bind("<Return>", self.ok)
-        box.pack()
+        *options* is the hash of the options that the MP3 was encoded
+        with, or ``None`` if they are unknown (an adopted MP3).
 
+        """
+        counts[outcome] += 1
+
+        if outcome != "failed":
+            flac_stat = os.stat(flac_filename)
+            record = OrderedDict([
+                ("flac", flac_filename),
+                ("mp3", mp3_filename),
+                ("options", options),
+                ("flac_size", flac_stat.st_size),
+                ("flac_mtime", flac_stat.st_mtime),
+            ])
+            print(json.dumps(record), file=journal, flush=True)
 
-class _EditConfigurationDialog(simpledialog.Dialog):
-    """Base class for dialogs that allow the user to edit the
-    *flacmanager.ini* configuration file.
+        if outcome == "current":
+            return
 
-    """
+        event = OrderedDict([
+            ("event", outcome),
+            ("flac", flac_filename),
+            ("mp3", mp3_filename),
+        ])
+        if error is not None:
+            event["error"] = "%s: %s" % (error.__class__.__name__, error)
+        self.report(event)
 
-    def body(self, frame):
-        """Create the content of the dialog.
+    def _walk_flac_library(self):
+        """Generate the name of every FLAC file in the FLAC library."""
+        fileext = get_config()["FLAC"]["track_fileext"]
+        for (dirpath, dirnames, filenames) in os.walk(self.flac_library_root):
+            dirnames[:] = [name for name in dirnames if not name.startswith('.')]
+            for name in filenames:
+                if name.endswith(fileext) and not name.startswith('.'):
+                    yield os.path.join(dirpath, name)
 
-        :arg Frame frame: the frame that contains the body content
+    def _load_state(self):
+        """Read the checkpoint records, keyed by FLAC file name.
+
+        A partially written (last) record, e.g. from an interrupted run,
+        is ignored.
 
         """
-        self._row = 0
-        self._variables = {} # "Section" -> { "option" -> tk-variable }
+        state = {}
+        if os.path.isfile(self.state_filename):
+            with open(self.state_filename) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        self.__log.warning("ignoring %r", line)
+                        continue
+                    state[record["flac"]] = record
 
-        self._populate(frame, get_config())
+        self._state = state
+        return state
 
-        frame.grid_columnconfigure(0, weight=0)
+    def _compact_state(self):
+        """Rewrite the checkpoint file with one record per FLAC file."""
+        self.__log.call()
 
-    def section(self, parent, section_name):
-        """Add a section header to the body of the dialog.
+        self._load_state()
+        (fd, temp_filename) = mkstemp(
+            dir=self.mp3_library_root, prefix=".fm", suffix=".tmp")
+        with open(fd, 'w') as f:
+            for record in self._state.values():
+                print(json.dumps(record), file=f)
+        os.replace(temp_filename, self.state_filename)
 
-        :arg parent: the parent object of the section header
-        :arg str section_name: the name of the configuration section
 
-        """
-        section_label = _styled(
-            Label(parent, text=section_name), font="-size 13 -weight bold")
-        section_label.grid(row=self._row, columnspan=2, pady=11, sticky=W)
+def _mp3_options_hash():
+    """Return a digest of the settings that affect MP3 encoding."""
+    config = get_config()
+    options = json.dumps([
+        config["MP3"]["lame_encode_options"].split(),
+        _id3v2_version(),
+    ])
+    return hashlib.sha1(options.encode("utf-8")).hexdigest()
 
-        self._row += 1
 
-    def option(
-            self, parent, section_name, option_name, value, width=67):
-        """Add an editable option to the body of the dialog.
+def _transcode_track(flac_filename, mp3_filename, track_metadata):
+    """Decode *flac_filename* and encode it as *mp3_filename*.
 
-        :arg parent: the parent object of the section header
-        :arg str section_name: the name of the configuration section
-        :arg str option_name: the name of the configuration option
-        :arg value: the default/initial value of the option
-        :keyword int width:
-           the display width of the entry box for this option's value
+    The MP3 is encoded to a temporary (*.part*) name and renamed when it
+    is complete, so that an interrupted encoding never leaves a partial
+    MP3 behind.
+
+    .. note::
+       This function is run in a :class:`LibraryTranscoder` worker
+       process.
+
+    """
+    _log.call(flac_filename, mp3_filename, track_metadata)
+
+    # os.makedirs doesn't work as expected for external media
+    subprocess.check_call(["mkdir", "-p", os.path.dirname(mp3_filename)])
+    part_filename = mp3_filename + ".part"
+    with TemporaryDirectory(prefix="fm") as tempdir:
+        wav_filename = os.path.join(tempdir, "track.wav")
+        stdout_filename = os.path.join(tempdir, "stdout.out")
+        decode_wav(
+            flac_filename, wav_filename, stdout_filename=stdout_filename)
+        encode_mp3_without_clipping(
+            wav_filename, part_filename, track_metadata,
+            stdout_filename=stdout_filename)
+    os.replace(part_filename, mp3_filename)
+
+
+#: The number of album folders that a :class:`LibraryReorganizer` moves
+#: files into concurrently.
+REORGANIZE_MAX_WORKERS = 8
+
+#: The name of the folder (in the library root) where
+#: :class:`LibraryReorganizer` move logs are written.
+REORGANIZE_LOG_DIRNAME = ".flacmanager-reorganize"
+
+#: The tags that identify a track in FLAC files, and in MP3 files,
+#: when the files are matched to persisted metadata for reorganizing.
+_REORGANIZE_IDENTITY_TAGS = {
+    "FLAC": ["ALBUM", "ALBUMARTIST", "DISCNUMBER", "TRACKNUMBER"],
+    "MP3": ["TALB", "TPE2", "TPOS", "TRCK"],
+}
+
+
+@logged
+class LibraryReorganizer:
+    """Move existing FLAC and MP3 files to the locations that the
+    *current* folder and file naming templates (and trie settings)
+    produce.
+
+    Each file's tags are read and matched to a track in the persisted
+    album metadata (by album title, album artist, disc number and track
+    number), from which its new location is computed. Moves that would
+    collide with each other, or with a file that is not being moved, are
+    reported and skipped, as are files whose tags match tracks of more
+    than one persisted album (e.g. an album and its reissue). A file is
+    never moved over an existing file.
+
+    Files are moved in parallel (one batch per destination album
+    folder), and every move is recorded in a move log so that a
+    reorganization can be undone (see :meth:`undo`).
+
+    """
 
+    def __init__(self, max_workers=None, report=None):
         """
-        Label(parent, text=option_name).grid(row=self._row, sticky=E)
+        :keyword int max_workers:
+           the number of album folders that are processed concurrently
+           (default :data:`REORGANIZE_MAX_WORKERS`)
+        :keyword report:
+           a function that is called with a :obj:`dict` describing each
+           planned or completed move, conflict and failure
 
-        if type(value) is int:
-            variable = IntVar(self, value=value)
-        elif type(value) is bool:
-            variable = BooleanVar(self, value=value)
-        elif type(value) is float:
-            variable = DoubleVar(self, value=value)
-        else:
-            variable = StringVar(
-                self, value=value if type(value) is not list else value[0])
+        """
+        self.__log.call(max_workers=max_workers, report=report)
 
-        if type(value) is list:
-            widget = OptionMenu(parent, variable, *value[1:])
-        elif type(variable) is BooleanVar:
-            widget = Checkbutton(
-                parent, variable=variable, onvalue=True, offvalue=False)
-        else:
-            widget = Entry(parent, textvariable=variable, width=width)
-        widget.grid(row=self._row, column=1, sticky=W, padx=_PADX)
+        self.max_workers = (
+            max_workers if max_workers is not None
+            else REORGANIZE_MAX_WORKERS)
+        self.report = report if report is not None else (lambda event: None)
 
-        self._row += 1
+        self.library_roots = _resolve_library_roots()
+        self.library_root = resolve_path(
+            get_config()["Organize"]["library_root"])
+        self._log_lock = threading.Lock()
 
-        # track the variable; see apply()
-        if section_name not in self._variables:
-            self._variables[section_name] = {}
-        self._variables[section_name][option_name] = variable
+    def plan(self):
+        """Determine the moves that are needed.
 
-    def buttonbox(self):
-        """Create the buttons to save and/or dismiss the dialog."""
-        box = Frame(self)
+        :return: a list of (current file name, new file name) pairs
+        :rtype: :obj:`list`
 
-        Button(
-            box, text="Save", width=10, command=self.ok, default=ACTIVE
-            ).pack(side=LEFT, padx=_PADX, pady=_PADY)
+        """
+        self.__log.call()
 
-        Button(
-            box, text="Cancel", width=10,
-            command=self.cancel
-            ).pack(side=LEFT, padx=_PADX, pady=_PADY)
+        (index, ambiguous) = self._index_persisted_metadata()
+
+        candidates = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for (i, type_) in enumerate(["FLAC", "MP3"]):
+                filenames = list(self._walk_library(type_))
+                for (filename, identity) in zip(
+                        filenames,
+                        executor.map(
+                            partial(self._read_identity, type_), filenames)):
+                    metadata_paths = ambiguous.get((type_, identity))
+                    if metadata_paths is not None:
+                        self.report(OrderedDict([
+                            ("event", "conflict"),
+                            ("from", filename),
+                            ("to", None),
+                            ("reason",
+                                "%d persisted albums have the same tags" %
+                                    len(metadata_paths)),
+                            ("metadata", metadata_paths),
+                        ]))
+                        continue
+
+                    target = index.get((type_, identity))
+                    if target is None:
+                        self.report(OrderedDict([
+                            ("event", "unmatched"),
+                            ("file", filename),
+                        ]))
+                    elif target[i] != filename:
+                        candidates.append((filename, target[i]))
+
+        moves = self._resolve_conflicts(candidates)
+
+        self.__log.return_(len(moves))
+        return moves
+
+    def run(self, dry_run=False):
+        """Plan and perform the moves.
+
+        :keyword bool dry_run:
+           if ``True``, only report the moves that would be made
+        :return: the number of files that could not be moved
+        :rtype: :obj:`int`
 
-        self.bind("<Return>", self.ok)
-        self.bind("<Escape>", self.cancel)
+        """
+        self.__log.call(dry_run=dry_run)
+
+        moves = self.plan()
+        if dry_run:
+            for (source, target) in moves:
+                self.report(OrderedDict([
+                    ("event", "move"),
+                    ("from", source),
+                    ("to", target),
+                ]))
+            self.report(OrderedDict([
+                ("event", "summary"),
+                ("planned", len(moves)),
+            ]))
+            return 0
+
+        if not moves:
+            self.report(OrderedDict([("event", "summary"), ("moved", 0)]))
+            return 0
+
+        log_dirname = os.path.join(self.library_root, REORGANIZE_LOG_DIRNAME)
+        # os.makedirs doesn't work as expected for external media
+        subprocess.check_call(["mkdir", "-p", log_dirname])
+        log_filename = os.path.join(
+            log_dirname,
+            "%s.jsonl" % datetime.datetime.now().strftime("%Y%m%d-%H%M%S"))
+        self.report(OrderedDict([("event", "log"), ("file", log_filename)]))
+
+        # a file whose current name is another file's new name is first
+        # renamed out of the way (in its own folder), so that the batches
+        # below never depend on each other
+        targets = set(target.casefold() for (_, target) in moves)
+        staged_moves = []
+        failed = 0
+        with open(log_filename, 'a') as move_log:
+            for (source, target) in moves:
+                if source.casefold() in targets:
+                    staged_source = source + ".fm-reorganize"
+                    try:
+                        self._move(move_log, source, staged_source)
+                    except Exception as e:
+                        failed += 1
+                        self._report_failure(source, staged_source, e)
+                        continue
+                    staged_moves.append((staged_source, target))
+                else:
+                    staged_moves.append((source, target))
 
-        box.pack()
+            failed += self._move_in_batches(move_log, staged_moves)
+            self._move_cover_images(move_log, moves)
 
-    def apply(self):
-        """Save changes to the *flacmanager.ini* file."""
-        with _CONFIG_LOCK:
-            config = get_config()
+        self._prune_empty_dirs(source for (source, _) in moves)
 
-            for (section, optvar) in self._variables.items():
-                for (option, variable) in optvar.items():
-                    # values MUST be strings!
-                    if type(variable) is not BooleanVar:
-                        config[section][option] = str(variable.get())
-                    else:
-                        config[section][option] = \
-                            "yes" if variable.get() else "no"
+        self.report(OrderedDict([
+            ("event", "summary"),
+            ("moved", len(moves) - failed),
+            ("failed", failed),
+            ("log", log_filename),
+        ]))
 
-            save_config()
+        self.__log.return_(failed)
+        return failed
 
+    def undo(self, log_filename):
+        """Reverse the moves recorded in a move log.
 
-class EditRequiredConfigurationDialog(_EditConfigurationDialog):
-    """A dialog that allows the user to edit **required** options from
-    the *flacmanager.ini* configuration file.
+        :arg str log_filename: a move log written by :meth:`run`
+        :return: the number of files that could not be moved back
+        :rtype: :obj:`int`
 
-    """
+        The reversal is itself logged (in a new move log), so that it
+        can also be undone.
 
-    def _populate(self, frame, config):
-        """Create the content of the dialog."""
-        section = partial(self.section, frame)
-        option = partial(self.option, frame)
+        """
+        self.__log.call(log_filename)
+
+        with open(log_filename) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+
+        undo_filename = "%s.undo-%s.jsonl" % (
+            os.path.splitext(log_filename)[0],
+            datetime.datetime.now().strftime("%Y%m%d-%H%M%S"))
+        failed = 0
+        with open(undo_filename, 'a') as move_log:
+            # moves are reversed one at a time, in reverse order, because
+            # a (staged) move may depend on an earlier one
+            for record in reversed(records):
+                try:
+                    self._move(move_log, record["to"], record["from"])
+                except Exception as e:
+                    failed += 1
+                    self._report_failure(record["to"], record["from"], e)
+
+        self._prune_empty_dirs(record["to"] for record in records)
+        self.report(OrderedDict([
+            ("event", "summary"),
+            ("moved", len(records) - failed),
+            ("failed", failed),
+            ("log", undo_filename),
+        ]))
+
+        self.__log.return_(failed)
+        return failed
+
+    def _index_persisted_metadata(self):
+        """Map the identifying tags of every persisted track to its
+        (FLAC, MP3) file names under the current naming settings.
 
-        section("Organize")
-        option(
-            "Organize", "library_root", config["Organize"]["library_root"])
+        :return:
+           a 2-tuple containing the index and a mapping of the
+           identities that are claimed (with different file names) by
+           more than one persisted album to those albums' metadata file
+           names; ambiguous identities are not in the index
+
+        """
+        self.__log.call()
+
+        planner = AlbumPathPlanner(*self.library_roots)
+        metadata_root = os.path.join(self.library_root, ".metadata")
+        metadata_names = (
+            sorted(os.listdir(metadata_root)) if os.path.isdir(metadata_root)
+            else [])
+
+        index = {}
+        claimed_by = {}
+        ambiguous = {}
+        for name in metadata_names:
+            if not name.endswith(".json"):
+                continue
+            metadata_path = os.path.join(metadata_root, name)
+            try:
+                per_track_metadata = flatten_metadata_snapshot(
+                    load_metadata_snapshot(metadata_path))
+                plan = planner.plan(per_track_metadata)
+            except Exception as e:
+                self.__log.warning("skipping %s: %s", metadata_path, e)
+                self.report(OrderedDict([
+                    ("event", "skipped"),
+                    ("metadata", metadata_path),
+                    ("error", "%s: %s" % (e.__class__.__name__, e)),
+                ]))
+                continue
+
+            for (track_metadata, paths) in zip(per_track_metadata, plan):
+                if paths is None:
+                    continue
+                for (type_, tags) in [
+                        ("FLAC", make_vorbis_comments(track_metadata)),
+                        ("MP3", make_id3v2_tags(track_metadata)),
+                        ]:
+                    key = (type_, _tag_identity(type_, tags))
+                    if key in ambiguous:
+                        ambiguous[key].append(metadata_path)
+                    elif key in index and index[key] != paths:
+                        # e.g. an album and its reissue; neither location
+                        # can be chosen safely
+                        self.__log.warning(
+                            "%s and %s have the same %s tags %r",
+                            claimed_by[key], metadata_path, type_, key[1])
+                        del index[key]
+                        ambiguous[key] = [claimed_by.pop(key), metadata_path]
+                    else:
+                        index[key] = paths
+                        claimed_by[key] = metadata_path
+
+        return (index, ambiguous)
+
+    def _walk_library(self, type_):
+        """Generate the name of every track file in a library."""
+        library_root = self.library_roots[0 if type_ == "FLAC" else 1]
+        fileext = get_config()[type_]["track_fileext"]
+        for (dirpath, dirnames, filenames) in os.walk(library_root):
+            dirnames[:] = [
+                name for name in dirnames if not name.startswith('.')]
+            for name in filenames:
+                if name.endswith(fileext) and not name.startswith('.'):
+                    yield os.path.join(dirpath, name)
+
+    def _read_identity(self, type_, filename):
+        """Return the identifying tags of a FLAC or MP3 file."""
+        try:
+            tags = (
+                read_flac_vorbis_comments(filename) if type_ == "FLAC"
+                else read_id3v2_tags(filename))
+        except Exception as e:
+            self.__log.warning("unable to read tags from %s: %s", filename, e)
+            return None
 
-        section("Gracenote")
-        option("Gracenote", "client_id", config["Gracenote"]["client_id"])
+        return _tag_identity(type_, tags)
 
-        section("MusicBrainz")
-        option(
-            "MusicBrainz", "contact_url_or_email", 
-            config["MusicBrainz"]["contact_url_or_email"])
-        option(
-            "MusicBrainz", "libdiscid_location",
-            config["MusicBrainz"]["libdiscid_location"])
+    def _resolve_conflicts(self, candidates):
+        """Remove (and report) moves that would overwrite other files.
 
+        :arg list candidates: (current file name, new file name) pairs
+        :return: the moves that can be made safely
+        :rtype: :obj:`list`
 
-class EditAggregationConfigurationDialog(_EditConfigurationDialog):
-    """A dialog that allows the user to edit metadata aggregation
-    options from the *flacmanager.ini* configuration file.
+        """
+        by_target = OrderedDict()
+        for (source, target) in candidates:
+            by_target.setdefault(target.casefold(), []).append(
+                (source, target))
+
+        sources = set(source.casefold() for (source, _) in candidates)
+        moves = []
+        for same_target in by_target.values():
+            (source, target) = same_target[0]
+            if len(same_target) > 1:
+                reason = "%d files would be moved to the same name" % len(
+                    same_target)
+            elif (os.path.exists(target)
+                    and target.casefold() not in sources
+                    and not os.path.samefile(source, target)):
+                reason = "a different file already exists"
+            else:
+                moves.append((source, target))
+                continue
 
-    """
+            for (source, target) in same_target:
+                self.report(OrderedDict([
+                    ("event", "conflict"),
+                    ("from", source),
+                    ("to", target),
+                    ("reason", reason),
+                ]))
 
-    def _populate(self, frame, config):
-        """Create the content of the dialog."""
-        section = partial(self.section, frame)
-        option = partial(self.option, frame)
+        return moves
 
-        section("HTTP")
-        option("HTTP", "timeout", config["HTTP"].getfloat("timeout"), width=7)
+    def _move_in_batches(self, move_log, moves):
+        """Move files concurrently, one batch per destination folder.
 
-        section("Gracenote")
-        option("Gracenote", "client_id", config["Gracenote"]["client_id"])
-        option("Gracenote", "user_id", config["Gracenote"]["user_id"])
+        :return: the number of files that could not be moved
 
-        section("MusicBrainz")
-        option(
-            "MusicBrainz", "contact_url_or_email", 
-            config["MusicBrainz"]["contact_url_or_email"])
-        option(
-            "MusicBrainz", "libdiscid_location",
-            config["MusicBrainz"]["libdiscid_location"])
+        """
+        batches = OrderedDict()
+        for (source, target) in moves:
+            batches.setdefault(os.path.dirname(target), []).append(
+                (source, target))
+
+        def move_batch(batch):
+            failed = 0
+            for (source, target) in batch:
+                try:
+                    self._move(move_log, source, target)
+                except Exception as e:
+                    failed += 1
+                    self._report_failure(source, target, e)
+            return failed
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return sum(executor.map(move_batch, batches.values()))
+
+    def _move_cover_images(self, move_log, moves):
+        """Move the saved cover images along with their album folders."""
+        album_dirnames = OrderedDict(
+            (os.path.dirname(source), os.path.dirname(target))
+            for (source, target) in moves)
+        for (old_dirname, dirname) in album_dirnames.items():
+            for cover_basename in ["cover.jpg", "cover.png"]:
+                source = os.path.join(old_dirname, cover_basename)
+                target = os.path.join(dirname, cover_basename)
+                if os.path.isfile(source) and not os.path.exists(target):
+                    try:
+                        self._move(move_log, source, target)
+                    except Exception as e:
+                        self._report_failure(source, target, e)
 
+    def _move(self, move_log, source, target):
+        """Move *source* to *target* and record the move.
 
-class EditOrganizationConfigurationDialog(_EditConfigurationDialog):
-    """A dialog that allows the user to edit library folder/file
-    organization options from the *flacmanager.ini* configuration file.
+        :raises FLACManagerError:
+           if a different file already exists at *target*
 
-    """
+        """
+        if os.path.lexists(target) and not (
+                os.path.exists(source) and os.path.samefile(source, target)):
+            # never overwrite (e.g. a file that reappeared before an undo)
+            raise FLACManagerError(
+                "%s already exists" % target, context_hint="Reorganize")
 
-    def _populate(self, frame, config):
-        """Create the content of the dialog."""
-        section = partial(self.section, frame)
-        option = partial(self.option, frame)
+        # os.makedirs doesn't work as expected for external media
+        subprocess.check_call(["mkdir", "-p", os.path.dirname(target)])
+        shutil.move(source, target)
 
-        section("Organize")
-        option("Organize", "library_root", config["Organize"]["library_root"])
-        option(
-            "Organize", "library_subroot_trie_key",
-            config["Organize"]["library_subroot_trie_key"], width=29)
-        option(
-            "Organize", "library_subroot_trie_level",
-            config["Organize"].getint("library_subroot_trie_level"), width=5)
-        option(
-            "Organize", "album_folder",
-            config["Organize"].get("album_folder", raw=True))
-        option(
-            "Organize", "ndisc_album_folder",
-            config["Organize"].get("ndisc_album_folder", raw=True))
-        option(
-            "Organize", "compilation_album_folder",
-            config["Organize"].get("compilation_album_folder", raw=True))
-        option(
-            "Organize", "ndisc_compilation_album_folder",
-            config["Organize"].get("ndisc_compilation_album_folder", raw=True))
-        option(
-            "Organize", "track_filename",
-            config["Organize"].get("track_filename", raw=True))
-        option(
-            "Organize", "ndisc_track_filename",
-            config["Organize"].get("ndisc_track_filename", raw=True))
-        option(
-            "Organize", "compilation_track_filename",
-            config["Organize"].get("compilation_track_filename", raw=True))
-        option(
-            "Organize", "ndisc_compilation_track_filename",
-            config["Organize"].get("ndisc_compilation_track_filename", raw=True))
-        option(
-            "Organize", "use_xplatform_safe_names",
-            config["Organize"].getboolean("use_xplatform_safe_names"))
-        option(
-            "Organize", "save_cover_image",
-            config["Organize"].getboolean("save_cover_image"))
+        record = OrderedDict([("from", source), ("to", target)])
+        with self._log_lock:
+            print(json.dumps(record), file=move_log, flush=True)
 
+        self.report(OrderedDict([("event", "moved")] + list(record.items())))
 
-class EditFLACEncodingConfigurationDialog(_EditConfigurationDialog):
-    """A dialog that allows the user to edit FLAC encoding options from
-    the *flacmanager.ini* configuration file.
+    def _report_failure(self, source, target, e):
+        """Report a move that failed."""
+        self.__log.error("failed to move %s to %s: %s", source, target, e)
+        self.report(OrderedDict([
+            ("event", "failed"),
+            ("from", source),
+            ("to", target),
+            ("error", "%s: %s" % (e.__class__.__name__, e)),
+        ]))
 
-    """
+    def _prune_empty_dirs(self, filenames):
+        """Remove folders that have been emptied by moves (up to, but
+        not including, the library roots).
 
-    def _populate(self, frame, config):
-        """Create the content of the dialog."""
-        section = partial(self.section, frame)
-        option = partial(self.option, frame)
+        """
+        roots = set(self.library_roots)
+        for dirname in sorted(
+                set(os.path.dirname(filename) for filename in filenames),
+                key=len, reverse=True):
+            while dirname not in roots and os.path.isdir(dirname):
+                try:
+                    os.rmdir(dirname)
+                except OSError:
+                    break # not empty
+                dirname = os.path.dirname(dirname)
 
-        section("FLAC")
-        option(
-            "FLAC", "flac_encode_options",
-            config["FLAC"]["flac_encode_options"])
 
+def _tag_identity(type_, tags):
+    """Return the values of the identifying tags for a track.
 
-class EditVorbisCommentsConfigurationDialog(_EditConfigurationDialog):
-    """A dialog that allows the user to edit default FLAC Vorbis comment
-    options from the *flacmanager.ini* configuration file.
+    :arg str type_: "FLAC" or "MP3"
+    :arg dict tags: tag name/value-list pairs
 
     """
+    return tuple(
+        tuple(str(value).casefold() for value in tags.get(name, []))
+        for name in _REORGANIZE_IDENTITY_TAGS[type_])
 
-    def _populate(self, frame, config):
-        """Create the content of the dialog."""
-        section = partial(self.section, frame)
-        option = partial(self.option, frame, width=29)
-
-        section("Vorbis")
 
-        for comment in config["Vorbis"].keys():
-            option("Vorbis", comment, config["Vorbis"].get(comment, raw=True))
+class MetadataError(FLACManagerError):
+    """The type of exception raised when metadata operations fail."""
 
 
-class EditFLACOrganizationConfigurationDialog(_EditConfigurationDialog):
-    """A dialog that allows the user to edit FLAC folder/file
-    organization options from the *flacmanager.ini* configuration file.
+@logged
+class MetadataCollector:
+    """Base class for collecting album and track metadata."""
 
-    """
+    #: The *flacmanager.ini* section that configures this collector's
+    #: ``deadline`` (see :class:`MetadataAggregator`), or ``None`` if
+    #: the collector is only bound by the overall aggregation deadline.
+    CONFIG_SECTION = None
 
-    def _populate(self, frame, config):
-        """Create the content of the dialog."""
-        section = partial(self.section, frame)
-        option = partial(self.option, frame)
+    def __init__(self, toc):
+        """
+        :arg flacmanager.TOC toc: a disc's table of contents
 
-        section("FLAC")
-        option(
-            "FLAC", "library_root",
-            config["FLAC"].get("library_root", raw=True))
-        option(
-            "FLAC", "library_subroot_trie_key",
-            config["FLAC"].get("library_subroot_trie_key", raw=True), width=29)
+        """
+        self.__log.call(toc)
+        self.toc = toc
 
-        # there won't be any validation if this is set to a non-interpolated,
-        # non-int value!
-        option(
-            "FLAC", "library_subroot_trie_level",
-            config["FLAC"].get("library_subroot_trie_level", raw=True))
-        Label(
-            frame, text="${Organize:library_subroot_trie_level} or a number"
-            ).grid(row=self._row, column=1, sticky=W)
-        self._row += 1
+    def reset(self):
+        """Initialize all collection fields to default (empty)."""
+        self.__log.call()
 
-        option(
-            "FLAC", "album_folder",
-            config["FLAC"].get("album_folder", raw=True))
-        option(
-            "FLAC", "ndisc_album_folder",
-            config["FLAC"].get("ndisc_album_folder", raw=True))
-        option(
-            "FLAC", "compilation_album_folder",
-            config["FLAC"].get("compilation_album_folder", raw=True))
-        option(
-            "FLAC", "ndisc_compilation_album_folder",
-            config["FLAC"].get("ndisc_compilation_album_folder", raw=True))
-        option(
-            "FLAC", "track_filename",
-            config["FLAC"].get("track_filename", raw=True))
-        option(
-            "FLAC", "ndisc_track_filename",
-            config["FLAC"].get("ndisc_track_filename", raw=True))
-        option(
-            "FLAC", "compilation_track_filename",
-            config["FLAC"].get("compilation_track_filename", raw=True))
-        option(
-            "FLAC", "ndisc_compilation_track_filename",
-            config["FLAC"].get("ndisc_compilation_track_filename", raw=True))
+        number_of_tracks = len(self.toc.track_offsets)
 
-        # there won't be any validation if this is set to a non-interpolated,
-        # non-boolean ("yes"/"no") value!
-        option(
-            "FLAC", "use_xplatform_safe_names",
-            config["FLAC"].get("use_xplatform_safe_names", raw=True))
-        Label(
-            frame, text="${Organize:use_xplatform_safe_names}, yes, or no"
-            ).grid(row=self._row, column=1, sticky=W)
-        self._row += 1
+        metadata = {
+            "album_title": [],
+            "album_discnumber": 1,
+            "album_disctotal": 1,
+            "album_compilation": False,
+            "album_artist": [],
+            "album_label": [],
+            "album_genre": [],
+            "album_year": [],
+            "album_cover": [],
+            "album_tracktotal": number_of_tracks,
+            "__tracks": [None],  # 1-based indexing
+            "__custom": OrderedDict(),
+        }
 
-        # there won't be any validation if this is set to a non-interpolated,
-        # non-boolean ("yes"/"no") value!
-        option(
-            "FLAC", "save_cover_image",
-            config["FLAC"].getboolean("save_cover_image"))
-        Label(
-            frame, text="${Organize:save_cover_image}, yes, or no"
-            ).grid(row=self._row, column=1, sticky=W)
-        self._row += 1
+        for i in range(number_of_tracks):
+            metadata["__tracks"].append({
+                "track_number": i + 1,
+                "track_include": True,
+                "track_title": [],
+                "track_artist": [],
+                "track_genre": [],
+                "track_year": [],
+                "__custom": OrderedDict(),
+            })
 
+        self.metadata = metadata
 
-class EditMP3EncodingConfigurationDialog(_EditConfigurationDialog):
-    """A dialog that allows the user to edit MP3 encoding options from
-    the *flacmanager.ini* configuration file.
+    def collect(self):
+        """Fetch metadata from a service."""
+        self.reset()
 
-    """
 
-    def _populate(self, frame, config):
-        """Create the content of the dialog."""
-        section = partial(self.section, frame)
-        option = partial(self.option, frame)
+#: The default ``[HTTP] rate_limits``: whitespace-separated
+#: ``host=rate:burst`` pairs (see :class:`RateLimiter`). MusicBrainz
+#: allows one request per second (on average) per client.
+HTTP_RATE_LIMITS = "musicbrainz.org=1.0:1"
 
-        section("MP3")
-        option(
-            "MP3", "lame_encode_options", config["MP3"]["lame_encode_options"])
 
+def _lookup_host(mapping, host, default=None):
+    """Return the value in *mapping* for *host* or its closest parent
+    domain.
 
-class EditID3v2TagsConfigurationDialog(_EditConfigurationDialog):
-    """A dialog that allows the user to edit default MP3 ID3v2 tag
-    options from the *flacmanager.ini* configuration file.
+    :arg dict mapping: (lower case) host or domain names -> values
+    :arg str host: an HTTP host, optionally with a port
+    :keyword default: returned if neither *host* nor any parent domain
+                      is in *mapping*
 
     """
+    host = host.split(':')[0].lower()
+    while host:
+        if host in mapping:
+            return mapping[host]
+        host = host.partition('.')[2]
 
-    def _populate(self, frame, config):
-        """Create the content of the dialog."""
-        section = partial(self.section, frame)
-        option = partial(self.option, frame, width=29)
+    return default
 
-        section("ID3v2")
 
-        for tag in config["ID3v2"].keys():
-            option("ID3v2", tag, config["ID3v2"].get(tag, raw=True))
+@logged
+class RateLimiter:
+    """Token-bucket rate limits for HTTP requests, per host.
 
+    Each configured host (which also covers its subdomains) has a bucket
+    that holds up to *burst* tokens and is refilled at *rate* tokens per
+    second. Every request to that host takes a token; a request that
+    finds the bucket empty **waits** for its token rather than failing,
+    and waiting requests are served in the order they arrived.
 
-class EditMP3OrganizationConfigurationDialog(_EditConfigurationDialog):
-    """A dialog that allows the user to edit MP3 folder/file
-    organization options from the *flacmanager.ini* configuration file.
+    Hosts without a configured limit are not limited.
 
     """
 
-    def _populate(self, frame, config):
-        """Create the content of the dialog."""
-        section = partial(self.section, frame)
-        option = partial(self.option, frame)
+    def __init__(self, limits=None):
+        """
+        :keyword dict limits:
+           host or domain name -> a 2-tuple of (*rate* in requests per
+           second, *burst* size)
 
-        section("MP3")
-        option(
-            "MP3", "library_root",
-            config["MP3"].get("library_root", raw=True))
-        option(
-            "MP3", "library_subroot_trie_key",
-            config["MP3"].get("library_subroot_trie_key", raw=True), width=29)
+        """
+        self.__log.call(limits=limits)
 
-        # there won't be any validation if this is set to a non-interpolated,
-        # non-int value!
-        option(
-            "MP3", "library_subroot_trie_level",
-            config["MP3"].get("library_subroot_trie_level", raw=True))
-        Label(
-            frame, text="${Organize:library_subroot_trie_level} or a number"
-            ).grid(row=self._row, column=1, sticky=W)
-        self._row += 1
+        self.limits = {
+            host.lower(): limit
+            for (host, limit) in (limits or {}).items()}
+        self._domains = {domain: domain for domain in self.limits}
 
-        option(
-            "MP3", "album_folder",
-            config["MP3"].get("album_folder", raw=True))
-        option(
-            "MP3", "ndisc_album_folder",
-            config["MP3"].get("ndisc_album_folder", raw=True))
-        option(
-            "MP3", "compilation_album_folder",
-            config["MP3"].get("compilation_album_folder", raw=True))
-        option(
-            "MP3", "ndisc_compilation_album_folder",
-            config["MP3"].get("ndisc_compilation_album_folder", raw=True))
-        option(
-            "MP3", "track_filename",
-            config["MP3"].get("track_filename", raw=True))
-        option(
-            "MP3", "ndisc_track_filename",
-            config["MP3"].get("ndisc_track_filename", raw=True))
-        option(
-            "MP3", "compilation_track_filename",
-            config["MP3"].get("compilation_track_filename", raw=True))
-        option(
-            "MP3", "ndisc_compilation_track_filename",
-            config["MP3"].get("ndisc_compilation_track_filename", raw=True))
+        #: host or domain name -> [tokens, last refill time]
+        self._buckets = {}
+        #: host or domain name -> [requests delayed, total seconds waited]
+        self._waits = {}
+        self._lock = threading.Lock()
 
-        # there won't be any validation if this is set to a non-interpolated,
-        # non-boolean ("yes"/"no") value!
-        option(
-            "MP3", "use_xplatform_safe_names",
-            config["MP3"].get("use_xplatform_safe_names", raw=True))
-        Label(
-            frame, text="${Organize:use_xplatform_safe_names}, yes, or no"
-            ).grid(row=self._row, column=1, sticky=W)
-        self._row += 1
+    def wait(self, host):
+        """Block until a request to *host* is allowed.
 
-        # there won't be any validation if this is set to a non-interpolated,
-        # non-boolean ("yes"/"no") value!
-        option(
-            "MP3", "save_cover_image",
-            config["MP3"].getboolean("save_cover_image"))
-        Label(
-            frame, text="${Organize:save_cover_image}, yes, or no"
-            ).grid(row=self._row, column=1, sticky=W)
-        self._row += 1
+        :arg str host: an HTTP host, optionally with a port
+        :return: the number of seconds waited
+        :rtype: :obj:`float`
 
+        """
+        self.__log.call(host)
+
+        domain = _lookup_host(self._domains, host)
+        if domain is None:
+            self.__log.return_(0.0)
+            return 0.0
+
+        (rate, burst) = self.limits[domain]
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._buckets.setdefault(domain, [burst, now])
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+            # a negative balance reserves tokens for the requests that
+            # are already waiting, so requests are served in order
+            bucket[0] -= 1
+            delay = -bucket[0] / rate if bucket[0] < 0 else 0.0
+
+            if delay:
+                waits = self._waits.setdefault(domain, [0, 0.0])
+                waits[0] += 1
+                waits[1] += delay
+                (delayed, waited) = waits
+
+        if delay:
+            self.__log.info(
+                "waiting %.2fs to request %s (%d requests to %s have waited "
+                    "%.2fs in total)",
+                delay, host, delayed, domain, waited)
+            time.sleep(delay)
 
-class EditUserInterfaceConfigurationDialog(_EditConfigurationDialog):
-    """A dialog that allows the user to edit user interface settings
-    from the *flacmanager.ini* file.
+        self.__log.return_(delay)
+        return delay
 
-    """
 
-    def _populate(self, frame, config):
-        """Create the content of the dialog."""
-        section = partial(self.section, frame)
-        option = partial(self.option, frame)
+#: The process-wide :class:`RateLimiter` (see :func:`get_rate_limiter`).
+_RATE_LIMITER = None
 
-        section("UI")
-        option(
-            "UI", "minwidth", config["UI"].getint("minwidth", 1024), width=5)
-        option(
-            "UI", "minheight", config["UI"].getint("minheight", 768), width=5)
-        option("UI", "padx", config["UI"].getint("padx", 7), width=3)
-        option("UI", "pady", config["UI"].getint("pady", 7), width=3)
-        option(
-            "UI", "encoding_max_visible_tracks",
-            config["UI"].getint("encoding_max_visible_tracks", 29), width=3)
+#: Guards initialization of :data:`_RATE_LIMITER`.
+_RATE_LIMITER_LOCK = threading.Lock()
 
 
-class EditLoggingConfigurationDialog(_EditConfigurationDialog):
-    """A dialog that allows the user to edit logging and debug settings
-    from the *flacmanager.ini* file.
+def get_rate_limiter():
+    """Return the process-wide HTTP request rate limiter.
+
+    :return: the :class:`RateLimiter` configured by ``[HTTP] rate_limits``
+    :rtype: :class:`RateLimiter`
 
     """
+    _log.call()
 
-    def _populate(self, frame, config):
-        """Create the content of the dialog."""
-        section = partial(self.section, frame)
-        option = partial(self.option, frame)
+    global _RATE_LIMITER
+    with _RATE_LIMITER_LOCK:
+        if _RATE_LIMITER is None:
+            limits = {}
+            for host_limit in get_config().get(
+                    "HTTP", "rate_limits", fallback=HTTP_RATE_LIMITS).split():
+                (host, _, limit) = host_limit.partition('=')
+                (rate, _, burst) = limit.partition(':')
+                limits[host] = (float(rate), float(burst or 1))
 
-        section("Logging")
-        levels = [
-            "TRACE", "DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
-        level = config["Logging"].get("level", "INFO")
-        option(
-            "Logging", "level",
-            [level if level in levels else "INFO"] + levels)
-        option("Logging", "filename", config["Logging"]["filename"])
-        option("Logging", "filemode", config["Logging"]["filemode"])
-        option("Logging", "format", config["Logging"].get("format", raw=True))
+            _RATE_LIMITER = RateLimiter(limits)
 
-        section("HTTP")
-        option(
-            "HTTP", "debuglevel", config["HTTP"].getint("debuglevel", 0),
-            width=3)
+        rate_limiter = _RATE_LIMITER
 
+    _log.return_(rate_limiter)
+    return rate_limiter
 
-#: A list of recommended and proposed Vorbis comment names.
-_VORBIS_COMMENTLIST = [
-    # https://xiph.org/vorbis/doc/v-comment.html
-    # [1] https://wiki.xiph.org/Field_names
-    # [2] http://age.hobba.nl/audio/mirroredpages/ogg-tagging.html
-    # [3] http://reallylongword.org/vorbiscomment/
-    "ALBUM (collection name)",
-    "ARRANGER (who arranged the piece)", # [2]
-    "ARTIST (artist responsible for the work)",
-    "AUTHOR (author of spoken work)", # [2]
-    "CATALOGNUMBER (producer/label catalog number)", # [3]
-    "COMMENT (user comment)", # [2]
-    "COMPOSER (composer of the work)", # [1]
-    "CONDUCTOR (conductor of the work)", # [2]
-    "CONTACT (creator/distributor contact info)",
-    "COPYRIGHT (Copyright attribution)",
-    "DATE (recording date)",
-    "DESCRIPTION (description of contents)",
-    "DISCNUMBER (multi-disc number)", # [1]
-    "DISCTOTAL (number of discs)", # [1]
-    #"ENCODER (user application name)", # [1]
-    "ENCODING (quality/bitrate settings)", # [2]
-    "ENGINEER (who produced the master)", # [3]
-    "ENSEMBLE (group playing the piece)", # [2]
-    "GENRE (music genre)",
-    "GUESTARTIST (collaborative artist)", # [3]
-    "ISRC (International Standard Recording Code)",
-    "LABEL (record label or imprint)", # [2]
-    "LICENSE (License information)",
-    "LOCATION (recording location)",
-    "LYRICIST (who wrote the lyrics)", # [2]
-    "OPUS (number of the work)", # [2]
-    "ORGANIZATION (production organization)",
-    "PART (division within a work)", # [2]
-    "PARTNUMBER (number of the division/part)", # [2]
-    "PERFORMER (artist(s) who performed the work)",
-    "PRODUCER (producer of the work)", # [3]
-    "PRODUCTNUMBER (UPC, EAN, JAN, etc.)", # [1]
-    "PUBLISHER (who published the disc)", # [2]
-    "REMIXER (who remixed the work)", # [3]
-    "SOURCEARTIST (original artist of performed work)", # [3]
-    "SOURCEMEDIA (recording media type)", # [1]
-    "TITLE (Track/Work name)",
-    "TRACKNUMBER (number of this piece)",
-    "TRACKTOTAL (number of tracks)", # [1]
-    "VERSION (differentiate multiple versions)",
-    "VOLUME (multi-volume work)", # [3]
-]
 
+#: The maximum number of connections (in use or idle) that a
+#: :class:`HTTPConnectionPool` keeps to any one host.
+HTTP_POOL_MAX_PER_HOST = 6
 
-#: A list of standard and common non-standard ID3v2 frames.
-_ID3V2_TAGLIST = [
-    # http://id3.org/id3v2.3.0 (unless otherwise noted)
-    "AENC (Audio encryption)",
-    "APIC (Attached picture)",
-    "COMM (Comments)",
-    "COMR (Commercial frame)",
-    "ENCR (Encryption method registration)",
-    "EQUA (Equalization)",
-    "ETCO (Event timing codes)",
-    "GEOB (General encapsulated object)",
-    "GRID (Group identification registration)",
-    "IPLS (Involved people list)",
-    "LINK (Linked information)",
-    "MCDI (Music CD identifier)",
-    "MLLT (MPEG location lookup table)",
-    "OWNE (Ownership frame)",
-    "PRIV (Private frame)",
-    "PCNT (Play counter)",
-    "POPM (Popularimeter)",
-    "POSS (Position synchronisation frame)",
-    "RBUF (Recommended buffer size)",
-    "RVAD (Relative volume adjustment)",
-    "RVRB (Reverb)",
-    "SYLT (Synchronized lyric/text)",
-    "SYTC (Synchronized tempo codes)",
-    "TALB (Album/Movie/Show title)",
-    "TBPM (BPM (beats per minute))",
-    "TCMP (iTunes Compilation Flag)", # http://id3.org/iTunes Compilation Flag
-    "TCOM (Composer)",
-    "TCON (Content type)",
-    "TCOP (Copyright message)",
-    "TDAT (Date)",
-    "TDLY (Playlist delay)",
-    #"TENC (Encoded by)",
-    "TEXT (Lyricist/Text writer)",
-    "TFLT (File type)",
-    "TIME (Time)",
-    "TIT1 (Content group description)",
-    "TIT2 (Title/songname/content description)",
-    "TIT3 (Subtitle/Description refinement)",
-    "TKEY (Initial key)",
-    "TLAN (Language(s))",
-    "TLEN (Length)",
-    "TMED (Media type)",
-    "TOAL (Original album/movie/show title)",
-    "TOFN (Original filename)",
-    "TOLY (Original lyricist(s)/text writer(s))",
-    "TOPE (Original artist(s)/performer(s))",
-    "TORY (Original release year)",
-    "TOWN (File owner/licensee)",
-    "TPE1 (Lead performer(s)/Soloist(s))",
-    "TPE2 (Band/orchestra/accompaniment)",
-    "TPE3 (Conductor/performer refinement)",
-    "TPE4 (Interpreted, remixed, or otherwise modified by)",
-    "TPOS (Part of a set)",
-    "TPUB (Publisher)",
-    "TRCK (Track number/Position in set)",
-    "TRDA (Recording dates)",
-    "TRSN (Internet radio station name)",
-    "TRSO (Internet radio station owner)",
-    "TSIZ (Size)",
-    "TSOT (iTunes Title Sort)", # http://id3.org/iTunes
-    "TSOP (iTunes Artist Sort)", # http://id3.org/iTunes
-    "TSOA (iTunes Album Sort)", # http://id3.org/iTunes
-    "TSO2 (iTunes Album Artist Sort)", # http://id3.org/iTunes
-    "TSOC (iTunes Composer Sort)", # http://id3.org/iTunes
-    "TSRC (ISRC (international standard recording code))",
-    "TSSE (Software/Hardware and settings used for encoding)",
-    "TYER (Year)",
-    "TXXX (User defined text information frame)",
-    "UFID (Unique file identifier)",
-    "USER (Terms of use)",
-    "USLT (Unsychronized lyric/text transcription)",
-    "WCOM (Commercial information)",
-    "WCOP (Copyright/Legal information)",
-    "WOAF (Official audio file webpage)",
-    "WOAR (Official artist/performer webpage)",
-    "WOAS (Official audio source webpage)",
-    "WORS (Official internet radio station homepage)",
-    "WPAY (Payment)",
-    "WPUB (Publishers official webpage)",
-    "WXXX (User defined URL link frame)",
-]
+#: The number of seconds after which an idle pooled connection is
+#: closed rather than reused.
+HTTP_POOL_IDLE_TIMEOUT = 30.0
+
+#: The maximum number of redirects followed by
+#: :meth:`HTTPConnectionPool.request`.
+HTTP_MAX_REDIRECTS = 10
 
 
 @logged
-class EditCustomMetadataTaggingDialog(simpledialog.Dialog):
-    """Base dialog that allows the user to add/change/remove custom
-    metadata fields for Vorbis/ID3v2 tagging.
+class HTTPConnectionPool:
+    """Keep-alive HTTP/S connections shared by everything in the
+    process that talks to the metadata API and cover image hosts.
+
+    Connections are keyed by (scheme, host, port). A connection is
+    returned to the pool after its response has been read completely
+    (unless either side asked to close it), and is reused by the next
+    request to the same host, no matter which collector (or disc) makes
+    it. Idle connections older than the idle timeout are closed, and at
+    most *max_per_host* connections are open to any one host; further
+    requests wait for a connection to be released.
 
     """
 
-    class _TaggingHelp(simpledialog.Dialog):
-        """Dialog that displays a list of known and recommended Vorbis
-        comment names **or** standard and common non-standard ID3v2
-        frames.
+    def __init__(
+            self, max_per_host=HTTP_POOL_MAX_PER_HOST,
+            idle_timeout=HTTP_POOL_IDLE_TIMEOUT):
+        """
+        :keyword int max_per_host:
+           the maximum number of connections to any one host
+        :keyword float idle_timeout:
+           the number of seconds after which an idle connection is
+           closed
+
+        """
+        self.__log.call(max_per_host=max_per_host, idle_timeout=idle_timeout)
+
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+
+        #: (scheme, host, port) -> [(connection, idle since), ...]
+        self._idle = {}
+        #: (scheme, host, port) -> the number of connections in use
+        self._in_use = {}
+        self._condition = threading.Condition()
+
+    def request(
+            self, method, url, body=None, headers=None, timeout=None,
+            context=None):
+        """Make an HTTP/S request over a pooled connection.
+
+        :arg str method: the HTTP request method
+        :arg str url: the absolute request URL
+        :keyword body: the HTTP request body
+        :type body: :obj:`str` or :obj:`bytes`
+        :keyword headers: the HTTP request headers
+        :type headers: :obj:`dict` or :class:`http.client.HTTPMessage`
+        :keyword float timeout: the connection timeout in seconds
+        :keyword ssl.SSLContext context: used for HTTPS connections
+        :return:
+           a 2-tuple containing the connection and its (unread)
+           :class:`http.client.HTTPResponse`; the caller **must** pass
+           both to :meth:`release` when finished with the response
+
+        This method follows redirects (301, 302, 303, 307 and 308). A
+        request that fails because a reused connection had been closed
+        by the server is retried once over a new connection.
+
+        """
+        self.__log.call(
+            method, url, body=body, headers=headers, timeout=timeout,
+            context=context)
+
+        headers = headers if headers is not None else {}
+        for _ in range(HTTP_MAX_REDIRECTS + 1):
+            parsed_url = urlparse(url)
+            path = parsed_url.path or '/'
+            if parsed_url.query:
+                path = "%s?%s" % (path, parsed_url.query)
+
+            (conx, response) = self._request(
+                parsed_url.scheme, parsed_url.netloc, method, path, body,
+                headers, timeout, context)
+            if response.status not in [301, 302, 303, 307, 308]:
+                rv = (conx, response)
+                self.__log.return_(rv)
+                return rv
+
+            location = response.msg["Location"]
+            self.__log.info(
+                "%s %s is being %d-redirected to %s",
+                method, url, response.status, location)
+            response.read()
+            self.release(conx, response)
+
+            url = urljoin(url, location)
+            if response.status == 303:
+                method = "GET"
+                body = None
+
+        raise HTTPException(
+            "%s %s exceeded %d redirects" % (method, url, HTTP_MAX_REDIRECTS))
 
-        """
-    
-        _VORBIS_HELP_TEXT = None
+    def release(self, conx, response=None):
+        """Return *conx* to the pool.
 
-        _ID3V2_HELP_TEXT = None
+        :arg http.client.HTTPConnection conx:
+           a connection obtained from :meth:`request`
+        :keyword http.client.HTTPResponse response:
+           the last response received over *conx*
 
-        @classmethod
-        @lru_cache(maxsize=2)
-        def _helptext(cls, type_):
-            """Format the list of Vorbis comments or ID3v2 frames.
+        *conx* is closed instead of being kept for reuse if *response*
+        was not read completely or either side asked to close the
+        connection.
 
-            :arg str type_:
-               either "Vorbis comment" or "ID3v2 tag"
-            :return: a text listing of Vorbis comments or ID3v2 frames
-            :rtype: :obj:`str`
+        """
+        self.__log.call(conx, response=response)
+
+        key = conx._fm_pool_key
+        reusable = (
+            conx.sock is not None
+            and (response is None
+                or (response.isclosed() and not response.will_close)))
+        if not reusable:
+            conx.close()
 
-            """
-            if type_ == "Vorbis comment":
-                if cls._VORBIS_HELP_TEXT is None:
-                    cls._VORBIS_HELP_TEXT = '\n'.join(_VORBIS_COMMENTLIST)
-                text = cls._VORBIS_HELP_TEXT
-            else: # ID3v2 tag
-                if cls._ID3V2_HELP_TEXT is None:
-                    cls._ID3V2_HELP_TEXT = '\n'.join(_ID3V2_TAGLIST)
-                text = cls._ID3V2_HELP_TEXT
+        with self._condition:
+            self._in_use[key] -= 1
+            if reusable:
+                self._idle.setdefault(key, []).append((conx, time.time()))
+            self._condition.notify_all()
 
-            return text
+    def close(self):
+        """Close all idle connections."""
+        self.__log.call()
 
-        def __init__(self, master, type_):
-            """
-            :arg master: the parent object of this dialog
-            :arg str type_:
-               either "Vorbis comment" or "ID3v2 tag"
+        with self._condition:
+            idle = self._idle
+            self._idle = {}
 
-            """
-            self._type = type_ # must be set BEFORE calling super __init__!
-            super().__init__(master, title="%s help" % type_)
+        for connections in idle.values():
+            for (conx, _) in connections:
+                conx.close()
 
-        def body(self, frame):
-            """Populate this dialog."""
-            help_list = scrolledtext.ScrolledText(
-                frame, height=17, bd=0, relief=FLAT, wrap=NONE)
-            help_list.insert(END, self._helptext(self._type))
-            help_list.config(state=DISABLED)
-            help_list.pack(
-                side=LEFT, fill=BOTH, expand=YES, padx=_PADX, pady=_PADY)
+    def _request(
+            self, scheme, netloc, method, path, body, headers, timeout,
+            context):
+        """Send one request over a pooled connection to *netloc*.
 
-    def __init__(self, master, metadata, **keywords):
-        """Initialize the dialog.
+        :return: the connection and its (unread) response
 
-        :arg master: the parent object of this dialog
-        :arg metadata: the album or track metadata
-        :arg dict keywords:
-           *name=value* keywords used to configure this dialog
+        The request first waits for its turn under the process-wide
+        :class:`RateLimiter`.
 
         """
-        self.__log.call(master, metadata, **keywords)
+        get_rate_limiter().wait(netloc)
+        (conx, reused) = self._acquire(scheme, netloc, timeout, context)
+        try:
+            try:
+                conx.request(method, path, body=body, headers=headers)
+                response = conx.getresponse()
+            except ConnectionError as e:
+                if not reused:
+                    raise
+                self.__log.debug(
+                    "reused connection to %s failed (%s); reconnecting",
+                    netloc, e)
+                conx.close()
+                conx.request(method, path, body=body, headers=headers)
+                response = conx.getresponse()
+        except:
+            conx.close()
+            self.release(conx)
+            raise
 
-        self._metadata = metadata
-        self._fields = [] # (vorbis_var, id3v2_var, value_var)
-        self._widgets = [] # (button, vorbis_entry, id3v2_entry, value_entry)
-        # must come last, as it will call body(frame) before returning!
-        super().__init__(master, **keywords)
+        return (conx, response)
 
-    def body(self, frame):
-        """Create the content of the dialog.
+    def _acquire(self, scheme, netloc, timeout, context):
+        """Take an idle connection to *netloc* from the pool, or open a
+        new one.
 
-        :arg Frame frame: the frame that contains the body content
+        :return:
+           a 2-tuple containing the connection and whether or not it is
+           being reused
+        :raises TimeoutError:
+           if no connection to *netloc* became available within
+           *timeout* seconds
 
         """
-        self.__log.call(frame)
+        self.__log.call(scheme, netloc, timeout, context)
 
-        self._row = 0
+        parsed_netloc = urlparse("//" + netloc)
+        key = (
+            scheme, parsed_netloc.hostname,
+            parsed_netloc.port or (443 if scheme == "https" else 80))
 
-        self._instructions_var = StringVar()
-        self._body_instructions()
+        conx = None
+        expired = []
+        try:
+            with self._condition:
+                while True:
+                    now = time.time()
+                    idle = self._idle.get(key, [])
+                    while idle:
+                        (idle_conx, idle_since) = idle.pop()
+                        if now - idle_since < self.idle_timeout:
+                            conx = idle_conx
+                            break
+                        expired.append(idle_conx)
+
+                    in_use = self._in_use.get(key, 0)
+                    if (conx is not None
+                            or in_use + len(idle) < self.max_per_host):
+                        self._in_use[key] = in_use + 1
+                        break
 
-        Label(
-            frame, textvariable=self._instructions_var, anchor=NW
-        ).grid(row=self._row, columnspan=4, pady=7, sticky=W)
-        self._row += 1
+                    self.__log.debug(
+                        "waiting for one of %d connections to %s",
+                        in_use, netloc)
+                    if not self._condition.wait(timeout):
+                        raise TimeoutError(
+                            "no connection to %s became available" % netloc)
+        finally:
+            # (also if the wait timed out)
+            for expired_conx in expired:
+                self.__log.debug("closing idle connection %r", expired_conx)
+                expired_conx.close()
+
+        reused = conx is not None
+        if not reused:
+            if scheme == "https":
+                conx = HTTPSConnection(netloc, context=context, timeout=timeout)
+            else:
+                conx = HTTPConnection(netloc, timeout=timeout)
+            conx._fm_pool_key = key
+        elif timeout is not None:
+            conx.timeout = timeout
+            conx.sock.settimeout(timeout)
 
-        add_button = _styled(
-            Button(
-                frame, text="Add", default=ACTIVE,
-                command=lambda f=self._add_field, p=frame: f(p)),
-            foreground="Blue")
-        add_button.grid(row=self._row, column=0, pady=7, sticky=W)
+        rv = (conx, reused)
+        self.__log.return_(rv)
+        return rv
 
-        vorbis_frame = Frame(frame)
 
-        vorbis_label = _styled(
-            Label(vorbis_frame, text="Vorbis"), font="-weight bold")
-        vorbis_label.pack(side=LEFT)
+#: The process-wide :class:`HTTPConnectionPool`.
+_HTTP_POOL = HTTPConnectionPool()
 
-        vorbis_help_button = Button(
-            vorbis_frame, text='?', width=1,
-            command=
-                lambda self=self:
-                    self._TaggingHelp(vorbis_frame, type_="Vorbis comment"))
-        vorbis_help_button.pack(side=LEFT)
 
-        vorbis_frame.grid(row=self._row, column=1, pady=_PADY, sticky=W)
+def get_http_connection_pool():
+    """Return the process-wide HTTP/S connection pool.
 
-        id3v2_frame = Frame(frame)
+    :rtype: :class:`HTTPConnectionPool`
 
-        id3v2_label = _styled(
-            Label(id3v2_frame, text="ID3v2"), font="-weight bold")
-        id3v2_label.pack(side=LEFT)
+    """
+    return _HTTP_POOL
 
-        id3v2_help_button = Button(
-            id3v2_frame, text='?', width=1,
-            command=
-                lambda self=self:
-                    self._TaggingHelp(id3v2_frame, type_="ID3v2 tag"))
-        id3v2_help_button.pack(side=LEFT)
 
-        id3v2_frame.grid(row=self._row, column=2, pady=_PADY, sticky=W)
+#: The maximum number of cover images that a :class:`CoverFetcher`
+#: downloads concurrently.
+COVER_FETCH_MAX_WORKERS = 4
 
-        value_label = _styled(Label(frame, text="Value"), font="-weight bold")
-        value_label.grid(row=self._row, column=3, pady=_PADY, sticky=W)
+#: The maximum size (in bytes) of a downloaded cover image; larger
+#: images are discarded.
+COVER_MAX_BYTES = 16 * 1024 * 1024
 
-        self._row += 1
+#: The number of bytes read at a time when downloading a cover image.
+COVER_CHUNK_SIZE = 64 * 1024
 
-        for ((vorbis_comment, id3v2_tag), values) \
-                in self._metadata.get("__custom", {}).items():
-            self._add_field(
-                frame, vorbis_comment=vorbis_comment, id3v2_tag=id3v2_tag,
-                values=values)
 
-    def _body_instructions(self):
-        """Populate text instructions for the dialog."""
-        self._instructions_var.set(
-            "Specify a Vorbis comment and/or ID3v2 tag name, and a value.\n"
-            "Changes to metadata are not saved unless the [Save] button is "
-            "clicked.\n"
-            "Fields with empty comment/tag names, or an empty value, are NOT "
-            "saved.\n"
-            "Specify multiple values by adding multiple fields with the same "
-            "comment and/or tag and a different value."
-        )
+@logged
+class CoverFetcher:
+    """Downloads album cover images concurrently into temporary files.
 
-    def _add_field(self, parent, vorbis_comment="", id3v2_tag="", values=None):
-        """Render a custom field in the dialog body.
+    Images are streamed to disk (never held in memory in their
+    entirety), images larger than a maximum size are discarded, and
+    images are deduplicated by the SHA-1 digest of their content, so
+    the same image found by several metadata sources (or releases) is
+    kept only once.
 
-        :arg parent: the object that contains the field controls
-        :keyword str vorbis_comment: the custom Vorbis comment
-        :keyword str id3v2_tag: the custom ID3v2 tag
-        :keyword list values: the value(s) for the custom comment/tag
+    A single fetcher may be shared (e.g. by the collectors of a
+    :class:`MetadataAggregator`) so that images are deduplicated across
+    all of them.
 
-        """
-        self.__log.call(
-            parent, vorbis_comment=vorbis_comment, id3v2_tag=id3v2_tag,
-            values=values)
+    """
 
-        if values is None:
-            values = [""]
+    def __init__(
+            self, timeout=None, max_size=COVER_MAX_BYTES,
+            max_workers=COVER_FETCH_MAX_WORKERS):
+        """
+        :keyword float timeout:
+           the HTTP timeout in seconds (default: ``[HTTP] timeout``)
+        :keyword int max_size: the maximum image size in bytes
+        :keyword int max_workers:
+           the maximum number of concurrent downloads
 
-        for value in values:
-            # len(self._fields) will be the index where references to the
-            # variables are stored
-            fields_ix = len(self._fields)
+        """
+        self.__log.call(
+            timeout=timeout, max_size=max_size, max_workers=max_workers)
 
-            clear_button = _styled(
-                Button(
-                    parent, text="\u00d7", width=1,
-                    command=lambda f=self._clear_field, ix=fields_ix: f(ix)),
-                foreground="Red", font="-weight bold")
-            clear_button.grid(row=self._row, column=0)
+        self.timeout = (
+            timeout if timeout is not None
+            else get_config().getfloat("HTTP", "timeout"))
+        self.max_size = max_size
+        self.max_workers = max_workers
 
-            vorbis_var = StringVar(parent, value=vorbis_comment)
-            vorbis_entry = Entry(parent, textvariable=vorbis_var, width=17)
-            vorbis_entry.grid(row=self._row, column=1, sticky=W)
+        #: SHA-1 hex digest -> temporary file name
+        self._files = {}
+        self._lock = threading.Lock()
 
-            id3v2_var = StringVar(parent, value=id3v2_tag)
-            id3v2_entry = Entry(parent, textvariable=id3v2_var, width=7)
-            id3v2_entry.grid(row=self._row, column=2, sticky=W)
+    def fetch_all(self, urls, headers=None, context=None):
+        """Download the images at *urls* concurrently.
 
-            value_var = StringVar(parent, value=value)
-            value_entry = Entry(parent, textvariable=value_var, width=59)
-            value_entry.grid(row=self._row, column=3, sticky=W)
+        :arg list urls: image URLs
+        :keyword dict headers: additional HTTP request headers
+        :keyword ssl.SSLContext context: used for HTTPS URLs
+        :return:
+           the temporary file name of each distinct image, in *urls*
+           order (images that could not be downloaded, were too large or
+           were not recognized are omitted)
+        :rtype: :obj:`list`
 
-            self._fields.append((vorbis_var, id3v2_var, value_var))
-            self._widgets.append(
-                (clear_button, vorbis_entry, id3v2_entry, value_entry))
+        """
+        self.__log.call(urls, headers=headers, context=context)
 
-            self._row += 1
+        if not urls:
+            return []
 
-    def _clear_field(self, index):
-        """Clear (effectively removing) the *index* -th field.
+        with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(urls))) as executor:
+            filenames = list(executor.map(
+                partial(self._fetch, headers=headers, context=context), urls))
 
-        :arg int index: index into the *fields* list of variables
+        filenames = list(OrderedDict.fromkeys(
+            filename for filename in filenames if filename is not None))
 
-        """
-        self.__log.call(index)
+        self.__log.return_(filenames)
+        return filenames
 
-        for var in self._fields[index]:
-            var.set("")
-        for i in range(4):
-            self._widgets[index][i].destroy()
-            
+    def store(self, image_data):
+        """Write (or find the existing file for) *image_data*.
 
-    def buttonbox(self):
-        """Create the buttons to save and/or dismiss the dialog."""
-        box = Frame(self)
+        :arg bytes image_data: the raw image data
+        :return:
+           the temporary file name for *image_data*, or ``None`` if the
+           image type is not recognized
+        :rtype: :obj:`str`
 
-        Button(box, text="Save", width=10, command=self.ok).pack(
-            side=LEFT, padx=_PADX, pady=_PADY)
+        """
+        self.__log.call(image_data[:32])
 
-        Button(box, text="Cancel", width=10, command=self.cancel).pack(
-            side=LEFT, padx=_PADX, pady=_PADY)
+        image_type = imghdr.what("_ignored_", h=image_data)
+        if image_type is None:
+            self.__log.error(
+                "ignoring unrecognized image data: %r...", image_data[:32])
+            return None
 
-        self.bind("<Return>", self.ok)
-        self.bind("<Escape>", self.cancel)
+        digest = hashlib.sha1(image_data).hexdigest()
+        with self._lock:
+            filename = self._files.get(digest)
+        if filename is None:
+            filename = make_tempfile(suffix='.' + image_type)
+            with open(filename, "wb") as f:
+                f.write(image_data)
+            filename = self._keep(digest, filename)
 
-        box.pack()
+        self.__log.return_(filename)
+        return filename
 
-    def apply(self):
-        """Save changes to *metadata*."""
-        self.__log.call()
+    def _fetch(self, url, headers=None, context=None):
+        """Stream the image at *url* into a temporary file.
 
-        custom = self._metadata["__custom"] = OrderedDict()
+        :return: the temporary file name, or ``None``
 
-        for (vorbis_var, id3v2_var, value_var) in self._fields:
-            vorbis_comment = vorbis_var.get()
-            id3v2_tag = id3v2_var.get()
-            value = value_var.get()
+        """
+        self.__log.call(url, headers=headers, context=context)
 
-            if value and (vorbis_comment or id3v2_tag):
-                key = (vorbis_comment, id3v2_tag)
+        pool = get_http_connection_pool()
+        try:
+            (conx, response) = pool.request(
+                "GET", url, headers=headers, timeout=self.timeout,
+                context=context)
+        except Exception as e:
+            self.__log.warning("GET %s failed: %s", url, e)
+            return None
 
-                if key not in custom:
-                    custom[key] = [value]
-                else:
-                    custom[key].append(value)
+        try:
+            if response.status != 200:
+                self.__log.warning(
+                    "GET %s failed: HTTP %d %s",
+                    url, response.status, response.reason)
+                return None
 
-                self.__log.info("saved custom %r = %r", key, value)
-            elif vorbis_comment or id3v2_tag or value:
+            # a malformed Content-Length is ignored (as http.client does);
+            # the size is still enforced while streaming
+            try:
+                content_length = int(response.getheader("Content-Length"))
+            except (TypeError, ValueError):
+                content_length = None
+            if content_length is not None and content_length > self.max_size:
                 self.__log.warning(
-                    "ignoring (%r, %r) = %r", vorbis_comment, id3v2_tag, value)
+                    "skipping %s; %s bytes exceeds the %d-byte limit",
+                    url, content_length, self.max_size)
+                return None
 
+            # the first chunk identifies the image type (and so the file
+            # name suffix)
+            try:
+                chunk = response.read(COVER_CHUNK_SIZE)
+            except Exception as e:
+                self.__log.warning("GET %s failed: %s", url, e)
+                return None
+            image_type = imghdr.what("_ignored_", h=chunk)
+            if image_type is None:
+                self.__log.warning(
+                    "ignoring unrecognized image data from %s: %r...",
+                    url, chunk[:32])
+                return None
 
-@logged
-class EditAlbumCustomMetadataTaggingDialog(EditCustomMetadataTaggingDialog):
-    """Dialog that allows the user to add/change/remove custom metadata
-    fields for *all tracks* (i.e. the album) at once for Vorbis/ID3v2
-    tagging.
+            filename = make_tempfile(suffix='.' + image_type)
+            sha1 = hashlib.sha1()
+            size = 0
+            try:
+                with open(filename, "wb") as f:
+                    while chunk:
+                        size += len(chunk)
+                        if size > self.max_size:
+                            raise FLACManagerError(
+                                "image exceeds the %d-byte limit"
+                                    % self.max_size,
+                                context_hint="Cover image download")
+                        sha1.update(chunk)
+                        f.write(chunk)
+                        chunk = response.read(COVER_CHUNK_SIZE)
+            except Exception as e:
+                self.__log.warning("skipping %s: %s", url, e)
+                os.unlink(filename)
+                return None
+        finally:
+            pool.release(conx, response)
 
-    """
+        filename = self._keep(sha1.hexdigest(), filename)
 
-    def __init__(self, master, album_metadata, tracks_metadata, **keywords):
-        """Initialize the dialog.
+        self.__log.return_(filename)
+        return filename
 
-        :arg master: the parent object of this dialog
-        :arg album_metadata: the album metadata
-        :arg tracks_metadata: the track metadata
-        :arg dict keywords:
-           *name=value* keywords used to configure this dialog
+    def _keep(self, digest, filename):
+        """Record *filename* as the file for *digest*, unless another
+        file already has the same content (in which case *filename* is
+        removed and the other file name is returned).
 
         """
-        self.__log.call(master, album_metadata, tracks_metadata, **keywords)
+        with self._lock:
+            existing_filename = self._files.setdefault(digest, filename)
 
-        self._tracks_metadata = tracks_metadata
-        self._cleared = set()
-        # must come last, as it will call body(frame) before returning!
-        super().__init__(master, album_metadata, **keywords)
+        if existing_filename != filename:
+            self.__log.debug(
+                "%s is a duplicate of %s", filename, existing_filename)
+            os.unlink(filename)
 
-    def _body_instructions(self):
-        """Populate text instructions for the dialog."""
-        super()._body_instructions()
-        self._instructions_var.set(
-            self._instructions_var.get() + '\n' +
-            "Changes applied (saved) to custom metadata tagging fields at the "
-            "album level are applied to ALL tracks."
-        )
+        return existing_filename
 
-    def _add_field(self, parent, vorbis_comment="", id3v2_tag="", values=None):
-        """Render a custom field in the dialog body.
 
-        :arg parent: the object that contains the field controls
-        :keyword str vorbis_comment: the custom Vorbis comment
-        :keyword str id3v2_tag: the custom ID3v2 tag
-        :keyword list values: the value(s) for the custom comment/tag
+#: The default folder in which metadata API responses are cached (see
+#: ``cache_dir`` in the ``[HTTP]`` section of *flacmanager.ini*).
+HTTP_CACHE_DIRNAME = "flacmanager-cache"
+
+#: The default number of seconds for which a cached metadata API
+#: response is used without revalidation (see :class:`HTTPResponseCache`).
+HTTP_CACHE_TTL = 7 * 24 * 60 * 60
+
+#: The default maximum total size (in megabytes) of cached metadata API
+#: responses.
+HTTP_CACHE_MAX_SIZE_MB = 64
 
-        If adding an already-populated field, the entry widgets will be
-        disabled. This is a bit ugly, but it greatly simplifies change
-        tracking - modify is modeled as a remove-then-add operation
-        instead of having to keep track of old and new values.
 
+class CachedHTTPResponse:
+    """Stands in for a **closed** :class:`http.client.HTTPResponse`
+    whose body was served from an :class:`HTTPResponseCache`.
+
+    """
+
+    def __init__(self, status, reason, headers):
         """
-        self.__log.call(
-            parent, vorbis_comment=vorbis_comment, id3v2_tag=id3v2_tag,
-            values=values)
+        :arg int status: the HTTP status code
+        :arg str reason: the HTTP reason phrase
+        :arg http.client.HTTPMessage headers: the response headers
 
-        super()._add_field(
-            parent, vorbis_comment=vorbis_comment, id3v2_tag=id3v2_tag,
-            values=values)
+        """
+        self.status = status
+        self.reason = reason
+        self.msg = self.headers = headers
 
-        if (vorbis_comment or id3v2_tag) and values:
-            for added in self._widgets[-len(values):]:
-                for widget in added[1:]:
-                    widget.config(state=DISABLED)
+    def getheader(self, name, default=None):
+        """Return the value of the *name* response header."""
+        return self.headers.get(name, default)
 
-    def _clear_field(self, index):
-        """Clear (effectively removing) the *index* -th field.
+    def close(self):
+        """Do nothing (the response is already closed)."""
+        pass
 
-        :arg int index: index into the *fields* list of variables
 
-        This method keeps track of which fields have been cleared so
-        that the changes can be "replayed" for each track.
+@logged
+class HTTPResponseCache:
+    """A disk-backed cache of metadata API responses.
+
+    Each response is stored as two files in the cache directory: a
+    *.body* file containing the response body, and a *.json* file
+    containing the status, headers and time of storage. Entries are
+    keyed by the request method, host, path and a digest of the request
+    body (so that idempotent POST queries, like Gracenote's, are cached
+    too).
+
+    A response younger than its host's TTL is used as-is. An older
+    response is revalidated with ``If-None-Match`` and/or
+    ``If-Modified-Since`` (if the server provided an ``ETag`` and/or
+    ``Last-Modified``), so that a "304 Not Modified" renews it without
+    transferring the body again.
+
+    When the total size of the cache exceeds its maximum size, the
+    least-recently used entries are removed. (The modification time of
+    an entry's *.json* file is its last use, so recency survives across
+    sessions.)
 
+    """
+
+    def __init__(
+            self, directory, max_size=HTTP_CACHE_MAX_SIZE_MB * 1024 * 1024,
+            ttl=HTTP_CACHE_TTL, host_ttls=None):
         """
-        self.__log.call(index)
+        :arg str directory: where cached responses are stored
+        :keyword int max_size: the maximum total size (in bytes)
+        :keyword float ttl: the default TTL (in seconds)
+        :keyword dict host_ttls:
+           host name -> TTL (in seconds); a host name also applies to
+           its subdomains
 
-        key = (
-            self._fields[index][0].get(), # Vorbis comment
-            self._fields[index][1].get() # ID3v2 tag
-        )
-        value = self._fields[index][2].get() # value
-        self._cleared.add((key, value))
+        """
+        self.__log.call(
+            directory, max_size=max_size, ttl=ttl, host_ttls=host_ttls)
 
-        super()._clear_field(index)
+        self.directory = directory
+        self.max_size = max_size
+        self.ttl = ttl
+        self.host_ttls = host_ttls if host_ttls is not None else {}
 
-    def apply(self):
-        """Save changes to the album metadata.
+        #: Entry key -> size (in bytes), least-recently used first.
+        self._index = None
+        self._size = 0
+        self._lock = threading.RLock()
 
-        The changes will also be applied to all tracks.
+    def make_key(self, method, host, path, body=None):
+        """Return the cache key for a request.
+
+        :arg str method: the HTTP request method
+        :arg str host: the HTTP host
+        :arg str path: the request path and optional query string
+        :keyword body: the HTTP request body
+        :type body: :obj:`str` or :obj:`bytes`
+        :rtype: :obj:`str`
 
         """
-        self.__log.call()
-        super().apply()
+        if type(body) is str:
+            body = body.encode("UTF-8")
 
-        album_custom = self._metadata["__custom"]
+        body_digest = hashlib.sha1(body or b"").hexdigest()
+        return hashlib.sha1(
+            ("%s %s %s %s" % (method, host, path, body_digest)).encode(
+                "UTF-8")).hexdigest()
 
-        for i in range(1, len(self._tracks_metadata)):
-            track_custom = \
-                self._tracks_metadata[i].setdefault("__custom", OrderedDict())
+    def ttl_for(self, host):
+        """Return the TTL (in seconds) for responses from *host*.
 
-            self._replay_clear(track_custom, i)
+        :arg str host: the HTTP host
 
-            for (key, values) in album_custom.items():
-                track_custom[key] = values
-                self.__log.info(
-                    "applied custom %r = %r to track %d", key, values, i)
+        """
+        return _lookup_host(self.host_ttls, host, self.ttl)
 
-    def _replay_clear(self, track_custom, i):
-        """Clear the same fields in each track that were cleared in the
-        album.
+    def get(self, key):
+        """Return the cached response for *key*.
 
-        :arg dict track_custom:
-           the custom metadata tagging fields for track *i*
-        :arg int i:
-           the track number
+        :arg str key: the entry key (see :meth:`make_key`)
+        :return:
+           a 3-tuple containing the :class:`CachedHTTPResponse`, the
+           response :obj:`bytes` (body) and whether or not the response
+           is still fresh; or ``None`` if *key* is not cached
 
         """
-        self.__log.call(track_custom, i)
+        self.__log.call(key)
 
-        if self._cleared:
-            self.__log.debug("clearing %r from track %d", self._cleared, i)
+        with self._lock:
+            self._load_index()
+            if key not in self._index:
+                self.__log.return_(None)
+                return None
 
-        for (key, value) in self._cleared:
-            track_values = track_custom.get(key)
+            try:
+                with open(self._path(key, ".json"), encoding="UTF-8") as f:
+                    entry = json.load(f)
+                with open(self._path(key, ".body"), "rb") as f:
+                    data = f.read()
+            except Exception as e:
+                self.__log.warning("discarding cache entry %s: %s", key, e)
+                self._remove(key)
+                self.__log.return_(None)
+                return None
 
-            if track_values and value in track_values:
-                track_values[:] = [v for v in track_values if v != value]
-                self.__log.info(
-                    "cleared %r = %r from track %d", key, value, i)
+            # mark this entry as the most recently used
+            self._index.move_to_end(key)
+            os.utime(self._path(key, ".json"))
 
-            if track_values == []:
-                del track_custom[key]
+        response = CachedHTTPResponse(
+            entry["status"], entry["reason"], self._headers(entry))
+        fresh = time.time() - entry["stored"] < self.ttl_for(entry["host"])
 
+        rv = (response, data, fresh)
+        self.__log.return_(rv)
+        return rv
 
-def resolve_path(spec):
-    """Evaluate all variables in *spec* and make sure it's absolute.
+    def validators(self, response):
+        """Return the conditional request headers that revalidate
+        *response*.
 
-    :arg str spec: a directory or file path template
-    :return: a valid, absolute file system path
-    :rtype: :obj:`str`
+        :arg CachedHTTPResponse response: a cached response
+        :rtype: :obj:`dict`
 
-    """
-    _log.call(spec)
+        """
+        validators = {}
+        if "ETag" in response.headers:
+            validators["If-None-Match"] = response.headers["ETag"]
+        if "Last-Modified" in response.headers:
+            validators["If-Modified-Since"] = response.headers["Last-Modified"]
 
-    resolved_path = os.path.realpath(
-        os.path.abspath(
-            os.path.expandvars(
-                os.path.expanduser(spec))))
+        return validators
 
-    if not os.path.exists(resolved_path):
-        raise RuntimeError("not a valid path: " + resolved_path)
+    def put(self, key, host, response, data):
+        """Store a response.
 
-    _log.return_(resolved_path)
-    return resolved_path
+        :arg str key: the entry key (see :meth:`make_key`)
+        :arg str host: the HTTP host of the (original) request
+        :arg response:
+           a :class:`http.client.HTTPResponse` or
+           :class:`CachedHTTPResponse`
+        :arg bytes data: the response body
 
+        Responses that forbid storage (``Cache-Control: no-store``) are
+        not stored.
 
-def encode_flac(
-        cdda_filename, flac_filename, track_metadata, stdout_filename=None):
-    """Rip a CDDA file to a tagged FLAC file.
+        """
+        self.__log.call(key, host, response, data[:32])
 
-    :arg str cdda_filename: absolute CD-DA file name
-    :arg str flac_filename: absolute *.flac* file name
-    :arg dict track_metadata: tagging fields for this track
-    :keyword str stdout_filename:
-       absolute file name for redirected stdout
+        if "no-store" in response.headers.get("Cache-Control", ""):
+            self.__log.debug("not storing %s (no-store)", key)
+            return
 
-    """
-    _log.call(
-        cdda_filename, flac_filename, track_metadata,
-        stdout_filename=stdout_filename)
+        entry = OrderedDict([
+            ("host", host),
+            ("stored", time.time()),
+            ("status", response.status),
+            ("reason", response.reason),
+            ("headers", list(response.headers.items())),
+        ])
+        entry_bytes = json.dumps(entry).encode("UTF-8")
 
-    command = ["flac"]
-    command.extend(get_config().get("FLAC", "flac_encode_options").split())
+        with self._lock:
+            self._load_index()
+            self._remove(key)
+            try:
+                self._write(self._path(key, ".body"), data)
+                self._write(self._path(key, ".json"), entry_bytes)
+            except Exception as e:
+                self.__log.warning("unable to cache %s: %s", key, e)
+                self._remove(key)
+                return
 
-    if track_metadata["album_cover"]:
-        command.append("--picture=%s" % track_metadata["album_cover"])
+            self._index[key] = len(entry_bytes) + len(data)
+            self._size += self._index[key]
+            self._evict()
 
-    vorbis_comments = make_vorbis_comments(track_metadata)
-    for (name, values) in vorbis_comments.items():
-        if not values:
-            continue
-        command.extend(["--tag=%s=%s" % (name, value) for value in values])
+    def discard(self, key):
+        """Remove a cached response.
 
-    command.append("--output-name=%s" % flac_filename)
-    command.append(cdda_filename)
+        :arg str key: the entry key (see :meth:`make_key`)
 
-    _log.info("command = %r", command)
+        """
+        self.__log.call(key)
 
-    if stdout_filename:
-        with open(stdout_filename, "wb") as f:
-            subprocess.check_call(
-                command, stdout=f, stderr=subprocess.STDOUT)
-    else:
-        subprocess.check_call(command)
+        with self._lock:
+            self._load_index()
+            self._remove(key)
 
-    _log.info("finished %s", flac_filename)
+    def revalidated(self, key, response):
+        """Renew a cached response after a "304 Not Modified".
 
+        :arg str key: the entry key (see :meth:`make_key`)
+        :arg http.client.HTTPResponse response: the 304 response
+        :return:
+           the renewed :class:`CachedHTTPResponse` and response
+           :obj:`bytes`, or ``None`` if *key* is no longer cached
 
-def decode_wav(flac_filename, wav_filename, stdout_filename=None):
-    """Convert a FLAC file to a WAV file.
+        """
+        self.__log.call(key, response)
+
+        with self._lock:
+            cached = self.get(key)
+            if cached is None:
+                self.__log.return_(None)
+                return None
+
+            (cached_response, data, _) = cached
+            for name in ["Cache-Control", "Date", "ETag", "Expires",
+                    "Last-Modified"]:
+                if name in response.headers:
+                    del cached_response.headers[name]
+                    cached_response.headers[name] = response.headers[name]
+
+            with open(self._path(key, ".json"), encoding="UTF-8") as f:
+                host = json.load(f)["host"]
+            self.put(key, host, cached_response, data)
+
+        rv = (cached_response, data)
+        self.__log.return_(rv)
+        return rv
 
-    :arg str flac_filename: absolute *.flac* file name
-    :arg str wav_filename: absolute *.wav* file name
-    :keyword str stdout_filename:
-       absolute file name for redirected stdout
+    def _headers(self, entry):
+        """Return the :class:`http.client.HTTPMessage` for the response
+        headers of a cache *entry*.
 
-    """
-    _log.call(flac_filename, wav_filename, stdout_filename=stdout_filename)
+        """
+        headers = HTTPMessage()
+        for (name, value) in entry["headers"]:
+            headers[name] = value
 
-    command = ["flac", "--decode"]
-    command.extend(get_config().get("FLAC", "flac_decode_options").split())
-    command.append("--output-name=%s" % wav_filename)
-    command.append(flac_filename)
+        return headers
 
-    _log.info("command = %r", command)
+    def _path(self, key, extension):
+        """Return the file name for *key* with *extension*."""
+        return os.path.join(self.directory, key + extension)
 
-    if stdout_filename:
-        with open(stdout_filename, "wb") as f:
-            subprocess.check_call(
-                command, stdout=f, stderr=subprocess.STDOUT)
-    else:
-        subprocess.check_call(command)
+    def _write(self, filename, data):
+        """Atomically write *data* to *filename*."""
+        tmp_filename = filename + ".tmp"
+        with open(tmp_filename, "wb") as f:
+            f.write(data)
+        os.replace(tmp_filename, filename)
 
-    _log.info("finished %s", wav_filename)
+    def _load_index(self):
+        """Build the LRU index from the cache directory (once)."""
+        if self._index is not None:
+            return
 
+        os.makedirs(self.directory, exist_ok=True)
 
-def encode_mp3(
-        wav_filename, mp3_filename, track_metadata, scale=None,
-        stdout_filename=None):
-    """Convert a WAV file to an MP3 file.
+        entries = []
+        for name in os.listdir(self.directory):
+            (key, extension) = os.path.splitext(name)
+            if extension != ".json":
+                continue
+            try:
+                entry_stat = os.stat(self._path(key, ".json"))
+                body_stat = os.stat(self._path(key, ".body"))
+            except OSError:
+                continue
+            entries.append(
+                (entry_stat.st_mtime, key,
+                    entry_stat.st_size + body_stat.st_size))
+
+        self._index = OrderedDict()
+        self._size = 0
+        for (_, key, size) in sorted(entries):
+            self._index[key] = size
+            self._size += size
+        self.__log.debug(
+            "%d cached responses (%d bytes) in %s",
+            len(self._index), self._size, self.directory)
+
+        self._evict()
+
+    def _evict(self):
+        """Remove least-recently used entries until the cache fits."""
+        while self._size > self.max_size and self._index:
+            key = next(iter(self._index))
+            self.__log.debug("evicting %s", key)
+            self._remove(key)
+
+    def _remove(self, key):
+        """Remove the files for *key* (if any)."""
+        self._size -= self._index.pop(key, 0)
+        for extension in [".json", ".body"]:
+            try:
+                os.unlink(self._path(key, extension))
+            except FileNotFoundError:
+                pass
 
-    :arg str wav_filename: absolute *.wav* file name
-    :arg str mp3_filename: absolute *.mp3* file name
-    :arg dict track_metadata: tagging fields for this track
-    :keyword float scale:
-      multiply PCM data by this factor
-    :keyword str stdout_filename:
-       absolute file name for redirected stdout
+
+#: The process-wide :class:`HTTPResponseCache` (see
+#: :func:`get_http_cache`).
+_HTTP_CACHE = None
+
+#: Guards initialization of :data:`_HTTP_CACHE`.
+_HTTP_CACHE_LOCK = threading.Lock()
+
+
+def get_http_cache():
+    """Return the process-wide metadata API response cache.
+
+    :return:
+       the :class:`HTTPResponseCache` configured in the ``[HTTP]``
+       section, or ``None`` if *cache_dir* is empty
+    :rtype: :class:`HTTPResponseCache`
 
     """
-    _log.call(
-        wav_filename, mp3_filename, track_metadata, scale=scale,
-        stdout_filename=stdout_filename)
+    _log.call()
 
-    command = ["lame"]
-    command.extend(get_config()["MP3"]["lame_encode_options"].split())
-    if scale is not None:
-        command.extend(["--scale", "%.2f" % scale])
-    command.append("--id3v2-only")
+    global _HTTP_CACHE
+    with _HTTP_CACHE_LOCK:
+        if _HTTP_CACHE is None:
+            config = get_config()["HTTP"]
+            directory = config.get("cache_dir", fallback=HTTP_CACHE_DIRNAME)
+            if directory:
+                try:
+                    os.makedirs(
+                        os.path.expandvars(os.path.expanduser(directory)),
+                        exist_ok=True)
+                    directory = resolve_path(directory)
+                except Exception as e:
+                    _log.warning(
+                        "not caching responses; cannot use cache_dir %r: %s",
+                        directory, e)
+                    directory = ""
+            if directory:
+                host_ttls = {}
+                for host_ttl in config.get(
+                        "cache_host_ttls", fallback="").split():
+                    (host, _, ttl) = host_ttl.partition('=')
+                    host_ttls[host.lower()] = float(ttl)
+
+                _HTTP_CACHE = HTTPResponseCache(
+                    directory,
+                    max_size=int(
+                        config.getfloat(
+                            "cache_max_size_mb",
+                            fallback=HTTP_CACHE_MAX_SIZE_MB)
+                        * 1024 * 1024),
+                    ttl=config.getfloat("cache_ttl", fallback=HTTP_CACHE_TTL),
+                    host_ttls=host_ttls)
+
+        cache = _HTTP_CACHE
+
+    _log.return_(cache)
+    return cache
+
+
+class _APIResponseBody:
+    """A binary file-like object that reads a metadata API response body
+    as it arrives over a pooled connection.
+
+    The connection is returned to the :class:`HTTPConnectionPool` as
+    soon as the body has been read completely (or when this object is
+    closed).
 
-    if track_metadata["album_cover"]:
-        command.extend(["--ti", track_metadata["album_cover"]])
+    """
 
-    id3v2_tags = make_id3v2_tags(track_metadata)
-    id3v2_utf16_tags = []
-    for (name, values) in id3v2_tags.items():
-        if not values:
-            continue
+    def __init__(self, pool, conx, response, on_complete=None):
+        """
+        :arg HTTPConnectionPool pool: the pool that owns *conx*
+        :arg http.client.HTTPConnection conx: the connection
+        :arg http.client.HTTPResponse response: the (unread) response
+        :keyword on_complete:
+           called with the entire response body once it has been read
+           completely (e.g. to cache it)
 
-        # ID3v2 spec calls for '/' separator, but iTunes only handles ','
-        # separator correctly
-        tag = "%s=%s" % (name, ", ".join(values))
+        """
+        self._pool = pool
+        self._conx = conx
+        self._response = response
+        self._on_complete = on_complete
+        self._chunks = [] if on_complete is not None else None
 
-        try:
-            tag.encode("latin-1")
-        except UnicodeEncodeError:
-            id3v2_utf16_tags.extend(["--tv", tag])
-        else:
-            command.extend(["--tv", tag])
+    def read(self, size=-1):
+        """Read up to *size* bytes (or the rest) of the response body.
 
-    # add any UTF-16 tags
-    if id3v2_utf16_tags:
-        command.append("--id3v2-utf16")
-        command.extend(id3v2_utf16_tags)
+        :rtype: :obj:`bytes`
 
-    command.append(wav_filename)
-    command.append(mp3_filename)
+        """
+        if self._conx is None:
+            return b""
+
+        data = self._response.read(
+            size if size is not None and size >= 0 else None)
+        if self._chunks is not None:
+            self._chunks.append(data)
+        if not data or self._response.isclosed():
+            on_complete = self._on_complete
+            self.close()
+            if on_complete is not None:
+                on_complete(b"".join(self._chunks))
+            self._chunks = None
 
-    _log.info("command = %r", command)
+        return data
 
-    if stdout_filename:
-        with open(stdout_filename, "wb") as f:
-            subprocess.check_call(
-                command, stdout=f, stderr=subprocess.STDOUT)
-    else:
-        subprocess.check_call(command)
+    def close(self):
+        """Return the connection to the pool (it is closed instead if
+        the body has not been read completely).
 
-    _log.debug("finished %s", mp3_filename)
+        """
+        if self._conx is not None:
+            self._pool.release(self._conx, self._response)
+            self._conx = None
+            self._on_complete = None
 
 
-def make_vorbis_comments(metadata):
-    """Create Vorbis comments for tagging from *metadata*.
+@logged
+class _HTTPMetadataCollector(MetadataCollector):
+    """Base class for HTTP/S metadata API clients."""
 
-    :arg dict metadata: the metadata for a single track
-    :return: Vorbis comment name/value pairs
-    :rtype: :obj:`dict`
+    def __init__(self, toc, api_host, use_ssl=True):
+        """
+        :arg flacmanager.TOC toc: a disc's table of contents
+        :arg str api_host: the API host name
+        :keyword bool use_ssl: whether or not to use an SSL connection
 
-    .. seealso::
+        """
+        self.__log.call(toc, api_host, use_ssl=use_ssl)
+        super().__init__(toc)
 
-       `Ogg Vorbis I format specification: comment field and header specification <https://xiph.org/vorbis/doc/v-comment.html>`_
-          The only (?) "official recommendation" for Vorbis comments
+        # provide reasonable defaults (also see the `_ssl_context' property)
+        self.user_agent = FLACManager.USER_AGENT
+        self.timeout = get_config().getfloat("HTTP", "timeout")
 
-       `Xiph Wiki: VorbisComment <https://wiki.xiph.org/VorbisComment>`_
-          a (very) basic metadata format
+        self.api_host = api_host
+        self.use_ssl = use_ssl
 
-       `Xiph Wiki: Field_names <https://wiki.xiph.org/Field_names>`_
-          official (?) proposed updates to the VorbisComment recommendations
+        #: Downloads album cover images (see :class:`CoverFetcher`).
+        self.cover_fetcher = CoverFetcher(timeout=self.timeout)
 
-       `Ogg Vorbis Comment Field Recommendations <http://age.hobba.nl/audio/mirroredpages/ogg-tagging.html>`_
-          Just a proposal, but linked directly from Xiph Wiki
+    @property
+    @lru_cache(maxsize=1)
+    def _ssl_context(self):
+        """The SSL context for communicating securely with a metadata
+        API host.
 
-    """
-    _log.call(metadata)
+        :rtype: :class:`ssl.SSLContext`
+
+        """
+        context = ssl.SSLContext(ssl.PROTOCOL_TLSv1)
+        context.verify_mode = ssl.CERT_NONE
+        context.set_default_verify_paths()
 
-    comments = _make_tagging_map("Vorbis", metadata)
+        return context
 
-    # only use COMPILATION=1
-    if comments["COMPILATION"] == ['0']:
-        del comments["COMPILATION"]
+    def _api_request(
+            self, path, body=None, additional_headers=None, cacheable=None):
+        """Make an HTTP GET or POST API request.
 
-    # flac automatically includes a vendor string to identify itself
-    comments["ENCODER"] = [
-        "http://ninthtest.info/flac-mp3-audio-manager/ %s" % __version__]
+        :arg str path: the request path and optional query string
+        :keyword body: the HTTP request body
+        :type body: :obj:`str` or :obj:`bytes`
+        :keyword additional_headers:
+           additional request headers (User-Agent is default)
+        :type additional_headers:
+           :obj:`dict` or :class:`http.client.HTTPMessage`
+        :keyword cacheable:
+           called with a complete response body to decide whether or
+           not it may be cached (see :meth:`_api_open`)
+        :return:
+           a 2-tuple containing the **closed**
+           :class:`http.client.HTTPResponse` object and the response
+           :obj:`bytes` (body)
 
-    _log.return_(comments)
-    return comments
+        This method reads the entire response body; use
+        :meth:`_api_open` to process the body as it arrives.
 
+        """
+        self.__log.call(
+            path, body=body, additional_headers=additional_headers,
+            cacheable=cacheable)
 
-def make_id3v2_tags(metadata):
-    """Create ID3v2 frames for tagging from *metadata*.
+        (response, response_body) = self._api_open(
+            path, body=body, additional_headers=additional_headers,
+            cacheable=cacheable)
+        try:
+            data = response_body.read()
+        finally:
+            response_body.close()
 
-    :arg dict metadata: the metadata for a single track
-    :return: ID3v2 frame name/value pairs
-    :rtype: :obj:`dict`
+        rv = (response, data)
+        self.__log.return_(rv)
+        return rv
 
-    .. seealso::
+    def _api_open(
+            self, path, body=None, additional_headers=None, cacheable=None):
+        """Make an HTTP GET or POST API request.
 
-       `ID3 tag version 2.3.0 <http://id3.org/id3v2.3.0>`_
-          The most compatible standard for ID3 tagging
+        :arg str path: the request path and optional query string
+        :keyword body: the HTTP request body
+        :type body: :obj:`str` or :obj:`bytes`
+        :keyword additional_headers:
+           additional request headers (User-Agent is default)
+        :type additional_headers:
+           :obj:`dict` or :class:`http.client.HTTPMessage`
+        :keyword cacheable:
+           called with a complete response body to decide whether or
+           not it may be cached (by default, every successful response
+           is cached)
+        :return:
+           a 2-tuple containing the :class:`http.client.HTTPResponse`
+           (or :class:`CachedHTTPResponse`) object and a binary
+           file-like object from which the response body may be read as
+           it arrives; the caller **must** close the latter
 
-       http://id3.org/iTunes
-          ID3 tagging idiosyncracies in Apple iTunes
+        If *body* is not ``None``, the request will be an HTTP POST;
+        otherwise the request will be an HTTP GET.
 
-       `MusicBrainz Picard <http://picard.musicbrainz.org/>`_
-          FLACManager does its best to get the tagging right the first
-          time, but Picard is a fantastic post-encoding fixer-upper.
+        This method handles redirects (301, 302, 303, 307 and 308)
+        automatically. Requests are made over keep-alive connections
+        from the process-wide :class:`HTTPConnectionPool`.
 
-    """
-    _log.call(metadata)
+        Successful responses are cached (see :func:`get_http_cache`); a
+        fresh cached response is returned without making a request at
+        all, and a stale one is revalidated. APIs that report failures
+        in a successful response (like Gracenote) must pass *cacheable*
+        so that those failures are not cached.
 
-    tags = _make_tagging_map("ID3v2", metadata)
+        """
+        self.__log.call(
+            path, body=body, additional_headers=additional_headers,
+            cacheable=cacheable)
 
-    # only use TCMP=1
-    if tags["TCMP"] == ['0']:
-        del tags["TCMP"]
+        headers = HTTPMessage()
+        if additional_headers is not None:
+            for (name, value) in additional_headers.items():
+                headers[name] = value
+        if "User-Agent" not in headers:
+            headers["User-Agent"] = self.user_agent
 
-    # lame automatically includes TSSE to identify itself
-    tags["TENC"] = ["http://ninthtest.info/flac-mp3-audio-manager/"]
+        method = "POST" if body is not None else "GET"
 
-    _log.return_(tags)
-    return tags
+        cache = get_http_cache()
+        cached = None
+        if cache is not None:
+            host = self.api_host
+            cache_key = cache.make_key(method, host, path, body)
+            cached = cache.get(cache_key)
+            if (cached is not None and cacheable is not None
+                    and not cacheable(cached[1])):
+                self.__log.info(
+                    "%s %s %s discarded from the cache", host, method, path)
+                cache.discard(cache_key)
+                cached = None
+            if cached is not None:
+                (cached_response, cached_data, fresh) = cached
+                if fresh:
+                    self.__log.info(
+                        "%s %s %s served from the cache", host, method, path)
+                    rv = (cached_response, BytesIO(cached_data))
+                    self.__log.return_(rv)
+                    return rv
+
+                for (name, value) in cache.validators(
+                        cached_response).items():
+                    headers[name] = value
+
+        pool = get_http_connection_pool()
+        (conx, response) = pool.request(
+            method,
+            "%s://%s%s" % (
+                "https" if self.use_ssl else "http", self.api_host, path),
+            body=body, headers=headers, timeout=self.timeout,
+            context=self._ssl_context)
+
+        if cache is not None and response.status == 304 and cached is not None:
+            response.read()
+            pool.release(conx, response)
+            self.__log.info(
+                "%s %s %s revalidated in the cache", host, method, path)
+            revalidated = cache.revalidated(cache_key, response)
+            if revalidated is not None:
+                (cached_response, cached_data) = revalidated
+                rv = (cached_response, BytesIO(cached_data))
+            else:
+                rv = (response, BytesIO())
+        elif cache is not None and response.status == 200:
+            def store(data):
+                if cacheable is None or cacheable(data):
+                    cache.put(cache_key, host, response, data)
+                else:
+                    self.__log.debug(
+                        "not caching %s %s %s", host, method, path)
 
+            rv = (
+                response,
+                _APIResponseBody(pool, conx, response, on_complete=store))
+        else:
+            rv = (response, _APIResponseBody(pool, conx, response))
 
-def _make_tagging_map(type_, metadata):
-    """Create Vorbis comments or ID3v2 frames for tagging from
-    *metadata*.
+        self.__log.return_(rv)
+        return rv
 
-    :arg str type_:
-       "Vorbis" or "ID3v2" (corresponds to a tagging section in the
-       flacmanager.ini configuration file)
-    :arg dict metadata: the metadata for a single track
-    :return: Vorbis commen or ID3v2 frame name/value pairs
-    :rtype: :obj:`dict`
+    def _fetch_album_covers(self, urls):
+        """Download album cover images and add them to the album
+        metadata.
 
-    """
-    _log.call(metadata)
+        :arg list urls: the cover image URLs
 
-    config = get_config()
+        """
+        self.__log.call(urls)
 
-    tags = OrderedDict()
-    for (tag, spec) in config[type_].items():
-        value = (
-            spec.format(**metadata) if spec[0] == '{' # format specification
-            else metadata[spec]) # direct key lookup
+        album_covers = self.metadata["album_cover"]
+        for filename in self.cover_fetcher.fetch_all(
+                urls, headers={"User-Agent": self.user_agent},
+                context=self._ssl_context):
+            if filename not in album_covers:
+                album_covers.append(filename)
 
-        # only include truthy values
-        if value:
-            tags[tag] = value if type(value) is list else [value]
 
-    _update_custom_tagging(tags, type_, metadata)
+#: The maximum number of Gracenote 'ALBUM_FETCH' requests that are made
+#: concurrently (each over its own pooled connection).
+GRACENOTE_FETCH_CONNECTIONS = 4
 
-    _log.return_(tags)
-    return tags
 
+@logged
+class GracenoteCDDBMetadataCollector(_HTTPMetadataCollector):
+    """A Gracenote CDDB client that populates album and track metadata
+    choices for a disc identified by its offsets.
 
-def _update_custom_tagging(tags, type_, metadata):
-    """Update *tags* with any custom Vorbis comments or ID3v2 tags from
-    *metadata["__custom"]* (if defined).
+    """
 
-    :arg dict tags: the tagging map for a track
-    :arg str type_: "Vorbis" or "ID3v2"
-    :arg dict metadata: the metadata for a single track
+    #: The *flacmanager.ini* section for Gracenote.
+    CONFIG_SECTION = "Gracenote"
 
-    *tags* is updated in place.
-    
-    .. note::
-       Custom tags with the same name as a preconfigured tag will
-       **replace** the preconfigured tag.
+    #: Host name format string for Gracenote.
+    API_HOST_TEMPLATE = "c%s.web.cddbp.net"
 
-    """
-    _log.call(metadata)
+    #: Request path for Gracenote service calls.
+    API_PATH = "/webapi/xml/1.0/"
 
-    if "__custom" in metadata:
-        custom_tagpairs = []
-        for ((vorbis_comment, id3v2_tag), values) \
-                in metadata["__custom"].items():
-            if type_ == "Vorbis" and vorbis_comment:
-                custom_tagpairs.append((vorbis_comment, values))
-            elif type_ == "ID3v2" and id3v2_tag:
-                custom_tagpairs.append((id3v2_tag, values))
-            else:
-                _log.warning(
-                    "skipping custom (%r, %r) = %r",
-                    vorbis_comment, id3v2_tag, values)
+    #: Request body for a Gracenote User ID.
+    REGISTER_XML = (
+        '<QUERIES>'
+            '<QUERY CMD="REGISTER">'
+                '<CLIENT>%s</CLIENT>'
+            '</QUERY>'
+        '</QUERIES>'
+    )
 
-        _log.debug(
-            "custom tag pairs (before formatting):\n%r", custom_tagpairs)
+    #: Request body for Gracenote Album summary metadata.
+    ALBUM_TOC_XML = (
+        '<QUERIES>'
+            '<AUTH>'
+                '<CLIENT>%s</CLIENT>'
+                '<USER>%s</USER>'
+            '</AUTH>'
+            '<LANG>eng</LANG>'
+            '<COUNTRY>usa</COUNTRY>'
+            '<QUERY CMD="ALBUM_TOC">'
+                '<TOC>'
+                    '<OFFSETS>%s</OFFSETS>'
+                '</TOC>'
+            '</QUERY>'
+        '</QUERIES>'
+    )
 
-        custom_tags = OrderedDict()
-        for (tag, values) in custom_tagpairs:
-            # custom values are always formatted, but only keep if non-empty
-            values = [
-                value for value in (spec.format(**metadata) for spec in values)
-                if value]
+    #: Request body for Gracenote Album and Track detail metadata.
+    ALBUM_FETCH_XML = (
+        '<QUERIES>'
+            '<AUTH>'
+                '<CLIENT>%s</CLIENT>'
+                '<USER>%s</USER>'
+            '</AUTH>'
+            '<LANG>eng</LANG>'
+            '<COUNTRY>usa</COUNTRY>'
+            '<QUERY CMD="ALBUM_FETCH">'
+                '<GN_ID>%s</GN_ID>'
+                '<OPTION>'
+                    '<PARAMETER>SELECT_EXTENDED</PARAMETER>'
+                    '<VALUE>COVER</VALUE>'
+                '</OPTION>'
+                '<OPTION>'
+                    '<PARAMETER>COVER_SIZE</PARAMETER>'
+                    '<VALUE>MEDIUM,LARGE,SMALL,THUMBNAIL,XLARGE</VALUE>'
+                '</OPTION>'
+                '<OPTION>'
+                    '<PARAMETER>SELECT_DETAIL</PARAMETER>'
+                    '<VALUE>GENRE:3LEVEL</VALUE>'
+                '</OPTION>'
+            '</QUERY>'
+        '</QUERIES>'
+    )
 
-            if values:
-                if tag not in custom_tags:
-                    custom_tags[tag] = values
-                else:
-                    custom_tags[tag].extend(values)
+    def __init__(self, toc):
+        """
+        :arg flacmanager.TOC toc: a disc's table of contents
 
-                _log.debug("custom %s %s = %r", type_, tag, custom_tags[tag])
-            else:
-                _log.warning(
-                    "custom %s %s evaluated to an empty list", type_, tag)
+        """
+        self.__log.call(toc)
 
-        if custom_tags:
-            _log.info("updating tagging map with %r", custom_tags)
-            tags.update(custom_tags)
+        config = get_config()
+        self.__log.debug("Gracenote config = %r", dict(config["Gracenote"]))
 
+        client_id = config.get("Gracenote", "client_id")
+        if not client_id:
+            raise MetadataError(
+                    "Gracenote client_id must be defined in flacmanager.ini!",
+                    context_hint="Gracenote configuration")
+        api_host = self.API_HOST_TEMPLATE % client_id.split('-', 1)[0]
+        super().__init__(toc, api_host)
 
-#: Used to pass data between a :class:`FLACEncoder` thread and the main
-#: thread.
-_ENCODING_QUEUE = queue.PriorityQueue()
+        self._client_id = client_id
+        self._user_id = config.get("Gracenote", "user_id")
 
-#: The number of seconds to wait between enqueuing a FLAC encoding
-#: status.
-FLAC_ENCODING_STATUS_WAIT = 1.25
+    def _register(self):
+        """Register this client with the Gracenote Web API."""
+        self.__log.call()
 
+        gn_queries = ET.fromstring(self.REGISTER_XML)
+        gn_queries.find("QUERY/CLIENT").text = self._client_id
 
-@logged
-class FLACEncoder(threading.Thread):
-    """A thread that rips CD-DA tracks to FLAC."""
+        gn_responses = self._get_response(gn_queries)
+        user = gn_responses.find("RESPONSE/USER")
+        self._user_id = user.text
+        self.__log.debug("registered user_id = %r", self._user_id)
 
-    def __init__(self):
-        """``FLACEncoder`` threads are daemonized so that they are
-        killed automatically if the program exits.
+        get_config().set("Gracenote", "user_id", self._user_id)
+        save_config()
 
-        """
+    def collect(self):
+        """Populate all Gracenote album metadata choices."""
         self.__log.call()
-        super().__init__(daemon=True)
+        super().collect()
+
+        if not self._user_id:
+            self._register()
+
+        gn_queries = self._prepare_gn_queries(self.ALBUM_TOC_XML)
+        toc_offsets = "%s %d" % (
+            ' '.join(str(offset) for offset in self.toc.track_offsets),
+            self.toc.leadout_track_offset)
+        gn_queries.find("QUERY/TOC/OFFSETS").text = toc_offsets
+
+        try:
+            gn_responses = self._get_response(gn_queries)
+        except MetadataError as e:
+            if str(e) == "NO_MATCH":
+                self.__log.warning("album not recognized by Gracenote")
+                return
+            raise
 
-        self._instructions = []
+        gn_ids = [
+            gn_album_summary.find("GN_ID").text
+            for gn_album_summary in gn_responses.findall("RESPONSE/ALBUM")]
+        cover_art_urls = []
+        for (gn_id, gn_album_detail) in zip(
+                gn_ids, self._fetch_albums(gn_ids)):
+            metadata = self.metadata
 
-    def add_instruction(
-            self, track_index, cdda_filename, flac_filename, mp3_filename,
-            track_metadata):
-        """Schedule a track for FLAC encoding.
+            num_tracks = int(gn_album_detail.find("TRACK_COUNT").text)
+            if num_tracks != metadata["album_tracktotal"]:
+                self.__log.warning(
+                    "discarding %r; expected %d tracks but found %d",
+                    gn_id, metadata["album_tracktotal"], num_tracks)
+                continue
 
-        :arg int track_index: index (not ordinal) of the track
-        :arg str cdda_filename: absolute CD-DA file name
-        :arg str flac_filename: absolute *.flac* file name
-        :arg str mp3_filename: absolute *.mp3* file name
-        :arg dict track_metadata: tagging fields for this track
+            title = gn_album_detail.find("TITLE").text
+            if title not in metadata["album_title"]:
+                metadata["album_title"].append(title)
 
-        """
-        self.__log.call(
-            track_index, cdda_filename, flac_filename, mp3_filename,
-            track_metadata)
+            artist = gn_album_detail.find("ARTIST").text
+            if artist not in metadata["album_artist"]:
+                metadata["album_artist"].append(artist)
 
-        self._instructions.append(
-            (track_index, cdda_filename, flac_filename, mp3_filename,
-                track_metadata))
+            gn_date = gn_album_detail.find("DATE")
+            if (gn_date is not None
+                    and gn_date.text not in metadata["album_year"]):
+                metadata["album_year"].append(gn_date.text)
 
-    def run(self):
-        """Rip CD-DA tracks to FLAC."""
-        self.__log.call()
+            for gn_genre in gn_album_detail.findall("GENRE"):
+                genre = gn_genre.text
+                if genre not in metadata["album_genre"]:
+                    metadata["album_genre"].append(genre)
 
-        mp3_encoder_threads = []
-        for (index, cdda_fn, flac_fn, mp3_fn, metadata) in self._instructions:
-            stdout_fn = make_tempfile(suffix=".out")
+            for gn_url_coverart in gn_album_detail.findall(
+                    "URL[@TYPE='COVERART']"):
+                if gn_url_coverart.text not in cover_art_urls:
+                    cover_art_urls.append(gn_url_coverart.text)
 
-            # the FLAC encoding must block because it needs exclusive access to
-            # the drive; so run the status updates in a separate thread
-            status_interval_thread = threading.Thread(
-                target=self._enqueue_status_interval,
-                args=(index, cdda_fn, flac_fn, stdout_fn),
-                daemon=True)
-            status_interval_thread.start()
+            for gn_track in gn_album_detail.findall("TRACK"):
+                track_number = int(gn_track.find("TRACK_NUM").text)
 
-            flac_encoding_error = None
-            try:
-                encode_flac(
-                    cdda_fn, flac_fn, metadata, stdout_filename=stdout_fn)
-            except Exception as e:
-                self.__log.exception("FLAC encoding failed")
-                flac_encoding_error = e
+                track_metadata = metadata["__tracks"][track_number]
 
-            # touch the done file; see _enqueue_status_interval
-            open("%s.done" % stdout_fn, 'w').close()
+                # sanity check:
+                # there are cases where the ordinality of hidden tracks
+                # preceded or interspersed by empty tracks are misnumbered as
+                # though the empty tracks did not exist
+                # (e.g. on the single-disc re-release of Nine Inch Nails' 1992
+                # EP "Broken," the hidden tracks "Physical" and "Suck" SHOULD
+                # be numbered 98/99, respectively, NOT 7/8 or 8/9!!!)
+                assert track_metadata["track_number"] == track_number
 
-            # block until the status updates thread exits
-            status_interval_thread.join()
+                title = gn_track.find("TITLE").text
+                if title not in track_metadata["track_title"]:
+                    track_metadata["track_title"].append(title)
 
-            if flac_encoding_error is None:
-                # run the MP3 encoding in a separate thread so we can move on
-                # to the next CD-DA -> FLAC encoding; the MP3 encoder will
-                # enqueue the "TRACK_COMPLETE" state when it's finished
-                mp3_encoder = MP3Encoder(
-                    index, cdda_fn, flac_fn, mp3_fn, stdout_fn, metadata)
-                mp3_encoder.start()
-                mp3_encoder_threads.append(mp3_encoder)
-            else:
-                status = (
-                    index, cdda_fn, flac_fn, stdout_fn, flac_encoding_error)
-                self.__log.error("enqueueing %r", status)
-                _ENCODING_QUEUE.put((2, status))
+                gn_artist = gn_track.find("ARTIST")
+                if (gn_artist is not None
+                        and gn_artist.text not in
+                            track_metadata["track_artist"]):
+                    track_metadata["track_artist"].append(gn_artist.text)
 
-        # make sure all MP3 encoders are done before enqueueing "FINISHED"
-        for mp3_encoder_thread in mp3_encoder_threads:
-            mp3_encoder_thread.join()
+                for gn_genre in gn_track.findall("GENRE"):
+                    genre = gn_genre.text
+                    if genre not in track_metadata["track_genre"]:
+                        track_metadata["track_genre"].append(genre)
 
-        status = (index, cdda_fn, flac_fn, stdout_fn, "FINISHED")
-        self.__log.info("enqueueing %r", status)
-        _ENCODING_QUEUE.put((13, status))
+        self._fetch_album_covers(cover_art_urls)
 
-        # do not terminate until "FINISHED" status has been processed
-        _ENCODING_QUEUE.join()
+    def _fetch_albums(self, gn_ids):
+        """Make Gracenote 'ALBUM_FETCH' requests for several albums
+        concurrently.
 
-        self.__log.info("thread is exiting")
+        :arg list gn_ids: the Gracenote IDs of the albums
+        :return:
+           a list of Gracenote <ALBUM> elements, in the same order as
+           *gn_ids*
+        :rtype: :obj:`list`
+        :raises MetadataError:
+           (the first error, in *gn_ids* order) if any request fails
 
-    def _enqueue_status_interval(
-            self, track_index, cdda_filename, flac_filename,
-            stdout_filename=None):
-        """Enqueue a status update notification on an interval.
+        Up to :data:`GRACENOTE_FETCH_CONNECTIONS` requests are in flight
+        at once, each over a pooled keep-alive connection (see
+        :class:`HTTPConnectionPool`).
 
-        :arg int track_index: index (**not** ordinal) of the track
-        :arg str cdda_filename: absolute CD-DA file name
-        :arg str flac_filename: absolute .flac file name
-        :keyword str stdout_filename:
-           absolute file name for redirected stdout
+        """
+        self.__log.call(gn_ids)
+
+        gn_albums = [None] * len(gn_ids)
+        requests = queue.Queue()
+        for (i, gn_id) in enumerate(gn_ids):
+            requests.put((i, gn_id))
+
+        def fetch():
+            while True:
+                try:
+                    (i, gn_id) = requests.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    gn_albums[i] = self._fetch_album(gn_id)
+                except Exception as e:
+                    gn_albums[i] = e
+
+        # the current thread does its share too
+        fetchers = [
+            threading.Thread(
+                target=fetch, name="gracenote-fetch-%d" % n, daemon=True)
+            for n in range(
+                1, min(GRACENOTE_FETCH_CONNECTIONS, len(gn_ids)))]
+        for fetcher in fetchers:
+            fetcher.start()
+        fetch()
+        for fetcher in fetchers:
+            fetcher.join()
+
+        for gn_album in gn_albums:
+            if isinstance(gn_album, Exception):
+                raise gn_album
+
+        self.__log.return_(gn_albums)
+        return gn_albums
+
+    def _fetch_album(self, gn_id):
+        """Make a Gracenote 'ALBUM_FETCH' request.
 
-        .. note::
-           This method is run in a separate thread (see :meth:`run`).
+        :arg str gn_id: the Gracenote ID of an album
+        :return: a Gracenote <ALBUM>
+        :rtype: :class:`xml.etree.ElementTree.Element`
 
         """
-        # enqueueing this status causes UI to read latest status line from the
-        # stdout file
-        status = (
-            track_index, cdda_filename, flac_filename, stdout_filename,
-            TRACK_ENCODING_FLAC)
+        self.__log.call(gn_id)
 
-        # when the FLAC encoding is complete, this file will be created whether
-        # an error occurred or not
-        done_filename = "%s.done" % stdout_filename
+        gn_queries = self._prepare_gn_queries(self.ALBUM_FETCH_XML)
+        gn_queries.find("QUERY/GN_ID").text = gn_id
 
-        self.__log.info(
-            "enqueueing %r every %s seconds...",
-            status, FLAC_ENCODING_STATUS_WAIT)
+        gn_responses = self._get_response(gn_queries)
+        gn_album = gn_responses.find("RESPONSE/ALBUM")
 
-        # as long as the ".done" file doesn't exist, keep telling the UI to
-        # read a status update from the stdout file
-        exists = os.path.isfile
-        while not exists(done_filename):
-            _ENCODING_QUEUE.put((7, status))
-            time.sleep(FLAC_ENCODING_STATUS_WAIT)
+        self.__log.return_(gn_album)
+        return gn_album
 
+    def _prepare_gn_queries(self, xml):
+        """Create a request object with authentication.
 
-@logged
-class MP3Encoder(threading.Thread):
-    """A thread that converts WAV files to MP3 files."""
+        :arg str xml:
+           an XML template string for a Gracenote <QUERIES> document
+        :return: the prepared Gracenote <QUERIES> document
+        :rtype: :class:`xml.etree.ElementTree.Element`
 
-    def __init__(
-            self, track_index, cdda_filename, flac_filename, mp3_filename,
-            stdout_filename, track_metadata):
         """
-        :arg int track_index: index (not ordinal) of the track
-        :arg str cdda_filename: absolute CD-DA file name
-        :arg str flac_filename: absolute *.flac* file name
-        :arg str stdout_filename:
-           absolute file name for redirected stdout
-        :arg dict track_metadata: tagging fields for this track
-
-        ``MP3Encoder`` threads are daemonized so that they are killed
-        automatically if the program exits.
+        self.__log.call(xml)
 
-        """
-        self.__log.call(
-            track_index, cdda_filename, flac_filename, mp3_filename,
-            stdout_filename, track_metadata)
+        gn_queries = ET.fromstring(xml)
+        gn_queries.find("AUTH/CLIENT").text = self._client_id
+        gn_queries.find("AUTH/USER").text = self._user_id
 
-        super().__init__(daemon=True)
+        self.__log.return_(gn_queries)
+        return gn_queries
 
-        self.track_index = track_index
-        self.cdda_filename = cdda_filename
-        self.flac_filename = flac_filename
-        self.mp3_filename = mp3_filename
-        self.stdout_filename = stdout_filename
-        self.track_metadata = track_metadata
+    def _get_response(self, gn_queries, http_keep_alive=True):
+        """POST a Gracenote request and return the response.
 
-    def run(self):
-        """Decode FLAC to WAV, then encode WAV to MP3."""
-        self.__log.call()
+        :arg xml.etree.ElementTree.Element gn_queries:
+           a Gracenote <QUERIES> document
+        :keyword bool http_keep_alive:
+           whether or not to keep the Gracenote HTTP connection alive
+        :return: a Gracenote <RESPONSES> document
+        :rtype: :class:`xml.etree.ElementTree.Element`
+        :raises MetadataError:
+           if the Gracenote request is unsuccessful
 
-        flac_basename = os.path.basename(self.flac_filename)
-        wav_tempdir = TemporaryDirectory(prefix="fm")
-        wav_basename = os.path.splitext(flac_basename)[0] + ".wav"
-        wav_filename = os.path.join(wav_tempdir.name, wav_basename)
+        """
+        self.__log.call(gn_queries, http_keep_alive=http_keep_alive)
 
-        # make sure the UI gets a status update for decoding FLAC to WAV
-        status = (
-            self.track_index, self.cdda_filename, self.flac_filename,
-            self.stdout_filename, TRACK_DECODING_WAV)
-        self.__log.info("enqueueing %r", status)
-        _ENCODING_QUEUE.put((3, status))
+        buf = BytesIO()
+        ET.ElementTree(gn_queries).write(
+            buf, encoding="UTF-8", xml_declaration=False)
+        gn_queries_bytes = buf.getvalue()
+        buf.close()
+        self.__log.debug("gn_queries_bytes = %r", gn_queries_bytes)
 
+        headers = {"Content-Type": "text/xml; charset=UTF-8"}
+        if not http_keep_alive:
+            headers["Connection"] = "close"
+        (response, response_body) = self._api_open(
+            self.API_PATH, body=gn_queries_bytes, additional_headers=headers,
+            cacheable=self._is_cacheable)
         try:
-            decode_wav(
-                self.flac_filename, wav_filename,
-                stdout_filename=self.stdout_filename)
-        except Exception as e:
-            self.__log.exception("WAV decoding failed")
-            del wav_tempdir
-            status = (
-                self.track_index, self.cdda_filename, self.flac_filename,
-                self.stdout_filename, e)
-            self.__log.error("enqueueing %r", status)
-            _ENCODING_QUEUE.put((2, status))
-            return
-
-        # make sure the UI gets a status update for encoding WAV to MP3
-        status = (
-            self.track_index, self.cdda_filename, self.flac_filename,
-            self.stdout_filename, TRACK_ENCODING_MP3)
-        self.__log.info("enqueueing %r", status)
-        _ENCODING_QUEUE.put((5, status))
+            if response.status != 200:
+                cmd = gn_queries.find("QUERY").get("CMD")
+                raise MetadataError(
+                    "HTTP %d %s" % (response.status, response.reason),
+                    context_hint="Gracenote %s" % cmd)
 
-        try:
-            self._encode_mp3(wav_filename)
-        except Exception as e:
-            self.__log.exception("MP3 encoding failed")
-            status = (
-                self.track_index, self.cdda_filename, self.flac_filename,
-                self.stdout_filename, e)
-            self.__log.error("enqueueing %r", status)
-            _ENCODING_QUEUE.put((2, status))
-        else:
-            status = (
-                self.track_index, self.cdda_filename, self.flac_filename,
-                self.stdout_filename, TRACK_COMPLETE)
-            self.__log.info("enqueueing %r", status)
-            _ENCODING_QUEUE.put((11, status))
+            # parse the response as it arrives (rather than reading,
+            # decoding and then parsing it)
+            gn_responses = ET.parse(
+                response_body, parser=ET.XMLParser(encoding="UTF-8")).getroot()
         finally:
-            del wav_tempdir
+            response_body.close()
+
+        status = gn_responses.find("RESPONSE").get("STATUS")
+        if status != "OK":
+            cmd = gn_queries.find("QUERY").get("CMD")
+            gn_message = gn_responses.find("MESSAGE")
+            if gn_message is not None:
+                message = "%s: %s" % (status, gn_message.text)
+            else:
+                message = status
+            raise MetadataError(message, context_hint="Gracenote %s" % cmd)
 
-    def _encode_mp3(self, wav_filename):
-        """Encode *wav_filename* to MP3 format.
+        self.__log.return_(gn_responses)
+        return gn_responses
 
-        :arg str wav_filename:
-           absolute path to a (temporary) WAV file
+    @staticmethod
+    def _is_cacheable(data):
+        """Return whether or not a Gracenote response body may be cached.
 
-        If clipping is detected in the encoded MP3 file, *wav_filename*
-        will be **re-encoded** with scaled PCM data until there is no
-        clipping detected.
+        :arg bytes data: a Gracenote <RESPONSES> document
+
+        Gracenote reports failures (e.g. "NO_MATCH" or "ERROR") in an
+        HTTP 200 response, so only responses whose every <RESPONSE> has
+        ``STATUS="OK"`` are cacheable.
 
         """
-        encode_mp3(
-            wav_filename, self.mp3_filename, self.track_metadata,
-            stdout_filename=self.stdout_filename)
-
-        # check for clipping
-        stdout = self.__read_stdout()
-        if "WARNING: clipping occurs at the current gain." in stdout:
-            clipping_occurs = True
-            m = re.search(
-                r"encode\s+again\s+using\s+\-\-scale\s+(\d+\.\d+)", stdout)
-            scale = float(m.group(1)) if m else 0.99
-
-            # re-encode, scaling the PCM data, until there is no clipping
-            while clipping_occurs:
-                self.__log.info(
-                    "detected clipping in %s; re-encoding at %.2f scale...",
-                    self.mp3_filename, scale)
-                status = (
-                    self.track_index, self.cdda_filename, self.flac_filename,
-                    self.stdout_filename, TRACK_REENCODING_MP3(scale))
-                _ENCODING_QUEUE.put((5, status))
+        try:
+            gn_responses = ET.fromstring(data)
+        except ET.ParseError:
+            return False
 
-                encode_mp3(
-                    wav_filename, self.mp3_filename, self.track_metadata,
-                    scale=scale, stdout_filename=self.stdout_filename)
+        statuses = [
+            gn_response.get("STATUS")
+            for gn_response in gn_responses.findall("RESPONSE")]
 
-                clipping_occurs = (
-                    "WARNING: clipping occurs at the current gain."
-                    in self.__read_stdout())
-                scale -= 0.01
+        return bool(statuses) and all(status == "OK" for status in statuses)
 
-    def __read_stdout(self):
-        """Read the MP3 encoder's *stdout*."""
-        with open(self.stdout_filename) as f:
-            return f.read()
 
+@logged
+class MusicBrainzMetadataCollector(_HTTPMetadataCollector):
+    """A MusicBrainz client that populates album and track metadata
+    choices for a disc identified by its MusicBrainz ID.
 
-class MetadataError(FLACManagerError):
-    """The type of exception raised when metadata operations fail."""
+    """
 
+    #: The *flacmanager.ini* section for MusicBrainz.
+    CONFIG_SECTION = "MusicBrainz"
 
-@logged
-class MetadataCollector:
-    """Base class for collecting album and track metadata."""
+    #: Host name for all MusicBrainz service calls.
+    API_HOST = "musicbrainz.org"
 
-    def __init__(self, toc):
-        """
-        :arg flacmanager.TOC toc: a disc's table of contents
+    #: Request path prefix for all MusicBrainz service calls.
+    API_PATH_PREFIX = "/ws/2"
 
-        """
-        self.__log.call(toc)
-        self.toc = toc
+    #: URL format string for cover image requests.
+    COVERART_URL_TEMPLATE = "http://coverartarchive.org/release/%s/front-500"
 
-    def reset(self):
-        """Initialize all collection fields to default (empty)."""
-        self.__log.call()
+    #: HTTP User-Agent format string for MusicBrainz requests.
+    USER_AGENT_TEMPLATE = "%s ( %%s )" % FLACManager.USER_AGENT
 
-        number_of_tracks = len(self.toc.track_offsets)
+    #: XML namespace mapping for parsing MusicBrainz responses.
+    NAMESPACES = {
+        "mb": "http://musicbrainz.org/ns/mmd-2.0#",
+    }
 
-        metadata = {
-            "album_title": [],
-            "album_discnumber": 1,
-            "album_disctotal": 1,
-            "album_compilation": False,
-            "album_artist": [],
-            "album_label": [],
-            "album_genre": [],
-            "album_year": [],
-            "album_cover": [],
-            "album_tracktotal": number_of_tracks,
-            "__tracks": [None],  # 1-based indexing
-            "__custom": OrderedDict(),
-        }
+    #: A reference to the ``libdiscid`` shared library.
+    _LIBDISCID = None
 
-        for i in range(number_of_tracks):
-            metadata["__tracks"].append({
-                "track_number": i + 1,
-                "track_include": True,
-                "track_title": [],
-                "track_artist": [],
-                "track_genre": [],
-                "track_year": [],
-                "__custom": OrderedDict(),
-            })
+    @classmethod
+    def initialize_libdiscid(cls):
+        """Load the ``libdiscid`` shared library."""
+        cls.__log.call()
 
-        self.metadata = metadata
+        config = get_config()
+        try:
+            libdiscid_location = resolve_path(
+                config.get("MusicBrainz", "libdiscid_location"))
+        except Exception as e:
+            raise MetadataError(
+                "MusicBrainz libdiscid_location is not valid in "
+                    "flacmanager.ini",
+                context_hint="MusicBrainz configuration")
 
-    def collect(self):
-        """Fetch metadata from a service."""
-        self.reset()
+        try:
+            # http://jonnyjd.github.com/libdiscid/discid_8h.html
+            libdiscid = C.CDLL(libdiscid_location)
 
+            # Return a handle for a new DiscId object.
+            libdiscid.discid_new.argtypes = ()
+            libdiscid.discid_new.restype = C.c_void_p
 
-@logged
-class _HTTPMetadataCollector(MetadataCollector):
-    """Base class for HTTP/S metadata API clients."""
+            # Provides the TOC of a known CD.
+            libdiscid.discid_put.argtypes = (
+                C.c_void_p, C.c_int, C.c_int, C.c_void_p)
+            libdiscid.discid_put.restype = C.c_int
+
+            # Return a MusicBrainz DiscID.
+            libdiscid.discid_get_id.argtypes = (C.c_void_p,)
+            libdiscid.discid_get_id.restype = C.c_char_p
+
+            # Release the memory allocated for the DiscId object.
+            libdiscid.discid_free.argtypes = (C.c_void_p,)
+            libdiscid.discid_free.restype = None
+
+            cls._LIBDISCID = libdiscid
+        except Exception as e:
+            raise MetadataError(
+                str(e), context_hint="libdiscid initialization")
+
+    @classmethod
+    def calculate_disc_id(cls, toc):
+        """Return the MusicBrainz Disc ID for the disc *toc*.
 
-    def __init__(self, toc, api_host, use_ssl=True):
-        """
         :arg flacmanager.TOC toc: a disc's table of contents
-        :arg str api_host: the API host name
-        :keyword bool use_ssl: whether or not to use an SSL connection
+        :return: a MusicBrainz Disc ID for *toc*
+        :rtype: :obj:`str`
+
+        The Disc ID is calculated by
+        :func:`calculate_musicbrainz_disc_id`. If a ``libdiscid``
+        location is configured, the Disc ID is also cross-checked
+        (once per TOC) against ``libdiscid``.
 
         """
-        self.__log.call(toc, api_host, use_ssl=use_ssl)
-        super().__init__(toc)
+        cls.__log.call(toc)
 
-        # provide reasonable defaults (also see the `_ssl_context' property)
-        self.user_agent = FLACManager.USER_AGENT
-        self.timeout = get_config().getfloat("HTTP", "timeout")
+        disc_id = calculate_musicbrainz_disc_id(toc)
+        if get_config().get("MusicBrainz", "libdiscid_location"):
+            cls._cross_check_disc_id(toc, disc_id)
 
-        self.api_host = api_host
-        self.use_ssl = use_ssl
-        self._prepare_connection()
+        cls.__log.return_(disc_id)
+        return disc_id
 
-    def _prepare_connection(self):
-        """Initialize an HTTP(S) connection to a metadata API host."""
-        self.__log.call()
+    @classmethod
+    @lru_cache(maxsize=64)
+    def _cross_check_disc_id(cls, toc, disc_id):
+        """Compare *disc_id* to the Disc ID calculated by ``libdiscid``.
 
-        if self.use_ssl:
-            self._api_conx = HTTPSConnection(
-                self.api_host, context=self._ssl_context, timeout=self.timeout)
-        else:
-            self._api_conx = HTTPConnection(
-                self.api_host, timeout=self.timeout)
+        A mismatch, or a failure to use ``libdiscid``, is logged but is
+        not fatal.
 
-    @property
-    @lru_cache(maxsize=1)
-    def _ssl_context(self):
-        """The SSL context for communicating securely with a metadata
-        API host.
+        """
+        cls.__log.call(toc, disc_id)
 
-        :rtype: :class:`ssl.SSLContext`
+        try:
+            libdiscid_disc_id = cls._libdiscid_disc_id(toc)
+        except Exception as e:
+            cls.__log.warning("unable to cross-check with libdiscid: %s", e)
+            return
 
-        """
-        context = ssl.SSLContext(ssl.PROTOCOL_TLSv1)
-        context.verify_mode = ssl.CERT_NONE
-        context.set_default_verify_paths()
+        if libdiscid_disc_id != disc_id:
+            cls.__log.error(
+                "Disc ID %s does not match libdiscid Disc ID %s for %r",
+                disc_id, libdiscid_disc_id, toc)
 
-        return context
+    @classmethod
+    def _libdiscid_disc_id(cls, toc):
+        """Return the MusicBrainz Disc ID for *toc* from ``libdiscid``.
 
-    def _api_request(self, path, body=None, additional_headers=None):
-        """Make an HTTP GET or POST API request.
+        :arg flacmanager.TOC toc: a disc's table of contents
+        :return: a MusicBrainz Disc ID for *toc*
+        :rtype: :obj:`str`
 
-        :arg str path: the request path and optional query string
-        :keyword body: the HTTP request body
-        :type body: :obj:`str` or :obj:`bytes`
-        :keyword additional_headers:
-           additional request headers (User-Agent is default)
-        :type additional_headers:
-           :obj:`dict` or :class:`http.client.HTTPMessage`
-        :return:
-           a 2-tuple containing the **closed**
-           :class:`http.client.HTTPResponse` object and the response
-           :obj:`bytes` (body)
+        """
+        cls.__log.call(toc)
 
-        If *body* is not ``None``, the request will be an HTTP POST;
-        otherwise the request will be an HTTP GET.
+        if cls._LIBDISCID is None:
+            cls.initialize_libdiscid()
 
-        This method handles redirects (301, 302, 303, 307 and 308)
-        automatically.
+        handle = None
+        try:
+            handle = C.c_void_p(cls._LIBDISCID.discid_new())
+            if handle is None:
+                raise MetadataError(
+                    "Failed to create a new libdiscid DiscId handle!",
+                    context_hint="MusicBrainz libdiscid")
 
-        """
-        self.__log.call(path, body=body, additional_headers=additional_headers)
+            # libdiscid expects offsets indexed by track number
+            offsets = [0] * (toc.last_track_number + 1)
+            offsets[0] = toc.leadout_track_offset
+            offsets[toc.first_track_number:] = toc.track_offsets
+            c_int_array = C.c_int * len(offsets)
+            c_offsets = c_int_array(*offsets)
 
-        conx = self._api_conx
+            res = cls._LIBDISCID.discid_put(
+                handle,
+                toc.first_track_number, toc.last_track_number, c_offsets)
+            if res != 1:
+                cls.__log.error(
+                    "%d return from libdiscid.discid_put(handle, %d, %d, %r)",
+                    res, toc.first_track_number, toc.last_track_number,
+                    offsets)
+                raise MetadataError(
+                    "libdiscid.discid_put returned %d (expected 1)" % res,
+                    context_hint="MusicBrainz libdiscid")
 
-        headers = HTTPMessage()
-        if additional_headers is not None:
-            for (name, value) in additional_headers.items():
-                headers[name] = value
-        if "User-Agent" not in headers:
-            headers["User-Agent"] = self.user_agent
+            disc_id = cls._LIBDISCID.discid_get_id(handle).decode("us-ascii")
 
-        method = "POST" if body is not None else "GET"
-        conx.request(method, path, body=body, headers=headers)
-        response = conx.getresponse()
-        while response.status in [301, 302, 303, 307, 308]:
-            response.close()
-            self.__log.info(
-                "%s %s %s is being %d-redirected to %s",
-                conx.host, method, path,
-                response.status, response.msg["Location"])
-
-            url = urlparse(response.msg["Location"])
-            if (url.netloc != conx.host
-                    or url.scheme !=
-                        ("https" if type(conx) is HTTPSConnection else "http")
-                    or response.msg["Connection"] == "close"):
-                conx.close()
+            cls.__log.return_(disc_id)
+            return disc_id
+        finally:
+            if handle is not None:
+                cls._LIBDISCID.discid_free(handle)
+                handle = None
+                del handle
 
-                if url.scheme == "https":
-                    conx = HTTPSConnection(
-                        url.netloc, context=self._ssl_context,
-                        timeout=self.timeout)
-                else:
-                    conx = HTTPConnection(url.netloc, timeout=self.timeout)
+    def __init__(self, toc):
+        """
+        :arg flacmanager.TOC toc: a disc's table of contents
 
-            path = \
-                url.path if not url.query else "%s?%s" % (url.path, url.query)
+        """
+        self.__log.call(toc)
+        super().__init__(toc, self.API_HOST)
 
-            if response.status == 303:
-                method = "GET"
-                body = None
+        config = get_config()
+        self.__log.debug(
+            "MusicBrainz config = %r", dict(config["MusicBrainz"]))
 
-            conx.request(method, path, body=body, headers=headers)
-            response = conx.getresponse()
+        contact_url_or_email = config.get(
+            "MusicBrainz", "contact_url_or_email")
+        if not contact_url_or_email:
+            raise MetadataError(
+                "MusicBrainz contact_url_or_email must be defined in "
+                    "flacmanager.ini!",
+                context_hint="MusicBrainz configuration")
+        self.user_agent = self.USER_AGENT_TEMPLATE % contact_url_or_email
 
-        data = response.read()
-        response.close()
+    def collect(self):
+        """Populate all MusicBrainz album metadata choices."""
+        self.__log.call()
+        super().collect()
 
-        if "close" in [headers["Connection"], response.msg["Connection"]]:
-            conx.close()
+        nsmap = self.NAMESPACES.copy()
+        self.__log.debug("using namespace map %r", nsmap)
 
-        if conx is not self._api_conx:
-            conx.close()
-            self._prepare_connection()
+        disc_id = self.calculate_disc_id(self.toc)
+        discid_request_path = self._prepare_discid_request(disc_id)
 
-        rv = (response, data)
-        self.__log.return_(rv)
-        return rv
+        metadata = self.metadata
+        cover_art_urls = []
+        for mb_release in self._iter_releases(
+                discid_request_path, disc_id, nsmap):
+            # ElementTree does not use QNames for attributes in the default
+            # namespace. This is fortunate, albeit incorrect, because there's
+            # no way to pass the namespaces map to get(), and subbing in the
+            # default namespace URI for every attribute get would be a PITA.
+            release_mbid = mb_release.get("id")
+            self.__log.info("processing release %r", release_mbid)
 
-    def _download_album_art_image(self, url):
-        """GET an album art image over HTTP/S.
+            title = mb_release.find("mb:title", namespaces=nsmap).text
+            if title not in metadata["album_title"]:
+                metadata["album_title"].append(title)
 
-        :arg str url: the full URL for an album art image
-        :return: the raw image :obj:`bytes` data
+            mb_name = mb_release.find(
+                "mb:artist-credit/mb:name-credit/mb:artist/mb:name",
+                 namespaces=nsmap)
+            if (mb_name is not None
+                    and mb_name.text not in metadata["album_artist"]):
+                album_artist = mb_name.text
+                metadata["album_artist"].append(album_artist)
+            else:
+                album_artist = None
 
-        """
-        self.__log.call(url)
+            mb_date = mb_release.find("mb:date", namespaces=nsmap)
+            if mb_date is not None:
+                year = mb_date.text.split('-', 1)[0]
+                if len(year) == 4 and year not in metadata["album_year"]:
+                    metadata["album_year"].append(year)
 
-        request = Request(url, headers={"User-Agent": self.user_agent})
-        response = urlopen(
-            request, timeout=self.timeout,
-            context=self._ssl_context if url.startswith("https:") else None)
-        data = response.read()
-        response.close()
+            # NOTE: MusicBrainz does not support genre information.
 
-        if response.status != 200:
-            if response.geturl() != url:
-                url = "%s (%s)" % (url, response.geturl())
-            self.__log.warning(
-                "GET %s -> %d %s %r",
-                url, response.status, response.reason, response.getheaders())
-            data = None
+            barcode_node = mb_release.find("mb:barcode", namespaces=nsmap)
+            # issues/2
+            barcode = barcode_node.text if barcode_node is not None else None
+            if barcode:
+                k = ("BARCODE", "")
+                metadata["__custom"].setdefault(k, [])
+                normalized_barcode = re.sub(r"[^\d]", "", barcode)
+                normalized_barcodes = [
+                    re.sub(r"[^\d]", "", b) for b in metadata["__custom"][k]]
+                if normalized_barcode not in normalized_barcodes:
+                    metadata["__custom"][k].append(barcode)
 
-        self.__log.return_(data)
-        return data
+            cover_art_front = mb_release.find(
+                "mb:cover-art-archive/mb:front", namespaces=nsmap).text
+            if cover_art_front == "true":
+                cover_art_urls.append(
+                    self.COVERART_URL_TEMPLATE % release_mbid)
 
+            # For a multi-CD release (e.g. any Global Underground), MusicBrainz
+            # returns both discs (and track lists) in <metadata>. So when we
+            # encounter any <medium-list> with @count > 1, match the disc ID
+            # in the <disc-list> explicitly, and only use the associated
+            # <track-list>.
+            # This only works when <metadata> is the result of an exact disc ID
+            # match. If <metadata> is the result of a fuzzy TOC match, then any
+            # release with medium-list/@count > 1 won't have its track list
+            # processed.
+            mb_medium_list = mb_release.find(
+                "mb:medium-list", namespaces=nsmap)
+            medium_count = int(mb_medium_list.get("count"))
+            mb_track_list = None
+            if medium_count == 1:
+                mb_track_list = mb_medium_list.find(
+                    "mb:medium/mb:track-list", namespaces=nsmap)
+            else:
+                metadata["album_disctotal"] = medium_count
+                disc_path = \
+                    "mb:medium/mb:disc-list/mb:disc[@id='%s']" % disc_id
+                mb_disc = mb_medium_list.find(disc_path, namespaces=nsmap)
+                if mb_disc is not None:
+                    mb_position = mb_medium_list.find(
+                        disc_path + "/../../mb:position", namespaces=nsmap)
+                    metadata["album_discnumber"] = int(mb_position.text)
+                    mb_track_list = mb_medium_list.find(
+                            disc_path + "/../../mb:track-list",
+                            namespaces=nsmap)
 
-@logged
-class GracenoteCDDBMetadataCollector(_HTTPMetadataCollector):
-    """A Gracenote CDDB client that populates album and track metadata
-    choices for a disc identified by its offsets.
+            if mb_track_list is None:
+                self.__log.warning(
+                    "unable to find a suitable track list for release %r",
+                    release_mbid)
+                continue
 
-    """
+            track_count = int(mb_track_list.get("count"))
+            if track_count != metadata["album_tracktotal"]:
+                self.__log.warning(
+                    "skipping track list (expected %d tracks, found %d)",
+                    metadata["album_tracktotal"], track_count)
 
-    #: Host name format string for Gracenote.
-    API_HOST_TEMPLATE = "c%s.web.cddbp.net"
+            for mb_track in mb_track_list.findall(
+                    "mb:track", namespaces=nsmap):
+                track_number = int(
+                    mb_track.find("mb:number", namespaces=nsmap).text)
 
-    #: Request path for Gracenote service calls.
-    API_PATH = "/webapi/xml/1.0/"
+                track_metadata = metadata["__tracks"][track_number]
 
-    #: Request body for a Gracenote User ID.
-    REGISTER_XML = (
-        '<QUERIES>'
-            '<QUERY CMD="REGISTER">'
-                '<CLIENT>%s</CLIENT>'
-            '</QUERY>'
-        '</QUERIES>'
-    )
+                # sanity check:
+                # there are cases where the ordinality of hidden tracks
+                # preceded or interspersed by empty tracks are misnumbered as
+                # though the empty tracks did not exist
+                # (e.g. on the single-disc re-release of Nine Inch Nails' 1992
+                # EP "Broken," the hidden tracks "Physical" and "Suck" SHOULD
+                # be numbered 98/99, respectively, NOT 7/8 or 8/9!!!)
+                assert track_metadata["track_number"] == track_number
 
-    #: Request body for Gracenote Album summary metadata.
-    ALBUM_TOC_XML = (
-        '<QUERIES>'
-            '<AUTH>'
-                '<CLIENT>%s</CLIENT>'
-                '<USER>%s</USER>'
-            '</AUTH>'
-            '<LANG>eng</LANG>'
-            '<COUNTRY>usa</COUNTRY>'
-            '<QUERY CMD="ALBUM_TOC">'
-                '<TOC>'
-                    '<OFFSETS>%s</OFFSETS>'
-                '</TOC>'
-            '</QUERY>'
-        '</QUERIES>'
-    )
+                title = mb_track.find(
+                    "mb:recording/mb:title", namespaces=nsmap).text
+                if title not in track_metadata["track_title"]:
+                    track_metadata["track_title"].append(title)
 
-    #: Request body for Gracenote Album and Track detail metadata.
-    ALBUM_FETCH_XML = (
-        '<QUERIES>'
-            '<AUTH>'
-                '<CLIENT>%s</CLIENT>'
-                '<USER>%s</USER>'
-            '</AUTH>'
-            '<LANG>eng</LANG>'
-            '<COUNTRY>usa</COUNTRY>'
-            '<QUERY CMD="ALBUM_FETCH">'
-                '<GN_ID>%s</GN_ID>'
-                '<OPTION>'
-                    '<PARAMETER>SELECT_EXTENDED</PARAMETER>'
-                    '<VALUE>COVER</VALUE>'
-                '</OPTION>'
-                '<OPTION>'
-                    '<PARAMETER>COVER_SIZE</PARAMETER>'
-                    '<VALUE>MEDIUM,LARGE,SMALL,THUMBNAIL,XLARGE</VALUE>'
-                '</OPTION>'
-                '<OPTION>'
-                    '<PARAMETER>SELECT_DETAIL</PARAMETER>'
-                    '<VALUE>GENRE:3LEVEL</VALUE>'
-                '</OPTION>'
-            '</QUERY>'
-        '</QUERIES>'
-    )
+                mb_name = mb_track.find(
+                    "mb:recording/mb:artist-credit/mb:name-credit/mb:artist/"
+                        "mb:name",
+                    namespaces=nsmap)
+                # MusicBrainz doesn't suppress the artist name even if it's the
+                # same as the release's artist name
+                if (mb_name is not None
+                        and mb_name.text != album_artist
+                        and mb_name.text not in
+                            track_metadata["track_artist"]):
+                    track_metadata["track_artist"].append(mb_name.text)
 
-    def __init__(self, toc):
-        """
-        :arg flacmanager.TOC toc: a disc's table of contents
+                # NOTE: MusicBrainz does not support genre information.
 
-        """
-        self.__log.call(toc)
+        self._fetch_album_covers(cover_art_urls)
 
-        config = get_config()
-        self.__log.debug("Gracenote config = %r", dict(config["Gracenote"]))
+    def _prepare_discid_request(self, disc_id):
+        """Build a full MusicBrainz '/discid' request path.
 
-        client_id = config.get("Gracenote", "client_id")
-        if not client_id:
-            raise MetadataError(
-                    "Gracenote client_id must be defined in flacmanager.ini!",
-                    context_hint="Gracenote configuration")
-        api_host = self.API_HOST_TEMPLATE % client_id.split('-', 1)[0]
-        super().__init__(toc, api_host)
+        :arg str disc_id: a MusicBrainz Disc ID
+        :return: the full MusicBrainz request path
+        :rtype: :obj:`str`
 
-        self._client_id = client_id
-        self._user_id = config.get("Gracenote", "user_id")
+        """
+        self.__log.call(disc_id)
 
-    def _register(self):
-        """Register this client with the Gracenote Web API."""
-        self.__log.call()
+        buf = StringIO()
+        buf.write("%s/discid/%s" % (self.API_PATH_PREFIX, disc_id))
+        buf.write(
+            "?toc=%d+%d+%d" % (
+                self.toc.first_track_number, len(self.toc.track_offsets),
+                self.toc.leadout_track_offset))
+        for track_offset in self.toc.track_offsets:
+            buf.write("+%d" % track_offset)
+        buf.write("&cdstubs=no&inc=artist-credits+recordings")
+        request_path = buf.getvalue()
+        buf.close()
 
-        gn_queries = ET.fromstring(self.REGISTER_XML)
-        gn_queries.find("QUERY/CLIENT").text = self._client_id
+        self.__log.return_(request_path)
+        return request_path
 
-        gn_responses = self._get_response(gn_queries)
-        user = gn_responses.find("RESPONSE/USER")
-        self._user_id = user.text
-        self.__log.debug("registered user_id = %r", self._user_id)
+    def _iter_releases(
+            self, request_path, disc_id, nsmap, http_keep_alive=True):
+        """GET the *request_path* and generate each <release> in the
+        response as it is parsed.
 
-        get_config().set("Gracenote", "user_id", self._user_id)
-        save_config()
+        :arg str request_path: a MusicBrainz '/discid' request path
+        :arg str disc_id: the MusicBrainz Disc ID in *request_path*
+        :arg dict nsmap: namespace prefixes to URIs
+        :keyword bool http_keep_alive:
+           whether or not to keep the MusicBrainz HTTP connection alive
+        :return:
+           a generator of complete MusicBrainz <release> elements
+        :raises MetadataError:
+           if the MusicBrainz request is unsuccessful, or the response
+           does not contain a <release-list>
 
-    def collect(self):
-        """Populate all Gracenote album metadata choices."""
-        self.__log.call()
-        super().collect()
+        The response is parsed incrementally as it arrives. Each
+        <release> is generated as soon as it has been parsed completely,
+        and is cleared (and removed from the document) once the caller
+        has processed it, so that at most one release is held in memory
+        regardless of the size of the response.
 
-        if not self._user_id:
-            self._register()
+        """
+        self.__log.call(
+            request_path, disc_id, nsmap, http_keep_alive=http_keep_alive)
 
-        gn_queries = self._prepare_gn_queries(self.ALBUM_TOC_XML)
-        toc_offsets = "%s %d" % (
-            ' '.join(str(offset) for offset in self.toc.track_offsets),
-            self.toc.leadout_track_offset)
-        gn_queries.find("QUERY/TOC/OFFSETS").text = toc_offsets
+        headers = {"User-Agent": self.user_agent}
+        if not http_keep_alive:
+            headers["Connection"] = "close"
 
+        (response, response_body) = self._api_open(
+            request_path, additional_headers=headers)
         try:
-            gn_responses = self._get_response(gn_queries)
-        except MetadataError as e:
-            if str(e) == "NO_MATCH":
-                self.__log.warning("album not recognized by Gracenote")
-                return
-            raise
-
-        last_album_ord = int(
-            gn_responses.find("RESPONSE/ALBUM[last()]").get("ORD", 1))
-        # when this equals last_album_ord, we'll send "Connection: close" in
-        # the HTTP headers
-        album_ord = 1
-        for gn_album_summary in gn_responses.findall("RESPONSE/ALBUM"):
-            gn_id = gn_album_summary.find("GN_ID").text
-            gn_album_detail = self._fetch_album(
-                gn_id, album_ord == last_album_ord)
+            if response.status != 200:
+                raise MetadataError(
+                    "HTTP %d %s" % (response.status, response.reason),
+                    context_hint="MusicBrainz API")
 
-            metadata = self.metadata
+            metadata_tag = "{%s}metadata" % nsmap["mb"]
+            disc_tag = "{%s}disc" % nsmap["mb"]
+            release_list_tag = "{%s}release-list" % nsmap["mb"]
+            release_tag = "{%s}release" % nsmap["mb"]
+
+            # the elements that are currently open, outermost first
+            mb_elements = []
+            mb_root = None
+            mb_release_list = None
+            for (event, mb_element) in ET.iterparse(
+                    response_body, events=["start", "end"]):
+                if mb_root is None:
+                    mb_root = mb_element
+
+                if mb_root.tag != metadata_tag:
+                    # e.g. an <error> document; it is small, so parse all
+                    # of it to report its message
+                    if event == "end" and mb_element is mb_root:
+                        mb_text = mb_root.find("text")
+                        if mb_text is not None:
+                            message = mb_text.text
+                        else:
+                            message = (
+                                "Unexpected response root element <%s>"
+                                    % mb_root.tag)
+                        raise MetadataError(
+                            message, context_hint="MusicBrainz API")
+                    continue
+
+                if event == "start":
+                    # If there was an exact disc ID match, then the
+                    # release list is in <disc>. Otherwise, if there was a
+                    # "fuzzy" TOC match, then the release list is in
+                    # <metadata>.
+                    if (mb_release_list is None
+                            and mb_element.tag == release_list_tag):
+                        if mb_elements[-1] is mb_root:
+                            mb_release_list = mb_element
+                            self.__log.warning(
+                                "fuzzy TOC match for disc_id %r", disc_id)
+                        elif (len(mb_elements) == 2
+                                and mb_elements[-1].tag == disc_tag):
+                            mb_release_list = mb_element
+                            self.__log.info(
+                                "exact match for disc_id %r", disc_id)
+                    mb_elements.append(mb_element)
+                    continue
+
+                mb_elements.pop()
+                if (mb_element.tag == release_tag
+                        and mb_elements
+                        and mb_elements[-1] is mb_release_list):
+                    yield mb_element
+
+                    mb_element.clear()
+                    mb_release_list.remove(mb_element)
+        finally:
+            response_body.close()
 
-            num_tracks = int(gn_album_detail.find("TRACK_COUNT").text)
-            if num_tracks != metadata["album_tracktotal"]:
-                self.__log.warning(
-                    "discarding %r; expected %d tracks but found %d",
-                    gn_id, metadata["album_tracktotal"], num_tracks)
-                continue
+        if mb_release_list is None:
+            raise MetadataError(
+                "No release list for disc ID %s" % disc_id,
+                context_hint="MusicBrainz API")
 
-            title = gn_album_detail.find("TITLE").text
-            if title not in metadata["album_title"]:
-                metadata["album_title"].append(title)
+        self.__log.return_()
+
+
+#: The schema of an :class:`OfflineMetadataIndex` database.
+_OFFLINE_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS disc (
+    source TEXT NOT NULL,
+    disc_id TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    release_key TEXT NOT NULL,
+    disc_number INTEGER NOT NULL,
+    disc_total INTEGER NOT NULL,
+    PRIMARY KEY (source, disc_id, release_key, disc_number)
+);
+CREATE INDEX IF NOT EXISTS disc_fingerprint ON disc (fingerprint);
+CREATE INDEX IF NOT EXISTS disc_release ON disc (source, release_key);
+CREATE TABLE IF NOT EXISTS release (
+    source TEXT NOT NULL,
+    release_key TEXT NOT NULL,
+    title TEXT,
+    artist TEXT,
+    year TEXT,
+    genre TEXT,
+    barcode TEXT,
+    revision INTEGER,
+    PRIMARY KEY (source, release_key)
+);
+CREATE TABLE IF NOT EXISTS track (
+    source TEXT NOT NULL,
+    release_key TEXT NOT NULL,
+    disc_number INTEGER NOT NULL,
+    track_number INTEGER NOT NULL,
+    title TEXT,
+    artist TEXT,
+    PRIMARY KEY (source, release_key, disc_number, track_number)
+);
+CREATE TABLE IF NOT EXISTS dump (
+    name TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    version TEXT,
+    imported REAL NOT NULL,
+    releases INTEGER NOT NULL
+);
+"""
 
-            artist = gn_album_detail.find("ARTIST").text
-            if artist not in metadata["album_artist"]:
-                metadata["album_artist"].append(artist)
+#: The MusicBrainz data dump tables (and the columns of each, in dump
+#: order) that :meth:`OfflineMetadataIndex.import_musicbrainz_dump`
+#: reads; columns named ``None`` are ignored.
+_MUSICBRAINZ_DUMP_TABLES = OrderedDict([
+    ("artist_credit", ["id", "name"]),
+    ("release", [
+        "id", "gid", "name", "artist_credit", None, None, None, None, None,
+        "barcode"]),
+    ("release_country", ["release", None, "date_year"]),
+    ("release_unknown_country", ["release", "date_year"]),
+    ("medium", ["id", "release", "position"]),
+    ("cdtoc", ["id", "discid", None, None, None, "track_offset"]),
+    ("medium_cdtoc", [None, "medium", "cdtoc"]),
+    ("track", [
+        None, None, None, "medium", "position", None, "name",
+        "artist_credit"]),
+])
+
+#: The number of rows inserted per :meth:`sqlite3.Cursor.executemany`
+#: call when importing data dumps.
+_OFFLINE_INDEX_BATCH_SIZE = 10000
+
+
+def _toc_fingerprint(track_offsets):
+    """Return the fingerprint of a disc's track offsets.
+
+    :arg track_offsets: the track offsets (in frames) of a disc
+    :return: a string that is identical for identical track layouts
+    :rtype: :obj:`str`
 
-            gn_date = gn_album_detail.find("DATE")
-            if (gn_date is not None
-                    and gn_date.text not in metadata["album_year"]):
-                metadata["album_year"].append(gn_date.text)
+    Unlike a FreeDB disc ID, the fingerprint does not collide for
+    different discs; unlike a MusicBrainz disc ID, it can be calculated
+    from a FreeDB entry (which lacks an exact lead-out offset).
 
-            for gn_genre in gn_album_detail.findall("GENRE"):
-                genre = gn_genre.text
-                if genre not in metadata["album_genre"]:
-                    metadata["album_genre"].append(genre)
+    """
+    return "%d:%s" % (
+        len(track_offsets), ' '.join(str(offset) for offset in track_offsets))
 
-            for gn_url_coverart in gn_album_detail.findall(
-                    "URL[@TYPE='COVERART']"):
-                cover_art = self._download_album_art_image(
-                    gn_url_coverart.text)
-                if cover_art and cover_art not in metadata["album_cover"]:
-                    metadata["album_cover"].append(cover_art)
 
-            for gn_track in gn_album_detail.findall("TRACK"):
-                track_number = int(gn_track.find("TRACK_NUM").text)
+def _unescape_pg_copy(field):
+    r"""Decode a field of a PostgreSQL ``COPY`` (text format) file.
 
-                track_metadata = metadata["__tracks"][track_number]
+    :arg str field: the escaped field (``\N`` is NULL)
+    :return: the decoded field, or ``None``
 
-                # sanity check:
-                # there are cases where the ordinality of hidden tracks
-                # preceded or interspersed by empty tracks are misnumbered as
-                # though the empty tracks did not exist
-                # (e.g. on the single-disc re-release of Nine Inch Nails' 1992
-                # EP "Broken," the hidden tracks "Physical" and "Suck" SHOULD
-                # be numbered 98/99, respectively, NOT 7/8 or 8/9!!!)
-                assert track_metadata["track_number"] == track_number
+    """
+    if field == r"\N":
+        return None
+    if '\\' not in field:
+        return field
+
+    return re.sub(
+        r"\\(.)",
+        lambda m: {'t': '\t', 'n': '\n', 'r': '\r'}.get(m.group(1), m.group(1)),
+        field)
+
+
+#: A release (or FreeDB entry) found in an :class:`OfflineMetadataIndex`.
+OfflineRelease = namedtuple(
+    "OfflineRelease", [
+        "source",
+        "release_key",
+        "title",
+        "artist",
+        "year",
+        "genre",
+        "barcode",
+        "disc_number",
+        "disc_total",
+        "tracks",
+    ])
+OfflineRelease.source.__doc__ = '"musicbrainz" or "freedb"'
+OfflineRelease.release_key.__doc__ = \
+    'the MusicBrainz release MBID, or the FreeDB "category/discid"'
+OfflineRelease.title.__doc__ = "the album title"
+OfflineRelease.artist.__doc__ = "the album artist"
+OfflineRelease.year.__doc__ = "the (four-digit) release year"
+OfflineRelease.genre.__doc__ = "the album genre (FreeDB only)"
+OfflineRelease.barcode.__doc__ = "the release barcode (MusicBrainz only)"
+OfflineRelease.disc_number.__doc__ = "the disc's position in the release"
+OfflineRelease.disc_total.__doc__ = "the number of discs in the release"
+OfflineRelease.tracks.__doc__ = \
+    "track number -> a 2-tuple of (title, artist) for the disc"
 
-                title = gn_track.find("TITLE").text
-                if title not in track_metadata["track_title"]:
-                    track_metadata["track_title"].append(title)
 
-                gn_artist = gn_track.find("ARTIST")
-                if (gn_artist is not None
-                        and gn_artist.text not in
-                            track_metadata["track_artist"]):
-                    track_metadata["track_artist"].append(gn_artist.text)
+@logged
+class OfflineMetadataIndex:
+    """A local SQLite index of MusicBrainz and FreeDB data dumps.
 
-                for gn_genre in gn_track.findall("GENRE"):
-                    genre = gn_genre.text
-                    if genre not in track_metadata["track_genre"]:
-                        track_metadata["track_genre"].append(genre)
+    Discs are indexed by MusicBrainz disc ID, FreeDB disc ID and TOC
+    fingerprint (see :func:`_toc_fingerprint`), and the index holds the
+    release, medium, track and artist fields that FLACManager uses.
 
-            album_ord += 1
+    Importing a newer dump into an existing index updates it in place:
 
-    def _fetch_album(self, gn_id, is_last_album=True):
-        """Make a Gracenote 'ALBUM_FETCH' request.
+    * A MusicBrainz data dump is always complete, so every indexed
+      MusicBrainz release is replaced by the dump's version of it (and
+      releases that are no longer in the dump are removed). A dump that
+      is not newer than the last one imported is skipped.
+    * A FreeDB dump may be complete or an update archive. Each entry
+      replaces the indexed entry unless the indexed entry has the same
+      or a higher revision.
 
-        :arg str gn_id: the Gracenote ID of an album
-        :keyword bool is_last_album:
-           whether or not this is the last album to fetch
-        :return: a Gracenote <ALBUM>
-        :rtype: :class:`xml.etree.ElementTree.Element`
+    """
 
+    def __init__(self, filename):
         """
-        self.__log.call(gn_id, is_last_album=is_last_album)
+        :arg str filename: the SQLite database file name (the database
+                           is created if it does not exist)
 
-        gn_queries = self._prepare_gn_queries(self.ALBUM_FETCH_XML)
-        gn_queries.find("QUERY/GN_ID").text = gn_id
+        """
+        self.__log.call(filename)
 
-        gn_responses = self._get_response(
-            gn_queries, http_keep_alive=is_last_album)
-        gn_album = gn_responses.find("RESPONSE/ALBUM")
+        self.filename = filename
 
-        self.__log.return_(gn_album)
-        return gn_album
+        with self._connect() as conx:
+            conx.executescript(_OFFLINE_INDEX_SCHEMA)
 
-    def _prepare_gn_queries(self, xml):
-        """Create a request object with authentication.
+    def lookup(self, toc):
+        """Find the releases for a disc.
 
-        :arg str xml:
-           an XML template string for a Gracenote <QUERIES> document
-        :return: the prepared Gracenote <QUERIES> document
-        :rtype: :class:`xml.etree.ElementTree.Element`
+        :arg flacmanager.TOC toc: a disc's table of contents
+        :return:
+           the matching releases (exact MusicBrainz disc ID matches
+           first)
+        :rtype: :obj:`list` of :class:`OfflineRelease`
 
         """
-        self.__log.call(xml)
-
-        gn_queries = ET.fromstring(xml)
-        gn_queries.find("AUTH/CLIENT").text = self._client_id
-        gn_queries.find("AUTH/USER").text = self._user_id
-
-        self.__log.return_(gn_queries)
-        return gn_queries
+        self.__log.call(toc)
 
-    def _get_response(self, gn_queries, http_keep_alive=True):
-        """POST a Gracenote request and return the response.
+        disc_id = calculate_musicbrainz_disc_id(toc)
+        fingerprint = _toc_fingerprint(toc.track_offsets)
+
+        releases = []
+        with self._connect() as conx:
+            discs = conx.execute(
+                "SELECT source, release_key, disc_number, disc_total, "
+                        "MAX(source = 'musicbrainz' AND disc_id = ?) AS exact "
+                    "FROM disc "
+                    "WHERE (source = 'musicbrainz' AND disc_id = ?) "
+                        "OR fingerprint = ? "
+                    "GROUP BY source, release_key, disc_number, disc_total "
+                    "ORDER BY exact DESC, source DESC, release_key, "
+                        "disc_number",
+                (disc_id, disc_id, fingerprint)).fetchall()
+            for (source, release_key, disc_number, disc_total, _) in discs:
+                row = conx.execute(
+                    "SELECT title, artist, year, genre, barcode FROM release "
+                        "WHERE source = ? AND release_key = ?",
+                    (source, release_key)).fetchone()
+                if row is None:
+                    continue
+                tracks = OrderedDict(
+                    (track_number, (title, artist))
+                    for (track_number, title, artist) in conx.execute(
+                        "SELECT track_number, title, artist FROM track "
+                            "WHERE source = ? AND release_key = ? "
+                                "AND disc_number = ? "
+                            "ORDER BY track_number",
+                        (source, release_key, disc_number)))
+                releases.append(OfflineRelease(
+                    source, release_key, *row, disc_number=disc_number,
+                    disc_total=disc_total, tracks=tracks))
+
+        self.__log.return_(releases)
+        return releases
+
+    def import_musicbrainz_dump(self, path, force=False):
+        """Import (or update from) a MusicBrainz data dump.
+
+        :arg str path:
+           the *mbdump.tar.bz2* archive, or the directory into which it
+           was extracted
+        :keyword bool force:
+           if ``True``, import the dump even if it is not newer than the
+           last MusicBrainz dump imported
+        :return:
+           the number of releases imported, or ``None`` if the dump was
+           skipped
+        :rtype: :obj:`int`
 
-        :arg xml.etree.ElementTree.Element gn_queries:
-           a Gracenote <QUERIES> document
-        :keyword bool http_keep_alive:
-           whether or not to keep the Gracenote HTTP connection alive
-        :return: a Gracenote <RESPONSES> document
-        :rtype: :class:`xml.etree.ElementTree.Element`
-        :raises MetadataError:
-           if the Gracenote request is unsuccessful
+        Only the tables in :data:`_MUSICBRAINZ_DUMP_TABLES` are read;
+        they are staged in temporary tables and then joined, so the
+        order of the tables in the archive does not matter.
 
         """
-        self.__log.call(gn_queries, http_keep_alive=http_keep_alive)
+        self.__log.call(path, force=force)
 
-        buf = BytesIO()
-        ET.ElementTree(gn_queries).write(
-            buf, encoding="UTF-8", xml_declaration=False)
-        gn_queries_bytes = buf.getvalue()
-        buf.close()
-        self.__log.debug("gn_queries_bytes = %r", gn_queries_bytes)
+        conx = self._connect()
+        try:
+            for (table, columns) in _MUSICBRAINZ_DUMP_TABLES.items():
+                conx.execute(
+                    "CREATE TEMP TABLE mb_%s (%s)" % (
+                        table,
+                        ", ".join(
+                            column for column in columns
+                            if column is not None)))
+            conx.execute("ALTER TABLE mb_cdtoc ADD COLUMN fingerprint")
+
+            version = None
+            for (name, f) in self._iter_dump_files(path):
+                (dirname, basename) = os.path.split(name)
+                if basename == "TIMESTAMP":
+                    # at the root of the archive (it precedes mbdump/)
+                    version = f.read().decode("UTF-8").strip()
+                    if not force and not self._is_newer("musicbrainz", version):
+                        self.__log.warning(
+                            "skipping %s (%s is not newer than the last "
+                                "MusicBrainz dump imported)",
+                            path, version)
+                        return None
+                elif (os.path.basename(dirname) == "mbdump"
+                        and basename in _MUSICBRAINZ_DUMP_TABLES):
+                    self._stage_musicbrainz_table(conx, basename, f)
+
+            releases = self._merge_musicbrainz_tables(conx)
+            self._record_dump(conx, path, "musicbrainz", version, releases)
+            conx.commit()
+        finally:
+            conx.close()
 
-        headers = {"Content-Type": "text/xml; charset=UTF-8"}
-        if not http_keep_alive:
-            headers["Connection"] = "close"
-        (response, response_body) = self._api_request(
-            self.API_PATH, body=gn_queries_bytes, additional_headers=headers)
+        self.__log.return_(releases)
+        return releases
 
-        if response.status != 200:
-            cmd = gn_queries.find("QUERY").get("CMD")
-            raise MetadataError(
-                "HTTP %d %s" % (response.status, response.reason),
-                context_hint="Gracenote %s" % cmd)
+    def import_freedb_dump(self, path, force=False):
+        """Import (or update from) a FreeDB dump.
 
-        gn_responses = ET.fromstring(response_body.decode("UTF-8"))
-        status = gn_responses.find("RESPONSE").get("STATUS")
-        if status != "OK":
-            cmd = gn_queries.find("QUERY").get("CMD")
-            gn_message = gn_responses.find("MESSAGE")
-            if gn_message is not None:
-                message = "%s: %s" % (status, gn_message.text)
-            else:
-                message = status
-            raise MetadataError(message, context_hint="Gracenote %s" % cmd)
+        :arg str path:
+           a complete or update archive (e.g.
+           *freedb-complete-20230101.tar.bz2*), or a directory of
+           category folders of xmcd files
+        :keyword bool force:
+           if ``True``, replace indexed entries even if their revision
+           is the same or higher
+        :return: the number of entries imported
+        :rtype: :obj:`int`
 
-        self.__log.return_(gn_responses)
-        return gn_responses
+        """
+        self.__log.call(path, force=force)
 
+        releases = 0
+        conx = self._connect()
+        try:
+            with conx:
+                for (name, f) in self._iter_dump_files(path):
+                    category = os.path.basename(os.path.dirname(name))
+                    basename = os.path.basename(name)
+                    if (not category
+                            or not re.match(r"^[0-9a-f]{8}$", basename)):
+                        continue
+                    entry = self._parse_xmcd(f.read())
+                    if entry is None:
+                        self.__log.warning("skipping malformed %s", name)
+                        continue
+                    if self._put_freedb_entry(
+                            conx, "%s/%s" % (category, basename), entry,
+                            force):
+                        releases += 1
+                        if releases % _OFFLINE_INDEX_BATCH_SIZE == 0:
+                            self.__log.info(
+                                "%d FreeDB entries imported", releases)
+
+                self._record_dump(conx, path, "freedb", None, releases)
+        finally:
+            conx.close()
 
-@logged
-class MusicBrainzMetadataCollector(_HTTPMetadataCollector):
-    """A MusicBrainz client that populates album and track metadata
-    choices for a disc identified by its MusicBrainz ID.
+        self.__log.return_(releases)
+        return releases
 
-    """
+    def _connect(self):
+        """Open the index database.
 
-    #: Host name for all MusicBrainz service calls.
-    API_HOST = "musicbrainz.org"
+        :rtype: :class:`sqlite3.Connection`
 
-    #: Request path prefix for all MusicBrainz service calls.
-    API_PATH_PREFIX = "/ws/2"
+        """
+        return sqlite3.connect(self.filename)
 
-    #: URL format string for cover image requests.
-    COVERART_URL_TEMPLATE = "http://coverartarchive.org/release/%s/front-500"
+    def _iter_dump_files(self, path):
+        """Generate (name, binary file object) for each regular file in
+        the archive or directory *path*.
 
-    #: HTTP User-Agent format string for MusicBrainz requests.
-    USER_AGENT_TEMPLATE = "%s ( %%s )" % FLACManager.USER_AGENT
+        """
+        if os.path.isdir(path):
+            for (dirpath, dirnames, filenames) in os.walk(path):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    filepath = os.path.join(dirpath, filename)
+                    with open(filepath, "rb") as f:
+                        yield (os.path.relpath(filepath, path), f)
+        else:
+            # stream the archive; dumps are far too large to extract
+            with tarfile.open(path, "r|*") as archive:
+                for member in archive:
+                    if member.isfile():
+                        yield (member.name, archive.extractfile(member))
 
-    #: XML namespace mapping for parsing MusicBrainz responses.
-    NAMESPACES = {
-        "mb": "http://musicbrainz.org/ns/mmd-2.0#",
-    }
+    def _is_newer(self, source, version):
+        """Return whether a *source* dump *version* is newer than the
+        last one imported.
 
-    #: A reference to the ``libdiscid`` shared library.
-    _LIBDISCID = None
+        """
+        with self._connect() as conx:
+            (last_version,) = conx.execute(
+                "SELECT MAX(version) FROM dump WHERE source = ?",
+                (source,)).fetchone()
 
-    @classmethod
-    def initialize_libdiscid(cls):
-        """Load the ``libdiscid`` shared library."""
-        cls.__log.call()
+        return last_version is None or version > last_version
 
-        config = get_config()
-        try:
-            libdiscid_location = resolve_path(
-                config.get("MusicBrainz", "libdiscid_location"))
-        except Exception as e:
-            raise MetadataError(
-                "MusicBrainz libdiscid_location is not valid in "
-                    "flacmanager.ini",
-                context_hint="MusicBrainz configuration")
+    def _stage_musicbrainz_table(self, conx, table, f):
+        """Copy the needed columns of a MusicBrainz dump *table* into
+        its temporary table.
 
-        try:
-            # http://jonnyjd.github.com/libdiscid/discid_8h.html
-            libdiscid = C.CDLL(libdiscid_location)
+        """
+        self.__log.call(conx, table, f)
+
+        columns = _MUSICBRAINZ_DUMP_TABLES[table]
+        indexes = [i for (i, column) in enumerate(columns) if column is not None]
+        sql = "INSERT INTO mb_%s VALUES (%s)" % (
+            table,
+            ", ".join('?' * (len(indexes) + (1 if table == "cdtoc" else 0))))
+
+        rows = []
+        count = 0
+        for line in f:
+            fields = line.decode("UTF-8").rstrip('\n').split('\t')
+            row = [_unescape_pg_copy(fields[i]) for i in indexes]
+            if table == "cdtoc":
+                # the offsets are a PostgreSQL array, e.g. "{150,18901}"
+                row.append(_toc_fingerprint(
+                    [int(offset) for offset in row[-1].strip("{}").split(',')]))
+            rows.append(row)
+            if len(rows) == _OFFLINE_INDEX_BATCH_SIZE:
+                conx.executemany(sql, rows)
+                count += len(rows)
+                rows = []
+        conx.executemany(sql, rows)
+        count += len(rows)
+
+        self.__log.info("staged %d MusicBrainz %s rows", count, table)
+
+    def _merge_musicbrainz_tables(self, conx):
+        """Replace the indexed MusicBrainz releases with the staged
+        ones.
+
+        :return: the number of releases (with disc IDs) in the dump
+
+        A transaction is begun (the caller must commit it), so a failed
+        import leaves the index unchanged.
 
-            # Return a handle for a new DiscId object.
-            libdiscid.discid_new.argtypes = ()
-            libdiscid.discid_new.restype = C.c_void_p
+        """
+        self.__log.call(conx)
+
+        conx.executescript("""
+            BEGIN;
+
+            CREATE INDEX temp.mb_medium_id ON mb_medium (id);
+            CREATE INDEX temp.mb_medium_release ON mb_medium (release);
+            CREATE INDEX temp.mb_track_medium ON mb_track (medium);
+            CREATE INDEX temp.mb_release_id ON mb_release (id);
+            CREATE INDEX temp.mb_cdtoc_id ON mb_cdtoc (id);
+            CREATE INDEX temp.mb_artist_credit_id ON mb_artist_credit (id);
+
+            CREATE TEMP TABLE mb_indexed_medium AS
+                SELECT DISTINCT medium AS id FROM mb_medium_cdtoc;
+            CREATE INDEX temp.mb_indexed_medium_id ON mb_indexed_medium (id);
+
+            CREATE TEMP TABLE mb_indexed_release AS
+                SELECT DISTINCT m.release AS id, r.gid AS gid
+                FROM mb_medium m
+                    JOIN mb_indexed_medium im ON im.id = m.id
+                    JOIN mb_release r ON r.id = m.release;
+            CREATE INDEX temp.mb_indexed_release_id
+                ON mb_indexed_release (id);
+
+            CREATE TEMP TABLE mb_release_year AS
+                SELECT release, MIN(date_year) AS year FROM (
+                    SELECT release, date_year FROM mb_release_country
+                    UNION ALL
+                    SELECT release, date_year FROM mb_release_unknown_country)
+                WHERE date_year IS NOT NULL
+                GROUP BY release;
+            CREATE INDEX temp.mb_release_year_release
+                ON mb_release_year (release);
+
+            DELETE FROM track WHERE source = 'musicbrainz';
+            DELETE FROM disc WHERE source = 'musicbrainz';
+            DELETE FROM release WHERE source = 'musicbrainz';
+
+            INSERT INTO release (
+                    source, release_key, title, artist, year, barcode)
+                SELECT 'musicbrainz', r.gid, r.name, ac.name, y.year,
+                        r.barcode
+                FROM mb_indexed_release ir
+                    JOIN mb_release r ON r.id = ir.id
+                    LEFT JOIN mb_artist_credit ac ON ac.id = r.artist_credit
+                    LEFT JOIN mb_release_year y ON y.release = r.id;
+
+            INSERT OR IGNORE INTO disc (
+                    source, disc_id, fingerprint, release_key, disc_number,
+                    disc_total)
+                SELECT 'musicbrainz', c.discid, c.fingerprint, ir.gid,
+                        m.position,
+                        (SELECT COUNT(*) FROM mb_medium m2
+                            WHERE m2.release = m.release)
+                FROM mb_medium_cdtoc mc
+                    JOIN mb_cdtoc c ON c.id = mc.cdtoc
+                    JOIN mb_medium m ON m.id = mc.medium
+                    JOIN mb_indexed_release ir ON ir.id = m.release;
+
+            INSERT OR REPLACE INTO track (
+                    source, release_key, disc_number, track_number, title,
+                    artist)
+                SELECT 'musicbrainz', ir.gid, m.position, t.position, t.name,
+                        ac.name
+                FROM mb_track t
+                    JOIN mb_indexed_medium im ON im.id = t.medium
+                    JOIN mb_medium m ON m.id = t.medium
+                    JOIN mb_indexed_release ir ON ir.id = m.release
+                    LEFT JOIN mb_artist_credit ac ON ac.id = t.artist_credit;
+        """)
+
+        (releases,) = conx.execute(
+            "SELECT COUNT(*) FROM mb_indexed_release").fetchone()
+
+        self.__log.return_(releases)
+        return releases
+
+    def _parse_xmcd(self, data):
+        """Parse a FreeDB (xmcd) entry.
+
+        :arg bytes data: the xmcd file content
+        :return:
+           a :obj:`dict` with "disc_ids", "track_offsets", "revision",
+           "DTITLE", "DYEAR", "DGENRE" and "TTITLE<n>" keys, or ``None``
+           if *data* is not a valid entry
 
-            # Provides the TOC of a known CD.
-            libdiscid.discid_put.argtypes = (
-                C.c_void_p, C.c_int, C.c_int, C.c_void_p)
-            libdiscid.discid_put.restype = C.c_int
+        """
+        try:
+            text = data.decode("UTF-8")
+        except UnicodeDecodeError:
+            text = data.decode("ISO-8859-1")
+
+        entry = {"track_offsets": [], "revision": 0}
+        in_offsets = False
+        for line in text.splitlines():
+            if line.startswith('#'):
+                comment = line[1:].strip()
+                if comment.startswith("Track frame offsets"):
+                    in_offsets = True
+                elif in_offsets and comment.isdigit():
+                    entry["track_offsets"].append(int(comment))
+                else:
+                    in_offsets = False
+                    if comment.startswith("Revision:"):
+                        try:
+                            entry["revision"] = int(comment[9:])
+                        except ValueError:
+                            pass
+                continue
 
-            # Return a MusicBrainz DiscID.
-            libdiscid.discid_get_id.argtypes = (C.c_void_p,)
-            libdiscid.discid_get_id.restype = C.c_char_p
+            (keyword, sep, value) = line.partition('=')
+            if sep:
+                # values that are too long are continued on more lines
+                entry[keyword] = entry.get(keyword, "") + value
 
-            # Release the memory allocated for the DiscId object.
-            libdiscid.discid_free.argtypes = (C.c_void_p,)
-            libdiscid.discid_free.restype = None
+        if "DISCID" not in entry or not entry["track_offsets"]:
+            return None
+        entry["disc_ids"] = [
+            disc_id.strip().lower() for disc_id in entry.pop("DISCID").split(',')
+            if disc_id.strip()]
 
-            cls._LIBDISCID = libdiscid
-        except Exception as e:
-            raise MetadataError(
-                str(e), context_hint="libdiscid initialization")
+        return entry
 
-    @classmethod
-    def calculate_disc_id(cls, toc):
-        """Return the MusicBrainz Disc ID for the disc *toc*.
+    def _put_freedb_entry(self, conx, release_key, entry, force):
+        """Index a parsed FreeDB entry.
 
-        :arg flacmanager.TOC toc: a disc's table of contents
-        :return: a MusicBrainz Disc ID for *toc*
-        :rtype: :obj:`str`
+        :return: whether or not the entry was (re-)indexed
 
         """
-        cls.__log.call(toc)
+        if not force:
+            row = conx.execute(
+                "SELECT revision FROM release "
+                    "WHERE source = 'freedb' AND release_key = ?",
+                (release_key,)).fetchone()
+            if row is not None and row[0] >= entry["revision"]:
+                return False
 
-        if cls._LIBDISCID is None:
-            cls.initialize_libdiscid()
+        def unescape(value):
+            return re.sub(
+                r"\\(.)",
+                lambda m: {'t': '\t', 'n': '\n'}.get(m.group(1), m.group(1)),
+                value).strip()
+
+        (artist, sep, title) = unescape(entry.get("DTITLE", "")).partition(
+            " / ")
+        if not sep:
+            title = artist
+        is_compilation = artist.lower() in ["various", "various artists"]
+
+        conx.execute(
+            "DELETE FROM track WHERE source = 'freedb' AND release_key = ?",
+            (release_key,))
+        conx.execute(
+            "DELETE FROM disc WHERE source = 'freedb' AND release_key = ?",
+            (release_key,))
+        conx.execute(
+            "INSERT OR REPLACE INTO release "
+                "(source, release_key, title, artist, year, genre, revision) "
+                "VALUES ('freedb', ?, ?, ?, ?, ?, ?)",
+            (release_key, title or None, artist or None,
+                unescape(entry.get("DYEAR", "")) or None,
+                unescape(entry.get("DGENRE", "")) or None,
+                entry["revision"]))
+
+        fingerprint = _toc_fingerprint(entry["track_offsets"])
+        conx.executemany(
+            "INSERT OR REPLACE INTO disc VALUES ('freedb', ?, ?, ?, 1, 1)",
+            [(disc_id, fingerprint, release_key)
+                for disc_id in entry["disc_ids"]])
+
+        tracks = []
+        for i in range(len(entry["track_offsets"])):
+            track_title = unescape(entry.get("TTITLE%d" % i, ""))
+            track_artist = None
+            if is_compilation and " / " in track_title:
+                (track_artist, _, track_title) = track_title.partition(" / ")
+            tracks.append(
+                (release_key, i + 1, track_title or None, track_artist))
+        conx.executemany(
+            "INSERT OR REPLACE INTO track VALUES ('freedb', ?, 1, ?, ?, ?)",
+            tracks)
 
-        handle = None
-        try:
-            handle = C.c_void_p(cls._LIBDISCID.discid_new())
-            if handle is None:
-                raise MetadataError(
-                    "Failed to create a new libdiscid DiscId handle!",
-                    context_hint="MusicBrainz libdiscid")
+        return True
 
-            offsets = [toc.leadout_track_offset] + list(toc.track_offsets)
-            c_int_array = C.c_int * len(offsets)
-            c_offsets = c_int_array(*offsets)
+    def _record_dump(self, conx, path, source, version, releases):
+        """Record that the dump at *path* was imported."""
+        conx.execute(
+            "INSERT OR REPLACE INTO dump VALUES (?, ?, ?, ?, ?)",
+            (os.path.basename(os.path.normpath(path)), source, version,
+                time.time(), releases))
 
-            res = cls._LIBDISCID.discid_put(
-                handle,
-                toc.first_track_number, toc.last_track_number, c_offsets)
-            if res != 1:
-                cls.__log.error(
-                    "%d return from libdiscid.discid_put(handle, %d, %d, %r)",
-                    res, toc.first_track_number, toc.last_track_number,
-                    offsets)
-                raise MetadataError(
-                    "libdiscid.discid_put returned %d (expected 1)" % res,
-                    context_hint="MusicBrainz libdiscid")
 
-            disc_id = cls._LIBDISCID.discid_get_id(handle).decode("us-ascii")
+@logged
+class OfflineMetadataCollector(MetadataCollector):
+    """A client of the local :class:`OfflineMetadataIndex` that
+    populates album and track metadata choices for a disc without any
+    network requests.
 
-            cls.__log.return_(disc_id)
-            return disc_id
-        finally:
-            if handle is not None:
-                cls._LIBDISCID.discid_free(handle)
-                handle = None
-                del handle
+    """
+
+    #: The *flacmanager.ini* section for the offline index.
+    CONFIG_SECTION = "Offline"
 
     def __init__(self, toc):
         """
@@ -5485,252 +11795,236 @@ class MusicBrainzMetadataCollector(_HTTPMetadataCollector):
 
         """
         self.__log.call(toc)
-        super().__init__(toc, self.API_HOST)
-
-        config = get_config()
-        self.__log.debug(
-            "MusicBrainz config = %r", dict(config["MusicBrainz"]))
+        super().__init__(toc)
 
-        contact_url_or_email = config.get(
-            "MusicBrainz", "contact_url_or_email")
-        if not contact_url_or_email:
-            raise MetadataError(
-                "MusicBrainz contact_url_or_email must be defined in "
-                    "flacmanager.ini!",
-                context_hint="MusicBrainz configuration")
-        self.user_agent = self.USER_AGENT_TEMPLATE % contact_url_or_email
+        self.index_filename = get_config().get(
+            "Offline", "index_filename", fallback="")
 
     def collect(self):
-        """Populate all MusicBrainz album metadata choices."""
-        self.__log.call()
-        super().collect()
+        """Populate all album metadata choices from the offline index.
 
-        nsmap = self.NAMESPACES.copy()
-        self.__log.debug("using namespace map %r", nsmap)
-
-        disc_id = self.calculate_disc_id(self.toc)
-        discid_request_path = self._prepare_discid_request(disc_id)
-        mb_metadata = self._get_response(
-            discid_request_path, nsmap, http_keep_alive=False)
-
-        # If there was an exact disc ID match, then the root element is <disc>.
-        # Otherwise, if there was a "fuzzy" TOC match, then the root element is
-        # <release-list>.
-        mb_release_list = mb_metadata.find(
-            "mb:disc/mb:release-list", namespaces=nsmap)
-        if mb_release_list is None:
-            mb_release_list = mb_metadata.find(
-                "mb:release-list", namespaces=nsmap)
-            if mb_release_list is None:
-                raise MetadataError(
-                    "No release list for disc ID %s" % disc_id,
-                    context_hint="MusicBrainz API")
-            else:
-                self.__log.warning("fuzzy TOC match for disc_id %r", disc_id)
-        else:
-            self.__log.info("exact match for disc_id %r", disc_id)
+        :raises MetadataError: if the offline index does not exist
 
-        metadata = self.metadata
-        for mb_release in mb_release_list.findall(
-                "mb:release", namespaces=nsmap):
-            # ElementTree does not use QNames for attributes in the default
-            # namespace. This is fortunate, albeit incorrect, because there's
-            # no way to pass the namespaces map to get(), and subbing in the
-            # default namespace URI for every attribute get would be a PITA.
-            release_mbid = mb_release.get("id")
-            self.__log.info("processing release %r", release_mbid)
+        """
+        self.__log.call()
+        super().collect()
 
-            title = mb_release.find("mb:title", namespaces=nsmap).text
-            if title not in metadata["album_title"]:
-                metadata["album_title"].append(title)
+        # checked here (not when constructed) so that a missing index is
+        # only one failed source for the aggregator
+        if not self.index_filename or not os.path.isfile(self.index_filename):
+            raise MetadataError(
+                "Offline index %r does not exist" % self.index_filename,
+                context_hint="Offline metadata index")
+        index = OfflineMetadataIndex(self.index_filename)
 
-            mb_name = mb_release.find(
-                "mb:artist-credit/mb:name-credit/mb:artist/mb:name",
-                 namespaces=nsmap)
-            if (mb_name is not None
-                    and mb_name.text not in metadata["album_artist"]):
-                album_artist = mb_name.text
-                metadata["album_artist"].append(album_artist)
-            else:
-                album_artist = None
+        metadata = self.metadata
+        for release in index.lookup(self.toc):
+            self.__log.info(
+                "processing %s release %r", release.source, release.release_key)
 
-            mb_date = mb_release.find("mb:date", namespaces=nsmap)
-            if mb_date is not None:
-                year = mb_date.text.split('-', 1)[0]
-                if len(year) == 4 and year not in metadata["album_year"]:
-                    metadata["album_year"].append(year)
+            if release.title and release.title not in metadata["album_title"]:
+                metadata["album_title"].append(release.title)
 
-            # NOTE: MusicBrainz does not support genre information.
+            if (release.artist
+                    and release.artist not in metadata["album_artist"]):
+                metadata["album_artist"].append(release.artist)
 
-            barcode_node = mb_release.find("mb:barcode", namespaces=nsmap)
-            # issues/2
-            barcode = barcode_node.text if barcode_node is not None else None
-            if barcode:
-                k = ("BARCODE", "")
-                metadata["__custom"].setdefault(k, [])
-                normalized_barcode = re.sub(r"[^\d]", "", barcode)
-                normalized_barcodes = [
-                    re.sub(r"[^\d]", "", b) for b in metadata["__custom"][k]]
-                if normalized_barcode not in normalized_barcodes:
-                    metadata["__custom"][k].append(barcode)
+            year = (release.year or "")[:4]
+            if len(year) == 4 and year not in metadata["album_year"]:
+                metadata["album_year"].append(year)
 
-            cover_art_front = mb_release.find(
-                "mb:cover-art-archive/mb:front", namespaces=nsmap).text
-            if cover_art_front == "true":
-                cover_art = self._download_album_art_image(
-                    self.COVERART_URL_TEMPLATE % release_mbid)
-                if cover_art and cover_art not in metadata["album_cover"]:
-                    metadata["album_cover"].append(cover_art)
+            if release.genre and release.genre not in metadata["album_genre"]:
+                metadata["album_genre"].append(release.genre)
 
-            # For a multi-CD release (e.g. any Global Underground), MusicBrainz
-            # returns both discs (and track lists) in <metadata>. So when we
-            # encounter any <medium-list> with @count > 1, match the disc ID
-            # in the <disc-list> explicitly, and only use the associated
-            # <track-list>.
-            # This only works when <metadata> is the result of an exact disc ID
-            # match. If <metadata> is the result of a fuzzy TOC match, then any
-            # release with medium-list/@count > 1 won't have its track list
-            # processed.
-            mb_medium_list = mb_release.find(
-                "mb:medium-list", namespaces=nsmap)
-            medium_count = int(mb_medium_list.get("count"))
-            mb_track_list = None
-            if medium_count == 1:
-                mb_track_list = mb_medium_list.find(
-                    "mb:medium/mb:track-list", namespaces=nsmap)
-            else:
-                metadata["album_disctotal"] = medium_count
-                disc_path = \
-                    "mb:medium/mb:disc-list/mb:disc[@id='%s']" % disc_id
-                mb_disc = mb_medium_list.find(disc_path, namespaces=nsmap)
-                if mb_disc is not None:
-                    mb_position = mb_medium_list.find(
-                        disc_path + "/../../mb:position", namespaces=nsmap)
-                    metadata["album_discnumber"] = int(mb_position.text)
-                    mb_track_list = mb_medium_list.find(
-                            disc_path + "/../../mb:track-list",
-                            namespaces=nsmap)
+            if release.barcode:
+                barcodes = metadata["__custom"].setdefault(("BARCODE", ""), [])
+                if release.barcode not in barcodes:
+                    barcodes.append(release.barcode)
 
-            if mb_track_list is None:
-                self.__log.warning(
-                    "unable to find a suitable track list for release %r",
-                    release_mbid)
-                continue
+            if release.disc_total > 1:
+                metadata["album_discnumber"] = release.disc_number
+                metadata["album_disctotal"] = release.disc_total
 
-            track_count = int(mb_track_list.get("count"))
-            if track_count != metadata["album_tracktotal"]:
+            if len(release.tracks) != metadata["album_tracktotal"]:
                 self.__log.warning(
                     "skipping track list (expected %d tracks, found %d)",
-                    metadata["album_tracktotal"], track_count)
-
-            for mb_track in mb_track_list.findall(
-                    "mb:track", namespaces=nsmap):
-                track_number = int(
-                    mb_track.find("mb:number", namespaces=nsmap).text)
+                    metadata["album_tracktotal"], len(release.tracks))
+                continue
 
+            for (track_number, (title, artist)) in release.tracks.items():
+                if not 1 <= track_number <= metadata["album_tracktotal"]:
+                    continue
                 track_metadata = metadata["__tracks"][track_number]
+                if title and title not in track_metadata["track_title"]:
+                    track_metadata["track_title"].append(title)
+                if (artist
+                        and artist != release.artist
+                        and artist not in track_metadata["track_artist"]):
+                    track_metadata["track_artist"].append(artist)
 
-                # sanity check:
-                # there are cases where the ordinality of hidden tracks
-                # preceded or interspersed by empty tracks are misnumbered as
-                # though the empty tracks did not exist
-                # (e.g. on the single-disc re-release of Nine Inch Nails' 1992
-                # EP "Broken," the hidden tracks "Physical" and "Suck" SHOULD
-                # be numbered 98/99, respectively, NOT 7/8 or 8/9!!!)
-                assert track_metadata["track_number"] == track_number
 
-                title = mb_track.find(
-                    "mb:recording/mb:title", namespaces=nsmap).text
-                if title not in track_metadata["track_title"]:
-                    track_metadata["track_title"].append(title)
+#: The name of the file (in the persisted metadata folder) that caches the
+#: track lengths of every persisted disc (see :class:`PersistedTOCIndex`).
+PERSISTED_TOC_INDEX_FILENAME = ".toc-index"
 
-                mb_name = mb_track.find(
-                    "mb:recording/mb:artist-credit/mb:name-credit/mb:artist/"
-                        "mb:name",
-                    namespaces=nsmap)
-                # MusicBrainz doesn't suppress the artist name even if it's the
-                # same as the release's artist name
-                if (mb_name is not None
-                        and mb_name.text != album_artist
-                        and mb_name.text not in
-                            track_metadata["track_artist"]):
-                    track_metadata["track_artist"].append(mb_name.text)
+#: The default ``[Offline] similar_toc_tolerance``: the maximum difference
+#: (in seconds) between the lengths of corresponding tracks of two
+#: "similar" discs (e.g. different pressings of the same album).
+SIMILAR_TOC_TOLERANCE = 2.0
 
-                # NOTE: MusicBrainz does not support genre information.
+#: Serializes updates of :data:`PERSISTED_TOC_INDEX_FILENAME` files.
+_PERSISTED_TOC_INDEX_LOCK = threading.Lock()
 
-    def _prepare_discid_request(self, disc_id):
-        """Build a full MusicBrainz '/discid' request path.
 
-        :arg str disc_id: a MusicBrainz Disc ID
-        :return: the full MusicBrainz request path
-        :rtype: :obj:`str`
+def _track_lengths(toc):
+    """Return the length (in seconds) of each track on a disc.
 
-        """
-        self.__log.call(disc_id)
+    :arg flacmanager.TOC toc: a disc's table of contents
+    :rtype: :obj:`list`
 
-        buf = StringIO()
-        buf.write("%s/discid/%s" % (self.API_PATH_PREFIX, disc_id))
-        buf.write(
-            "?toc=%d+%d+%d" % (
-                self.toc.first_track_number, len(self.toc.track_offsets),
-                self.toc.leadout_track_offset))
-        for track_offset in self.toc.track_offsets:
-            buf.write("+%d" % track_offset)
-        buf.write("&cdstubs=no&inc=artist-credits+recordings")
-        request_path = buf.getvalue()
-        buf.close()
+    Unlike the track offsets, the track lengths do not depend on where
+    the first track begins (i.e. on the pregap and lead-in of a
+    particular pressing).
 
-        self.__log.return_(request_path)
-        return request_path
+    """
+    offsets = list(toc.track_offsets) + [toc.leadout_track_offset]
+    return [
+        round((offsets[i + 1] - offsets[i]) / 75, 2)
+        for i in range(len(toc.track_offsets))]
 
-    def _get_response(self, request_path, nsmap, http_keep_alive=True):
-        """GET the *request_path* and return the response.
 
-        :arg str request_path: a MusicBrainz HTTP request path
-        :arg dict nsmap: namespace prefixes to URIs
-        :keyword bool http_keep_alive:
-           whether or not to keep the MusicBrainz HTTP connection alive
-        :return: the MusicBrainz <metadata> response document
-        :rtype: :class:`xml.etree.ElementTree.Element`
+@logged
+class PersistedTOCIndex:
+    """An index of the track lengths of every disc whose metadata has
+    been persisted, for finding discs that are *similar* to (but do not
+    have the same disc ID as) a new disc.
+
+    The track lengths are cached in :data:`PERSISTED_TOC_INDEX_FILENAME`
+    in the persisted metadata folder; only metadata files that are new
+    or have changed since the cache was written are read.
 
-        If this method returns, then /metadata is guaranteed to exist;
-        otherwise, a ``MetadataError`` with an appropriate message is
-        rasied.
+    """
 
+    def __init__(self, metadata_root):
         """
-        self.__log.call(request_path, nsmap, http_keep_alive=http_keep_alive)
+        :arg str metadata_root: the persisted metadata folder
 
-        headers = {"User-Agent": self.user_agent}
-        if not http_keep_alive:
-            headers["Connection"] = "close"
+        """
+        self.__log.call(metadata_root)
 
-        (response, response_body) = self._api_request(
-            request_path, additional_headers=headers)
+        self.metadata_root = metadata_root
 
-        if response.status != 200:
-            raise MetadataError(
-                "HTTP %d %s" % (response.status, response.reason),
-                context_hint="MusicBrainz API")
+        #: track count -> [(total length, track lengths, file name), ...]
+        #: sorted by total length
+        self._discs = {}
 
-        if "Content-Type" in response.headers:
-            (_, params) = cgi.parse_header(response.headers["Content-Type"])
-            encoding = params.get("charset", "ISO-8859-1")
-        else:
-            encoding = "ISO-8859-1"
-
-        mb_response = ET.fromstring(response_body.decode(encoding))
-        if (mb_response.tag == "error"
-                or mb_response.tag != "{%s}metadata" % nsmap["mb"]):
-            mb_text = mb_response.find("text")
-            if mb_text is not None:
-                message = mb_text.text
-            else:
-                message = \
-                    "Unexpected response root element <%s>" % mb_response.tag
-            raise MetadataError(message, context_hint="MusicBrainz API")
+    def refresh(self):
+        """Bring the index up to date with the persisted metadata
+        files.
+
+        """
+        self.__log.call()
+
+        index_path = os.path.join(
+            self.metadata_root, PERSISTED_TOC_INDEX_FILENAME)
+        with _PERSISTED_TOC_INDEX_LOCK:
+            try:
+                with open(index_path) as f:
+                    cached = json.load(f)
+            except (OSError, ValueError):
+                cached = {}
+
+            entries = {}
+            changed = False
+            for name in sorted(os.listdir(self.metadata_root)):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.metadata_root, name))
+                except OSError:
+                    continue
+                entry = cached.get(name)
+                if (entry is None
+                        or entry[:2] != [stat.st_mtime_ns, stat.st_size]):
+                    entry = [
+                        stat.st_mtime_ns, stat.st_size,
+                        self._read_track_lengths(name)]
+                    changed = True
+                entries[name] = entry
+
+            if changed or entries.keys() != cached.keys():
+                tmp_path = index_path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(entries, f, separators=(',', ':'))
+                os.replace(tmp_path, index_path)
+                self.__log.debug("wrote %s", index_path)
+
+        self._discs = {}
+        for (name, (_, _, lengths)) in entries.items():
+            if lengths:
+                self._discs.setdefault(len(lengths), []).append(
+                    (sum(lengths), lengths, name))
+        for discs in self._discs.values():
+            discs.sort()
+
+        self.__log.return_(len(entries))
+
+    def nearest(self, toc, tolerance=SIMILAR_TOC_TOLERANCE):
+        """Find the persisted discs that are similar to a disc.
+
+        :arg flacmanager.TOC toc: a disc's table of contents
+        :keyword float tolerance:
+           the maximum difference (in seconds) between the lengths of
+           corresponding tracks
+        :return:
+           (largest track length difference, metadata file path) for
+           each disc with the same number of tracks whose track lengths
+           are all within *tolerance*, nearest first
+        :rtype: :obj:`list`
 
-        self.__log.return_(mb_response)
-        return mb_response
+        """
+        self.__log.call(toc, tolerance=tolerance)
+
+        lengths = _track_lengths(toc)
+        total = sum(lengths)
+        discs = self._discs.get(len(lengths), [])
+
+        # no disc whose total length differs by more than this can match
+        window = tolerance * len(lengths)
+        i = bisect_left(discs, (total - window,))
+
+        matches = []
+        while i < len(discs) and discs[i][0] <= total + window:
+            (_, other_lengths, name) = discs[i]
+            differences = [
+                abs(length - other_length)
+                for (length, other_length) in zip(lengths, other_lengths)]
+            if max(differences) <= tolerance:
+                matches.append((
+                    max(differences), sum(differences),
+                    os.path.join(self.metadata_root, name)))
+            i += 1
+
+        matches.sort()
+        matches = [
+            (round(difference, 2), path) for (difference, _, path) in matches]
+
+        self.__log.return_(matches)
+        return matches
+
+    def _read_track_lengths(self, name):
+        """Return the track lengths of the disc described by a persisted
+        metadata file, or ``None`` if it cannot be read.
+
+        """
+        try:
+            with open(os.path.join(self.metadata_root, name)) as f:
+                disc_metadata = json.load(f)
+            toc = disc_metadata.get("__persisted", disc_metadata)["TOC"]
+            return _track_lengths(TOC(*toc))
+        except Exception as e:
+            self.__log.warning("cannot index %s: %s", name, e)
+            return None
 
 
 @logged
@@ -5740,14 +12034,20 @@ class MetadataPersistence(MetadataCollector):
 
     """
 
-    def __init__(self, toc):
+    def __init__(self, toc, find_similar=False):
         """
         :arg flacmanager.TOC toc: a disc's table of contents
+        :keyword bool find_similar:
+           whether or not to use the metadata persisted for a similar
+           disc if none was persisted for this disc (only enable this
+           when the metadata will be reviewed in the editor)
 
         """
-        self.__log.call(toc)
+        self.__log.call(toc, find_similar=find_similar)
         super().__init__(toc)
 
+        self.find_similar = find_similar
+
         library_root = get_config()["Organize"]["library_root"]
         try:
             library_root = resolve_path(library_root)
@@ -5770,9 +12070,20 @@ class MetadataPersistence(MetadataCollector):
         super().reset()
         self.restored = None # handled differently as of 0.8.0
         self.converted = False
+        #: If metadata was not persisted for this disc, but was persisted
+        #: for a similar disc (see :class:`PersistedTOCIndex`), then the
+        #: similar disc's persisted information (including its
+        #: "metadata_path" and the largest track length "difference").
+        self.similar = None
 
     def collect(self):
-        """Populate metadata choices from persisted data."""
+        """Populate metadata choices from persisted data.
+
+        If no metadata was persisted for this disc, the metadata
+        persisted for the most similar disc (if any) is used instead
+        (unless :attr:`find_similar` is ``False``).
+
+        """
         self.__log.call()
         super().collect()
 
@@ -5788,6 +12099,42 @@ class MetadataPersistence(MetadataCollector):
             self.__log.info("restored metadata %r", self.restored)
         else:
             self.__log.info("did not find %r", self.metadata_path)
+            if self.find_similar:
+                self._collect_similar()
+
+    def _collect_similar(self):
+        """Populate metadata choices from the metadata persisted for the
+        most similar disc (if any).
+
+        """
+        self.__log.call()
+
+        tolerance = get_config().getfloat(
+            "Offline", "similar_toc_tolerance",
+            fallback=SIMILAR_TOC_TOLERANCE)
+        if tolerance <= 0 or not os.path.isdir(self.metadata_persistence_root):
+            return
+
+        toc_index = PersistedTOCIndex(self.metadata_persistence_root)
+        toc_index.refresh()
+        matches = toc_index.nearest(self.toc, tolerance=tolerance)
+        if not matches:
+            self.__log.info("no similar disc was found")
+            return
+
+        (difference, similar_path) = matches[0]
+        with open(similar_path) as fp:
+            disc_metadata = json.load(fp, object_pairs_hook=OrderedDict)
+
+        self._postprocess(disc_metadata)
+
+        self.metadata = disc_metadata
+        self.similar = self.restored
+        self.similar["metadata_path"] = similar_path
+        self.similar["difference"] = difference
+        self.restored = None
+
+        self.__log.info("using metadata for similar disc %r", self.similar)
 
     def _postprocess(self, disc_metadata):
         """Modify *metadata* in place after deserializing from JSON.
@@ -6003,24 +12350,12 @@ class MetadataPersistence(MetadataCollector):
         self._xform_custom_keys(repr, disc_metadata)
 
         # issues/5
-        config = get_config()
-        ndisc = "ndisc_" if disc_metadata["album_disctotal"] > 1 else ""
-        compilation = \
-            "compilation_" if disc_metadata["album_compilation"] else ""
-        default_key_prefix = ndisc + compilation
         # only persist the specs if they differ from the defaults; that way,
         # changing the defaults will take effect for any reinserted disc
-        for encoding in ["FLAC", "MP3"]:
-            for field_suffix in [
-                    "subroot_trie", "album_folder", "track_filename"]:
-                default_key = (
-                    "library_subroot_%strie_key" % compilation
-                    if field_suffix == "subroot_trie"
-                    else default_key_prefix + field_suffix)
-                default_spec = config[encoding][default_key]
-                custom_key = "__%s_%s" % (encoding.lower(), field_suffix)
-                if disc_metadata[custom_key] == default_spec:
-                    del disc_metadata[custom_key]
+        for (custom_key, default_spec) in \
+                _default_naming_specs(disc_metadata).items():
+            if disc_metadata[custom_key] == default_spec:
+                del disc_metadata[custom_key]
 
         for track_metadata in disc_metadata["__tracks"][1:]:
             self._xform_custom_keys(repr, track_metadata)
@@ -6064,42 +12399,299 @@ class MetadataPersistence(MetadataCollector):
             raise TypeError("%r is not JSON serializable" % obj)
 
 
-#: Used to pass data between a :class:`MetadataAggregator` thread and
-#: the main thread.
-_AGGREGATOR_QUEUE = queue.Queue(1)
+def load_metadata_snapshot(metadata_path):
+    """Read a persisted metadata snapshot.
+
+    :arg str metadata_path:
+       absolute path to a persisted metadata (*.json*) file
+    :return:
+       the complete (album and tracks) metadata mapping, in the same
+       form that was passed to :meth:`MetadataPersistence.store`
+    :rtype: :class:`collections.OrderedDict`
+    :raises MetadataError:
+       if *metadata_path* was persisted by a FLACManager version older
+       than 0.8.0
+
+    The persisted cover image (if any) is written to a temporary file.
+    Any folder and file naming templates that were not persisted
+    (because they were the defaults at the time) are set to the
+    *current* defaults.
+
+    """
+    _log.call(metadata_path)
+
+    with open(metadata_path) as fp:
+        snapshot = json.load(fp, object_pairs_hook=OrderedDict)
+
+    snapshot = _restore_metadata_snapshot(snapshot, metadata_path)
+
+    _log.return_(snapshot)
+    return snapshot
+
+
+def _restore_metadata_snapshot(snapshot, origin):
+    """Convert a JSON-decoded (persisted) metadata snapshot back to the
+    form that was passed to :meth:`MetadataPersistence.store`.
+
+    :arg dict snapshot: the decoded JSON object (modified in place)
+    :arg str origin: where *snapshot* came from (for error messages)
+    :return: *snapshot*
+    :raises MetadataError: if *snapshot* uses the pre-0.8.0 format
+
+    See :func:`load_metadata_snapshot`.
+
+    """
+    if "tracks" in snapshot:
+        raise MetadataError(
+            "%s uses the pre-0.8.0 format; re-insert the disc to convert it"
+                % origin,
+            context_hint="Metadata persistence")
+
+    for key in ["__persisted", "__version__", "timestamp", "TOC"]:
+        snapshot.pop(key, None)
+
+    if snapshot["album_cover"] is not None:
+        # see MetadataPersistence._convert_to_json_serializable(obj)
+        image_data = snapshot["album_cover"].encode("Latin-1")
+        image_type = imghdr.what("_ignored_", h=image_data)
+        filename = make_tempfile(suffix='.' + (image_type or "jpeg"))
+        with open(filename, "wb") as f:
+            f.write(image_data)
+        snapshot["album_cover"] = filename
+
+    for metadata in [snapshot] + snapshot["__tracks"][1:]:
+        metadata["__custom"] = OrderedDict(
+            (literal_eval(key), value)
+            for (key, value) in metadata["__custom"].items())
+
+    # issues/5
+    for (custom_key, default_spec) in \
+            _default_naming_specs(snapshot).items():
+        snapshot.setdefault(custom_key, default_spec)
+
+    return snapshot
+
+
+def make_metadata_snapshot(aggregated_metadata):
+    """Build a complete (album and tracks) metadata mapping by choosing
+    the first (i.e. preferred) aggregated value for each field.
+
+    :arg dict aggregated_metadata:
+       the aggregated metadata for an album, as produced by
+       :class:`MetadataAggregator`
+    :return:
+       a mapping with the same structure as the UI's metadata snapshot
+    :rtype: :class:`collections.OrderedDict`
+
+    This is the metadata that the UI would present by default; it is
+    used when there is no user to edit the metadata (see
+    :func:`ingest_album`).
+
+    """
+    _log.call(aggregated_metadata)
+
+    first = lambda values: values[0] if values else ""
+
+    snapshot = OrderedDict()
+    for album_field_name in [
+            "album_title",
+            "album_discnumber",
+            "album_disctotal",
+            "album_compilation",
+            "album_artist",
+            "album_label",
+            "album_genre",
+            "album_year",
+            ]:
+        value = aggregated_metadata[album_field_name]
+        snapshot[album_field_name] = (
+            first(value) if type(value) is list else value)
+
+    snapshot["album_cover"] = first(aggregated_metadata["album_cover"]) or None
+    snapshot["album_tracktotal"] = len(aggregated_metadata["__tracks"]) - 1
+    snapshot["__custom"] = aggregated_metadata["__custom"].copy()
+
+    # issues/5
+    for (custom_key, default_spec) in \
+            _default_naming_specs(snapshot).items():
+        snapshot[custom_key] = aggregated_metadata.get(
+            custom_key, default_spec)
+
+    snapshot["__tracks"] = [None]
+    for aggregated_track_metadata in aggregated_metadata["__tracks"][1:]:
+        track_metadata = OrderedDict()
+
+        track_metadata["track_number"] = \
+            aggregated_track_metadata["track_number"]
+        track_metadata["track_include"] = \
+            aggregated_track_metadata["track_include"]
+        for track_field_name in [
+                "track_title",
+                "track_artist",
+                "track_genre",
+                "track_year",
+                ]:
+            track_metadata[track_field_name] = first(
+                aggregated_track_metadata[track_field_name])
+
+        track_metadata["__custom"] = \
+            aggregated_track_metadata["__custom"].copy()
+
+        snapshot["__tracks"].append(track_metadata)
+
+    _log.return_(snapshot)
+    return snapshot
+
+
+def flatten_metadata_snapshot(snapshot):
+    """Return the complete per-track metadata from *snapshot*,
+    including album metadata values shared by all tracks.
+
+    :arg dict snapshot:
+       a complete (album and tracks) metadata mapping
+    :rtype: :obj:`list` of :class:`collections.OrderedDict`
+
+    .. note::
+       The list returned by this function uses zero-based indexing.
+       (This differs from most other internal representations of
+       per-track metadata, which use 1-based indexing to maintain
+       consistency with respect to track numbers.)
+
+    """
+    _log.call(snapshot)
+
+    snapshot = deepcopy(snapshot)
+    snapshot.pop("__custom") # already incorporated into each track
+
+    # to "flatten" the metadata, just add the album metadata to each track
+    flattened = snapshot.pop("__tracks")[1:]    # zero-based indexing here
+    for track_metadata in flattened:
+        track_metadata.update(snapshot)
+
+    _log.return_(flattened)
+    return flattened
+
+
+#: The default number of seconds that a single metadata source may take
+#: (see ``deadline`` in the ``[Gracenote]`` and ``[MusicBrainz]``
+#: sections of *flacmanager.ini*).
+COLLECTOR_DEADLINE = 15.0
+
+#: The default number of seconds after which aggregation continues with
+#: whichever metadata sources have responded (see
+#: ``aggregation_deadline`` in the ``[HTTP]`` section of
+#: *flacmanager.ini*).
+AGGREGATION_DEADLINE = 20.0
+
+#: Used to pass :obj:`AggregationUpdate` items from a
+#: :class:`MetadataAggregator` thread to the main thread.
+_AGGREGATOR_QUEUE = queue.Queue()
+
+#: The metadata aggregated by a :class:`MetadataAggregator` after a
+#: source has been collected. *metadata* is a copy of the aggregated
+#: metadata, *complete* is ``True`` for the aggregator's final update,
+#: and *persisted* is ``True`` if *metadata* includes (and gives
+#: precedence to) persisted metadata.
+AggregationUpdate = namedtuple(
+    "AggregationUpdate", ["aggregator", "metadata", "complete", "persisted"])
 
 
 @logged
 class MetadataAggregator(MetadataCollector, threading.Thread):
     """The thread that aggregates metadata from multiple sources."""
 
-    def __init__(self, toc):
+    def __init__(self, toc, find_similar=False):
         """
         :arg flacmanager.TOC toc: a disc's table of contents
+        :keyword bool find_similar:
+           whether or not metadata persisted for a *similar* disc is
+           used (with the same precedence as metadata persisted for this
+           disc); only enable this when the aggregated metadata will be
+           reviewed in the editor, because a similar disc is not
+           necessarily the same album
 
         """
-        self.__log.call(toc)
+        self.__log.call(toc, find_similar=find_similar)
 
         threading.Thread.__init__(self, daemon=True)
         MetadataCollector.__init__(self, toc)
 
-        self.persistence = MetadataPersistence(toc)
-        self._collectors = [
-            self.persistence, # should be first
-            GracenoteCDDBMetadataCollector(toc),
-            MusicBrainzMetadataCollector(toc),
-        ]
-        self.exceptions = []
+        self.persistence = MetadataPersistence(toc, find_similar=find_similar)
+        self._collectors = [
+            self.persistence, # should be first
+            GracenoteCDDBMetadataCollector(toc),
+            MusicBrainzMetadataCollector(toc),
+        ]
+        if get_config().get("Offline", "index_filename", fallback=""):
+            # answers in milliseconds, so it is consulted right after the
+            # persisted metadata
+            self._collectors.insert(1, OfflineMetadataCollector(toc))
+        self.exceptions = []
+
+        #: Collector class name -> a :obj:`dict` describing how that
+        #: collector fared (``"state"`` is "ok", "error" or "timeout";
+        #: ``"elapsed"`` and ``"deadline"`` are in seconds; and
+        #: ``"error"`` describes the exception, if any).
+        self.diagnostics = OrderedDict()
+
+        #: Shared by all collectors so that identical cover images are
+        #: only kept once.
+        self.cover_fetcher = CoverFetcher()
+        for collector in self._collectors:
+            if isinstance(collector, _HTTPMetadataCollector):
+                collector.cover_fetcher = self.cover_fetcher
+
+        #: The collectors that have been collected so far.
+        self._collected = []
+
+    def run(self):
+        """Collect and aggregate metadata in another thread.
+
+        An :obj:`AggregationUpdate` is put on :data:`_AGGREGATOR_QUEUE`
+        after each source has been collected (persisted metadata first),
+        so that the UI can display metadata without waiting for every
+        music database to respond.
+
+        """
+        self.__log.call()
+
+        for collector in self._collect_each():
+            self.aggregate()
+
+            self.__log.info(
+                "enqueueing update after %s", collector.__class__.__name__)
+            _AGGREGATOR_QUEUE.put(
+                AggregationUpdate(
+                    self, deepcopy(self.metadata), False,
+                    self._is_persisted()))
+
+        self.__log.info("enqueueing final update")
+        _AGGREGATOR_QUEUE.put(
+            AggregationUpdate(
+                self, deepcopy(self.metadata), True, self._is_persisted()))
+
+    def _is_persisted(self):
+        """Return whether or not persisted metadata (for this disc or a
+        similar disc) has been collected.
+
+        .. note::
+           The persistence collector runs concurrently with the others,
+           so its own attributes may be set before it has been
+           collected (and aggregated).
 
-    def run(self):
-        """Run the :meth:`collect` method in another thread."""
-        self.__log.call()
+        """
+        return (
+            self.persistence in self._collected
+            and bool(self.persistence.restored or self.persistence.similar))
 
-        self.collect()
-        self.aggregate()
+    def reset(self):
+        """Initialize all collection fields to default (empty)."""
+        super().reset()
 
-        self.__log.info("enqueueing %r", self)
-        _AGGREGATOR_QUEUE.put(self)
+        # feature/toc-and-mbdiscid-tagging
+        self.metadata["__custom"][("MUSICBRAINZ_DISCID", "")] = [
+            self.persistence.disc_id]
+        #TODO: self.metadata["__custom"][("", "MCDI")] = []
 
     def collect(self):
         """Collect metadata from all music databases.
@@ -6110,33 +12702,134 @@ class MetadataAggregator(MetadataCollector, threading.Thread):
 
         """
         self.__log.call()
-        super().collect()
 
-        # feature/toc-and-mbdiscid-tagging
-        self.metadata["__custom"][("MUSICBRAINZ_DISCID", "")] = [
-            self.persistence.disc_id]
-        #TODO: self.metadata["__custom"][("", "MCDI")] = []
+        for collector in self._collect_each():
+            pass
+
+    def _collect_each(self):
+        """Collect metadata from all music databases concurrently,
+        yielding each collector as soon as it has been collected (or has
+        failed).
 
+        Each collector runs in its own thread and must finish within its
+        deadline (and within the overall aggregation deadline); a
+        collector that does not is recorded as a timeout in
+        :attr:`exceptions` and :attr:`diagnostics`, and whatever it
+        returns later is ignored.
+
+        """
+        self.__log.call()
+        super().collect()
+
+        config = get_config()
+        aggregation_deadline = config.getfloat(
+            "HTTP", "aggregation_deadline", fallback=AGGREGATION_DEADLINE)
+        deadlines = {
+            collector: min(
+                aggregation_deadline,
+                config.getfloat(
+                    collector.CONFIG_SECTION, "deadline",
+                    fallback=COLLECTOR_DEADLINE)
+                    if collector.CONFIG_SECTION is not None
+                    else aggregation_deadline)
+            for collector in self._collectors}
+
+        results = queue.Queue()
+        started = time.monotonic()
         for collector in self._collectors:
+            threading.Thread(
+                target=self._timed_collect, args=(collector, results),
+                name="collect-%s" % collector.__class__.__name__,
+                daemon=True).start()
+
+        pending = set(self._collectors)
+        while pending:
+            expires = min(started + deadlines[c] for c in pending)
             try:
-                collector.collect()
-            except Exception as e:
+                (collector, elapsed, e) = results.get(
+                    timeout=max(0, expires - time.monotonic()))
+            except queue.Empty:
+                now = time.monotonic()
+                for collector in [
+                        c for c in self._collectors
+                        if c in pending and now >= started + deadlines[c]]:
+                    pending.remove(collector)
+                    self._diagnose(
+                        collector, "timeout", now - started,
+                        deadlines[collector])
+                    self.exceptions.append(MetadataError(
+                        "%s did not respond within %.1f seconds" % (
+                            collector.__class__.__name__,
+                            deadlines[collector]),
+                        context_hint="Metadata aggregation"))
+                continue
+
+            if collector not in pending:
+                self.__log.warning(
+                    "ignoring late %s result", collector.__class__.__name__)
+                continue
+            pending.remove(collector)
+
+            if e is not None:
                 self.__log.error("metadata collection error", exc_info=e)
                 self.exceptions.append(e)
+            self._diagnose(
+                collector, "ok" if e is None else "error", elapsed,
+                deadlines[collector], e)
+
+            self._collected.append(collector)
+            yield collector
+
+    def _timed_collect(self, collector, results):
+        """Run *collector* and put (collector, elapsed seconds,
+        exception or ``None``) on *results*.
+
+        """
+        self.__log.call(collector, results)
+
+        started = time.monotonic()
+        try:
+            collector.collect()
+        except Exception as e:
+            results.put((collector, time.monotonic() - started, e))
+        else:
+            results.put((collector, time.monotonic() - started, None))
+
+    def _diagnose(self, collector, state, elapsed, deadline, e=None):
+        """Record how *collector* fared in :attr:`diagnostics`."""
+        diagnosis = OrderedDict([
+            ("state", state),
+            ("elapsed", round(elapsed, 3)),
+            ("deadline", deadline),
+        ])
+        if e is not None:
+            diagnosis["error"] = "%s: %s" % (e.__class__.__name__, e)
+        self.diagnostics[collector.__class__.__name__] = diagnosis
+
+        self.__log.info(
+            "%s %s after %.3fs", collector.__class__.__name__, state, elapsed)
 
     def aggregate(self):
-        """Combine metadata from all music databases into a single
-        mapping.
+        """Combine metadata from all music databases that have been
+        collected so far into a single mapping.
 
         .. note::
            If persisted metadata was collected, the persisted value for
            each metadata field will take precedence over any other
            collected values.
 
+        Each call re-aggregates from scratch, so this method may be
+        called again after more sources have been collected.
+
         """
         self.__log.call()
 
-        for collector in self._collectors:
+        self.reset()
+
+        # aggregate in priority order (persisted metadata first), not in
+        # the order in which the collectors finished
+        for collector in [
+                c for c in self._collectors if c in self._collected]:
             self._merge_metadata(
                 collector.metadata, self.metadata,
                 keys=[
@@ -6213,7 +12906,7 @@ class MetadataAggregator(MetadataCollector, threading.Thread):
 
         # persisted metadata takes precedence and provides some values not
         # collected by regular collectors
-        if self.persistence.restored:
+        if self._is_persisted():
             # I trust myself more than the music databases :)
             self.metadata["album_discnumber"] = \
                 self.persistence.metadata["album_discnumber"]
@@ -6298,26 +12991,810 @@ class MetadataAggregator(MetadataCollector, threading.Thread):
         .. note::
            This method will **replace** the binary image data with the
            temporary file name in the aggregated metadata mapping.
+           Images that were downloaded are already temporary files, and
+           images with identical content are kept only once.
 
         """
         self.__log.call()
 
         album_covers = self.metadata["album_cover"].copy()
         self.metadata["album_cover"] = []
-        for (i, image_data) in enumerate(album_covers):
-            image_type = imghdr.what("_ignored_", h=image_data)
-            if image_type is None:
-                self.__log.error(
-                    "ignoring unrecognized image data [%d]: %r...",
-                    i, image_data[:32])
-                continue
+        for image in album_covers:
+            filepath = (
+                self.cover_fetcher.store(image) if type(image) is bytes
+                else image)
+            if (filepath is not None
+                    and filepath not in self.metadata["album_cover"]):
+                self.metadata["album_cover"].append(filepath)
+
+
+def ingest_album(
+        album_dirname, metadata_snapshot=None, status_queue=None,
+        report=None):
+    """Encode a disc image or a folder of pre-ripped audio files as an
+    album.
+
+    :arg str album_dirname:
+       a folder that contains one WAV, AIFF or FLAC file for each track
+       (in file name order), or a disc image (or a folder that contains
+       one); see :func:`get_toc_provider`
+    :keyword dict metadata_snapshot:
+       a complete (album and tracks) metadata mapping, e.g. from
+       :func:`load_metadata_snapshot` (by default, metadata is
+       aggregated)
+    :keyword queue.Queue status_queue:
+       where (priority, status) encoding updates are reported (by
+       default, a private queue is used)
+    :keyword report:
+       a function that is called with a :obj:`dict` describing each
+       progress event (see below)
+    :return: the number of tracks that failed to encode
+    :rtype: :obj:`int`
+    :raises FLACManagerError:
+       if *album_dirname* is not recognized by any :class:`TOCProvider`,
+       or if no metadata could be found for the album
+
+    The :obj:`TOC` is read from the disc image (or, for a folder of
+    audio files, is built from the track lengths), and metadata is
+    aggregated (and persisted) exactly as for an inserted disc. The
+    first (preferred) value of each metadata field is used (see
+    :func:`make_metadata_snapshot`), and the tracks are then encoded by
+    the same pipeline as a ripped disc.
+
+    Each *report* event has a ``"source"`` (*album_dirname*) and an
+    ``"event"``:
+
+    ``"album"``
+       encoding has started (``"title"``, ``"artist"``, ``"tracks"``,
+       and the aggregator's ``"diagnostics"`` if metadata was
+       aggregated)
+    ``"track"``
+       a track changed state (``"track"`` number, ``"state"`` key
+       from :class:`TrackState`, ``"flac"`` file name, and ``"error"``
+       if the track failed)
+    ``"finished"``
+       all tracks have been processed (``"failed"`` count)
 
-            filepath = make_tempfile(suffix='.' + image_type)
-            with open(filepath, "wb") as f:
-                f.write(image_data)
-            self.__log.debug("wrote %s", filepath)
+    """
+    _log.call(
+        album_dirname, metadata_snapshot=metadata_snapshot,
+        status_queue=status_queue, report=report)
+
+    provider = get_toc_provider(album_dirname)
+    toc = provider.read_toc()
+    track_sources = provider.track_sources()
+    if len(track_sources) != len(toc.track_offsets):
+        raise FLACManagerError(
+            "TOC contains %d tracks, but %d track sources were found for %s"
+                % (len(toc.track_offsets), len(track_sources), album_dirname),
+            context_hint="Ingest")
+
+    diagnostics = None
+    if metadata_snapshot is None:
+        aggregator = MetadataAggregator(toc)
+        aggregator.collect()
+        aggregator.aggregate()
+        diagnostics = aggregator.diagnostics
+        for e in aggregator.exceptions:
+            _log.warning(
+                "%s: %s: %s", album_dirname, e.__class__.__name__, e)
+
+        if not (aggregator.persistence.restored
+                or aggregator.metadata["album_title"]):
+            raise FLACManagerError(
+                "No metadata was found for %s (disc ID %s)" % (
+                    album_dirname, aggregator.persistence.disc_id),
+                context_hint="Ingest")
+
+        metadata_snapshot = make_metadata_snapshot(aggregator.metadata)
+        # storing modifies the mapping in place
+        aggregator.persistence.store(deepcopy(metadata_snapshot))
+    elif len(metadata_snapshot["__tracks"]) - 1 != len(toc.track_offsets):
+        raise FLACManagerError(
+            "TOC contains %d tracks, but the metadata describes %d tracks "
+                "for %s" % (
+                    len(toc.track_offsets),
+                    len(metadata_snapshot["__tracks"]) - 1, album_dirname),
+            context_hint="Ingest")
+
+    if report is None:
+        report = lambda event: None
+
+    if status_queue is None:
+        status_queue = queue.PriorityQueue()
+    encoder = prepare_encoder(
+        track_sources, flatten_metadata_snapshot(metadata_snapshot),
+        status_queue=status_queue)
+    report(OrderedDict([
+        ("event", "album"),
+        ("source", album_dirname),
+        ("title", metadata_snapshot["album_title"]),
+        ("artist", metadata_snapshot["album_artist"]),
+        ("tracks", len(toc.track_offsets)),
+    ] + ([("diagnostics", diagnostics)] if diagnostics is not None else [])))
+    encoder.start()
+
+    failed = 0
+    track_states = {}
+    while True:
+        (_, status) = status_queue.get()
+        status_queue.task_done()
+
+        (track_index, _, flac_fn, _, target_state) = status
+        if target_state == "FINISHED":
+            break
+        elif isinstance(target_state, Exception):
+            failed += 1
+            _log.error(
+                "%s track %d failed: %s: %s",
+                album_dirname, track_index + 1,
+                target_state.__class__.__name__, target_state)
+        elif target_state == TRACK_COMPLETE:
+            _log.info("%s track %d complete: %s",
+                album_dirname, track_index + 1, flac_fn)
+        else:
+            _log.debug(
+                "%s track %d: %s", album_dirname, track_index + 1,
+                target_state.text)
+
+        # encoding statuses are repeated while a track is in progress
+        state_key = (
+            TRACK_FAILED.key if isinstance(target_state, Exception)
+            else target_state.key)
+        if track_states.get(track_index) != state_key:
+            track_states[track_index] = state_key
+            event = OrderedDict([
+                ("event", "track"),
+                ("source", album_dirname),
+                ("track", track_index + 1),
+                ("state", state_key),
+                ("flac", flac_fn),
+            ])
+            if isinstance(target_state, Exception):
+                event["error"] = "%s: %s" % (
+                    target_state.__class__.__name__, target_state)
+            report(event)
+
+    # the encoder does not terminate until every status has been processed
+    while True:
+        try:
+            status_queue.get_nowait()
+        except queue.Empty:
+            break
+        else:
+            status_queue.task_done()
+    encoder.join()
+
+    report(OrderedDict([
+        ("event", "finished"),
+        ("source", album_dirname),
+        ("failed", failed),
+    ]))
+
+    _log.return_(failed)
+    return failed
+
+
+#: The name of the marker file that is written to an album folder once
+#: it has been ingested from a watch folder.
+INGESTED_MARKER = ".flacmanager-ingested"
+
+#: The name of the marker file that is written to an album folder if
+#: ingesting it from a watch folder failed (it contains the error).
+FAILED_MARKER = ".flacmanager-failed"
+
+
+@logged
+class WatchFolder(threading.Thread):
+    """A thread that ingests album folders (see :func:`ingest_album`)
+    as they appear in a watch folder.
+
+    An album folder is considered complete once its audio files have
+    not changed for a configurable amount of time. Once ingested, an
+    album folder is marked so that it is not ingested again (delete the
+    marker file to re-ingest an album).
+
+    """
+
+    def __init__(
+            self, watch_root, max_albums=None, poll_interval=None,
+            settle_time=None):
+        """
+        :arg str watch_root: the folder that is watched for albums
+        :keyword int max_albums:
+           the maximum number of albums that are ingested concurrently
+        :keyword float poll_interval:
+           the number of seconds between scans of *watch_root*
+        :keyword float settle_time:
+           the number of seconds that an album folder must remain
+           unchanged before it is ingested
+
+        Unspecified options default to the ``[Watch]`` options in
+        *flacmanager.ini*.
+
+        ``WatchFolder`` threads are daemonized so that they are killed
+        automatically if the program exits.
+
+        """
+        self.__log.call(
+            watch_root, max_albums=max_albums, poll_interval=poll_interval,
+            settle_time=settle_time)
+        super().__init__(daemon=True)
+
+        config = get_config()
+        self.watch_root = watch_root
+        self.max_albums = (
+            max_albums if max_albums is not None
+            else config.getint("Watch", "max_concurrent_albums", fallback=2))
+        self.poll_interval = (
+            poll_interval if poll_interval is not None
+            else config.getfloat("Watch", "poll_interval", fallback=10.0))
+        self.settle_time = (
+            settle_time if settle_time is not None
+            else config.getfloat("Watch", "settle_time", fallback=30.0))
+
+        self._candidates = {}   # dirname -> (signature, unchanged since)
+        self._in_progress = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_albums)
+
+    def run(self):
+        """Scan the watch folder until the program exits."""
+        self.__log.call()
+
+        while True:
+            try:
+                self.scan()
+            except Exception:
+                self.__log.exception("unable to scan %s", self.watch_root)
+            time.sleep(self.poll_interval)
+
+    def ingest_all(self):
+        """Ingest every (unmarked) album folder that is present now,
+        without waiting for the folders to settle.
+
+        :return: the number of albums that failed
+        :rtype: :obj:`int`
+
+        """
+        self.__log.call()
+
+        futures = [
+            self._executor.submit(self._ingest, album_dirname)
+            for album_dirname in self._album_dirnames()]
+
+        failed = sum(1 for future in futures if not future.result())
+
+        self.__log.return_(failed)
+        return failed
+
+    def scan(self):
+        """Ingest any album folders that have become complete."""
+        now = time.time()
+        for album_dirname in self._album_dirnames():
+            with self._lock:
+                if album_dirname in self._in_progress:
+                    continue
+
+            signature = self._signature(album_dirname)
+            (previous_signature, since) = self._candidates.get(
+                album_dirname, (None, now))
+            if signature != previous_signature:
+                self._candidates[album_dirname] = (signature, now)
+            elif signature and now - since >= self.settle_time:
+                del self._candidates[album_dirname]
+                with self._lock:
+                    self._in_progress.add(album_dirname)
+                self.__log.info("submitting %s", album_dirname)
+                self._executor.submit(self._ingest, album_dirname)
+
+    def _album_dirnames(self):
+        """Return the (unmarked) album folders in the watch folder."""
+        album_dirnames = []
+        for name in sorted(os.listdir(self.watch_root)):
+            album_dirname = os.path.join(self.watch_root, name)
+            if (not name.startswith('.')
+                    and os.path.isdir(album_dirname)
+                    and not os.path.exists(
+                        os.path.join(album_dirname, INGESTED_MARKER))
+                    and not os.path.exists(
+                        os.path.join(album_dirname, FAILED_MARKER))):
+                album_dirnames.append(album_dirname)
+
+        return album_dirnames
+
+    def _signature(self, album_dirname):
+        """Return a value that changes whenever the (audio, image or CUE
+        sheet) files in *album_dirname* change.
+
+        """
+        signature = []
+        for name in sorted(os.listdir(album_dirname)):
+            if not name.startswith('.'):
+                stat = os.stat(os.path.join(album_dirname, name))
+                signature.append((name, stat.st_size, stat.st_mtime))
+
+        return tuple(signature)
+
+    def _ingest(self, album_dirname):
+        """Ingest *album_dirname* and mark it as ingested (or failed).
+
+        :return: ``True`` if every track was encoded, otherwise ``False``
+
+        .. note::
+           This method is run in a worker thread.
+
+        """
+        self.__log.call(album_dirname)
+
+        try:
+            failed = ingest_album(album_dirname)
+            if failed:
+                raise FLACManagerError(
+                    "%d track(s) failed to encode" % failed,
+                    context_hint="Ingest")
+        except Exception as e:
+            self.__log.exception("failed to ingest %s", album_dirname)
+            with open(os.path.join(album_dirname, FAILED_MARKER), 'w') as f:
+                print("%s: %s" % (e.__class__.__name__, e), file=f)
+            succeeded = False
+        else:
+            open(os.path.join(album_dirname, INGESTED_MARKER), 'w').close()
+            self.__log.info("ingested %s", album_dirname)
+            succeeded = True
+        finally:
+            with self._lock:
+                self._in_progress.discard(album_dirname)
+
+        return succeeded
+
+
+def batch_ingest(
+        sources, metadata_snapshots=None, max_albums=None, report=None):
+    """Ingest several discs (images, folders or mounted discs)
+    concurrently.
+
+    :arg list sources:
+       file or folder names accepted by :func:`get_toc_provider`
+    :keyword list metadata_snapshots:
+       a complete metadata mapping (or ``None`` to aggregate metadata)
+       for each of *sources*
+    :keyword int max_albums:
+       the maximum number of albums that are ingested concurrently
+       (default: ``[Watch] max_concurrent_albums``)
+    :keyword report:
+       a function that is called with a :obj:`dict` describing each
+       progress event (see :func:`ingest_album`); it is called from
+       multiple threads
+    :return:
+       the number of sources that could not be ingested, or that had
+       at least one track fail
+    :rtype: :obj:`int`
+
+    A source that cannot be ingested at all (e.g. because no metadata
+    was found) is reported as an ``"error"`` event with an ``"error"``
+    message.
+
+    """
+    _log.call(
+        sources, metadata_snapshots=metadata_snapshots,
+        max_albums=max_albums, report=report)
+
+    if metadata_snapshots is None:
+        metadata_snapshots = [None] * len(sources)
+    if max_albums is None:
+        max_albums = get_config().getint(
+            "Watch", "max_concurrent_albums", fallback=2)
+    if report is None:
+        report = lambda event: None
+
+    def ingest(source, metadata_snapshot):
+        try:
+            return ingest_album(
+                source, metadata_snapshot=metadata_snapshot, report=report)
+        except Exception as e:
+            _log.exception("failed to ingest %s", source)
+            report(OrderedDict([
+                ("event", "error"),
+                ("source", source),
+                ("error", "%s: %s" % (e.__class__.__name__, e)),
+            ]))
+            return 1
+
+    with ThreadPoolExecutor(max_workers=max_albums) as executor:
+        futures = [
+            executor.submit(ingest, source, metadata_snapshot)
+            for (source, metadata_snapshot) in zip(
+                sources, metadata_snapshots)]
+        failed = sum(1 for future in futures if future.result())
+
+    _log.return_(failed)
+    return failed
+
+
+@logged
+class EncodingJob:
+    """A request to ingest (aggregate, tag and encode) one source, as
+    submitted to an :class:`EncodingJobServer`.
+
+    Every progress event (see :func:`ingest_album`) is kept, so that
+    clients can follow a job from any point.
+
+    """
 
-            self.metadata["album_cover"].append(filepath)
+    def __init__(self, job_id, source, metadata_snapshot=None):
+        """
+        :arg str job_id: the unique identifier for this job
+        :arg str source:
+           a mounted disc, disc image or audio folder (see
+           :func:`get_toc_provider`)
+        :keyword dict metadata_snapshot:
+           a complete (album and tracks) metadata mapping (by default,
+           metadata is aggregated)
+
+        """
+        self.__log.call(job_id, source, metadata_snapshot=metadata_snapshot)
+
+        self.id = job_id
+        self.source = source
+        self.metadata_snapshot = metadata_snapshot
+        self.state = "queued"
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+
+        self._events = []
+        self._changed = threading.Condition()
+
+    @property
+    def done(self):
+        """``True`` if this job has finished (successfully or not)."""
+        return self.state in ["finished", "failed"]
+
+    def add_event(self, event):
+        """Record a progress *event* and wake any waiting clients.
+
+        :arg dict event: a progress event (see :func:`ingest_album`)
+
+        """
+        with self._changed:
+            self._events.append(event)
+            self._changed.notify_all()
+
+    def set_state(self, state, error=None):
+        """Change the state of this job and wake any waiting clients.
+
+        :arg str state: "running", "finished" or "failed"
+        :keyword str error: the reason that the job failed
+
+        """
+        self.__log.call(state, error=error)
+
+        with self._changed:
+            self.state = state
+            self.error = error
+            if state == "running":
+                self.started = time.time()
+            else:
+                self.finished = time.time()
+            self._changed.notify_all()
+
+    def wait_for_events(self, since, timeout):
+        """Return the events that were added after the first *since*
+        events, waiting up to *timeout* seconds for one to be added.
+
+        :arg int since: the number of events that the client has seen
+        :arg float timeout: the maximum number of seconds to wait
+        :return: a list of events (empty if the wait timed out or the
+           job finished without adding any more events)
+        :rtype: :obj:`list`
+
+        """
+        with self._changed:
+            self._changed.wait_for(
+                lambda: len(self._events) > since or self.done, timeout)
+            return self._events[since:]
+
+    def summary(self, events=False):
+        """Return a JSON-serializable description of this job.
+
+        :keyword bool events: whether or not to include all events
+        :rtype: :class:`collections.OrderedDict`
+
+        """
+        with self._changed:
+            summary = OrderedDict([
+                ("id", self.id),
+                ("source", self.source),
+                ("state", self.state),
+                ("error", self.error),
+                ("submitted", self.submitted),
+                ("started", self.started),
+                ("finished", self.finished),
+                ("event_count", len(self._events)),
+            ])
+            if events:
+                summary["events"] = list(self._events)
+
+        return summary
+
+
+@logged
+class EncodingJobServer:
+    """A local HTTP/JSON server that accepts and runs
+    :class:`EncodingJob` requests.
+
+    Jobs are queued and run by a fixed number of worker threads, so
+    any number of clients can share one machine. The API is:
+
+    ``POST /jobs``
+       submit ``{"source": "...", "metadata": {...}}``; *metadata* is
+       a persisted-form metadata snapshot (see
+       :func:`load_metadata_snapshot`), or ``null`` to aggregate it
+    ``GET /jobs``
+       list all jobs
+    ``GET /jobs/<id>``
+       describe one job, including all of its events
+    ``GET /jobs/<id>/events?since=N&timeout=T``
+       long-poll for events after the first *N*; if the ``Accept``
+       header is ``text/event-stream``, events are instead streamed as
+       server-sent events until the job finishes
+
+    """
+
+    def __init__(
+            self, host=None, port=None, max_jobs=None, max_queued_jobs=None):
+        """
+        :keyword str host: the address to listen on
+        :keyword int port: the port to listen on
+        :keyword int max_jobs:
+           the maximum number of jobs that run concurrently
+        :keyword int max_queued_jobs:
+           the maximum number of jobs that may be waiting to run (further
+           submissions are refused)
+
+        Unspecified options default to the ``[Server]`` options in
+        *flacmanager.ini*.
+
+        """
+        self.__log.call(
+            host=host, port=port, max_jobs=max_jobs,
+            max_queued_jobs=max_queued_jobs)
+
+        config = get_config()
+        if host is None:
+            host = config.get("Server", "host", fallback="127.0.0.1")
+        if port is None:
+            port = config.getint("Server", "port", fallback=8337)
+        self.max_jobs = (
+            max_jobs if max_jobs is not None
+            else config.getint("Server", "max_concurrent_jobs", fallback=2))
+        self.max_queued_jobs = (
+            max_queued_jobs if max_queued_jobs is not None
+            else config.getint("Server", "max_queued_jobs", fallback=100))
+
+        self._jobs = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._next_job_id = 1
+        self._job_queue = queue.Queue(self.max_queued_jobs)
+
+        self._httpd = ThreadingHTTPServer((host, port), _JobRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.job_server = self
+
+    @property
+    def address(self):
+        """The (host, port) that the server is listening on."""
+        return self._httpd.server_address
+
+    def serve_forever(self):
+        """Start the worker threads and handle requests until
+        :meth:`shutdown` is called.
+
+        """
+        self.__log.call()
+
+        for i in range(self.max_jobs):
+            threading.Thread(
+                target=self._run_jobs, name="EncodingJobWorker-%d" % (i + 1),
+                daemon=True).start()
+
+        self.__log.info("listening on %s:%d", *self.address)
+        self._httpd.serve_forever()
+
+    def shutdown(self):
+        """Stop handling requests (running jobs are not interrupted)."""
+        self.__log.call()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def submit(self, source, metadata_snapshot=None):
+        """Queue a new job.
+
+        :arg str source: see :class:`EncodingJob`
+        :keyword dict metadata_snapshot: see :class:`EncodingJob`
+        :return: the queued job
+        :rtype: :class:`EncodingJob`
+        :raises queue.Full: if too many jobs are already waiting
+
+        """
+        self.__log.call(source, metadata_snapshot=metadata_snapshot)
+
+        with self._jobs_lock:
+            job = EncodingJob(
+                str(self._next_job_id), source,
+                metadata_snapshot=metadata_snapshot)
+            self._job_queue.put_nowait(job)
+            self._next_job_id += 1
+            self._jobs[job.id] = job
+
+        self.__log.return_(job)
+        return job
+
+    def get_job(self, job_id):
+        """Return the job identified by *job_id* (or ``None``)."""
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self):
+        """Return all jobs, in submission order."""
+        with self._jobs_lock:
+            return list(self._jobs.values())
+
+    def _run_jobs(self):
+        """Run queued jobs, one at a time.
+
+        .. note::
+           This method is run in each worker thread.
+
+        """
+        while True:
+            job = self._job_queue.get()
+            job.set_state("running")
+            try:
+                failed = ingest_album(
+                    job.source, metadata_snapshot=job.metadata_snapshot,
+                    report=job.add_event)
+            except Exception as e:
+                self.__log.exception("job %s failed", job.id)
+                job.set_state("failed", "%s: %s" % (e.__class__.__name__, e))
+            else:
+                if failed:
+                    job.set_state(
+                        "failed", "%d track(s) failed to encode" % failed)
+                else:
+                    job.set_state("finished")
+            finally:
+                self._job_queue.task_done()
+
+
+#: The longest (in seconds) that a long-poll request for job events
+#: will wait.
+JOB_EVENTS_MAX_WAIT = 60.0
+
+
+@logged
+class _JobRequestHandler(BaseHTTPRequestHandler):
+    """Handles the HTTP requests for an :class:`EncodingJobServer`."""
+
+    server_version = "FLACManager/%s" % __version__
+
+    # SSE and long-poll responses are held open
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        """Describe jobs, or wait for job events."""
+        job_server = self.server.job_server
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+
+        if parts == ["jobs"]:
+            self._send_json(200, {
+                "jobs": [job.summary() for job in job_server.list_jobs()]})
+            return
+
+        job = (
+            job_server.get_job(parts[1])
+            if len(parts) in [2, 3] and parts[0] == "jobs" else None)
+        if job is None or (len(parts) == 3 and parts[2] != "events"):
+            self._send_json(404, {"error": "not found: %s" % url.path})
+        elif len(parts) == 2:
+            self._send_json(200, job.summary(events=True))
+        else:
+            query = parse_qs(url.query)
+            try:
+                since = int(query.get("since", ['0'])[0])
+                if since < 0:
+                    raise ValueError("since must not be negative: %d" % since)
+                timeout = min(
+                    float(query.get("timeout", ['30'])[0]),
+                    JOB_EVENTS_MAX_WAIT)
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+
+            if "text/event-stream" in self.headers.get("Accept", ""):
+                self._stream_events(job, since)
+            else:
+                events = job.wait_for_events(since, timeout)
+                self._send_json(200, OrderedDict([
+                    ("state", job.state),
+                    ("events", events),
+                    ("next", since + len(events)),
+                ]))
+
+    def do_POST(self):
+        """Submit a job."""
+        if [part for part in self.path.split('/') if part] != ["jobs"]:
+            self._send_json(404, {"error": "not found: %s" % self.path})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(
+                self.rfile.read(length).decode("utf-8"),
+                object_pairs_hook=OrderedDict)
+            source = request["source"]
+            metadata_snapshot = request.get("metadata")
+            if metadata_snapshot is not None:
+                metadata_snapshot = _restore_metadata_snapshot(
+                    metadata_snapshot, "job request")
+            job = self.server.job_server.submit(
+                source, metadata_snapshot=metadata_snapshot)
+        except queue.Full:
+            self._send_json(503, {"error": "too many jobs are queued"})
+        except Exception as e:
+            self._send_json(
+                400, {"error": "%s: %s" % (e.__class__.__name__, e)})
+        else:
+            self._send_json(201, job.summary())
+
+    def _send_json(self, status, obj):
+        """Send *obj* as a complete JSON response."""
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_events(self, job, since):
+        """Send *job* events (after the first *since*) as server-sent
+        events until the job finishes.
+
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        try:
+            while True:
+                events = job.wait_for_events(since, JOB_EVENTS_MAX_WAIT)
+                for event in events:
+                    since += 1
+                    self.wfile.write(
+                        ("id: %d\ndata: %s\n\n" % (since, json.dumps(event)))
+                            .encode("utf-8"))
+                if job.done and not events:
+                    self.wfile.write(
+                        ("event: %s\ndata: %s\n\n" % (
+                            job.state, json.dumps(job.summary())))
+                            .encode("utf-8"))
+                    break
+                elif not events:
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.__log.info("client disconnected from job %s", job.id)
+
+    def log_message(self, format, *args):
+        """Log requests to the FLACManager log (instead of stderr)."""
+        self.__log.info(
+            "%s %s", self.address_string(), format % args)
 
 
 @lru_cache(maxsize=1)
@@ -6379,16 +13856,274 @@ def initialize_logging():
     HTTPConnection.debuglevel = config["HTTP"].getint("debuglevel")
 
 
-if __name__ == "__main__":
+def main(argv=None):
+    """Run FLACManager.
+
+    :keyword list argv:
+       command line arguments (default: ``sys.argv[1:]``)
+    :return: the process exit status
+    :rtype: :obj:`int`
+
+    With no command, the FLACManager UI is started. The ``watch``
+    command ingests album folders from a watch folder instead (see
+    :class:`WatchFolder`), and the ``batch`` command ingests discs,
+    disc images and audio folders given on the command line (see
+    :func:`batch_ingest`), writing progress events to standard output as
+    JSON lines. The ``serve`` command accepts jobs over HTTP (see
+    :class:`EncodingJobServer`), and the ``transcode`` command
+    regenerates the MP3 library from the FLAC library (see
+    :class:`LibraryTranscoder`). The ``reorganize`` command moves
+    library files to match the current naming settings (see
+    :class:`LibraryReorganizer`), and the ``index`` command imports
+    MusicBrainz or FreeDB data dumps into the offline metadata index
+    (see :class:`OfflineMetadataIndex`). None of these commands requires
+    Tk.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="flacmanager.py",
+        description="Audio metadata aggregator and FLAC+MP3 encoder")
+    commands = parser.add_subparsers(dest="command")
+
+    watch_parser = commands.add_parser(
+        "watch", help="ingest pre-ripped album folders from a watch folder")
+    watch_parser.add_argument(
+        "watch_root", nargs='?',
+        help="the folder to watch (default: [Watch] watch_root)")
+    watch_parser.add_argument(
+        "--max-albums", type=int,
+        help="the number of albums to ingest concurrently "
+            "(default: [Watch] max_concurrent_albums)")
+    watch_parser.add_argument(
+        "--once", action="store_true",
+        help="ingest the albums that are present now, then exit")
+
+    batch_parser = commands.add_parser(
+        "batch",
+        help="ingest discs, disc images or audio folders without the UI")
+    batch_parser.add_argument(
+        "sources", nargs='+', metavar="source",
+        help="a mounted disc, CUE sheet, raw image or folder of tracks")
+    batch_parser.add_argument(
+        "--metadata", action="append", metavar="persisted.json|auto",
+        help="persisted metadata for each source, in order, or 'auto' "
+            "(the default) to aggregate metadata")
+    batch_parser.add_argument(
+        "--max-albums", type=int,
+        help="the number of albums to ingest concurrently "
+            "(default: [Watch] max_concurrent_albums)")
+
+    serve_parser = commands.add_parser(
+        "serve", help="accept and run encoding jobs over a local HTTP API")
+    serve_parser.add_argument(
+        "--host", help="the address to listen on (default: [Server] host)")
+    serve_parser.add_argument(
+        "--port", type=int,
+        help="the port to listen on (default: [Server] port)")
+    serve_parser.add_argument(
+        "--max-jobs", type=int,
+        help="the number of jobs to run concurrently "
+            "(default: [Server] max_concurrent_jobs)")
+
+    transcode_parser = commands.add_parser(
+        "transcode",
+        help="encode missing or out-of-date MP3s from the FLAC library")
+    transcode_parser.add_argument(
+        "--max-workers", type=int,
+        help="the number of encoding processes (default: %d)"
+            % TRANSCODE_MAX_WORKERS)
+    transcode_parser.add_argument(
+        "--force", action="store_true",
+        help="re-encode every MP3, even if it appears to be up to date")
+    transcode_parser.add_argument(
+        "--adopt-existing", action="store_true",
+        help="assume that existing MP3s newer than their FLAC files are up "
+            "to date, even though their encoding options are unknown")
+    transcode_parser.add_argument(
+        "--dry-run", action="store_true",
+        help="only report what would be encoded or moved")
+
+    reorganize_parser = commands.add_parser(
+        "reorganize",
+        help="move library files to match the current naming settings")
+    reorganize_parser.add_argument(
+        "--max-workers", type=int,
+        help="the number of album folders to move files into concurrently "
+            "(default: %d)" % REORGANIZE_MAX_WORKERS)
+    reorganize_parser.add_argument(
+        "--dry-run", action="store_true",
+        help="only report the moves that would be made")
+    reorganize_parser.add_argument(
+        "--undo", metavar="LOG",
+        help="reverse the moves recorded in a reorganize move log")
+
+    index_parser = commands.add_parser(
+        "index",
+        help="import data dumps into the offline metadata index")
+    index_parser.add_argument(
+        "source", choices=["musicbrainz", "freedb"],
+        help="the kind of data dump")
+    index_parser.add_argument(
+        "dumps", nargs='+', metavar="dump",
+        help="a data dump archive, or the directory it was extracted into")
+    index_parser.add_argument(
+        "--index", metavar="FILENAME",
+        help="the index database (default: [Offline] index_filename)")
+    index_parser.add_argument(
+        "--force", action="store_true",
+        help="import even if the index is already up to date")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "batch":
+        metadata = args.metadata or ["auto"]
+        if metadata == ["auto"]:
+            metadata = metadata * len(args.sources)
+        elif len(metadata) != len(args.sources):
+            parser.error(
+                "--metadata must be 'auto' or be given once for each source")
+
     if not os.path.isfile("flacmanager.py"):
         print(
             "Please run flacmanager.py from within its directory.",
             file=sys.stderr)
-        sys.exit(1)
+        return 1
 
     initialize_logging()
 
+    if args.command == "watch":
+        watch_root = args.watch_root or get_config().get(
+            "Watch", "watch_root", fallback="")
+        if not watch_root or not os.path.isdir(watch_root):
+            print(
+                "A watch folder must be specified on the command line or "
+                    "as [Watch] watch_root in flacmanager.ini.",
+                file=sys.stderr)
+            return 1
+
+        watch_folder = WatchFolder(watch_root, max_albums=args.max_albums)
+        if args.once:
+            return 1 if watch_folder.ingest_all() else 0
+
+        watch_folder.start()
+        try:
+            while watch_folder.is_alive():
+                watch_folder.join(1)
+        except KeyboardInterrupt:
+            pass
+        return 0
+    elif args.command == "batch":
+        report_lock = threading.Lock()
+
+        def report(event):
+            with report_lock:
+                print(json.dumps(event), flush=True)
+
+        try:
+            metadata_snapshots = [
+                load_metadata_snapshot(path) if path != "auto" else None
+                for path in metadata]
+        except Exception as e:
+            print("%s: %s" % (e.__class__.__name__, e), file=sys.stderr)
+            return 1
+
+        failed = batch_ingest(
+            args.sources, metadata_snapshots=metadata_snapshots,
+            max_albums=args.max_albums, report=report)
+        return 1 if failed else 0
+    elif args.command == "transcode":
+        def report(event):
+            print(json.dumps(event), flush=True)
+
+        try:
+            transcoder = LibraryTranscoder(
+                max_workers=args.max_workers, force=args.force,
+                adopt_existing=args.adopt_existing, report=report)
+            failed = transcoder.run(dry_run=args.dry_run)
+        except Exception as e:
+            _log.exception("transcoding failed")
+            print("%s: %s" % (e.__class__.__name__, e), file=sys.stderr)
+            return 1
+        return 1 if failed else 0
+    elif args.command == "reorganize":
+        report_lock = threading.Lock()
+
+        def report(event):
+            with report_lock:
+                print(json.dumps(event), flush=True)
+
+        try:
+            reorganizer = LibraryReorganizer(
+                max_workers=args.max_workers, report=report)
+            if args.undo:
+                failed = reorganizer.undo(args.undo)
+            else:
+                failed = reorganizer.run(dry_run=args.dry_run)
+        except Exception as e:
+            _log.exception("reorganizing failed")
+            print("%s: %s" % (e.__class__.__name__, e), file=sys.stderr)
+            return 1
+        return 1 if failed else 0
+    elif args.command == "index":
+        index_filename = args.index or get_config().get(
+            "Offline", "index_filename", fallback="")
+        if not index_filename:
+            print(
+                "An index file name must be specified on the command line "
+                    "or as [Offline] index_filename in flacmanager.ini.",
+                file=sys.stderr)
+            return 1
+
+        failed = 0
+        try:
+            index = OfflineMetadataIndex(index_filename)
+        except Exception as e:
+            _log.exception("cannot open %s", index_filename)
+            print("%s: %s" % (e.__class__.__name__, e), file=sys.stderr)
+            return 1
+        import_dump = (
+            index.import_musicbrainz_dump if args.source == "musicbrainz"
+            else index.import_freedb_dump)
+        for dump in args.dumps:
+            started = time.monotonic()
+            try:
+                releases = import_dump(dump, force=args.force)
+            except Exception as e:
+                _log.exception("importing %s failed", dump)
+                failed += 1
+                event = OrderedDict([
+                    ("event", "failed"),
+                    ("dump", dump),
+                    ("error", "%s: %s" % (e.__class__.__name__, e)),
+                ])
+            else:
+                event = OrderedDict([
+                    ("event", "imported" if releases is not None else "skipped"),
+                    ("dump", dump),
+                    ("releases", releases),
+                    ("elapsed", round(time.monotonic() - started, 3)),
+                ])
+            print(json.dumps(event), flush=True)
+        return 1 if failed else 0
+    elif args.command == "serve":
+        job_server = EncodingJobServer(
+            host=args.host, port=args.port, max_jobs=args.max_jobs)
+        print("Listening on http://%s:%d/jobs" % job_server.address[:2])
+        try:
+            job_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if not _TK_AVAILABLE:
+        print(
+            "The FLACManager UI requires Tk; use the batch or watch command "
+                "to run without it.",
+            file=sys.stderr)
+        return 1
+
     ui = get_config()["UI"]
+    global _PADX, _PADY
     _PADX = ui.getint("padx", _PADX)
     _PADY = ui.getint("pady", _PADY)
 
@@ -6398,7 +14133,10 @@ if __name__ == "__main__":
         _log.exception("aborting")
         show_exception_dialog(e, aborting=True)
         print("%s: %s" % (e.__class__.__name__, e), file=sys.stderr)
-        sys.exit(1)
+        return 1
 
-    sys.exit(0)
+    return 0
 
+
+if __name__ == "__main__":
+    sys.exit(main())